@@ -0,0 +1,88 @@
+""" Compare photos() query time using sets (the default) and bitmap indexes (bitmaps=True)
+    Loads a synthetic library (see synthetic_library.py) of each size given and times
+    queries that combine keywords, persons, albums, types and flags both ways.
+    The library is loaded once for each size and the same PhotosDB is queried both ways.
+
+    Usage: python bitmap_query.py [COUNT ...] """
+
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+
+from synthetic_library import make_library
+
+QUERIES = [
+    {"keywords": ["wedding"], "persons": ["Maria"], "favorite": True, "hidden": False},
+    {"keywords": ["Kids"], "persons": ["Katie"], "hidden": False},
+    {"keywords": ["Kids"], "movies": True},
+    {"albums": ["Pumpkin Farm"], "favorite": False},
+    {"favorite": False, "hasadjustments": True, "burst": False},
+]
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def match(photosdb, query):
+    """ returns Bitmap of the photos matching query without creating PhotoInfo objects """
+    index = photosdb._get_index()
+    bitmap = index.select(
+        **{k: v for k, v in query.items() if k not in ("keywords", "persons", "albums")}
+    )
+    for keyword in query.get("keywords", []):
+        bitmap &= index.related("_dbkeywords", keyword)
+    for person in query.get("persons", []):
+        bitmap &= index.related("_dbfaces", person)
+    for album in query.get("albums", []):
+        for album_id in photosdb._album_titles()[album]:
+            bitmap &= index.related("_dbalbums", album_id)
+    return bitmap
+
+
+def benchmark(count):
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        photosdb, load = timed(lambda: osxphotos.PhotosDB(library), repeat=1)
+    print(f"Load: {load:.2f}s")
+
+    # build all the indexes the queries use so only query time is compared
+    photosdb._bitmaps = True
+    _, build = timed(lambda: [photosdb.photos(**query) for query in QUERIES], repeat=1)
+    print(f"Bitmap indexes built in {build:.2f}s")
+
+    print(f"{'query':<82}{'photos':>8}{'sets s':>9}{'bitmaps s':>11}{'match ms':>10}")
+    for query in QUERIES:
+        photosdb._bitmaps = False
+        photos, elapsed = timed(lambda: photosdb.photos(**query))
+        photosdb._bitmaps = True
+        photos_bitmap, elapsed_bitmap = timed(lambda: photosdb.photos(**query))
+        assert sorted(p.uuid for p in photos) == sorted(p.uuid for p in photos_bitmap)
+        # PhotoInfo objects are created for every match either way; time just the matching
+        _, match_elapsed = timed(lambda: match(photosdb, query))
+        print(
+            f"{str(query):<82}{len(photos):>8}{elapsed:>9.3f}{elapsed_bitmap:>11.3f}"
+            f"{match_elapsed * 1000:>10.2f}"
+        )
+
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or [100000, 1000000]
+    for count in counts:
+        benchmark(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+""" Compare the time to find the photos matching date criteria of photos() by checking the
+    date of every photo (how photos() used to do it) and with the sorted date indexes
+    (PhotosDB._date_sets), and the time of the whole photos() query with the indexes
+    Loads a synthetic library (see synthetic_library.py) whose photos are spread out over
+    ~20 years; the indexes are built before timing and the time to build them is shown
+
+    Usage: python date_query.py [COUNT] """
+
+import datetime
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+from osxphotos.utils import _coredata_to_datetime, _datetime_to_coredata
+
+from synthetic_library import make_library
+
+UTC = datetime.timezone.utc
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def scan(photosdb, query):
+    """ returns set of uuids matching the date criteria of query, checking every photo """
+    start = query.get("from_date") or query.get("modified_since")
+    end = query.get("to_date") or query.get("modified_before")
+    modified = "modified_since" in query or "modified_before" in query
+    field = "lastmodifieddate" if modified else "imageDate"
+    start = _datetime_to_coredata(start) if start else None
+    end = _datetime_to_coredata(end) if end else None
+    month = query.get("month")
+    day = query.get("day")
+
+    uuids = set()
+    for uuid, info in photosdb._dbphotos.items():
+        timestamp = info[field]
+        if timestamp is None:
+            continue
+        if start is not None and timestamp < start:
+            continue
+        if end is not None and (
+            timestamp > end if field == "imageDate" else timestamp >= end
+        ):
+            continue
+        if month or day:
+            date = _coredata_to_datetime(timestamp, info["imageTimeZoneOffsetSeconds"])
+            if month not in (None, date.month) or day not in (None, date.day):
+                continue
+        uuids.add(uuid)
+    return uuids
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        photosdb = osxphotos.PhotosDB(library)
+
+    _, build = timed(
+        lambda: [
+            photosdb._get_date_index(field)
+            for field in ("imageDate", "lastmodifieddate")
+        ],
+        repeat=1,
+    )
+    print(f"{len(photosdb._dbphotos)} photos, date indexes built in {build:.3f}s")
+    # date range of the library to pick queries that select a share of it
+    timestamps = photosdb._get_date_index("imageDate").timestamps
+    last = _coredata_to_datetime(timestamps[-1]).astimezone(UTC)
+    year = datetime.datetime(last.year - 5, 1, 1, tzinfo=UTC)
+    modified = _coredata_to_datetime(
+        photosdb._get_date_index("lastmodifieddate").timestamps[-1]
+    ).astimezone(UTC)
+
+    queries = [
+        {"from_date": year, "to_date": year + datetime.timedelta(days=31)},
+        {"from_date": year, "to_date": year.replace(year=year.year + 1)},
+        {"modified_since": modified - datetime.timedelta(days=30)},
+        {"month": 12, "day": 25},
+    ]
+
+    print(
+        f"{'query':<40}{'photos':>8}{'scan ms':>10}{'index ms':>10}{'photos() ms':>13}"
+    )
+    for query in queries:
+        expected, scan_time = timed(lambda: scan(photosdb, query))
+        (found,), index_time = timed(lambda: photosdb._date_sets(**query))
+        assert found == expected
+        _, photos_time = timed(lambda: photosdb.photos(movies=True, **query))
+        label = ", ".join(
+            f"{k}={v.date() if isinstance(v, datetime.datetime) else v}"
+            for k, v in query.items()
+        )
+        print(
+            f"{label:<40}{len(found):>8}{scan_time * 1000:>10.1f}"
+            f"{index_time * 1000:>10.1f}{photos_time * 1000:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
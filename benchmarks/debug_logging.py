@@ -0,0 +1,62 @@
+""" Show that photos() with debugging off (the default) doesn't pay for debug messages:
+    photos() time is compared with list(iter_photos()), which doesn't log, for queries
+    returning more and more photos (the newest photos by date), along with the time
+    photos() used to spend formatting its debug message (pformat of the returned
+    PhotoInfo objects) even with debugging off
+    Loads a synthetic library (see synthetic_library.py) of the size given
+
+    Usage: python debug_logging.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+from pprint import pformat
+
+import osxphotos
+from osxphotos.utils import _coredata_to_datetime
+
+from synthetic_library import make_library
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        photosdb = osxphotos.PhotosDB(library)
+
+    osxphotos._set_debug(False)
+    # newest size photos by creation date
+    timestamps = photosdb._get_date_index("imageDate").timestamps
+    print(
+        f"{'photos':>8}{'photos() ms':>13}{'iter_photos() ms':>18}{'overhead %':>12}"
+        f"{'pformat ms':>12}"
+    )
+    for size in (10, 1000, 10000, len(timestamps)):
+        since = _coredata_to_datetime(timestamps[-size])
+        query = {"from_date": since, "movies": True}
+        photos, photos_time = timed(lambda: photosdb.photos(**query))
+        _, iter_time = timed(lambda: list(photosdb.iter_photos(**query)))
+        _, format_time = timed(lambda: pformat(photos), repeat=1)
+        overhead = (photos_time - iter_time) / iter_time * 100
+        print(
+            f"{len(photos):>8}{photos_time * 1000:>13.1f}{iter_time * 1000:>18.1f}"
+            f"{overhead:>12.1f}{format_time * 1000:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
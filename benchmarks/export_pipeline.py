@@ -0,0 +1,91 @@
+""" Compare the time of the export command exporting one photo at a time (--workers 1) vs.
+    running the export stages in a pipeline with the same number of threads for every stage
+    (--workers N --pipeline-stats) vs. more threads for the stage that limits export speed
+    (--stage-workers), and print the --pipeline-stats of each pipeline export
+    Creates a synthetic library (see synthetic_library.py) of COUNT photos with an original
+    file of 100 KB for each photo, then exports it with json and xmp sidecars, adding LATENCY
+    milliseconds to each file copy and a fifth of that to each sidecar write to stand in for a
+    network volume where copying a photo takes longer than writing its small sidecars
+
+    Usage: python export_pipeline.py [COUNT] [LATENCY] """
+
+import os
+import os.path
+import sys
+import tempfile
+import time
+
+from click.testing import CliRunner
+
+import osxphotos
+import osxphotos.filecopy
+from osxphotos.__main__ import export
+from osxphotos.photoinfo import PhotoInfo
+
+from parallel_export import make_originals, with_latency
+from synthetic_library import make_library
+
+# export options compared
+OPTIONS = [
+    ["--workers", "1"],
+    ["--workers", "1", "--pipeline-stats"],
+    ["--workers", "4", "--pipeline-stats"],
+    ["--workers", "4", "--stage-workers", "copy=16", "--pipeline-stats"],
+]
+
+
+def slow_write_sidecar(write_sidecar, latency):
+    """ returns PhotoInfo._write_sidecar that waits latency seconds before writing """
+
+    def _write_sidecar(self, filename, sidecar_str):
+        time.sleep(latency)
+        return write_sidecar(self, filename, sidecar_str)
+
+    return _write_sidecar
+
+
+def run_export(library, options):
+    """ returns (sorted list of files exported, time in seconds, stats printed) exporting
+        library with options """
+    with tempfile.TemporaryDirectory() as dest:
+        start = time.perf_counter()
+        result = CliRunner().invoke(
+            export, [library, dest, "--sidecar", "json", "--sidecar", "xmp"] + options
+        )
+        elapsed = time.perf_counter() - start
+        assert result.exit_code == 0, result.output
+        lines = result.output.splitlines()
+        # --pipeline-stats prints the stats after a header starting with "stage"
+        header = [i for i, line in enumerate(lines) if line.startswith("stage ")]
+        stats = lines[header[0] :] if header else []
+        return sorted(os.listdir(dest)), elapsed, stats
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 10.0
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        make_originals(library)
+
+        osxphotos.filecopy._copy_to = with_latency(
+            osxphotos.filecopy._copy_to, latency / 1000
+        )
+        PhotoInfo._write_sidecar = slow_write_sidecar(
+            PhotoInfo._write_sidecar, latency / 5000
+        )
+        expected = None
+        for options in OPTIONS:
+            files, elapsed, stats = run_export(library, options)
+            assert expected is None or files == expected
+            expected = files
+            print()
+            print(f"{' '.join(options)}: {len(files)} files in {elapsed:.2f} s")
+            for line in stats:
+                print(f"  {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+""" Compare finding names for exported files by listing the destination folder for each file
+    (how PhotoInfo.export does it without a session: glob of the file's stem, adding (1), (2),
+    etc. until the stem isn't used) and checking/creating the export by date folder for each
+    file (utils.create_path_by_date) vs. with an ExportSession, which lists each folder once
+    and checks or creates each date folder once
+    Reserves COUNT names, a quarter of them repeated, in one folder and in date folders
+    (photos taken over DAYS days) and creates an empty file for each like export would
+
+    Usage: python export_session.py [COUNT] [DAYS] """
+
+import datetime
+import glob
+import os
+import os.path
+import pathlib
+import sys
+import tempfile
+import time
+
+from osxphotos import ExportSession
+from osxphotos.utils import create_path_by_date
+
+
+def make_exports(count, days):
+    """ returns list of (file name, timetuple of date taken) of count photos """
+    start = datetime.datetime(2019, 1, 1)
+    return [
+        (
+            f"IMG_{i % (count * 3 // 4) + 1:06d}.JPG",
+            (start + datetime.timedelta(i % days)).timetuple(),
+        )
+        for i in range(count)
+    ]
+
+
+def globbed(dest, exports, by_date):
+    """ export with a glob of the destination folder for each file; returns names used """
+    names = []
+    for filename, date in exports:
+        folder = create_path_by_date(dest, date) if by_date else dest
+        path = pathlib.Path(folder) / filename
+        dest_files = [
+            pathlib.Path(f).stem for f in glob.glob(str(path.parent / f"{path.stem}*"))
+        ]
+        count = 1
+        stem = path.stem
+        while stem in dest_files:
+            stem = f"{path.stem} ({count})"
+            count += 1
+        path = path.parent / f"{stem}{path.suffix}"
+        path.touch()
+        names.append(str(path.relative_to(dest)))
+    return names
+
+
+def with_session(dest, exports, by_date):
+    """ export with a new ExportSession; returns names used """
+    session = ExportSession()
+    names = []
+    for filename, date in exports:
+        folder = session.create_path_by_date(dest, date) if by_date else dest
+        path = session.reserve(pathlib.Path(folder) / filename)
+        path.touch()
+        names.append(str(path.relative_to(dest)))
+    return names
+
+
+def timed(func):
+    """ returns (result of func(), time in seconds it took) """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+    exports = make_exports(count, days)
+    print(f"{'exports':>10}{'folders':>10}{'glob s':>10}{'session s':>11}")
+    for by_date in (False, True):
+        results = []
+        for export in (globbed, with_session):
+            with tempfile.TemporaryDirectory() as dest:
+                results.append(timed(lambda: export(dest, exports, by_date)))
+        (expected, glob_time), (names, session_time) = results
+        assert names == expected
+        folders = days if by_date else 1
+        print(f"{count:>10}{folders:>10}{glob_time:>10.2f}{session_time:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+""" Compare the time of exporting a library again in full vs. with --update, which only exports
+    the photos that changed since the last export
+    Creates a synthetic library (see synthetic_library.py) of COUNT photos with an original
+    file of 100 KB for each photo, exports it with --update and json sidecars, then changes
+    the titles of CHANGED percent of the photos and exports it again: in full to a new folder
+    and with --update to the first folder, which writes the changed photos' sidecars again
+    LATENCY milliseconds are added to each file copy to stand in for a network volume
+
+    Usage: python export_update.py [COUNT] [CHANGED] [LATENCY] """
+
+import os
+import os.path
+import sqlite3
+import sys
+import tempfile
+import time
+
+from click.testing import CliRunner
+
+import osxphotos
+import osxphotos.filecopy
+from osxphotos.__main__ import export
+
+from parallel_export import make_originals, with_latency
+from synthetic_library import make_library
+
+
+def change_titles(library, percent):
+    """ change the title of percent % of the photos in library, as if they were edited in
+        Photos; returns number of photos changed """
+    conn = sqlite3.connect(os.path.join(library, "database", "Photos.sqlite"))
+    pks = [
+        row[0]
+        for row in conn.execute(
+            "SELECT Z_PK FROM ZADDITIONALASSETATTRIBUTES ORDER BY Z_PK"
+        )
+    ]
+    changed = pks[:: max(1, round(100 / percent))] if percent else []
+    with conn:
+        conn.executemany(
+            "UPDATE ZADDITIONALASSETATTRIBUTES SET ZTITLE = 'Changed' WHERE Z_PK = ?",
+            [(pk,) for pk in changed],
+        )
+    conn.close()
+    return len(changed)
+
+
+def run_export(library, dest, options):
+    """ returns (summary printed by export, time in seconds) exporting library to dest """
+    start = time.perf_counter()
+    result = CliRunner().invoke(export, [library, dest, "--sidecar", "json"] + options)
+    elapsed = time.perf_counter() - start
+    assert result.exit_code == 0, result.output
+    lines = result.output.splitlines()
+    summary = next(i for i, line in enumerate(lines) if line.startswith("Exported "))
+    return "; ".join(lines[summary:]), elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    percent = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 5.0
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        make_originals(library)
+        osxphotos.filecopy._copy_to = with_latency(
+            osxphotos.filecopy._copy_to, latency / 1000
+        )
+
+        update_dest = os.path.join(tempdir, "update")
+        os.makedirs(update_dest)
+        output, elapsed = run_export(library, update_dest, ["--update"])
+        print(f"first export with --update: {elapsed:.2f} s ({output})")
+        changed = change_titles(library, percent)
+        print(f"changed the titles of {changed} photos")
+
+        full_dest = os.path.join(tempdir, "full")
+        os.makedirs(full_dest)
+        output, elapsed = run_export(library, full_dest, [])
+        print(f"full export: {elapsed:.2f} s ({output})")
+        output, elapsed = run_export(library, update_dest, ["--update"])
+        print(f"export with --update: {elapsed:.2f} s ({output})")
+
+
+if __name__ == "__main__":
+    main()
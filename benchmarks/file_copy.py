@@ -0,0 +1,84 @@
+""" Compare the time per file to copy files with a process for each file (how export used to
+    copy files: /usr/bin/ditto, or cp -p where there's no ditto) vs. copying them in-process
+    with filecopy.copy_file, which export now uses
+    Copies COUNT files of SIZE KB (default 1000 files of 200 KB, about the size of a small JPEG)
+
+    Usage: python file_copy.py [COUNT] [SIZE] """
+
+import os
+import os.path
+import subprocess
+import sys
+import tempfile
+import time
+
+from osxphotos.filecopy import copy_file
+
+COMMAND = ["/usr/bin/ditto"] if os.path.exists("/usr/bin/ditto") else ["cp", "-p"]
+
+
+def make_files(directory, count, size):
+    """ create count files of size bytes in directory; returns list of their paths """
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"IMG_{i:06d}.JPG")
+        with open(path, "wb") as f:
+            f.write(os.urandom(size))
+        paths.append(path)
+    return paths
+
+
+def subprocesses(paths, dest):
+    """ copy each of paths to dest with a new process """
+    for path in paths:
+        subprocess.run(
+            COMMAND + [path, os.path.join(dest, os.path.basename(path))],
+            check=True,
+            stderr=subprocess.PIPE,
+        )
+
+
+def in_process(paths, dest):
+    """ copy each of paths to dest with copy_file """
+    for path in paths:
+        copy_file(path, os.path.join(dest, os.path.basename(path)))
+
+
+def timed(func):
+    """ returns time in seconds func() took """
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    with tempfile.TemporaryDirectory() as tempdir:
+        src = os.path.join(tempdir, "src")
+        os.makedirs(src)
+        print(f"Creating {count} files of {size} KB")
+        paths = make_files(src, count, size * 1024)
+
+        times = []
+        for copy in (subprocesses, in_process):
+            dest = os.path.join(tempdir, copy.__name__)
+            os.makedirs(dest)
+            times.append(timed(lambda: copy(paths, dest)))
+            for path in paths:
+                with open(path, "rb") as f1, open(
+                    os.path.join(dest, os.path.basename(path)), "rb"
+                ) as f2:
+                    assert f1.read() == f2.read()
+
+        command = " ".join(COMMAND)
+        print(
+            f"{'files':>8}{'KB':>6}{command + ' ms/file':>24}{'in-process ms/file':>20}"
+        )
+        print(
+            f"{count:>8}{size:>6}{times[0] * 1000 / count:>24.2f}{times[1] * 1000 / count:>20.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
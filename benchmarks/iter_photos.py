@@ -0,0 +1,83 @@
+""" Compare getting every photo of a library with photos(), which loads the library and
+    returns a list, and with iter_photos() on a lazy PhotosDB, which reads the photos from
+    the database a batch at a time: time to the first photo, total time and peak memory
+    Loads a synthetic library (see synthetic_library.py) of each size given; the date and
+    ismissing of each PhotoInfo are read (as export does) so every photo is visited.
+    Peak memory is measured with tracemalloc in a separate run from the times.
+
+    Usage: python iter_photos.py [COUNT ...] """
+
+import os.path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import osxphotos
+
+from synthetic_library import make_library
+
+
+def with_list(library):
+    photosdb = osxphotos.PhotosDB(library)
+    return photosdb.photos(movies=True)
+
+
+def with_iterator(library):
+    photosdb = osxphotos.PhotosDB(library, lazy=True)
+    return photosdb.iter_photos(movies=True)
+
+
+def run(get_photos, library):
+    """ returns (seconds to first photo, total seconds, number of photos) """
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for photo in get_photos(library):
+        photo.date
+        photo.ismissing
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    return first, time.perf_counter() - start, count
+
+
+def peak_memory(get_photos, library):
+    """ returns peak bytes allocated while getting every photo """
+    tracemalloc.start()
+    for photo in get_photos(library):
+        photo.date
+        photo.ismissing
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark(count):
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+
+        print(
+            f"{'method':<15}{'photos':>8}{'first s':>10}{'total s':>10}{'peak MB':>10}"
+        )
+        for name, get_photos in (
+            ("photos()", with_list),
+            ("iter_photos()", with_iterator),
+        ):
+            first, total, photos = run(get_photos, library)
+            peak = peak_memory(get_photos, library)
+            print(
+                f"{name:<15}{photos:>8}{first:>10.2f}{total:>10.2f}{peak / 2**20:>10.1f}"
+            )
+
+
+def main():
+    counts = [int(count) for count in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        benchmark(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+""" Compare the time to find photos near a point or in a bounding box by checking the
+    location of every photo and with the grid index photos() uses (see GeoIndex)
+    Builds the index over COUNT geotagged photos scattered around a few cities and
+    over the rest of the world (photo data only, not a library, so a million or more
+    photos can be indexed quickly); the time to build the index is shown
+
+    Usage: python location_query.py [COUNT] """
+
+import math
+import random
+import sys
+import time
+
+from osxphotos.geoindex import GeoIndex
+
+CITIES = [(51.507, -0.128), (40.713, -74.006), (35.690, 139.692), (-33.869, 151.209)]
+
+QUERIES = [
+    {"near": (51.507, -0.128, 1)},
+    {"near": (51.507, -0.128, 10)},
+    {"near": (40.713, -74.006, 100)},
+    {"near": (0.0, 0.0, 1000)},
+    {"bbox": (51.4, -0.3, 51.6, 0.0)},
+    {"bbox": (30.0, 130.0, 40.0, 145.0)},
+    {"bbox": (-40.0, 170.0, 0.0, -170.0)},
+]
+
+
+class Photos:
+    """ stand-in for PhotosDB with just the photo data GeoIndex uses """
+
+    def __init__(self, count):
+        random.seed(count)
+        self._dbphotos = {}
+        for i in range(count):
+            if i % 5:
+                lat, lon = random.choice(CITIES)
+                lat += random.gauss(0, 0.2)
+                lon += random.gauss(0, 0.2)
+            else:
+                lat = math.degrees(math.asin(random.uniform(-1, 1)))
+                lon = random.uniform(-180, 180)
+            self._dbphotos[f"{i:08X}"] = {"latitude": lat, "longitude": lon}
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    a = (
+        math.sin((phi2 - phi1) / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    )
+    return 2 * 6371.0088 * math.asin(min(1.0, math.sqrt(a)))
+
+
+def scan(photos, query):
+    """ returns set of uuids matching query, checking every photo """
+    uuids = set()
+    for uuid, info in photos._dbphotos.items():
+        lat = info["latitude"]
+        lon = info["longitude"]
+        if "near" in query:
+            near_lat, near_lon, radius = query["near"]
+            if distance_km(near_lat, near_lon, lat, lon) > radius:
+                continue
+        if "bbox" in query:
+            min_lat, min_lon, max_lat, max_lon = query["bbox"]
+            if not min_lat <= lat <= max_lat:
+                continue
+            if min_lon <= max_lon and not min_lon <= lon <= max_lon:
+                continue
+            if min_lon > max_lon and max_lon < lon < min_lon:
+                continue
+        uuids.add(uuid)
+    return uuids
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print(f"Creating {count} geotagged photos")
+    photos = Photos(count)
+    geo_index, build = timed(lambda: GeoIndex(photos), repeat=1)
+    print(f"Location index built in {build:.2f}s ({len(geo_index._cells)} cells)")
+
+    print(f"{'query':<45}{'photos':>8}{'scan ms':>10}{'index ms':>10}")
+    for query in QUERIES:
+        expected, scan_time = timed(lambda: scan(photos, query), repeat=1)
+        if "near" in query:
+            found, index_time = timed(lambda: geo_index.near(*query["near"]))
+        else:
+            found, index_time = timed(lambda: geo_index.bbox(*query["bbox"]))
+        assert set(found) == expected
+        print(
+            f"{str(query):<45}{len(found):>8}{scan_time * 1000:>10.1f}"
+            f"{index_time * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+""" Compare the time of the export command exporting one photo at a time (--workers 1) vs.
+    several at a time (--workers N)
+    Creates a synthetic library (see synthetic_library.py) of COUNT photos with an original
+    file of 100 KB for each photo, then exports it with json sidecars, adding LATENCY
+    milliseconds to each file copy to stand in for a network volume, where each write waits
+    on the server (a local disk is too fast to show the difference on a small test machine)
+
+    Usage: python parallel_export.py [COUNT] [LATENCY] [WORKERS ...] """
+
+import os
+import os.path
+import sys
+import tempfile
+import time
+
+from click.testing import CliRunner
+
+import osxphotos
+import osxphotos.filecopy
+from osxphotos.__main__ import export
+
+from synthetic_library import make_library
+
+
+def make_originals(library):
+    """ create an original file for each photo in library """
+    photosdb = osxphotos.PhotosDB(library)
+    for photo in photosdb.photos(movies=True):
+        if photo.ismissing or photo.path is None:
+            continue
+        os.makedirs(os.path.dirname(photo.path), exist_ok=True)
+        with open(photo.path, "wb") as f:
+            f.write(os.urandom(100 * 1024))
+
+
+def with_latency(copy_to, latency):
+    """ returns filecopy._copy_to that waits latency seconds before copying """
+
+    def slow_copy_to(src, tmp):
+        time.sleep(latency)
+        return copy_to(src, tmp)
+
+    return slow_copy_to
+
+
+def run_export(library, workers):
+    """ returns (sorted list of files exported, time in seconds) exporting library with workers """
+    with tempfile.TemporaryDirectory() as dest:
+        start = time.perf_counter()
+        result = CliRunner().invoke(
+            export, [library, dest, "--sidecar", "json", "--workers", str(workers)],
+        )
+        elapsed = time.perf_counter() - start
+        assert result.exit_code == 0, result.output
+        return sorted(os.listdir(dest)), elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+    workers = [int(arg) for arg in sys.argv[3:]] or [1, 4, 16]
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        make_originals(library)
+
+        osxphotos.filecopy._copy_to = with_latency(
+            osxphotos.filecopy._copy_to, latency / 1000
+        )
+        print(f"{'workers':>8}{'files':>8}{'latency ms':>12}{'export s':>10}")
+        expected = None
+        for n in workers:
+            files, elapsed = run_export(library, n)
+            assert expected is None or files == expected
+            expected = files
+            print(f"{n:>8}{len(files):>8}{latency:>12.1f}{elapsed:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+""" Compare PhotosDB load time serially and with parallel loading
+    Times loading the test libraries and a synthetic library (see synthetic_library.py)
+    with the default serial loader, with workers (queries run on parallel connections in
+    threads) and with processes (the photos table read in ranges by worker processes).
+
+    Usage: python parallel_load.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+
+from synthetic_library import TEMPLATE_LIBRARY, make_library
+
+TEST_LIBRARIES = [
+    TEMPLATE_LIBRARY,
+    os.path.join(os.path.dirname(TEMPLATE_LIBRARY), "Test-10.14.6.photoslibrary"),
+]
+
+MODES = [
+    ("serial", {}),
+    ("workers=4", {"workers": 4}),
+    ("processes=4", {"processes": 4}),
+    ("workers=4, processes=4", {"workers": 4, "processes": 4}),
+]
+
+
+def best_time(library, repeat, **kwargs):
+    """ returns best time in seconds of repeat loads of library """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        osxphotos.PhotosDB(library, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def report(library, repeat):
+    print(os.path.basename(library))
+    serial = None
+    for name, kwargs in MODES:
+        elapsed = best_time(library, repeat, **kwargs)
+        serial = serial or elapsed
+        print(f"  {name:<25}{elapsed:>8.3f}s  speedup {serial / elapsed:.2f}x")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for library in TEST_LIBRARIES:
+        report(library, repeat=5)
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        report(library, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+""" Compare repeated photos() queries, set operations on the results and reading derived
+    properties (path, albums) with PhotoInfo objects created for every query and compared
+    by their data (how PhotosDB used to work) vs. the cached PhotoInfo objects PhotosDB
+    hands out now, which are compared and hashed by library and uuid
+    Loads a synthetic library (see synthetic_library.py) of the size given
+
+    Usage: python photo_info.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+from osxphotos.photoinfo import PhotoInfo
+
+from synthetic_library import make_library
+
+
+class UncachedPhotoInfo(PhotoInfo):
+    """ PhotoInfo as it was: compared by __dict__, not hashable, nothing memoized """
+
+    path = property(PhotoInfo.path.fget.__wrapped__)
+    albums = property(PhotoInfo.albums.fget.__wrapped__)
+
+    def __eq__(self, other):
+        return isinstance(other, PhotoInfo) and self.__dict__ == other.__dict__
+
+    __hash__ = None
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def uncached_photos(photosdb, **query):
+    return [
+        UncachedPhotoInfo(db=photosdb, uuid=p.uuid, info=p._info)
+        for p in photosdb.photos(**query)
+    ]
+
+
+def workload(photos, query):
+    """ photos common to two queries and their paths and albums, read twice as a report
+        that lists each photo's path and albums would """
+    first = photos(**query[0])
+    second = photos(**query[1])
+    try:
+        both = set(first) & set(second)
+    except TypeError:
+        # not hashable: compare every pair of photos
+        both = [p for p in first if any(p == q for q in second)]
+    for _ in range(2):
+        for photo in first:
+            photo.path
+            photo.albums
+    return len(both)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        photosdb = osxphotos.PhotosDB(library)
+
+    queries = [({"keywords": ["Kids"]}, {"persons": ["Katie"]}), ({}, {"movies": True})]
+    print(f"{'queries':<60}{'common':>8}{'uncached s':>12}{'cached s':>10}")
+    for query in queries:
+        kept = photosdb.photos(movies=True)  # photos in use stay cached
+        common, cached = timed(lambda: workload(photosdb.photos, query))
+        if (
+            len(photosdb.photos(**query[0])) * len(photosdb.photos(**query[1]))
+            > 10 ** 8
+        ):
+            uncached, label = None, "skipped"
+        else:
+            uncached_common, uncached = timed(
+                lambda: workload(lambda **q: uncached_photos(photosdb, **q), query),
+                repeat=1,
+            )
+            assert uncached_common == common
+            label = f"{uncached:.3f}"
+        del kept
+        print(f"{str(query):<60}{common:>8}{label:>12}{cached:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+""" Compare the time to run queries that combine flags (--favorite, --not-missing, --no-title,
+    etc.) by filtering the list of photos once per flag in a fixed order (how the query command
+    used to do it) vs. with PhotoQuery, which checks the flags for each photo in a single pass,
+    cheapest and most selective first
+    Loads a synthetic library (see synthetic_library.py) of the size given
+
+    Usage: python photo_query.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+
+from synthetic_library import make_library
+
+# the query command's flags in the order it used to filter by them
+CHAINED = [
+    ("no_title", lambda p: not p.title),
+    ("no_description", lambda p: not p.description),
+    ("hasadjustments", lambda p: p.hasadjustments),
+    ("external_edit", lambda p: p.external_edit),
+    ("favorite", lambda p: p.favorite),
+    ("hidden", lambda p: p.hidden),
+    ("ismissing", lambda p: p.ismissing),
+    ("shared", lambda p: p.shared),
+    ("burst", lambda p: p.burst),
+    ("live_photo", lambda p: p.live_photo),
+    ("iscloudasset", lambda p: p.iscloudasset),
+    ("incloud", lambda p: p.incloud),
+]
+
+QUERIES = [
+    {"ismissing": False, "favorite": True},
+    {"no_description": True, "no_title": True},
+    {"ismissing": False, "hidden": False, "incloud": False, "live_photo": True},
+    {"keywords": ["Kids"], "ismissing": False, "favorite": False, "shared": False},
+]
+
+
+def chained(photosdb, query):
+    """ returns photos matching query, filtering the photos once for each flag in turn """
+    query = dict(query)
+    photos = photosdb.photos(keywords=query.pop("keywords", None), movies=True)
+    for name, matches in CHAINED:
+        if name not in query:
+            continue
+        value = query[name]
+        photos = [p for p in photos if bool(matches(p)) == bool(value)]
+    return photos
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+        photosdb = osxphotos.PhotosDB(library)
+
+    kept = photosdb.photos(movies=True)  # photos in use stay cached
+    print(f"{'query':<75}{'photos':>8}{'chained s':>11}{'query s':>9}")
+    for query in QUERIES:
+        expected, chained_time = timed(lambda: chained(photosdb, query))
+        photo_query = osxphotos.PhotoQuery(movies=True, **query)
+        found, query_time = timed(lambda: photo_query.photos(photosdb))
+        assert set(found) == set(expected)
+        label = ", ".join(f"{name}={value}" for name, value in query.items())
+        print(f"{label:<75}{len(found):>8}{chained_time:>11.3f}{query_time:>9.3f}")
+    del kept
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+""" Compare checking that the originals of photos exist one at a time (how PhotoInfo.path
+    and export() check them) vs. ResourceIndex.prefetch, which checks them on a pool of
+    threads ahead of time so the lookups that follow don't go to the disk
+    Creates COUNT original files in folders like Photos does, an eighth of them missing, and
+    adds LATENCY milliseconds to each check to stand in for a network volume, where each
+    check is a round trip to the server (the local disk answers from its cache)
+
+    Usage: python prefetch_paths.py [COUNT] [LATENCY] """
+
+import os
+import os.path
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from osxphotos._constants import _PREFETCH_WORKERS
+from osxphotos.resourceindex import ResourceIndex
+
+
+def make_tree(root, count):
+    """ create count original files in root; returns list of paths to check """
+    paths = []
+    for i in range(count):
+        directory = os.path.join(root, f"{i % 16:X}")
+        path = os.path.join(directory, f"{i:08X}.jpeg")
+        paths.append(path)
+        if i % 8 == 7:
+            # photo in the library but file missing (e.g. not downloaded)
+            continue
+        os.makedirs(directory, exist_ok=True)
+        open(path, "w").close()
+    return paths
+
+
+def with_latency(latency):
+    """ returns os.path.isfile that waits latency seconds before checking """
+    isfile = os.path.isfile
+
+    def slow_isfile(path):
+        time.sleep(latency)
+        return isfile(path)
+
+    return slow_isfile
+
+
+def serial(paths):
+    """ returns number of paths that are files, checking them one at a time """
+    return sum(1 for path in paths if os.path.isfile(path))
+
+
+def prefetched(paths):
+    """ returns number of paths that are files, prefetched with a new ResourceIndex """
+    index = ResourceIndex([])
+    with ThreadPoolExecutor(max_workers=_PREFETCH_WORKERS) as executor:
+        index.prefetch(paths, executor)
+    return sum(1 for path in paths if index.isfile(path))
+
+
+def timed(func):
+    """ returns (result of func(), time in seconds it took) """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+    with tempfile.TemporaryDirectory() as tempdir:
+        root = os.path.join(tempdir, "originals")
+        print(f"Creating {count} original files")
+        paths = make_tree(root, count)
+
+        isfile = os.path.isfile
+        os.path.isfile = with_latency(latency / 1000)
+        try:
+            expected, serial_time = timed(lambda: serial(paths))
+            found, prefetch_time = timed(lambda: prefetched(paths))
+        finally:
+            os.path.isfile = isfile
+        assert found == expected
+        print(
+            f"{'paths':>10}{'found':>10}{'latency ms':>12}{'serial s':>10}{'prefetch s':>12}"
+        )
+        print(
+            f"{count:>10}{found:>10}{latency:>12.1f}{serial_time:>10.2f}{prefetch_time:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+""" Compare the memory used to store per-photo data as dicts (the old layout)
+    vs. the __slots__ records PhotosDB uses now (_PhotoRecord)
+    Loads a synthetic library (see synthetic_library.py) then measures how much
+    memory the containers holding each photo's fields take in each layout.
+    The field values themselves are shared by both layouts so aren't counted.
+
+    Usage: python record_memory.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import osxphotos
+from osxphotos.photosdb import _PhotoRecord
+
+from synthetic_library import make_library
+
+
+def measure(build):
+    """ returns (result of build(), bytes allocated while building it) """
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def as_dicts(records):
+    return [dict(record.items()) for record in records]
+
+
+def as_records(records):
+    copies = []
+    for record in records:
+        copy = _PhotoRecord()
+        for field, value in record.items():
+            copy[field] = value
+        copies.append(copy)
+    return copies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+
+        start = time.time()
+        photosdb = osxphotos.PhotosDB(library)
+        print(f"Loaded library in {time.time() - start:.1f} seconds")
+
+    records = list(photosdb._dbphotos.values())
+    fields = sum(len(record) for record in records) / len(records)
+    print(f"{len(records)} photos, {fields:.0f} fields per photo")
+
+    # build each layout from the same values so only the containers are compared
+    dicts, dict_size = measure(lambda: as_dicts(records))
+    del dicts
+    slots, slots_size = measure(lambda: as_records(records))
+    del slots
+
+    print(f"{'layout':<10}{'total MB':>12}{'bytes/photo':>14}")
+    for layout, size in (("dict", dict_size), ("slots", slots_size)):
+        print(f"{layout:<10}{size / 2**20:>12.1f}{size / len(records):>14.0f}")
+    print(f"slots records use {100 * (1 - slots_size / dict_size):.0f}% less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+""" Compare the memory used to store the keyword, person and album relationships as
+    dicts of lists of strings (the old layout) vs. the dictionary-encoded Relationship
+    objects PhotosDB uses now, and the time taken to intersect the photos of a keyword
+    and a person in each layout (PhotosDB._photos_sets for the new layout)
+    Loads a synthetic library (see synthetic_library.py) then builds each layout from
+    the rows of the queries PhotosDB uses to load the relationships.
+    PhotosDB keeps every photo uuid in its IdTable (_dbuuids) and uses the same strings
+    for _dbphotos so the table is built before measuring and isn't counted.
+
+    Usage: python relationship_memory.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import osxphotos
+from osxphotos._constants import _UNKNOWN_PERSON
+from osxphotos.photosdb import _QueryRecorder
+from osxphotos.relationship import IdTable, Relationship
+from osxphotos.utils import _open_sql_file
+
+from synthetic_library import make_library
+
+
+def measure(build):
+    """ returns (result of build(), bytes allocated while building it) """
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def timed(func, repeat=5):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def query_rows(c, queries):
+    """ yield (value, uuid) for each row of the relationship queries """
+    for step, (sql, params) in queries.items():
+        for value, uuid in c.execute(sql, params):
+            if step == "persons":
+                if value is None:
+                    continue
+                value = value or _UNKNOWN_PERSON
+            yield step, value, uuid
+
+
+def as_dicts(c, queries):
+    """ build the old layout: for each relationship, dicts by uuid and by value """
+    layout = {step: ({}, {}) for step in queries}
+    for step, value, uuid in query_rows(c, queries):
+        by_uuid, by_value = layout[step]
+        by_uuid.setdefault(uuid, []).append(value)
+        by_value.setdefault(value, []).append(uuid)
+    return layout
+
+
+def as_relationships(c, queries, uuids):
+    """ build the new layout: a Relationship for each relationship sharing IdTable uuids """
+    layout = {step: Relationship(uuids) for step in queries}
+    for step, value, uuid in query_rows(c, queries):
+        layout[step].add(value, uuid)
+    return layout
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        dbfile = make_library(library, count)
+        photosdb = osxphotos.PhotosDB(library)
+
+        # find the queries PhotosDB runs to load each relationship
+        queries = {}
+        for step in ["keywords", "persons", "albums"]:
+            recorder = _QueryRecorder()
+            getattr(photosdb, f"_process_{step}5")(recorder)
+            queries[step] = recorder.queries[0]
+
+        uuids = IdTable()
+        for uuid in photosdb._dbphotos:
+            uuids.encode(uuid)
+
+        (conn, c) = _open_sql_file(dbfile)
+        dicts, dict_size = measure(lambda: as_dicts(c, queries))
+        relationships, relationship_size = measure(
+            lambda: as_relationships(c, queries, uuids)
+        )
+        conn.close()
+
+    links = sum(
+        len(uuids) for _, by_value in dicts.values() for uuids in by_value.values()
+    )
+    print(f"{len(photosdb._dbphotos)} photos, {links} keyword, person and album links")
+    print(f"{'layout':<15}{'total MB':>12}{'bytes/link':>14}")
+    for layout, size in (("dict", dict_size), ("relationship", relationship_size)):
+        print(f"{layout:<15}{size / 2**20:>12.1f}{size / links:>14.0f}")
+    print(f"relationships use {dict_size / relationship_size:.1f}x less memory")
+
+    # intersect the photos of the most common keyword and person
+    keyword = max(dicts["keywords"][1], key=lambda k: len(dicts["keywords"][1][k]))
+    person = max(dicts["persons"][1], key=lambda p: len(dicts["persons"][1][p]))
+    old, old_time = timed(
+        lambda: set(dicts["keywords"][1][keyword]) & set(dicts["persons"][1][person])
+    )
+
+    (new,), new_time = timed(
+        lambda: photosdb._photos_sets([keyword], None, [person], None)
+    )
+    assert old == new
+    print(
+        f"keyword '{keyword}' & person '{person}' ({len(new)} photos): "
+        f"dict {old_time * 1000:.1f} ms, relationship {new_time * 1000:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+""" Compare finding the edited versions of photos by checking the disk for each photo (how
+    PhotoInfo.path_edited used to work on Photos <= 4: os.path.isfile of the expected path,
+    then os.walk of the resource folder if it's not there) vs. looking them up in the
+    ResourceIndex PhotosDB builds with one os.scandir pass over the resource directories
+    Creates a resources/media/version tree with COUNT edited files in folders of up to 256
+    files like Photos does, a quarter of them in a subfolder other than "00" and looks up
+    COUNT photos, a quarter of which have no edited file
+
+    Usage: python resource_index.py [COUNT] """
+
+import os
+import os.path
+import sys
+import tempfile
+import time
+
+from osxphotos.resourceindex import ResourceIndex
+
+
+def make_tree(root, count):
+    """ create count edited files in root; returns list of (folder, file name) to look up """
+    lookups = []
+    for i in range(count):
+        folder, file_id = f"{i // 256:02x}", f"{i:x}"
+        subfolder = "00" if i % 4 else "01"
+        name = f"fullsizeoutput_{file_id}.jpeg"
+        lookups.append((folder, name))
+        if i % 8 == 7:
+            # photo edited but file missing (e.g. not downloaded)
+            continue
+        directory = os.path.join(root, folder, subfolder)
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, name), "w").close()
+    return lookups
+
+
+def disk(root, lookups):
+    """ returns number of files found checking the disk for each lookup """
+    found = 0
+    for folder, name in lookups:
+        path = os.path.join(root, folder, "00", name)
+        if not os.path.isfile(path):
+            for dirname, _, filelist in os.walk(os.path.join(root, folder)):
+                if name in filelist:
+                    path = os.path.join(dirname, name)
+                    break
+        if os.path.isfile(path):
+            found += 1
+    return found
+
+
+def indexed(root, lookups):
+    """ returns number of files found with a new ResourceIndex, including reading the tree """
+    index = ResourceIndex([root])
+    found = 0
+    for folder, name in lookups:
+        path = os.path.join(root, folder, "00", name)
+        if not index.isfile(path):
+            path = index.find(os.path.join(root, folder), name) or path
+        if index.isfile(path):
+            found += 1
+    return found
+
+
+def timed(func):
+    """ returns (result of func(), time in seconds it took) """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        root = os.path.join(tempdir, "resources", "media", "version")
+        print(f"Creating {count} edited files")
+        lookups = make_tree(root, count)
+
+        expected, disk_time = timed(lambda: disk(root, lookups))
+        found, index_time = timed(lambda: indexed(root, lookups))
+        assert found == expected
+        print(f"{'lookups':>10}{'found':>10}{'disk s':>10}{'index s':>10}")
+        print(f"{count:>10}{found:>10}{disk_time:>10.2f}{index_time:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
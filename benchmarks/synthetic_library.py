@@ -0,0 +1,151 @@
+""" Build a large synthetic Photos 5 library for benchmarking osxphotos
+    The library is made by cloning the photos in the Catalina test library
+    (tests/Test-10.15.1.photoslibrary) until it has the requested number of photos.
+    Clones get new uuids and have their dates and locations spread out so that
+    date and location queries select a realistic share of the library.
+    Only the database is created: there are no image files in the library.
+
+    Usage: python synthetic_library.py DEST_LIBRARY COUNT """
+
+import math
+import os
+import os.path
+import shutil
+import sqlite3
+import sys
+
+TEMPLATE_LIBRARY = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "tests",
+    "Test-10.15.1.photoslibrary",
+)
+
+# tables cloned for each photo
+# table: (primary key or None, {column: how to rewrite it for the clone})
+# "pk" adds the clone's key offset, "id" makes a new uuid or fingerprint for the clone
+CLONED_TABLES = {
+    "ZGENERICASSET": (
+        "Z_PK",
+        {
+            "ZUUID": "id",
+            "ZAVALANCHEUUID": "id",
+            "ZADDITIONALATTRIBUTES": "pk",
+            "ZDATECREATED": "date",
+            "ZMODIFICATIONDATE": "date",
+            "ZADDEDDATE": "date",
+            "ZLATITUDE": "latitude",
+            "ZLONGITUDE": "longitude",
+        },
+    ),
+    "ZADDITIONALASSETATTRIBUTES": (
+        "Z_PK",
+        {
+            "ZASSET": "pk",
+            "ZASSETDESCRIPTION": "pk",
+            "ZUNMANAGEDADJUSTMENT": "pk",
+            "ZMASTERFINGERPRINT": "id",
+        },
+    ),
+    "ZASSETDESCRIPTION": ("Z_PK", {"ZASSETATTRIBUTES": "pk"}),
+    "ZUNMANAGEDADJUSTMENT": ("Z_PK", {"ZASSETATTRIBUTES": "pk", "ZUUID": "id"}),
+    "ZINTERNALRESOURCE": ("Z_PK", {"ZASSET": "pk", "ZFINGERPRINT": "id"}),
+    "ZDETECTEDFACE": ("Z_PK", {"ZASSET": "pk", "ZUUID": "id"}),
+    "Z_1KEYWORDS": (None, {"Z_1ASSETATTRIBUTES": "pk"}),
+    "Z_26ASSETS": (None, {"Z_34ASSETS": "pk"}),
+}
+
+# Core Data primary keys of the template are all below this
+# clone k gets the template's keys + k * KEY_OFFSET
+KEY_OFFSET = 100
+
+
+def _rewrite(column, how):
+    """ returns SQL expression for column of clone number copies.k """
+    if how == "pk":
+        return f"{column} + copies.k * {KEY_OFFSET}"
+    if how == "id":
+        # replace the first 8 characters with the clone number (NULL stays NULL)
+        return f"printf('%08X', copies.k) || substr({column}, 9)"
+    if how == "date":
+        # spread the clones out over ~20 years before the original date
+        return f"{column} - (copies.k % 7305) * 86400 - (copies.k % 86400)"
+    if how in ("latitude", "longitude"):
+        # -180.0 means no location; others are scattered over a few degrees
+        limit = 90 if how == "latitude" else 180
+        return (
+            f"CASE WHEN {column} = -180.0 THEN {column} "
+            f"ELSE max(-{limit}, min({limit}, {column} + ((copies.k * 7919) % 1000 - 500) / 100.0)) END"
+        )
+    raise ValueError(f"unknown rewrite {how}")
+
+
+def make_library(dest, count):
+    """ create synthetic library with approximately count photos at dest (a .photoslibrary path)
+        returns path to the library's Photos.sqlite """
+    if os.path.exists(dest):
+        raise FileExistsError(f"{dest} already exists")
+
+    database = os.path.join(dest, "database")
+    shutil.copytree(os.path.join(TEMPLATE_LIBRARY, "database"), database)
+    dbfile = os.path.join(database, "Photos.sqlite")
+
+    conn = sqlite3.connect(dbfile)
+    c = conn.cursor()
+
+    # fold the write ahead log into the database so only one file needs to be read
+    c.execute("PRAGMA journal_mode=DELETE")
+
+    # triggers call functions that only exist inside Photos and indexes make the
+    # bulk insert slow: drop them all then recreate the indexes once the data's in
+    triggers = c.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger'"
+    ).fetchall()
+    for (name,) in triggers:
+        c.execute(f"DROP TRIGGER {name}")
+    indexes = c.execute(
+        "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+    ).fetchall()
+    for name, _ in indexes:
+        c.execute(f"DROP INDEX {name}")
+
+    template_count = c.execute("SELECT COUNT(*) FROM ZGENERICASSET").fetchone()[0]
+    copies = math.ceil(count / template_count)
+    c.execute("CREATE TEMP TABLE copies (k INTEGER PRIMARY KEY)")
+    c.executemany("INSERT INTO copies VALUES (?)", ((k,) for k in range(1, copies)))
+
+    for table, (primary_key, rewrites) in CLONED_TABLES.items():
+        columns = [row[1] for row in c.execute(f"PRAGMA table_info({table})")]
+        rewrites = dict(rewrites)
+        if primary_key:
+            rewrites[primary_key] = "pk"
+        select = [
+            _rewrite(f"{table}.{column}", rewrites[column])
+            if column in rewrites
+            else f"{table}.{column}"
+            for column in columns
+        ]
+        c.execute(
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"SELECT {', '.join(select)} FROM {table}, copies"
+        )
+
+    for name, sql in indexes:
+        c.execute(sql)
+
+    conn.commit()
+    c.execute("VACUUM")
+    conn.close()
+    return dbfile
+
+
+def main():
+    if len(sys.argv) != 3:
+        sys.exit(__doc__)
+    dest, count = sys.argv[1], int(sys.argv[2])
+    make_library(dest, count)
+    print(f"Created {dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+""" Compare the time to find photos by title and description text by checking the text of
+    every photo (how query --title/--description used to do it) and with the trigram and
+    word indexes photos() uses (see TextIndex)
+    Builds the indexes over COUNT photos with titles and descriptions made of random words
+    (photo data only, not a library, so many photos can be indexed quickly); the time to
+    build each index is shown
+
+    Usage: python text_query.py [COUNT] """
+
+import random
+import re
+import string
+import sys
+import time
+
+from osxphotos.textindex import TextIndex, _text_pattern
+
+QUERIES = [
+    ("title", "sunset", "substring", False),
+    ("title", "Sunset", "substring", True),
+    ("title", "at the beach", "substring", True),
+    ("description", "birthday", "word", True),
+    ("description", "bir", "prefix", True),
+    ("description", r"party \d{4}", "regex", False),
+    ("title", "qzx", "substring", True),
+]
+
+COMMON = ["the", "at", "with", "and", "in", "of", "on", "a", "my", "our"]
+NAMED = ["Sunset", "beach", "birthday", "party", "wedding", "Paris", "garden", "snow"]
+
+
+class Photos:
+    """ stand-in for PhotosDB with just the photo data TextIndex uses """
+
+    def __init__(self, count):
+        random.seed(count)
+        vocabulary = [
+            "".join(random.choice(string.ascii_lowercase) for _ in range(length))
+            for length in (random.randint(3, 10) for _ in range(20000))
+        ]
+
+        def words(n):
+            text = []
+            for _ in range(n):
+                pick = random.random()
+                if pick < 0.4:
+                    text.append(random.choice(COMMON))
+                elif pick < 0.45:
+                    text.append(random.choice(NAMED))
+                elif pick < 0.47:
+                    text.append(f"party {random.randint(1990, 2020)}")
+                else:
+                    text.append(random.choice(vocabulary))
+            return " ".join(text)
+
+        self._dbphotos = {}
+        for i in range(count):
+            self._dbphotos[f"{i:08X}"] = {
+                "name": words(random.randint(1, 6)) if i % 3 else None,
+                "extendedDescription": words(random.randint(3, 20)) if i % 2 else None,
+            }
+
+
+def scan(photos, field, term, match, ignore_case):
+    """ returns set of uuids whose text matches term, checking every photo """
+    key = {"title": "name", "description": "extendedDescription"}[field]
+    pattern = _text_pattern(term, match, ignore_case)
+    if ignore_case:
+        term = term.lower()
+    uuids = set()
+    for uuid, info in photos._dbphotos.items():
+        text = info[key]
+        if not text:
+            continue
+        if pattern is None:
+            found = term in (text.lower() if ignore_case else text)
+        elif match == "regex":
+            found = pattern.search(text)
+        else:
+            found = pattern.search(text.casefold() if ignore_case else text)
+        if found:
+            uuids.add(uuid)
+    return uuids
+
+
+def timed(func, repeat=3):
+    """ returns (result of func(), best time in seconds of repeat calls) """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    print(f"Creating {count} photos")
+    photos = Photos(count)
+    indexes = {}
+    for field in ("title", "description"):
+        indexes[field], build = timed(lambda: TextIndex(photos, field), repeat=1)
+        print(
+            f"{field} index built in {build:.2f}s ({len(indexes[field])} texts, "
+            f"{len(indexes[field]._trigrams)} trigrams, {len(indexes[field]._words)} words)"
+        )
+
+    print(f"{'query':<55}{'photos':>8}{'scan ms':>10}{'index ms':>10}")
+    for field, term, match, ignore_case in QUERIES:
+        expected, scan_time = timed(
+            lambda: scan(photos, field, term, match, ignore_case), repeat=1
+        )
+        found, index_time = timed(
+            lambda: indexes[field].search(term, match, ignore_case)
+        )
+        assert found == expected
+        label = f"{field} {match} {term!r}" + (" ignore case" if ignore_case else "")
+        print(
+            f"{label:<55}{len(found):>8}{scan_time * 1000:>10.1f}"
+            f"{index_time * 1000:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
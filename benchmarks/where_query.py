@@ -0,0 +1,75 @@
+""" Compare answering a query that needs "or" by loading the library once for each part of
+    the query and merging the results (what running several query commands and combining
+    their output amounts to) vs. a single photos(where=...) query expression, which loads
+    the library once and combines the sets of photos found for each term
+    Loads a synthetic library (see synthetic_library.py) of the size given
+
+    Usage: python where_query.py [COUNT] """
+
+import os.path
+import sys
+import tempfile
+import time
+
+import osxphotos
+
+from synthetic_library import make_library
+
+# query expression: list of photos() queries whose results are merged to answer it
+QUERIES = [
+    (
+        "keyword:wedding or person:Katie",
+        [{"keywords": ["wedding"]}, {"persons": ["Katie"]}],
+    ),
+    (
+        '(keyword:wedding or person:Maria or album:"Test Album") and not favorite',
+        [
+            {"keywords": ["wedding"], "favorite": False},
+            {"persons": ["Maria"], "favorite": False},
+            {"albums": ["Test Album"], "favorite": False},
+        ],
+    ),
+]
+
+
+def merged(library, queries):
+    """ returns set of uuids of the photos found by any of queries, each run on a new PhotosDB """
+    uuids = set()
+    for query in queries:
+        photosdb = osxphotos.PhotosDB(library)
+        uuids.update(p.uuid for p in photosdb.photos(movies=True, **query))
+    return uuids
+
+
+def where(library, expression):
+    """ returns set of uuids of the photos matching expression, run on a new PhotosDB """
+    photosdb = osxphotos.PhotosDB(library)
+    return {p.uuid for p in photosdb.photos(movies=True, where=expression)}
+
+
+def timed(func):
+    """ returns (result of func(), time in seconds it took) """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    with tempfile.TemporaryDirectory() as tempdir:
+        library = os.path.join(tempdir, "Synthetic.photoslibrary")
+        print(f"Creating synthetic library with {count} photos")
+        make_library(library, count)
+
+        print(f"{'query':<80}{'photos':>8}{'merged s':>10}{'where s':>9}")
+        for expression, queries in QUERIES:
+            expected, merged_time = timed(lambda: merged(library, queries))
+            found, where_time = timed(lambda: where(library, expression))
+            assert found == expected
+            print(
+                f"{expression:<80}{len(found):>8}{merged_time:>10.2f}{where_time:>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
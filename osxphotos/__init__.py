@@ -1,7 +1,9 @@
 import logging
 
 from ._version import __version__
+from .exportsession import ExportSession
 from .photoinfo import PhotoInfo
+from .photoquery import PhotoQuery
 from .photosdb import PhotosDB
 from .utils import _set_debug, _debug, _get_logger
 
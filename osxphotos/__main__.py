@@ -1,5 +1,6 @@
 import csv
 import datetime
+import hashlib
 import json
 import os
 import os.path
@@ -13,7 +14,12 @@ import osxphotos
 
 from ._constants import _EXIF_TOOL_URL, _PHOTOS_5_VERSION
 from ._version import __version__
-from .utils import create_path_by_date, _copy_file
+from .exportdb import ExportDB, ExportedFile, ExportRecord, _normpath
+from .geoindex import _check_bbox, _near_bbox
+from .photoquery import _parse_where
+from .pipeline import Pipeline, PipelineStage
+from .textindex import _TEXT_MATCHES, _text_pattern
+from .utils import _copy_file
 
 
 def get_photos_db(*db_options):
@@ -51,11 +57,12 @@ def get_photos_db(*db_options):
 
 # Click CLI object & context settings
 class CLI_Obj:
-    def __init__(self, db=None, json=False, debug=False):
+    def __init__(self, db=None, json=False, debug=False, cache=False):
         if debug:
             osxphotos._set_debug(True)
         self.db = db
         self.json = json
+        self.cache = cache
 
 
 CTX_SETTINGS = dict(help_option_names=["-h", "--help"])
@@ -86,6 +93,62 @@ JSON_OPTION = click.option(
 )
 
 
+def _check_location(ctx, param, value):
+    """ click callback to check the coordinates of --near and --bbox """
+    if value is None:
+        return value
+    try:
+        if param.name == "near":
+            _near_bbox(*value)
+        else:
+            _check_bbox(*value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+    return value
+
+
+def _parse_stage_workers(ctx, param, value):
+    """ click callback to turn --stage-workers STAGE=N options into dict of stage: N """
+    stages = [name for name, concurrent in _PhotoExporter.STAGES if concurrent]
+    stage_workers = {}
+    for option in value:
+        stage, _, workers = option.partition("=")
+        if stage not in stages:
+            raise click.BadParameter(
+                f"invalid stage '{stage}' in '{option}', must be one of: {', '.join(stages)}"
+            )
+        try:
+            workers = int(workers)
+        except ValueError:
+            workers = 0
+        if workers < 1:
+            raise click.BadParameter(
+                f"invalid number of workers in '{option}', must be at least 1"
+            )
+        stage_workers[stage] = workers
+    return stage_workers
+
+
+def _check_text(text_match, ignore_case, *terms):
+    """ raise click.BadParameter if a --title, --description or --filename search term isn't
+        valid for --text-match (e.g. an invalid regular expression) """
+    try:
+        for term in terms:
+            _text_pattern(term, text_match, ignore_case)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _check_where(where, text_match, ignore_case):
+    """ raise click.BadParameter if --where isn't a valid query expression """
+    if where is None:
+        return
+    try:
+        _parse_where(where, text_match, ignore_case)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--where'")
+
+
 def query_options(f):
     o = click.option
     options = [
@@ -137,6 +200,20 @@ def query_options(f):
             is_flag=True,
             help="Search for photos with no description.",
         ),
+        o(
+            "--filename",
+            metavar="FILENAME",
+            default=None,
+            multiple=True,
+            help="Search for FILENAME in current or original filename of photo.",
+        ),
+        o(
+            "--text-match",
+            type=click.Choice(_TEXT_MATCHES),
+            default="substring",
+            help="How --title, --description and --filename match: substring (default), "
+            "word (whole words), prefix (start of a word) or regex (regular expression).",
+        ),
         o(
             "--uti",
             metavar="UTI",
@@ -148,7 +225,7 @@ def query_options(f):
             "-i",
             "--ignore-case",
             is_flag=True,
-            help="Case insensitive search for title or description. Does not apply to keyword, person, or album.",
+            help="Case insensitive search for title, description or filename. Does not apply to keyword, person, or album.",
         ),
         o("--edited", is_flag=True, help="Search for photos that have been edited."),
         o(
@@ -210,6 +287,47 @@ def query_options(f):
             help="Search by end item date, e.g. 2000-01-12T12:00:00 or 2000-12-31 (ISO 8601 w/o TZ).",
             type=click.DateTime(),
         ),
+        o(
+            "--modified-since",
+            help="Search for photos modified on or after date, e.g. 2000-01-12T12:00:00 or 2000-12-31 (ISO 8601 w/o TZ).",
+            type=click.DateTime(),
+        ),
+        o(
+            "--modified-before",
+            help="Search for photos modified before date, e.g. 2000-01-12T12:00:00 or 2000-12-31 (ISO 8601 w/o TZ).",
+            type=click.DateTime(),
+        ),
+        o(
+            "--near",
+            metavar="LAT LON RADIUS",
+            help="Search for photos taken within RADIUS km of latitude LAT, longitude LON "
+            "(in degrees), e.g. --near 51.5 -0.13 10",
+            type=(float, float, float),
+            default=None,
+            callback=_check_location,
+        ),
+        o(
+            "--bbox",
+            metavar="MIN_LAT MIN_LON MAX_LAT MAX_LON",
+            help="Search for photos taken in the box with south-west corner MIN_LAT, MIN_LON and "
+            "north-east corner MAX_LAT, MAX_LON (in degrees), e.g. --bbox 51.4 -0.3 51.6 0.0",
+            type=(float, float, float, float),
+            default=None,
+            callback=_check_location,
+        ),
+        o(
+            "--where",
+            metavar="EXPRESSION",
+            default=None,
+            help="Search for photos matching query EXPRESSION, which combines terms with "
+            "and, or, not and parentheses, e.g. "
+            "--where 'keyword:Kids and (person:Katie or person:Suzy) and not hidden'. "
+            "Terms are keyword:, person:, album:, uuid:, title:, description: or filename: "
+            'followed by a value (quoted if it contains spaces, e.g. album:"Summer 2019") or '
+            "one of the flags favorite, hidden, missing, edited, external-edit, shared, burst, "
+            "live, cloudasset, incloud. title:, description: and filename: match as set by "
+            "--text-match and -i.",
+        ),
     ]
     for o in options[::-1]:
         f = o(f)
@@ -220,10 +338,18 @@ def query_options(f):
 @DB_OPTION
 @JSON_OPTION
 @click.option("--debug", required=False, is_flag=True, default=False, hidden=True)
+@click.option(
+    "--cache",
+    required=False,
+    is_flag=True,
+    default=False,
+    help="Cache parsed library data on disk to speed up subsequent runs. "
+    "The cache is automatically rebuilt whenever the Photos library changes.",
+)
 @click.version_option(__version__, "--version", "-v")
 @click.pass_context
-def cli(ctx, db, json_, debug):
-    ctx.obj = CLI_Obj(db=db, json=json_, debug=debug)
+def cli(ctx, db, json_, debug, cache):
+    ctx.obj = CLI_Obj(db=db, json=json_, debug=debug, cache=cache)
 
 
 @cli.command()
@@ -242,7 +368,10 @@ def keywords(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    # only the data that's printed is read unless --cache, which needs the full library
+    photosdb = osxphotos.PhotosDB(
+        dbfile=db, cache=cli_obj.cache, lazy=not cli_obj.cache
+    )
     keywords = {"keywords": photosdb.keywords_as_dict}
     if json_ or cli_obj.json:
         click.echo(json.dumps(keywords))
@@ -266,7 +395,9 @@ def albums(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    photosdb = osxphotos.PhotosDB(
+        dbfile=db, cache=cli_obj.cache, lazy=not cli_obj.cache
+    )
     albums = {"albums": photosdb.albums_as_dict}
     if photosdb.db_version >= _PHOTOS_5_VERSION:
         albums["shared albums"] = photosdb.albums_shared_as_dict
@@ -293,7 +424,9 @@ def persons(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    photosdb = osxphotos.PhotosDB(dbfile=db)
+    photosdb = osxphotos.PhotosDB(
+        dbfile=db, cache=cli_obj.cache, lazy=not cli_obj.cache
+    )
     persons = {"persons": photosdb.persons_as_dict}
     if json_ or cli_obj.json:
         click.echo(json.dumps(persons))
@@ -317,7 +450,7 @@ def info(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    pdb = osxphotos.PhotosDB(dbfile=db)
+    pdb = osxphotos.PhotosDB(dbfile=db, cache=cli_obj.cache, lazy=not cli_obj.cache)
     info = {}
     info["database_path"] = pdb.db_path
     info["database_version"] = pdb.db_version
@@ -390,8 +523,9 @@ def dump(ctx, cli_obj, db, json_, photos_library):
         _list_libraries()
         return
 
-    pdb = osxphotos.PhotosDB(dbfile=db)
-    photos = pdb.photos(movies=True)
+    # photos are read and printed in batches unless the whole library is loaded from the cache
+    pdb = osxphotos.PhotosDB(dbfile=db, cache=cli_obj.cache, lazy=not cli_obj.cache)
+    photos = _prefetched(pdb, pdb.iter_photos(movies=True))
     print_photo_info(photos, json_ or cli_obj.json)
 
 
@@ -489,6 +623,8 @@ def query(
     no_title,
     description,
     no_description,
+    filename,
+    text_match,
     ignore_case,
     json_,
     edited,
@@ -514,6 +650,11 @@ def query(
     not_incloud,
     from_date,
     to_date,
+    modified_since,
+    modified_before,
+    near,
+    bbox,
+    where,
 ):
     """ Query the Photos database using 1 or more search options; 
         if more than one option is provided, they are treated as "AND" 
@@ -532,6 +673,12 @@ def query(
         uti,
         from_date,
         to_date,
+        modified_since,
+        modified_before,
+        near,
+        bbox,
+        filename,
+        where,
     ]
     exclusive = [
         (favorite, not_favorite),
@@ -549,6 +696,8 @@ def query(
     if not any(nonexclusive + [b ^ n for b, n in exclusive]):
         click.echo(cli.commands["query"].get_help(ctx), err=True)
         return
+    _check_text(text_match, ignore_case, *title, *description, *filename)
+    _check_where(where, text_match, ignore_case)
 
     # actually have something to query
     isphoto = ismovie = True  # default searches for everything
@@ -559,6 +708,7 @@ def query(
 
     # below needed for to make CliRunner work for testing
     cli_db = cli_obj.db if cli_obj is not None else None
+    cli_cache = cli_obj.cache if cli_obj is not None else False
     db = get_photos_db(*photos_library, db, cli_db)
     if db is None:
         click.echo(cli.commands["query"].get_help(ctx), err=True)
@@ -576,6 +726,8 @@ def query(
         no_title=no_title,
         description=description,
         no_description=no_description,
+        filename=filename,
+        text_match=text_match,
         ignore_case=ignore_case,
         edited=edited,
         external_edit=external_edit,
@@ -600,6 +752,12 @@ def query(
         not_incloud=not_incloud,
         from_date=from_date,
         to_date=to_date,
+        modified_since=modified_since,
+        modified_before=modified_before,
+        near=near,
+        bbox=bbox,
+        where=where,
+        cache=cli_cache,
     )
 
     # below needed for to make CliRunner work for testing
@@ -619,6 +777,22 @@ def query(
     "Use this with caution as it may create name collisions on export. "
     "(e.g. if two files happen to have the same name)",
 )
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Only export the photos that are new or have changed since they were exported to "
+    "DEST with --update, exporting changed photos to the same files instead of adding "
+    "(1), (2), etc.  The files exported are recorded in DEST/.osxphotos_export.db as each "
+    "photo is exported so an export that was interrupted can be finished by running it "
+    "again with --update.  The first time --update is used with DEST, photos already "
+    "exported to DEST are found by name and size instead of being exported again.",
+)
+@click.option(
+    "--cleanup",
+    is_flag=True,
+    help="With --update, delete the files exported to DEST for photos that are no longer "
+    "in the library.",
+)
 @click.option(
     "--export-by-date",
     is_flag=True,
@@ -661,6 +835,43 @@ def query(
     "--sidecar xmp: create XMP sidecar used by Adobe Lightroom, etc."
     "The sidecar file is named in format photoname.xmp",
 )
+@click.option(
+    "--workers",
+    metavar="N",
+    default=1,
+    type=click.IntRange(min=1),
+    help="Export N photos at a time (default 1).  Exporting several photos at once is faster "
+    "when copying a file doesn't keep the destination busy, e.g. on a fast SSD or network "
+    "volume.  The exported files are named as they would be with --workers 1 and messages "
+    "are printed in the same order.  Photos are exported in stages (resolve: find the files "
+    "to export, plan: name the exported files, copy, sidecar: write sidecars, verify: check "
+    "the exported files) and N is the number of threads for each stage except plan, which "
+    "names the files one photo at a time.",
+)
+@click.option(
+    "--stage-workers",
+    metavar="STAGE=N",
+    multiple=True,
+    callback=_parse_stage_workers,
+    help="Use N threads for export stage STAGE (resolve, copy, sidecar or verify) instead of "
+    "the number given by --workers, e.g. --stage-workers copy=8 to copy more files at once "
+    "than the other stages process photos.  May be repeated for several stages.",
+)
+@click.option(
+    "--pipeline-stats",
+    is_flag=True,
+    help="When done, print for each export stage the number of threads, the photos it "
+    "processed, how busy its threads were, photos per second and how many photos waited "
+    "for it.  The stage with its threads busy nearly all the time and photos waiting is the "
+    "one that limits export speed; give it more threads with --stage-workers.",
+)
+@click.option(
+    "--use-ditto",
+    is_flag=True,
+    help="Copy files with /usr/bin/ditto instead of in-process.  "
+    "Files are copied in-process by default, which preserves extended attributes, "
+    "permissions and dates like ditto but doesn't start a ditto process for each file.",
+)
 @click.option(
     "--download-missing",
     is_flag=True,
@@ -686,6 +897,8 @@ def export(
     no_title,
     description,
     no_description,
+    filename,
+    text_match,
     uti,
     ignore_case,
     edited,
@@ -698,14 +911,25 @@ def export(
     not_shared,
     from_date,
     to_date,
+    modified_since,
+    modified_before,
+    near,
+    bbox,
+    where,
     verbose,
     overwrite,
+    update,
+    cleanup,
     export_by_date,
     export_edited,
     export_bursts,
     export_live,
     original_name,
     sidecar,
+    workers,
+    stage_workers,
+    pipeline_stats,
+    use_ditto,
     only_photos,
     only_movies,
     burst,
@@ -739,6 +963,12 @@ def export(
     if any([all(bb) for bb in exclusive]):
         click.echo(cli.commands["export"].get_help(ctx), err=True)
         return
+    _check_text(text_match, ignore_case, *title, *description, *filename)
+    _check_where(where, text_match, ignore_case)
+    if cleanup and not update:
+        raise click.BadParameter(
+            "--cleanup requires --update", param_hint="'--cleanup'"
+        )
 
     isphoto = ismovie = True  # default searches for everything
     if only_movies:
@@ -748,6 +978,7 @@ def export(
 
     # below needed for to make CliRunner work for testing
     cli_db = cli_obj.db if cli_obj is not None else None
+    cli_cache = cli_obj.cache if cli_obj is not None else False
     db = get_photos_db(*photos_library, db, cli_db)
     if db is None:
         click.echo(cli.commands["export"].get_help(ctx), err=True)
@@ -755,7 +986,8 @@ def export(
         _list_libraries()
         return
 
-    photos = _query(
+    photosdb = _open_photos_db(db, cli_cache)
+    photos, estimated_count = _query(
         db=db,
         keyword=keyword,
         person=person,
@@ -765,6 +997,8 @@ def export(
         no_title=no_title,
         description=description,
         no_description=no_description,
+        filename=filename,
+        text_match=text_match,
         ignore_case=ignore_case,
         edited=edited,
         external_edit=external_edit,
@@ -789,55 +1023,120 @@ def export(
         not_incloud=False,
         from_date=from_date,
         to_date=to_date,
+        modified_since=modified_since,
+        modified_before=modified_before,
+        near=near,
+        bbox=bbox,
+        where=where,
+        cache=cli_cache,
+        photosdb=photosdb,
+        count=True,
     )
 
-    if photos:
-        if export_bursts:
-            # add the burst_photos to the export set
-            photos_burst = [p for p in photos if p.burst]
-            for burst in photos_burst:
-                burst_set = [p for p in burst.burst_photos if not p.ismissing]
-                photos.extend(burst_set)
-
-        num_photos = len(photos)
-        photo_str = "photos" if num_photos > 1 else "photo"
-        click.echo(f"Exporting {num_photos} {photo_str} to {dest}...")
+    if export_bursts:
+        # add the burst_photos to the export set
+        photos = _with_burst_photos(photos)
+
+    # photos are exported as the query finds them so the exact number of photos isn't known
+    # until the export is done; the progress bar uses the estimate from the database
+    num_photos = 0
+    # with --update, the photos exported are recorded in the export database
+    export_db = ExportDB(dest) if update else None
+    exporter = _PhotoExporter(
+        dest,
+        verbose,
+        export_by_date,
+        sidecar,
+        overwrite,
+        export_edited,
+        original_name,
+        export_live,
+        download_missing,
+        osxphotos.ExportSession(),
+        use_ditto,
+        export_db,
+    )
+    stats = [] if pipeline_stats else None
+    if workers == 1 and not stage_workers and not pipeline_stats:
+        # export the photos one at a time, printing messages as they come
+        exported = (exporter.export(_ExportJob(p, click.echo)) for p in photos)
+    else:
+        exported = _export_photos(photos, exporter, workers, stage_workers, stats)
+
+    # uuids of the photos found and number of photos exported for the first time, exported
+    # again as they changed since the last export, skipped as unchanged (--update), found
+    # already exported to dest before there was an export database (--update, see
+    # _PhotoExporter._adopt) and skipped as missing
+    uuids = set()
+    counts = {
+        "new": 0,
+        "updated": 0,
+        "unchanged": 0,
+        "already exported": 0,
+        "missing": 0,
+    }
+
+    def done(job):
+        """ count job's photo once it's exported; returns the key of counts it's counted in """
+        uuids.add(job.photo.uuid)
+        if not job.export_path:
+            kind = "missing"
+        elif job.adopted and not job.copies:
+            kind = "already exported"
+        elif not job.changed:
+            kind = "unchanged"
+        elif job.record is None:
+            kind = "new"
+        else:
+            kind = "updated"
+        counts[kind] += 1
+        return kind
+
+    click.echo(f"Exporting photos to {dest}...")
+    try:
         if not verbose:
             # show progress bar
-            with click.progressbar(photos) as bar:
-                for p in bar:
-                    export_photo(
-                        p,
-                        dest,
-                        verbose,
-                        export_by_date,
-                        sidecar,
-                        overwrite,
-                        export_edited,
-                        original_name,
-                        export_live,
-                        download_missing,
-                    )
+            with click.progressbar(exported, length=estimated_count) as bar:
+                for job in bar:
+                    num_photos += 1
+                    done(job)
         else:
-            for p in photos:
-                export_path = export_photo(
-                    p,
-                    dest,
-                    verbose,
-                    export_by_date,
-                    sidecar,
-                    overwrite,
-                    export_edited,
-                    original_name,
-                    export_live,
-                    download_missing,
-                )
-                if export_path:
-                    click.echo(f"Exported {p.filename} to {export_path}")
-                else:
+            for job in exported:
+                num_photos += 1
+                kind = done(job)
+                p = job.photo
+                if kind == "missing":
                     click.echo(f"Did not export missing file {p.filename}")
-    else:
-        click.echo("Did not find any photos to export")
+                elif kind in ("unchanged", "already exported"):
+                    click.echo(f"Skipped {kind} {p.filename} ({job.export_path})")
+                else:
+                    click.echo(f"Exported {p.filename} to {job.export_path}")
+
+        if num_photos:
+            num_exported = counts["new"] + counts["updated"]
+            photo_str = "photos" if num_exported != 1 else "photo"
+            if update:
+                click.echo(
+                    f"Exported {num_exported} {photo_str} "
+                    f"({counts['new']} new, {counts['updated']} updated)"
+                )
+            else:
+                click.echo(f"Exported {num_exported} {photo_str}")
+            for kind in ("unchanged", "already exported", "missing"):
+                if counts[kind]:
+                    photo_str = "photos" if counts[kind] > 1 else "photo"
+                    click.echo(f"Skipped {counts[kind]} {kind} {photo_str}")
+        else:
+            click.echo("Did not find any photos to export")
+
+        if cleanup:
+            _cleanup_export(export_db, photosdb, uuids, verbose)
+    finally:
+        if export_db is not None:
+            export_db.close()
+
+    if stats:
+        _print_pipeline_stats(stats)
 
 
 @cli.command()
@@ -853,19 +1152,20 @@ def help(ctx, topic, **kw):
 
 
 def print_photo_info(photos, json=False):
+    """ print info for each photo in iterable photos as JSON or CSV; each photo is printed
+        as soon as it's read from photos """
     if json:
-        dump = []
-        for p in photos:
-            dump.append(p.json())
-        click.echo(f"[{', '.join(dump)}]")
+        click.echo("[", nl=False)
+        for i, p in enumerate(photos):
+            click.echo(f"{', ' if i else ''}{p.json()}", nl=False)
+        click.echo("]")
     else:
         # dump as CSV
         csv_writer = csv.writer(
             sys.stdout, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
         )
-        dump = []
         # add headers
-        dump.append(
+        csv_writer.writerow(
             [
                 "uuid",
                 "filename",
@@ -899,7 +1199,7 @@ def print_photo_info(photos, json=False):
         )
         for p in photos:
             date_modified_iso = p.date_modified.isoformat() if p.date_modified else None
-            dump.append(
+            csv_writer.writerow(
                 [
                     p.uuid,
                     p.filename,
@@ -931,8 +1231,6 @@ def print_photo_info(photos, json=False):
                     date_modified_iso,
                 ]
             )
-        for row in dump:
-            csv_writer.writerow(row)
 
 
 def _query(
@@ -945,6 +1243,8 @@ def _query(
     no_title=None,
     description=None,
     no_description=None,
+    filename=None,
+    text_match=None,
     ignore_case=None,
     edited=None,
     external_edit=None,
@@ -969,14 +1269,30 @@ def _query(
     not_incloud=None,
     from_date=None,
     to_date=None,
+    modified_since=None,
+    modified_before=None,
+    near=None,
+    bbox=None,
+    where=None,
+    cache=False,
+    photosdb=None,
+    count=False,
 ):
     """ run a query against PhotosDB to extract the photos based on user supply criteria """
+    """ returns iterator of the matching photos, which are read as they're iterated """
     """ used by query and export commands """
     """ arguments must be passed in same order as query and export """
     """ if either is modified, need to ensure all three functions are updated """
-
-    photosdb = osxphotos.PhotosDB(dbfile=db)
-    photos = photosdb.photos(
+    """ photosdb: PhotosDB to query (see _open_photos_db), opened from db if None """
+    """ count: if True, returns tuple of (iterator, estimated number of photos) for progress,
+        see PhotoQuery.estimate_count """
+
+    # with lazy=True, the query is run as a database query so only matching photos are read,
+    # a batch at a time; the criteria that can't be checked in the database are checked for
+    # each photo in one pass (see PhotoQuery)
+    if photosdb is None:
+        photosdb = _open_photos_db(db, cache)
+    query = osxphotos.PhotoQuery(
         keywords=keyword,
         persons=person,
         albums=album,
@@ -985,93 +1301,146 @@ def _query(
         movies=ismovie,
         from_date=from_date,
         to_date=to_date,
+        modified_since=modified_since,
+        modified_before=modified_before,
+        near=near,
+        bbox=bbox,
+        title=title,
+        description=description,
+        filename=filename,
+        text_match=text_match or "substring",
+        ignore_case=bool(ignore_case),
+        favorite=True if favorite else False if not_favorite else None,
+        hidden=True if hidden else False if not_hidden else None,
+        uti=uti,
+        ismissing=True if missing else False if not_missing else None,
+        hasadjustments=True if edited else None,
+        external_edit=True if external_edit else None,
+        shared=True if shared else False if not_shared else None,
+        burst=True if burst else False if not_burst else None,
+        live_photo=True if live else False if not_live else None,
+        iscloudasset=True if cloudasset else False if not_cloudasset else None,
+        incloud=True if incloud else False if not_incloud else None,
+        where=where,
+        no_title=bool(no_title and not title),
+        no_description=bool(no_description and not description),
     )
+    photos = _prefetched(photosdb, query.iter_photos(photosdb))
+    if count:
+        return photos, query.estimate_count(photosdb)
+    return photos
 
-    if title:
-        # search title field for text
-        # if more than one, find photos with all title values in title
-        if ignore_case:
-            # case-insensitive
-            for t in title:
-                t = t.lower()
-                photos = [p for p in photos if p.title and t in p.title.lower()]
-        else:
-            for t in title:
-                photos = [p for p in photos if p.title and t in p.title]
-    elif no_title:
-        photos = [p for p in photos if not p.title]
-
-    if description:
-        # search description field for text
-        # if more than one, find photos with all name values in description
-        if ignore_case:
-            # case-insensitive
-            for d in description:
-                d = d.lower()
-                photos = [
-                    p for p in photos if p.description and d in p.description.lower()
-                ]
-        else:
-            for d in description:
-                photos = [p for p in photos if p.description and d in p.description]
-    elif no_description:
-        photos = [p for p in photos if not p.description]
-
-    if edited:
-        photos = [p for p in photos if p.hasadjustments]
-
-    if external_edit:
-        photos = [p for p in photos if p.external_edit]
-
-    if favorite:
-        photos = [p for p in photos if p.favorite]
-    elif not_favorite:
-        photos = [p for p in photos if not p.favorite]
-
-    if hidden:
-        photos = [p for p in photos if p.hidden]
-    elif not_hidden:
-        photos = [p for p in photos if not p.hidden]
-
-    if missing:
-        photos = [p for p in photos if p.ismissing]
-    elif not_missing:
-        photos = [p for p in photos if not p.ismissing]
-
-    if shared:
-        photos = [p for p in photos if p.shared]
-    elif not_shared:
-        photos = [p for p in photos if not p.shared]
-
-    if shared:
-        photos = [p for p in photos if p.shared]
-    elif not_shared:
-        photos = [p for p in photos if not p.shared]
-
-    if uti:
-        photos = [p for p in photos if uti in p.uti]
-
-    if burst:
-        photos = [p for p in photos if p.burst]
-    elif not_burst:
-        photos = [p for p in photos if not p.burst]
-
-    if live:
-        photos = [p for p in photos if p.live_photo]
-    elif not_live:
-        photos = [p for p in photos if not p.live_photo]
-
-    if cloudasset:
-        photos = [p for p in photos if p.iscloudasset]
-    elif not_cloudasset:
-        photos = [p for p in photos if not p.iscloudasset]
-
-    if incloud:
-        photos = [p for p in photos if p.incloud]
-    elif not_incloud:
-        photos = [p for p in photos if not p.incloud]
 
-    return photos
+def _open_photos_db(db, cache=False):
+    """ returns PhotosDB for library db as used by _query """
+    # with --cache, the whole library is loaded so use the columnar view if NumPy is installed
+    return osxphotos.PhotosDB(
+        dbfile=db,
+        cache=cache,
+        lazy=not cache,
+        columnar=cache and osxphotos.photocolumns.np is not None,
+    )
+
+
+def _prefetched(photosdb, photos, batch_size=1000):
+    """ yield the photos in iterable photos from PhotosDB photosdb after checking the files
+        of each batch of batch_size photos at once (see PhotosDB.prefetch_paths) so printing
+        or exporting them doesn't wait for the disk one file at a time """
+    batch = []
+    for photo in photos:
+        batch.append(photo)
+        if len(batch) == batch_size:
+            photosdb.prefetch_paths(batch)
+            yield from batch
+            batch = []
+    if batch:
+        photosdb.prefetch_paths(batch)
+        yield from batch
+
+
+def _with_burst_photos(photos):
+    """ yield each photo in iterable photos followed by the other photos in its burst set 
+        that aren't missing """
+    for photo in photos:
+        yield photo
+        if photo.burst:
+            for p in photo.burst_photos:
+                if not p.ismissing:
+                    yield p
+
+
+def _cleanup_export(export_db, photosdb, uuids, verbose):
+    """ delete the files recorded in ExportDB export_db for photos that are no longer in the
+        library of PhotosDB photosdb and remove their records
+        uuids: uuids of the photos found by the export, which are in the library """
+    gone = export_db.uuids() - uuids
+    gone -= photosdb._library_uuids(gone)
+    deleted = 0
+    for uuid in sorted(gone):
+        for exported in export_db.get(uuid).files.values():
+            try:
+                os.remove(exported.path)
+            except FileNotFoundError:
+                continue
+            deleted += 1
+            if verbose:
+                click.echo(f"Deleted {exported.path}")
+        export_db.remove(uuid)
+    click.echo(
+        f"Deleted {deleted} files exported for {len(gone)} photos no longer in the library"
+    )
+
+
+def _export_photos(photos, exporter, workers, stage_workers, stats=None):
+    """ export photos in iterable photos with _PhotoExporter exporter, running its stages in a
+        Pipeline with workers threads for each stage that can export several photos at once
+        or the number in dict stage_workers (stage name: threads)
+        yields the _ExportJob of each photo in the order of photos
+        the messages printed exporting a photo are printed before the photo is yielded so
+        they're in the same order as exporting the photos one at a time
+        stats: if not None, list the stats of the pipeline stages are added to when done
+        (see Pipeline.stats) """
+
+    def jobs():
+        for photo in photos:
+            # the stages run in other threads so load the photo's library data now
+            photo._db._require_all()
+            yield _ExportJob(photo)
+
+    pipeline = Pipeline(
+        [
+            PipelineStage(
+                name,
+                getattr(exporter, name),
+                workers=stage_workers.get(name, workers) if concurrent else 1,
+                ordered=not concurrent,
+            )
+            for name, concurrent in exporter.STAGES
+        ]
+    )
+    try:
+        for job in pipeline.run(jobs()):
+            for message in job.messages:
+                click.echo(message)
+            yield job
+    finally:
+        if stats is not None:
+            stats.extend(pipeline.stats())
+
+
+def _print_pipeline_stats(stats):
+    """ print the stats of the export pipeline stages (see Pipeline.stats) """
+    click.echo(
+        f"{'stage':<10}{'workers':>8}{'photos':>8}{'busy s':>9}{'busy %':>8}"
+        f"{'photos/s':>10}{'max queue':>11}{'mean queue':>12}"
+    )
+    for stage in stats:
+        click.echo(
+            f"{stage['name']:<10}{stage['workers']:>8}{stage['processed']:>8}"
+            f"{stage['busy']:>9.2f}{stage['utilization'] * 100:>8.1f}"
+            f"{stage['throughput']:>10.1f}{stage['max_queue_depth']:>11}"
+            f"{stage['mean_queue_depth']:>12.1f}"
+        )
 
 
 def export_photo(
@@ -1085,6 +1454,10 @@ def export_photo(
     original_name,
     export_live,
     download_missing,
+    session=None,
+    use_ditto=False,
+    echo=click.echo,
+    export_db=None,
 ):
     """ Helper function for export that does the actual export
         photo: PhotoInfo object
@@ -1097,94 +1470,434 @@ def export_photo(
         export_live: boolean; also export live video component if photo is a live photo
                      live video will have same name as photo but with .mov extension
         download_missing: attempt download of missing iCloud photos
+        session: ExportSession used to name the exported files and create the export folders;
+                 if None, a new one is used
+        use_ditto: boolean; copy files with ditto instead of in-process
+        echo: function used to print messages (default click.echo)
+        export_db: ExportDB of dest; if not None, only the files that changed since the photo
+                   was last exported are exported, to the same paths, and the files exported
+                   are recorded in export_db
         returns destination path of exported photo or None if photo was missing 
     """
+    exporter = _PhotoExporter(
+        dest,
+        verbose,
+        export_by_date,
+        sidecar,
+        overwrite,
+        export_edited,
+        original_name,
+        export_live,
+        download_missing,
+        session or osxphotos.ExportSession(),
+        use_ditto,
+        export_db,
+    )
+    return exporter.export(_ExportJob(photo, echo)).export_path
+
+
+class _ExportJob:
+    """ a photo exported by _PhotoExporter and what each stage found out about it for the
+        next stages """
+
+    def __init__(self, photo, echo=None):
+        self.photo = photo
+        # messages are kept to be printed in order if echo is None
+        self.messages = []
+        self.echo = echo or self.messages.append
+        # set to False by a stage if the photo isn't exported
+        self.exported = True
+        self.filename = None
+        self.edited_name = None
+        # pathlib.Path reserved for the photo and its edited version (None if not exported)
+        self.dest = None
+        self.edited_dest = None
+        self.export_path = None
+        self.edited_path = None
+        # (source path or None if unknown, destination path) of each file copied
+        self.copies = []
+        self.sidecars = []
+        # set to True when a file is written (all files are unless updating an export)
+        self.changed = False
+        # with an ExportDB: the photo's ExportRecord from the last export (None if new), hash
+        # of its metadata and dict of kind: ExportedFile of the files it's exported to now
+        self.record = None
+        self.metadata = None
+        self.files = {}
+        # dict of kind: ExportedFile of the files found already exported for a photo that's
+        # not in the export database (see _PhotoExporter._reserve)
+        self.adopted = {}
+
+
+class _PhotoExporter:
+    """ exports photos for the export command in stages, each a method that takes and returns
+        an _ExportJob: export() runs them one after the other for a photo and _export_photos
+        runs them in a Pipeline so several photos can be at different stages at once
+        see export_photo for the arguments """
+
+    # (name of stage method, True if it can run for several photos at once)
+    # plan hands out the names of the files so it runs for one photo at a time, in order
+    STAGES = [
+        ("resolve", True),
+        ("plan", False),
+        ("copy", True),
+        ("sidecar", True),
+        ("verify", True),
+    ]
+
+    def __init__(
+        self,
+        dest,
+        verbose,
+        export_by_date,
+        sidecar,
+        overwrite,
+        export_edited,
+        original_name,
+        export_live,
+        download_missing,
+        session,
+        use_ditto,
+        export_db=None,
+    ):
+        self.dest = dest
+        self.verbose = verbose
+        self.export_by_date = export_by_date
+        sidecar = [s.lower() for s in sidecar]
+        self.sidecar_json = "json" in sidecar
+        self.sidecar_xmp = "xmp" in sidecar
+        self.overwrite = overwrite
+        self.export_edited = export_edited
+        self.original_name = original_name
+        self.export_live = export_live
+        self.download_missing = download_missing
+        self.session = session
+        self.use_ditto = use_ditto
+        self.export_db = export_db
+        # normalized paths of the files in the export database or reserved or adopted by a
+        # photo, which can't be adopted by another photo (see _reserve)
+        self._claimed = set()
+        if export_db is not None:
+            # the names of the files exported before stay with their photos, even if a file
+            # was deleted since, so a new photo doesn't take the name
+            for uuid in export_db.uuids():
+                for exported in export_db.get(uuid).files.values():
+                    session.reserve(exported.path, overwrite=True)
+                    self._claimed.add(_normpath(exported.path))
+
+    def export(self, job):
+        """ run all the stages for job; returns job """
+        for name, _ in self.STAGES:
+            job = getattr(self, name)(job)
+        return job
+
+    def _exported(self, job, kind):
+        """ returns ExportedFile of file kind (see ExportRecord) of job's photo from the last
+            export or adopted by _reserve, None if there's none """
+        if kind in job.adopted:
+            return job.adopted[kind]
+        return job.record.files.get(kind) if job.record is not None else None
+
+    def _unchanged(self, job, kind, path, src):
+        """ returns True if file kind (see ExportRecord) of job's photo was exported to path from
+            src by the last export and neither has changed since """
+        exported = self._exported(job, kind)
+        return (
+            exported is not None and src is not None and exported.unchanged(path, src)
+        )
 
-    if not download_missing:
-        if photo.ismissing:
-            space = " " if not verbose else ""
-            click.echo(f"{space}Skipping missing photo {photo.filename}")
+    def _reserve(self, job, kind, path, src):
+        """ returns path (pathlib.Path) to export file kind of job's photo to: the path it was
+            exported to before if it's in the export database, otherwise path, reserved
+            src: path of the file to export there (None if not known)
+            with an export database, if the photo isn't in it but path already exists and is the
+            same size as src (e.g. exported before without --update), the file is adopted:
+            recorded as exported from src and used instead of exporting to a new name
+            (see _adopt) """
+        exported = self._exported(job, kind)
+        if exported is None:
+            adopted = None
+            if self.export_db is not None:
+                adopted = self._adopt(job, kind, path, src)
+            if adopted is not None:
+                return self.session.reserve(adopted, overwrite=True)
+            path = self.session.reserve(path, overwrite=self.overwrite)
+            # a file this export writes can't be adopted by another photo
+            self._claimed.add(_normpath(path))
+            return path
+        # export to the same path (under dest as given so messages show paths the same way),
+        # creating the folder again if it was deleted
+        path = os.path.join(self.dest, os.path.relpath(exported.path, self.dest))
+        self.session.makedirs(os.path.dirname(path))
+        return self.session.reserve(path, overwrite=True)
+
+    def _adopt(self, job, kind, path, src):
+        """ adopt path, or path with (1), (2), etc. added to its stem as export does for photos
+            with the same name, as file kind of job's photo (see _reserve): the first of them
+            that's the same size as src and that no other photo has
+            returns the path adopted or None """
+        if src is None:
             return None
-        elif not os.path.exists(photo.path):
-            space = " " if not verbose else ""
-            click.echo(
-                f"{space}WARNING: file {photo.path} is missing but ismissing=False, "
-                f"skipping {photo.filename}"
-            )
+        path = pathlib.Path(path)
+        try:
+            size = os.stat(src).st_size
+        except OSError:
             return None
-    elif photo.ismissing and not photo.iscloudasset or not photo.incloud:
-        click.echo(
-            f"Skipping missing {photo.filename}: not iCloud asset or missing from cloud"
-        )
+        count = 0
+        candidate = path
+        while os.path.exists(candidate):
+            normpath = _normpath(candidate)
+            if normpath not in self._claimed and os.stat(candidate).st_size == size:
+                self._claimed.add(normpath)
+                job.adopted[kind] = ExportedFile.copied(str(candidate), src)
+                return candidate
+            count += 1
+            candidate = path.parent / f"{path.stem} ({count}){path.suffix}"
         return None
 
-    filename = None
-    if original_name:
-        filename = photo.original_filename
-    else:
-        filename = photo.filename
-
-    if verbose:
-        click.echo(f"Exporting {photo.filename} as {filename}")
-
-    if export_by_date:
-        date_created = photo.date.timetuple()
-        dest = create_path_by_date(dest, date_created)
-
-    sidecar = [s.lower() for s in sidecar]
-    sidecar_json = sidecar_xmp = False
-    if "json" in sidecar:
-        sidecar_json = True
-    if "xmp" in sidecar:
-        sidecar_xmp = True
-
-    photo_path = photo.export(
-        dest,
-        filename,
-        sidecar_json=sidecar_json,
-        sidecar_xmp=sidecar_xmp,
-        overwrite=overwrite,
-        use_photos_export=download_missing,
-    )
-
-    # if export-edited, also export the edited version
-    # verify the photo has adjustments and valid path to avoid raising an exception
-    if export_edited and photo.hasadjustments:
-        if download_missing or photo.path_edited is not None:
-            edited_name = pathlib.Path(filename)
-            edited_name = f"{edited_name.stem}_edited{edited_name.suffix}"
-            if verbose:
-                click.echo(f"Exporting edited version of {filename} as {edited_name}")
-            photo.export(
-                dest,
-                edited_name,
-                sidecar_json=sidecar_json,
-                sidecar_xmp=sidecar_xmp,
-                overwrite=overwrite,
-                edited=True,
-                use_photos_export=download_missing,
+    def resolve(self, job):
+        """ check the photo's files can be exported and find the ones to export """
+        photo = job.photo
+        if not self.download_missing:
+            if photo.ismissing:
+                space = " " if not self.verbose else ""
+                job.echo(f"{space}Skipping missing photo {photo.filename}")
+                job.exported = False
+                return job
+            elif not photo._isfile(photo.path):
+                space = " " if not self.verbose else ""
+                job.echo(
+                    f"{space}WARNING: file {photo.path} is missing but ismissing=False, "
+                    f"skipping {photo.filename}"
+                )
+                job.exported = False
+                return job
+        elif photo.ismissing and not photo.iscloudasset or not photo.incloud:
+            job.echo(
+                f"Skipping missing {photo.filename}: not iCloud asset or missing from cloud"
             )
+            job.exported = False
+            return job
+
+        # look for the edited version and live movie now so copy doesn't wait for them
+        if self.export_edited and photo.hasadjustments:
+            photo.path_edited
+        if self.export_live and photo.live_photo:
+            photo.path_live_photo
+
+        if self.export_db is not None:
+            job.record = self.export_db.get(photo.uuid)
+            job.metadata = hashlib.sha1(photo.json().encode("utf-8")).hexdigest()
+        return job
+
+    def plan(self, job):
+        """ create the photo's export folder and reserve the names of its files """
+        if not job.exported:
+            return job
+        photo = job.photo
+
+        filename = None
+        if self.original_name:
+            filename = photo.original_filename
         else:
-            click.echo(f"Skipping missing edited photo for {filename}")
-
-    if export_live and photo.live_photo and photo.path_live_photo is not None:
-        # if destination exists, will be overwritten regardless of overwrite
-        # so that name matches name of live photo
-        live_name = pathlib.Path(photo_path)
-        live_name = f"{live_name.stem}.mov"
-
-        src_live = photo.path_live_photo
-        dest_live = pathlib.Path(photo_path).parent / pathlib.Path(live_name)
-
-        if src_live is not None:
-            if verbose:
-                click.echo(f"Exporting live photo video of {filename} as {live_name}")
+            filename = photo.filename
+        job.filename = filename
+
+        if self.verbose:
+            job.echo(f"Exporting {photo.filename} as {filename}")
+
+        dest = self.dest
+        if self.export_by_date:
+            date_created = photo.date.timetuple()
+            dest = self.session.create_path_by_date(dest, date_created)
+
+        if not self.session.isdir(dest):
+            raise FileNotFoundError("Invalid path passed to export")
+        job.dest = self._reserve(
+            job,
+            "original",
+            pathlib.Path(dest) / filename,
+            None if self.download_missing else photo.path,
+        )
 
-            _copy_file(src_live, str(dest_live))
+        # if export-edited, also export the edited version
+        # verify the photo has adjustments and valid path to avoid raising an exception
+        if self.export_edited and photo.hasadjustments:
+            if self.download_missing or photo.path_edited is not None:
+                edited_name = pathlib.Path(filename)
+                job.edited_name = f"{edited_name.stem}_edited{edited_name.suffix}"
+                job.edited_dest = self._reserve(
+                    job,
+                    "edited",
+                    pathlib.Path(dest) / job.edited_name,
+                    None if self.download_missing else photo.path_edited,
+                )
+            else:
+                job.echo(f"Skipping missing edited photo for {filename}")
+
+        if self.export_db is not None:
+            # record the names reserved before exporting the files so if the export is
+            # interrupted, the next export uses them instead of leaving stray copies
+            files = dict(job.record.files) if job.record is not None else {}
+            reserved = {"original": job.dest, "edited": job.edited_dest}
+            new = {
+                kind: job.adopted.get(kind) or ExportedFile(str(path))
+                for kind, path in reserved.items()
+                if path is not None and kind not in files
+            }
+            if new:
+                files.update(new)
+                metadata = job.record.metadata if job.record is not None else None
+                self.export_db.record(ExportRecord(photo.uuid, metadata, files))
+        return job
+
+    def copy(self, job):
+        """ copy the photo, its edited version and live movie to the names reserved """
+        if not job.exported:
+            return job
+        photo = job.photo
+
+        # names are already reserved so export with overwrite=True to use them as they are
+        src = None if self.download_missing else photo.path
+        if self._unchanged(job, "original", job.dest, src):
+            job.export_path = str(job.dest)
+            job.files["original"] = self._exported(job, "original")
         else:
-            click.echo(f"Skipping missing live movie for {filename}")
+            job.export_path = photo.export(
+                str(job.dest.parent),
+                job.dest.name,
+                overwrite=True,
+                use_photos_export=self.download_missing,
+                session=self.session,
+                use_ditto=self.use_ditto,
+            )
+            job.copies.append(("original", src, job.export_path))
+            job.changed = True
+
+        if job.edited_dest is not None:
+            src = None if self.download_missing else photo.path_edited
+            if self._unchanged(job, "edited", job.edited_dest, src):
+                job.edited_path = str(job.edited_dest)
+                job.files["edited"] = self._exported(job, "edited")
+            else:
+                if self.verbose:
+                    job.echo(
+                        f"Exporting edited version of {job.filename} as {job.edited_name}"
+                    )
+                job.edited_path = photo.export(
+                    str(job.edited_dest.parent),
+                    job.edited_dest.name,
+                    overwrite=True,
+                    edited=True,
+                    use_photos_export=self.download_missing,
+                    session=self.session,
+                    use_ditto=self.use_ditto,
+                )
+                job.copies.append(("edited", src, job.edited_path))
+                job.changed = True
+
+        if self.export_live and photo.live_photo and photo.path_live_photo is not None:
+            # if destination exists, will be overwritten regardless of overwrite
+            # so that name matches name of live photo
+            live_name = pathlib.Path(job.export_path)
+            live_name = f"{live_name.stem}.mov"
+
+            src_live = photo.path_live_photo
+            dest_live = pathlib.Path(job.export_path).parent / pathlib.Path(live_name)
+
+            if self._unchanged(job, "live", dest_live, src_live):
+                job.files["live"] = self._exported(job, "live")
+            elif src_live is not None:
+                if self.verbose:
+                    job.echo(
+                        f"Exporting live photo video of {job.filename} as {live_name}"
+                    )
+
+                _copy_file(src_live, str(dest_live), use_ditto=self.use_ditto)
+                job.copies.append(("live", src_live, str(dest_live)))
+                job.changed = True
+            else:
+                job.echo(f"Skipping missing live movie for {job.filename}")
+        return job
+
+    def sidecar(self, job):
+        """ write the sidecars of the photo and its edited version """
+        if not job.exported or not (self.sidecar_json or self.sidecar_xmp):
+            return job
+        photo = job.photo
+        # the sidecars are rendered the first time one has to be written
+        render = {
+            "json": photo._exiftool_json_sidecar,
+            "xmp": photo._xmp_sidecar,
+        }
+        suffixes = [
+            suffix
+            for suffix, wanted in (
+                ("json", self.sidecar_json),
+                ("xmp", self.sidecar_xmp),
+            )
+            if wanted
+        ]
+        rendered = {}
+        for prefix, path in (("", job.export_path), ("edited_", job.edited_path)):
+            if path is None:
+                continue
+            path = pathlib.Path(path)
+            for suffix in suffixes:
+                sidecar_filename = path.parent / f"{path.stem}.{suffix}"
+                kind = f"{prefix}{suffix}"
+                if self._sidecar_unchanged(job, kind, sidecar_filename):
+                    job.files[kind] = job.record.files[kind]
+                    continue
+                if suffix not in rendered:
+                    rendered[suffix] = render[suffix]()
+                photo._write_sidecar(sidecar_filename, rendered[suffix])
+                job.sidecars.append((kind, str(sidecar_filename)))
+                job.changed = True
+        return job
+
+    def _sidecar_unchanged(self, job, kind, path):
+        """ returns True if sidecar kind (see ExportRecord) of job's photo was written to path
+            by the last export, is still there and the photo's metadata hasn't changed since """
+        if job.record is None or job.record.metadata != job.metadata:
+            return False
+        exported = job.record.files.get(kind)
+        return (
+            exported is not None and exported.exported_to(path) and os.path.exists(path)
+        )
 
-    return photo_path
+    def verify(self, job):
+        """ check the files exported are there and the same size as the files copied and
+            record them in the export database """
+        for kind, src, dest in job.copies:
+            try:
+                size = os.stat(dest).st_size
+            except OSError:
+                job.echo(f"WARNING: exported file {dest} is missing")
+                job.files[kind] = ExportedFile(dest)
+                continue
+            if src is not None and os.stat(src).st_size != size:
+                job.echo(f"WARNING: exported file {dest} is not the same size as {src}")
+                job.files[kind] = ExportedFile(dest)
+            else:
+                job.files[kind] = ExportedFile.copied(dest, src)
+        for kind, sidecar in job.sidecars:
+            if not os.path.isfile(sidecar):
+                job.echo(f"WARNING: sidecar {sidecar} is missing")
+            job.files[kind] = ExportedFile(sidecar)
+
+        if (
+            self.export_db is not None
+            and job.exported
+            and (
+                job.changed
+                or job.record is None
+                or job.record.metadata != job.metadata
+                or job.record.files.keys() != job.files.keys()
+            )
+        ):
+            self.export_db.record(ExportRecord(job.photo.uuid, job.metadata, job.files))
+        return job
 
 
 if __name__ == "__main__":
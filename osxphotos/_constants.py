@@ -34,3 +34,28 @@ _MOVIE_TYPE = 1
 # Name of XMP template file
 _TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "templates")
 _XMP_TEMPLATE_NAME = "xmp_sidecar.mako"
+
+# Where to store snapshots of parsed library data when PhotosDB(cache=True)
+_CACHE_DIR = os.path.expanduser("~/Library/Caches/osxphotos")
+
+# Bump this whenever the layout of the data stored in the snapshot changes
+_CACHE_FORMAT_VERSION = 6
+
+# Photos stores dates as Core Data timestamps: seconds since Jan 1, 2001 UTC
+# add this to a Core Data timestamp to get a POSIX timestamp
+_COREDATA_EPOCH_OFFSET = 978307200.0
+
+# Maximum number of parameters to pass in a single sqlite query
+# (sqlite versions before 3.32 have a limit of 999)
+_SQLITE_MAX_VARIABLES = 500
+
+# Number of threads PhotosDB.prefetch_paths uses to check that files exist
+_PREFETCH_WORKERS = 16
+
+# Size of the buffer used to copy files when the kernel can't copy them directly
+_COPY_BUFFER_SIZE = 1024 * 1024
+
+# Name of the database export --update keeps in the export folder (see exportdb.py)
+# and the version of its tables
+_EXPORT_DB_NAME = ".osxphotos_export.db"
+_EXPORT_DB_VERSION = 1
@@ -0,0 +1,177 @@
+"""
+Bitmap class
+Compressed bitmap of non-negative integers (photo ids) in the style of Roaring bitmaps
+Ids are split into chunks of 2**16 ids by their high bits; each chunk that has any ids is
+stored in a container that is either a sorted array of the low 16 bits of its ids (when it
+has fewer than _ARRAY_MAX ids) or an int used as a 2**16 bit bitset (when it has more)
+Used by PhotoIndex to answer PhotosDB.photos() queries with bitwise operations
+"""
+
+from array import array
+
+_CHUNK_BITS = 16
+_LOW_MASK = (1 << _CHUNK_BITS) - 1
+_BITSET_BYTES = (1 << _CHUNK_BITS) // 8
+
+# containers with fewer ids than this are stored as arrays, others as bitsets
+_ARRAY_MAX = 4096
+
+
+def _bitset_from_lows(lows):
+    """ returns int bitset with the bits in iterable lows set """
+    buf = bytearray(_BITSET_BYTES)
+    for low in lows:
+        buf[low >> 3] |= 1 << (low & 7)
+    return int.from_bytes(buf, "little")
+
+
+def _iter_bitset(bits):
+    """ yields positions of the set bits of int bits in ascending order """
+    digits = bin(bits)[:1:-1]
+    position = digits.find("1")
+    while position >= 0:
+        yield position
+        position = digits.find("1", position + 1)
+
+
+def _cardinality(container):
+    if isinstance(container, int):
+        return bin(container).count("1")
+    return len(container)
+
+
+def _as_bitset(container):
+    if isinstance(container, int):
+        return container
+    return _bitset_from_lows(container)
+
+
+def _container_from_lows(lows):
+    """ returns container for iterable of low bits, which may be unsorted and repeat """
+    lows = set(lows)
+    if len(lows) < _ARRAY_MAX:
+        return array("H", sorted(lows))
+    return _bitset_from_lows(lows)
+
+
+def _and(a, b):
+    # results of operations on two bitsets stay bitsets: counting their ids to see if
+    # they'd fit in an array costs more than the operation
+    if isinstance(a, int) and isinstance(b, int):
+        return a & b or None
+    if isinstance(a, int):
+        a, b = b, a
+    if isinstance(b, int):
+        # array & bitset: keep the array's ids whose bit is set
+        buf = b.to_bytes(_BITSET_BYTES, "little")
+        lows = array("H", [low for low in a if buf[low >> 3] >> (low & 7) & 1])
+    else:
+        lows = array("H", sorted(set(a).intersection(b)))
+    return lows or None
+
+
+def _or(a, b):
+    if isinstance(a, int) or isinstance(b, int):
+        return _as_bitset(a) | _as_bitset(b)
+    return _container_from_lows(a + b)
+
+
+def _andnot(a, b):
+    if isinstance(a, int):
+        return a & ~_as_bitset(b) or None
+    if isinstance(b, int):
+        buf = b.to_bytes(_BITSET_BYTES, "little")
+        lows = array("H", [low for low in a if not buf[low >> 3] >> (low & 7) & 1])
+    else:
+        exclude = set(b)
+        lows = array("H", [low for low in a if low not in exclude])
+    return lows or None
+
+
+class Bitmap:
+    """ Compressed bitmap of non-negative integer ids (see module docstring)
+        Bitmaps are immutable: &, | and - (and not) return new bitmaps """
+
+    __slots__ = ("_containers",)
+
+    def __init__(self, ids=()):
+        """ create bitmap of the ids in iterable ids (in any order) """
+        chunks = {}
+        for id_ in ids:
+            high = id_ >> _CHUNK_BITS
+            lows = chunks.get(high)
+            if lows is None:
+                lows = chunks[high] = []
+            lows.append(id_ & _LOW_MASK)
+        # containers by high bits, in ascending order
+        self._containers = {
+            high: _container_from_lows(chunks[high]) for high in sorted(chunks)
+        }
+
+    @classmethod
+    def _from_containers(cls, containers):
+        bitmap = cls.__new__(cls)
+        bitmap._containers = containers
+        return bitmap
+
+    def __and__(self, other):
+        containers = {}
+        for high, container in self._containers.items():
+            if high in other._containers:
+                result = _and(container, other._containers[high])
+                if result is not None:
+                    containers[high] = result
+        return self._from_containers(containers)
+
+    def __or__(self, other):
+        containers = {}
+        for high in sorted(set(self._containers) | set(other._containers)):
+            if high not in other._containers:
+                containers[high] = self._containers[high]
+            elif high not in self._containers:
+                containers[high] = other._containers[high]
+            else:
+                containers[high] = _or(self._containers[high], other._containers[high])
+        return self._from_containers(containers)
+
+    def __sub__(self, other):
+        containers = {}
+        for high, container in self._containers.items():
+            if high in other._containers:
+                container = _andnot(container, other._containers[high])
+            if container is not None:
+                containers[high] = container
+        return self._from_containers(containers)
+
+    def __iter__(self):
+        """ yields ids in ascending order """
+        for high, container in self._containers.items():
+            base = high << _CHUNK_BITS
+            lows = _iter_bitset(container) if isinstance(container, int) else container
+            for low in lows:
+                yield base | low
+
+    def __len__(self):
+        return sum(_cardinality(container) for container in self._containers.values())
+
+    def __bool__(self):
+        return bool(self._containers)
+
+    def __contains__(self, id_):
+        container = self._containers.get(id_ >> _CHUNK_BITS)
+        if container is None:
+            return False
+        low = id_ & _LOW_MASK
+        if isinstance(container, int):
+            return bool(container >> low & 1)
+        return low in container
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return list(self) == list(other)
+        return False
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)})"
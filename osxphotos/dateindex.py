@@ -0,0 +1,99 @@
+"""
+DateIndex class
+Photos of a PhotosDB sorted by creation or modification date so that PhotosDB.photos() finds
+the photos in a date range with a binary search instead of checking every photo
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+
+from ._constants import _COREDATA_EPOCH_OFFSET
+from .utils import _coredata_to_datetime
+
+# photos are dated in their own time zone: UTC-12:00 to UTC+14:00
+_MAX_TZ_OFFSET = timedelta(hours=14)
+
+
+def _coredata_timestamp(dt):
+    """ returns Core Data timestamp of timezone aware datetime dt """
+    return dt.timestamp() - _COREDATA_EPOCH_OFFSET
+
+
+class DateIndex:
+    """
+    Photos of a PhotosDB sorted by a date field of their info
+    field: "imageDate" (creation date) or "lastmodifieddate" (modification date)
+    timestamps: array of the dates as Core Data timestamps, in ascending order
+    uuids: uuid of the photo with each timestamp
+    Photos with no date (None) aren't in the index
+    """
+
+    def __init__(self, db, field):
+        self._db = db
+        self.field = field
+
+        photos = db._dbphotos
+        uuids = [uuid for uuid, info in photos.items() if info[field] is not None]
+        timestamps = [photos[uuid][field] for uuid in uuids]
+        order = sorted(range(len(uuids)), key=timestamps.__getitem__)
+        self.timestamps = array("d", [timestamps[i] for i in order])
+        self.uuids = [uuids[i] for i in order]
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def range(self, start=None, end=None, include_end=True):
+        """ returns list of uuids of the photos dated from start to end, in date order
+            start, end: Core Data timestamps or None for no limit
+            include_end: if False, photos dated end aren't included """
+        low = 0 if start is None else bisect_left(self.timestamps, start)
+        if end is None:
+            high = len(self.timestamps)
+        elif include_end:
+            high = bisect_right(self.timestamps, end)
+        else:
+            high = bisect_left(self.timestamps, end)
+        return self.uuids[low:high]
+
+    def calendar(self, month=None, day=None):
+        """ returns list of uuids of the photos dated in month and/or on day of the month
+            of any year, as PhotoInfo.date gives the date (in the photo's time zone)
+            month: 1-12 or None for any month; day: 1-31 or None for any day """
+        if not self.timestamps or (month is None and day is None):
+            return list(self.uuids)
+
+        first = _coredata_to_datetime(self.timestamps[0]).astimezone(timezone.utc)
+        last = _coredata_to_datetime(self.timestamps[-1]).astimezone(timezone.utc)
+        months = [month] if month is not None else range(1, 13)
+
+        # find the photos dated within a day of each matching day (or month) using the
+        # index then check the date of each in its own time zone
+        photos = self._db._dbphotos
+        uuids = []
+        for year in range(first.year - 1, last.year + 2):
+            for m in months:
+                try:
+                    if day is None:
+                        start = datetime(year, m, 1, tzinfo=timezone.utc)
+                        end = datetime(
+                            year + m // 12, m % 12 + 1, 1, tzinfo=timezone.utc
+                        )
+                    else:
+                        start = datetime(year, m, day, tzinfo=timezone.utc)
+                        end = start + timedelta(days=1)
+                except ValueError:
+                    # no such day this month (e.g. Feb 29 on a non-leap year)
+                    continue
+                for uuid in self.range(
+                    _coredata_timestamp(start - _MAX_TZ_OFFSET),
+                    _coredata_timestamp(end + _MAX_TZ_OFFSET),
+                    include_end=False,
+                ):
+                    info = photos[uuid]
+                    date = _coredata_to_datetime(
+                        info[self.field], info["imageTimeZoneOffsetSeconds"]
+                    )
+                    if date.month == m and (day is None or date.day == day):
+                        uuids.append(uuid)
+        return uuids
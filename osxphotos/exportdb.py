@@ -0,0 +1,183 @@
+"""
+ExportDB class
+Record of the photos exported to a folder, kept in a sqlite database in the folder, so that
+export --update can skip the photos that haven't changed since they were exported and export
+the ones that have to the same files
+Each photo is recorded in its own transaction as soon as its files are exported so an export
+that's interrupted can be run again with --update without exporting the photos already done
+"""
+
+import os
+import os.path
+import sqlite3
+import threading
+
+from ._constants import _EXPORT_DB_NAME, _EXPORT_DB_VERSION
+
+
+def _normpath(path):
+    """ returns absolute, normalized path so different ways of writing it compare equal """
+    return os.path.normpath(os.path.abspath(str(path)))
+
+
+class ExportedFile:
+    """ a file exported for a photo
+        path: path of the exported file
+        src: path of the file it was copied from (None for sidecars or if not known)
+        src_size, src_mtime: size and modification time of src when it was copied
+        (None if the file was reserved but not copied yet) """
+
+    __slots__ = ("path", "src", "src_size", "src_mtime")
+
+    def __init__(self, path, src=None, src_size=None, src_mtime=None):
+        self.path = path
+        self.src = src
+        self.src_size = src_size
+        self.src_mtime = src_mtime
+
+    @classmethod
+    def copied(cls, path, src):
+        """ returns ExportedFile for file path just copied from src (stats src) """
+        if src is None:
+            return cls(path)
+        stat = os.stat(src)
+        return cls(path, src, stat.st_size, stat.st_mtime)
+
+    def exported_to(self, path):
+        """ returns True if this file was exported to path (however path is written) """
+        return _normpath(path) == _normpath(self.path)
+
+    def unchanged(self, path, src):
+        """ returns True if this file was exported to path from src, src hasn't changed since
+            and the exported file is still there """
+        if not self.exported_to(path) or src != self.src or self.src_size is None:
+            return False
+        try:
+            stat = os.stat(src)
+        except OSError:
+            return False
+        return (
+            stat.st_size == self.src_size
+            and stat.st_mtime == self.src_mtime
+            and os.path.exists(path)
+        )
+
+
+class ExportRecord:
+    """ the files exported for a photo (dict of kind: ExportedFile where kind is one of
+        original, edited, live or a sidecar: json, xmp, edited_json, edited_xmp) and a hash of
+        the photo's metadata when they were exported (None if not exported yet) """
+
+    __slots__ = ("uuid", "metadata", "files")
+
+    def __init__(self, uuid, metadata=None, files=None):
+        self.uuid = uuid
+        self.metadata = metadata
+        self.files = files or {}
+
+
+class ExportDB:
+    """
+    Photos exported to folder dest, stored in dest/.osxphotos_export.db
+    The records are read when the database is opened and kept in memory
+    Paths are stored relative to dest so the export folder can be moved and read back as
+    absolute paths
+    Safe to use from several threads at once
+    """
+
+    def __init__(self, dest):
+        self.dest = dest
+        self.path = os.path.join(dest, _EXPORT_DB_NAME)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # with the write-ahead log a commit doesn't rewrite the database or wait for the disk
+        # for every photo and the last commits are still kept if the export is interrupted
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_tables()
+        self._records = self._read_records()
+
+    def _create_tables(self):
+        """ create the tables if the database is new """
+        c = self._conn.cursor()
+        version = c.execute("PRAGMA user_version").fetchone()[0]
+        if version > _EXPORT_DB_VERSION:
+            raise ValueError(
+                f"export database {self.path} is version {version}, "
+                f"this version of osxphotos can only read up to version {_EXPORT_DB_VERSION}"
+            )
+        with self._conn:
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS photos (uuid TEXT PRIMARY KEY, metadata TEXT)"
+            )
+            c.execute(
+                "CREATE TABLE IF NOT EXISTS files (uuid TEXT, kind TEXT, path TEXT, "
+                "src TEXT, src_size INTEGER, src_mtime REAL, PRIMARY KEY (uuid, kind))"
+            )
+            c.execute(f"PRAGMA user_version = {_EXPORT_DB_VERSION}")
+
+    def _read_records(self):
+        """ returns dict of uuid: ExportRecord for the photos in the database """
+        c = self._conn.cursor()
+        records = {
+            uuid: ExportRecord(uuid, metadata)
+            for uuid, metadata in c.execute("SELECT uuid, metadata FROM photos")
+        }
+        for uuid, kind, path, src, src_size, src_mtime in c.execute(
+            "SELECT uuid, kind, path, src, src_size, src_mtime FROM files"
+        ):
+            record = records.get(uuid)
+            if record is not None:
+                record.files[kind] = ExportedFile(
+                    _normpath(os.path.join(self.dest, path)), src, src_size, src_mtime
+                )
+        return records
+
+    def get(self, uuid):
+        """ returns ExportRecord of the photo with uuid or None if it wasn't exported """
+        with self._lock:
+            return self._records.get(uuid)
+
+    def uuids(self):
+        """ returns set of the uuids of the photos exported """
+        with self._lock:
+            return set(self._records)
+
+    def record(self, record):
+        """ save ExportRecord record, replacing the photo's previous record """
+        rows = [
+            (
+                record.uuid,
+                kind,
+                os.path.relpath(exported.path, self.dest),
+                exported.src,
+                exported.src_size,
+                exported.src_mtime,
+            )
+            for kind, exported in record.files.items()
+        ]
+        with self._lock, self._conn:
+            c = self._conn.cursor()
+            c.execute("DELETE FROM files WHERE uuid = ?", (record.uuid,))
+            c.execute(
+                "INSERT OR REPLACE INTO photos (uuid, metadata) VALUES (?, ?)",
+                (record.uuid, record.metadata),
+            )
+            c.executemany(
+                "INSERT INTO files (uuid, kind, path, src, src_size, src_mtime) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._records[record.uuid] = record
+
+    def remove(self, uuid):
+        """ remove the record of the photo with uuid """
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files WHERE uuid = ?", (uuid,))
+            self._conn.execute("DELETE FROM photos WHERE uuid = ?", (uuid,))
+            self._records.pop(uuid, None)
+
+    def close(self):
+        """ close the database """
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,96 @@
+"""
+ExportSession class
+Names of the files in the export destination directories kept in memory so that exporting
+many photos doesn't list the destination directory (glob) for every photo to find a name that
+isn't used and doesn't check and create the export by date folders for every photo
+"""
+
+import os
+import os.path
+import pathlib
+import threading
+
+
+class ExportSession:
+    """
+    Names reserved for the files exported to each destination directory
+    Each directory is listed once, the first time a name in it is reserved; after that the
+    names reserved by the session are added so the directory must not be changed by anything
+    else while the session is in use
+    Safe to use from several threads exporting at once: each name is handed out only once
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # directory: set of stems of the files (and directories) in it
+        self._stems = {}
+        # directories known to exist
+        self._dirs = set()
+
+    def _get_stems(self, directory):
+        """ returns set of stems in directory, listing it the first time; caller holds the lock """
+        stems = self._stems.get(directory)
+        if stems is None:
+            try:
+                stems = {pathlib.Path(name).stem for name in os.listdir(directory)}
+            except FileNotFoundError:
+                stems = set()
+            self._stems[directory] = stems
+        return stems
+
+    def reserve(self, dest, increment=True, overwrite=False):
+        """ reserve the name of file dest (path of file to export) and return it as pathlib.Path
+            increment: (boolean, default=True); if True and overwrite=False, if there's already
+                       a file with the same stem in the directory (e.g. file1.png or sidecar
+                       file1.json when exporting file1.jpeg) adds (1), (2), etc to the stem
+                       until a stem that isn't used is found, like PhotoInfo.export does
+            overwrite: (boolean, default=False); if True, dest is returned even if it exists
+            the stem returned is reserved for the sidecars of dest, which have the same stem """
+        dest = pathlib.Path(dest)
+        # absolute so names reserved with relative and absolute paths are found either way
+        directory = os.path.normpath(os.path.abspath(str(dest.parent)))
+        with self._lock:
+            stems = self._get_stems(directory)
+            if increment and not overwrite:
+                count = 1
+                dest_new = dest.stem
+                while dest_new in stems:
+                    dest_new = f"{dest.stem} ({count})"
+                    count += 1
+                dest = dest.parent / f"{dest_new}{dest.suffix}"
+            stems.add(dest.stem)
+        return dest
+
+    def isdir(self, path):
+        """ returns True if path is a directory, like os.path.isdir, checking each path only
+            once per session """
+        path = os.path.normpath(path)
+        with self._lock:
+            if path not in self._dirs:
+                if not os.path.isdir(path):
+                    return False
+                self._dirs.add(path)
+        return True
+
+    def makedirs(self, path):
+        """ create directory path and any missing parents unless the session created it or
+            found it before; returns path """
+        normpath = os.path.normpath(path)
+        with self._lock:
+            if normpath not in self._dirs:
+                os.makedirs(normpath, exist_ok=True)
+                self._dirs.add(normpath)
+        return path
+
+    def create_path_by_date(self, dest, dt):
+        """ Creates a path in dest folder in form dest/YYYY/MM/DD/, like utils.create_path_by_date
+            but checks dest and creates each date folder only once per session
+            dest: valid path as str
+            dt: datetime.timetuple() object
+            returns path """
+        if not self.isdir(dest):
+            raise FileNotFoundError(f"dest {dest} must be valid path")
+        yyyy, mm, dd = dt[0:3]
+        return self.makedirs(
+            os.path.join(dest, str(yyyy).zfill(4), str(mm).zfill(2), str(dd).zfill(2))
+        )
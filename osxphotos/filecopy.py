@@ -0,0 +1,237 @@
+"""
+File copy used by export
+Copies a file without starting a process for each file: on MacOS with copyfile(3), which clones
+the file on APFS and copies the extended attributes, ACLs, permissions and dates like ditto does;
+on other systems by cloning the file (reflink) if the filesystem supports it or else with the
+fastest copy the kernel supports (copy_file_range, sendfile) or reading and writing large
+buffers, then copying permissions, dates and extended attributes
+The file is copied to a temporary name in the destination folder then renamed so dest is
+never left partly written
+/usr/bin/ditto can still be used instead (use_ditto=True)
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import os.path
+import shutil
+import subprocess
+import sys
+import uuid
+
+from ._constants import _COPY_BUFFER_SIZE
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ioctl to clone a file on Linux (btrfs, xfs, ...) from linux/fs.h
+_FICLONE = 0x40049409
+
+# flags for copyfile(3) from copyfile.h: copy data, xattrs, ACLs, permissions and dates,
+# cloning the file if possible
+_COPYFILE_ALL = 0xF
+_COPYFILE_CLONE = 1 << 24
+
+# errors that mean a way of copying isn't supported for these files so another should be tried
+_UNSUPPORTED = {
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.ENOTTY,
+    errno.EXDEV,
+}
+
+_libc = None
+
+
+def _get_libc():
+    """ returns libc loaded with ctypes """
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _libc.copyfile.argtypes = [
+            ctypes.c_char_p,
+            ctypes.c_char_p,
+            ctypes.c_void_p,
+            ctypes.c_uint32,
+        ]
+    return _libc
+
+
+def _clone(src_fd, dest_fd, size):
+    """ clone src_fd to dest_fd with the FICLONE ioctl; returns False if not supported """
+    if fcntl is None or not sys.platform.startswith("linux"):
+        return False
+    try:
+        fcntl.ioctl(dest_fd, _FICLONE, src_fd)
+    except OSError as e:
+        if e.errno in _UNSUPPORTED:
+            return False
+        raise
+    return True
+
+
+def _copy_range(copy, src_fd, dest_fd, size):
+    """ copy size bytes with copy(src_fd, dest_fd, offset, count) (returns bytes copied)
+        returns False if copy isn't supported for these files or copies nothing (some
+        filesystems return 0 from copy_file_range instead of an error)
+        raises OSError if the copy ends before size bytes so dest isn't left truncated """
+    offset = 0
+    while offset < size:
+        try:
+            copied = copy(src_fd, dest_fd, offset, min(size - offset, 1 << 30))
+        except OSError as e:
+            if offset == 0 and e.errno in _UNSUPPORTED:
+                return False
+            raise
+        if copied == 0:
+            if offset == 0:
+                return False
+            raise OSError(
+                errno.EIO,
+                f"copy ended after {offset} of {size} bytes (file got shorter?)",
+            )
+        offset += copied
+    return True
+
+
+def _copy_file_range(src_fd, dest_fd, size):
+    """ copy with os.copy_file_range (Python 3.8+, Linux); returns False if not supported """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is None:
+        return False
+    return _copy_range(
+        lambda src, dest, offset, count: copy_file_range(src, dest, count),
+        src_fd,
+        dest_fd,
+        size,
+    )
+
+
+def _sendfile(src_fd, dest_fd, size):
+    """ copy with os.sendfile, which copies between files on Linux; returns False if not supported """
+    if not hasattr(os, "sendfile") or not sys.platform.startswith("linux"):
+        return False
+    return _copy_range(
+        lambda src, dest, offset, count: os.sendfile(dest, src, offset, count),
+        src_fd,
+        dest_fd,
+        size,
+    )
+
+
+def _copy_buffered(src_fd, dest_fd, size):
+    """ copy by reading and writing _COPY_BUFFER_SIZE bytes at a time """
+    buffer = bytearray(min(_COPY_BUFFER_SIZE, max(size, 1)))
+    view = memoryview(buffer)
+    with open(src_fd, "rb", buffering=0, closefd=False) as src:
+        while True:
+            read = src.readinto(buffer)
+            if not read:
+                break
+            written = 0
+            while written < read:
+                written += os.write(dest_fd, view[written:read])
+    return True
+
+
+# ways of copying the data of a file, fastest first
+_COPY_METHODS = [
+    ("clone", _clone),
+    ("copy_file_range", _copy_file_range),
+    ("sendfile", _sendfile),
+    ("buffered", _copy_buffered),
+]
+
+
+def _copy_data(src_fd, dest_fd, size, methods=None):
+    """ copy the data of open file src_fd to dest_fd (empty file open for writing) with the
+        first of methods (list of (name, function), default _COPY_METHODS) that works
+        returns name of the method used """
+    for name, copy in methods or _COPY_METHODS:
+        if copy(src_fd, dest_fd, size):
+            return name
+    raise OSError(errno.ENOTSUP, "no way to copy file")
+
+
+def _copy_to(src, tmp):
+    """ copy src to new file tmp with its permissions, dates and extended attributes """
+    if sys.platform == "darwin":
+        if (
+            _get_libc().copyfile(
+                os.fsencode(src),
+                os.fsencode(tmp),
+                None,
+                _COPYFILE_ALL | _COPYFILE_CLONE,
+            )
+            != 0
+        ):
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), src)
+        return
+
+    with open(src, "rb") as src_file:
+        src_fd = src_file.fileno()
+        size = os.fstat(src_fd).st_size
+        dest_fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            _copy_data(src_fd, dest_fd, size)
+        finally:
+            os.close(dest_fd)
+    # permissions, dates and, on Linux, extended attributes
+    shutil.copystat(src, tmp)
+
+
+def _ditto(src, dest):
+    """ copy src to dest with /usr/bin/ditto """
+    # if error on copy, subprocess will raise CalledProcessError
+    try:
+        subprocess.run(
+            ["/usr/bin/ditto", src, dest], check=True, stderr=subprocess.PIPE
+        )
+    except subprocess.CalledProcessError as e:
+        logger.critical(
+            f"ditto returned error: {e.returncode} {e.stderr.decode(sys.getfilesystemencoding()).rstrip()}"
+        )
+        raise e
+
+
+def copy_file(src, dest, use_ditto=False):
+    """ copy file src to dest, replacing dest if it exists
+        src: path of file to copy
+        dest: path to copy to; if it's a directory, src is copied into it
+        use_ditto: if True, copy with /usr/bin/ditto instead
+        creates the folder dest is in if it doesn't exist
+        returns path of the copy """
+    if os.path.isdir(dest):
+        dest = os.path.join(dest, os.path.basename(src))
+
+    if use_ditto:
+        _ditto(src, dest)
+        return dest
+
+    directory, name = os.path.split(os.path.abspath(dest))
+    tmp = os.path.join(directory, f".{name}.{uuid.uuid4().hex[:12]}.tmp")
+    try:
+        try:
+            _copy_to(src, tmp)
+        except FileNotFoundError:
+            if os.path.isdir(directory) or not os.path.exists(src):
+                raise
+            os.makedirs(directory, exist_ok=True)
+            _copy_to(src, tmp)
+        os.replace(tmp, dest)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return dest
@@ -0,0 +1,245 @@
+"""
+GeoIndex class
+Geotagged photos of a PhotosDB in a grid of latitude/longitude cells so that PhotosDB.photos()
+finds the photos in a bounding box or near a point by looking only at the photos in the cells
+that overlap it instead of checking every photo
+"""
+
+from array import array
+from bisect import bisect_left, bisect_right
+from math import cos, degrees, floor, pi, radians, sin
+
+# mean radius of the Earth used for distances
+_EARTH_RADIUS_KM = 6371.0088
+
+# size of the grid cells in degrees of latitude and longitude (~11 km at the equator)
+_CELL_SIZE = 0.1
+
+# cells are widened by this many degrees when checking if they're inside a query's area
+_MARGIN = 1e-9
+
+
+def _check_latitude(lat):
+    if not -90 <= lat <= 90:
+        raise ValueError(f"latitude must be between -90 and 90: {lat}")
+
+
+def _check_longitude(lon):
+    if not -180 <= lon <= 180:
+        raise ValueError(f"longitude must be between -180 and 180: {lon}")
+
+
+def _check_bbox(min_lat, min_lon, max_lat, max_lon):
+    for lat in (min_lat, max_lat):
+        _check_latitude(lat)
+    for lon in (min_lon, max_lon):
+        _check_longitude(lon)
+    if min_lat > max_lat:
+        raise ValueError(
+            f"min latitude {min_lat} must not be greater than max latitude {max_lat}"
+        )
+
+
+def _near_bbox(lat, lon, radius_km):
+    """ returns bounding box (min_lat, min_lon, max_lat, max_lon) of the points within
+        radius_km km of lat, lon; min_lon > max_lon if the box crosses the 180th meridian """
+    _check_latitude(lat)
+    _check_longitude(lon)
+    if radius_km < 0:
+        raise ValueError(f"radius must not be negative: {radius_km}")
+
+    dlat = degrees(radius_km / _EARTH_RADIUS_KM)
+    min_lat = max(-90.0, lat - dlat)
+    max_lat = min(90.0, lat + dlat)
+    if min_lat == -90 or max_lat == 90:
+        # circle includes a pole so covers every longitude
+        return (min_lat, -180.0, max_lat, 180.0)
+
+    # widest longitude span is at the latitude of the box furthest from the equator
+    widest = max(abs(min_lat), abs(max_lat))
+    dlon = degrees(radius_km / (_EARTH_RADIUS_KM * cos(radians(widest))))
+    if dlon >= 180:
+        return (min_lat, -180.0, max_lat, 180.0)
+    min_lon = lon - dlon
+    if min_lon < -180:
+        min_lon += 360
+    max_lon = lon + dlon
+    if max_lon > 180:
+        max_lon -= 360
+    return (min_lat, min_lon, max_lat, max_lon)
+
+
+class GeoIndex:
+    """
+    Photos of a PhotosDB with a location, grouped by grid cell of cell_size degrees
+    latitudes, longitudes, uuids: location and uuid of each photo, sorted by cell and
+        by latitude within each cell
+    Photos with no location (latitude or longitude is None) aren't in the index
+    """
+
+    def __init__(self, db, cell_size=_CELL_SIZE):
+        self.cell_size = cell_size
+        self._columns = int(round(360 / cell_size))
+
+        photos = []
+        for uuid, info in db._dbphotos.items():
+            lat = info["latitude"]
+            lon = info["longitude"]
+            if lat is None or lon is None:
+                continue
+            photos.append((self._cell(lat, lon), lat, lon, uuid))
+        photos.sort(key=lambda photo: photo[:2])
+
+        self.latitudes = array("d", [photo[1] for photo in photos])
+        self.longitudes = array("d", [photo[2] for photo in photos])
+        self.uuids = [photo[3] for photo in photos]
+
+        # cell: (start, end) of the cell's photos in latitudes, longitudes and uuids
+        self._cells = {}
+        start = 0
+        for i in range(1, len(photos) + 1):
+            if i == len(photos) or photos[i][0] != photos[start][0]:
+                self._cells[photos[start][0]] = (start, i)
+                start = i
+
+    def __len__(self):
+        return len(self.uuids)
+
+    def _row(self, lat):
+        return floor((lat + 90) / self.cell_size)
+
+    def _column(self, lon):
+        # longitude 180 is in the last column
+        return min(floor((lon + 180) / self.cell_size), self._columns - 1)
+
+    def _cell(self, lat, lon):
+        return self._row(lat) * self._columns + self._column(lon)
+
+    def _column_ranges(self, min_lon, max_lon):
+        """ returns list of (first, last) column ranges covering min_lon to max_lon
+            if min_lon > max_lon the range crosses the 180th meridian """
+        first = self._column(min_lon)
+        last = self._column(max_lon)
+        if min_lon <= max_lon:
+            return [(first, last)]
+        return [(first, self._columns - 1), (0, last)]
+
+    def _cell_bounds(self, cell):
+        """ returns (min_lat, min_lon, max_lat, max_lon) of cell, widened by a tiny margin so
+            that every photo in the cell is within the bounds despite rounding """
+        row, column = divmod(cell, self._columns)
+        size = self.cell_size
+        return (
+            row * size - 90 - _MARGIN,
+            column * size - 180 - _MARGIN,
+            (row + 1) * size - 90 + _MARGIN,
+            (column + 1) * size - 180 + _MARGIN,
+        )
+
+    def _candidates(self, min_lat, min_lon, max_lat, max_lon):
+        """ yield (cell, start, end) of the cells with photos that overlap the bounding box """
+        first_row = self._row(min_lat)
+        last_row = self._row(max_lat)
+        columns = self._column_ranges(min_lon, max_lon)
+        num_cells = (last_row - first_row + 1) * sum(
+            last - first + 1 for first, last in columns
+        )
+
+        if num_cells > len(self._cells):
+            # box covers more cells than have photos: check the cells with photos
+            for cell, (start, end) in self._cells.items():
+                row, column = divmod(cell, self._columns)
+                if first_row <= row <= last_row and any(
+                    first <= column <= last for first, last in columns
+                ):
+                    yield cell, start, end
+            return
+
+        cells = self._cells
+        for row in range(first_row, last_row + 1):
+            offset = row * self._columns
+            for first, last in columns:
+                for column in range(first, last + 1):
+                    span = cells.get(offset + column)
+                    if span is not None:
+                        yield (offset + column, *span)
+
+    def bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """ returns list of uuids of the photos in the bounding box, edges included
+            min_lat, min_lon: south-west corner; max_lat, max_lon: north-east corner, in degrees
+            if min_lon > max_lon the box crosses the 180th meridian """
+        _check_bbox(min_lat, min_lon, max_lat, max_lon)
+        wraps = min_lon > max_lon
+
+        def inside(lat, lon):
+            if not min_lat <= lat <= max_lat:
+                return False
+            if wraps:
+                return lon >= min_lon or lon <= max_lon
+            return min_lon <= lon <= max_lon
+
+        latitudes = self.latitudes
+        longitudes = self.longitudes
+        uuids = self.uuids
+        found = []
+        for cell, start, end in self._candidates(min_lat, min_lon, max_lat, max_lon):
+            cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = self._cell_bounds(
+                cell
+            )
+            if inside(cell_min_lat, cell_min_lon) and inside(
+                cell_max_lat, cell_max_lon
+            ):
+                if not wraps or cell_min_lon >= min_lon or cell_max_lon <= max_lon:
+                    # cell is inside the box: every photo in it is
+                    found.extend(uuids[start:end])
+                    continue
+            # photos in a cell are sorted by latitude
+            start = bisect_left(latitudes, min_lat, start, end)
+            end = bisect_right(latitudes, max_lat, start, end)
+            for i in range(start, end):
+                if inside(latitudes[i], longitudes[i]):
+                    found.append(uuids[i])
+        return found
+
+    def near(self, lat, lon, radius_km):
+        """ returns list of uuids of the photos within radius_km km of lat, lon (in degrees)
+            distance is the great-circle distance """
+        min_lat, min_lon, max_lat, max_lon = _near_bbox(lat, lon, radius_km)
+        phi = radians(lat)
+        cos_phi = cos(phi)
+        # haversine of the central angle of radius_km
+        max_a = sin(min(radius_km / _EARTH_RADIUS_KM, pi) / 2) ** 2
+
+        def haversine(lat2, lon2):
+            phi2 = radians(lat2)
+            return (
+                sin((phi2 - phi) / 2) ** 2
+                + cos_phi * cos(phi2) * sin(radians(lon2 - lon) / 2) ** 2
+            )
+
+        latitudes = self.latitudes
+        longitudes = self.longitudes
+        uuids = self.uuids
+        found = []
+        for cell, start, end in self._candidates(min_lat, min_lon, max_lat, max_lon):
+            # distance to the points of a cell is greatest at one of its corners unless
+            # the cell contains the meridian opposite lon
+            cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = self._cell_bounds(
+                cell
+            )
+            west = (cell_min_lon - lon + 180) % 360 - 180
+            east = (cell_max_lon - lon + 180) % 360 - 180
+            if west <= east and all(
+                haversine(corner_lat, corner_lon) <= max_a
+                for corner_lat in (cell_min_lat, cell_max_lat)
+                for corner_lon in (cell_min_lon, cell_max_lon)
+            ):
+                found.extend(uuids[start:end])
+                continue
+            # photos in a cell are sorted by latitude
+            start = bisect_left(latitudes, min_lat, start, end)
+            end = bisect_right(latitudes, max_lat, start, end)
+            for i in range(start, end):
+                if haversine(latitudes[i], longitudes[i]) <= max_a:
+                    found.append(uuids[i])
+        return found
@@ -0,0 +1,178 @@
+"""
+PhotoColumns class
+Columnar view of the photos in a PhotosDB: one NumPy array per field with an entry per photo
+Used by PhotosDB.photos() when PhotosDB is created with columnar=True to filter photos
+with vectorized operations instead of checking each photo in turn
+NumPy is optional: it's only needed if columnar=True
+"""
+
+import logging
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from ._constants import _COREDATA_EPOCH_OFFSET, _MOVIE_TYPE, _PHOTO_TYPE
+from .photoinfo import PhotoInfo
+from .utils import _debug
+
+logger = logging.getLogger(__name__)
+
+# PhotoInfo properties stored as bits of PhotoColumns.flags, in bit order
+# these are also the names of the photos() arguments that filter on them
+_FLAGS = [
+    "favorite",
+    "hidden",
+    "ismissing",
+    "hasadjustments",
+    "external_edit",
+    "shared",
+    "burst",
+    "live_photo",
+    "iscloudasset",
+    "incloud",
+]
+
+# value of PhotoColumns.type for each photo type; other types are -1
+_TYPE_CODES = {_PHOTO_TYPE: 0, _MOVIE_TYPE: 1}
+
+
+class PhotoColumns:
+    """
+    Columnar view of the photo data in a PhotosDB, built from PhotosDB._dbphotos
+    uuid: uuid of each photo (the row order of all the other columns)
+    date: creation date as POSIX timestamp (float64 so fractional seconds match datetime comparisons)
+    latitude, longitude: float64, NaN if the photo has no location
+    type: int8 type code (see _TYPE_CODES)
+    uti: int32 index of the photo's UTI in utis
+    flags: uint16 bitfield with a bit for each of _FLAGS
+    selectable: False for burst photos that photos() never returns (the non-selected ones)
+    When the PhotosDB is lazy, each flag is filled in the first time a query uses it
+    so only the data needed by the query is loaded
+    """
+
+    def __init__(self, db):
+        if np is None:
+            raise ImportError("PhotoColumns requires numpy")
+
+        self._db = db
+        photos = db._dbphotos
+        records = list(photos.values())
+        count = len(records)
+
+        self.uuid = np.array(list(photos), dtype=object)
+        self.index = {uuid: row for row, uuid in enumerate(photos)}
+
+        self.date = (
+            np.fromiter(
+                (r["imageDate"] for r in records), dtype=np.float64, count=count
+            )
+            + _COREDATA_EPOCH_OFFSET
+        )
+        self.latitude = np.fromiter(
+            (np.nan if r["latitude"] is None else r["latitude"] for r in records),
+            dtype=np.float64,
+            count=count,
+        )
+        self.longitude = np.fromiter(
+            (np.nan if r["longitude"] is None else r["longitude"] for r in records),
+            dtype=np.float64,
+            count=count,
+        )
+        self.type = np.fromiter(
+            (_TYPE_CODES.get(r["type"], -1) for r in records),
+            dtype=np.int8,
+            count=count,
+        )
+
+        # photos with the same UTI share a code so UTI matches are a lookup in utis
+        uti_codes = {}
+        self.uti = np.fromiter(
+            (uti_codes.setdefault(r["UTI"], len(uti_codes)) for r in records),
+            dtype=np.int32,
+            count=count,
+        )
+        self.utis = list(uti_codes)
+
+        self.selectable = np.fromiter(
+            (not (r["burst"] and not r["burst_key"]) for r in records),
+            dtype=bool,
+            count=count,
+        )
+
+        self.flags = np.zeros(count, dtype=np.uint16)
+        self._flags_loaded = set()
+        if not db._lazy:
+            self._load_flags(_FLAGS)
+
+    def __len__(self):
+        return len(self.uuid)
+
+    def _load_flags(self, flags):
+        """ fill in the bits of self.flags for flags that haven't been filled in yet """
+        flags = [flag for flag in flags if flag not in self._flags_loaded]
+        if not flags:
+            return
+
+        # flags have the same meaning as the PhotoInfo properties they're named after
+        photos = [
+            PhotoInfo(db=self._db, uuid=uuid, info=info)
+            for uuid, info in self._db._dbphotos.items()
+        ]
+        for flag in flags:
+            bit = np.uint16(1 << _FLAGS.index(flag))
+            values = np.fromiter(
+                (bool(getattr(p, flag)) for p in photos), dtype=bool, count=len(photos)
+            )
+            self.flags[values] |= bit
+            self._flags_loaded.add(flag)
+            if _debug():
+                logger.debug(f"Loaded column for {flag}")
+
+    def select(self, uuids):
+        """ returns boolean mask that's True for the photos in uuids """
+        mask = np.zeros(len(self), dtype=bool)
+        rows = [self.index[uuid] for uuid in uuids if uuid in self.index]
+        mask[rows] = True
+        return mask
+
+    def mask(
+        self, images=True, movies=False, from_date=None, to_date=None, uti=None, **flags
+    ):
+        """ returns boolean mask that's True for the photos that match all the criteria
+            arguments have the same meaning as the arguments of PhotosDB.photos()
+            flags: flag name (see _FLAGS): True/False to select photos with/without the flag or None """
+        mask = self.selectable.copy()
+
+        codes = []
+        if images:
+            codes.append(_TYPE_CODES[_PHOTO_TYPE])
+        if movies:
+            codes.append(_TYPE_CODES[_MOVIE_TYPE])
+        mask &= np.isin(self.type, codes)
+
+        if from_date:
+            mask &= self.date >= from_date.timestamp()
+        if to_date:
+            mask &= self.date <= to_date.timestamp()
+
+        if uti:
+            codes = [
+                code for code, value in enumerate(self.utis) if value and uti in value
+            ]
+            mask &= np.isin(self.uti, codes)
+
+        flags = {flag: value for flag, value in flags.items() if value is not None}
+        if flags:
+            # all the flags are checked with a single comparison of the bitfield
+            self._load_flags(flags)
+            bits = want = 0
+            for flag, value in flags.items():
+                bit = 1 << _FLAGS.index(flag)
+                bits |= bit
+                if value:
+                    want |= bit
+            mask &= (self.flags & np.uint16(bits)) == want
+
+        return mask
@@ -0,0 +1,103 @@
+"""
+PhotoIndex class
+Bitmap indexes of the photos in a PhotosDB (see Bitmap) by keyword, person, album, type and flag
+Used by PhotosDB.photos() when PhotosDB is created with bitmaps=True so that the criteria of
+a query are combined with a few bitmap operations instead of building and intersecting sets
+"""
+
+import logging
+
+from ._constants import _MOVIE_TYPE, _PHOTO_TYPE
+from .bitmap import Bitmap
+from .photocolumns import _FLAGS
+from .photoinfo import PhotoInfo
+from .utils import _debug
+
+logger = logging.getLogger(__name__)
+
+
+class PhotoIndex:
+    """
+    Bitmap indexes of the photo data in a PhotosDB, by photo id (see PhotosDB._dbuuids)
+    all: every photo in PhotosDB._dbphotos
+    selectable: photos that photos() can return (non-selected burst photos are excluded)
+    types: photos of each type, by type (_PHOTO_TYPE, _MOVIE_TYPE)
+    The indexes of flags (see photocolumns._FLAGS) and of each keyword, person and album
+    are built the first time a query uses them
+    """
+
+    def __init__(self, db):
+        self._db = db
+        uuids = db._dbuuids
+
+        ids = []
+        selectable = []
+        types = {_PHOTO_TYPE: [], _MOVIE_TYPE: []}
+        for uuid, info in db._dbphotos.items():
+            id_ = uuids.get(uuid)
+            ids.append(id_)
+            if not (info["burst"] and not info["burst_key"]):
+                selectable.append(id_)
+            if info["type"] in types:
+                types[info["type"]].append(id_)
+
+        self.all = Bitmap(ids)
+        self.selectable = Bitmap(selectable)
+        self.types = {type_: Bitmap(ids) for type_, ids in types.items()}
+
+        # flag: Bitmap of photos for which flag is True
+        self._flags = {}
+        # (relationship attribute, value): Bitmap of photos with value
+        self._values = {}
+
+    def flag(self, flag):
+        """ returns Bitmap of the photos for which the PhotoInfo property flag is True """
+        bitmap = self._flags.get(flag)
+        if bitmap is None:
+            if flag not in _FLAGS:
+                raise ValueError(f"Unknown flag {flag}")
+            db = self._db
+            uuids = db._dbuuids
+            bitmap = self._flags[flag] = Bitmap(
+                uuids.get(uuid)
+                for uuid, info in db._dbphotos.items()
+                if getattr(PhotoInfo(db=db, uuid=uuid, info=info), flag)
+            )
+            if _debug():
+                logger.debug(f"Built index for {flag}")
+        return bitmap
+
+    def related(self, attr, value):
+        """ returns Bitmap of the photos with value in the PhotosDB Relationship attr
+            (e.g. "_dbkeywords") """
+        key = (attr, value)
+        bitmap = self._values.get(key)
+        if bitmap is None:
+            relationship = getattr(self._db, attr)
+            bitmap = self._values[key] = Bitmap(relationship.photo_ids(value))
+        return bitmap
+
+    def uuid(self, uuid):
+        """ returns Bitmap of the photo uuid """
+        id_ = self._db._dbuuids.get(uuid)
+        return Bitmap([id_] if id_ is not None and id_ in self.all else [])
+
+    def select(self, images=True, movies=False, **flags):
+        """ returns Bitmap of the selectable photos matching the type and flag criteria
+            arguments have the same meaning as the arguments of PhotosDB.photos()
+            flags: flag name (see _FLAGS): True/False to select photos with/without the flag or None """
+        bitmap = Bitmap()
+        if images:
+            bitmap |= self.types[_PHOTO_TYPE]
+        if movies:
+            bitmap |= self.types[_MOVIE_TYPE]
+        bitmap &= self.selectable
+
+        for flag, value in flags.items():
+            if value is None:
+                continue
+            if value:
+                bitmap &= self.flag(flag)
+            else:
+                bitmap -= self.flag(flag)
+        return bitmap
@@ -4,6 +4,7 @@ Represents a single photo in the Photos library and provides access to the photo
 PhotosDB.photos() returns a list of PhotoInfo objects
 """
 
+import functools
 import glob
 import json
 import logging
@@ -12,7 +13,7 @@ import pathlib
 import re
 import subprocess
 import sys
-from datetime import timedelta, timezone
+import threading
 from pprint import pformat
 
 import yaml
@@ -28,11 +29,49 @@ from ._constants import (
 )
 from .utils import (
     _copy_file,
+    _coredata_to_datetime,
+    _debug,
     _export_photo_uuid_applescript,
     _get_resource_loc,
     dd_to_dms_str,
 )
 
+logger = logging.getLogger(__name__)
+
+# XMP sidecar template, compiled the first time it's used (see _get_xmp_template)
+_xmp_template = None
+_xmp_template_lock = threading.Lock()
+
+
+def _get_xmp_template():
+    """ returns the compiled XMP sidecar template
+        it's compiled once as compiling takes much longer than rendering it and mako can't
+        compile templates in several threads at once """
+    global _xmp_template
+    with _xmp_template_lock:
+        if _xmp_template is None:
+            _xmp_template = Template(
+                filename=os.path.join(_TEMPLATE_DIR, _XMP_TEMPLATE_NAME)
+            )
+    return _xmp_template
+
+
+def _memoized_property(func):
+    """ like property but computes the value once per PhotoInfo object (the photo data
+        doesn't change once loaded); lists are copied so callers can't change the memo
+        don't use for properties that check the file system (e.g. path_edited) """
+    attr = f"_memo_{func.__name__}"
+
+    @functools.wraps(func)
+    def getter(self):
+        try:
+            value = self.__dict__[attr]
+        except KeyError:
+            value = self.__dict__[attr] = func(self)
+        return list(value) if isinstance(value, list) else value
+
+    return property(getter)
+
 
 class PhotoInfo:
     """
@@ -59,24 +98,20 @@ class PhotoInfo:
     @property
     def date(self):
         """ image creation date as timezone aware datetime object """
-        imagedate = self._info["imageDate"]
-        seconds = self._info["imageTimeZoneOffsetSeconds"] or 0
-        delta = timedelta(seconds=seconds)
-        tz = timezone(delta)
-        imagedate_utc = imagedate.astimezone(tz=tz)
-        return imagedate_utc
+        # dates are stored as Core Data timestamps and only decoded when needed
+        return _coredata_to_datetime(
+            self._info["imageDate"], self._info["imageTimeZoneOffsetSeconds"]
+        )
 
     @property
     def date_modified(self):
         """ image modification date as timezone aware datetime object
             or None if no modification date set """
         imagedate = self._info["lastmodifieddate"]
-        if imagedate:
-            seconds = self._info["imageTimeZoneOffsetSeconds"] or 0
-            delta = timedelta(seconds=seconds)
-            tz = timezone(delta)
-            imagedate_utc = imagedate.astimezone(tz=tz)
-            return imagedate_utc
+        if imagedate is not None:
+            return _coredata_to_datetime(
+                imagedate, self._info["imageTimeZoneOffsetSeconds"]
+            )
         else:
             return None
 
@@ -85,7 +120,7 @@ class PhotoInfo:
         """ timezone offset from UTC in seconds """
         return self._info["imageTimeZoneOffsetSeconds"]
 
-    @property
+    @_memoized_property
     def path(self):
         """ absolute path on disk of the original picture """
 
@@ -126,7 +161,7 @@ class PhotoInfo:
 
         # if all else fails, photopath = None
         # photopath = None
-        # logging.debug(
+        # logger.debug(
         #     f"WARNING: photopath None, masterFingerprint null, not shared {pformat(self._info)}"
         # )
         # return photopath
@@ -158,7 +193,8 @@ class PhotoInfo:
                         filename = f"fullsizeoutput_{file_id}.mov"
                     else:
                         # don't know what it is!
-                        logging.debug(f"WARNING: unknown type {self._info['type']}")
+                        if _debug():
+                            logger.debug(f"WARNING: unknown type {self._info['type']}")
                         return None
 
                     # photopath appears to usually be in "00" subfolder but
@@ -174,26 +210,29 @@ class PhotoInfo:
                         filename,
                     )
 
-                    if not os.path.isfile(photopath):
+                    # files are looked up in the index of the resource directories
+                    # instead of checking the disk for every photo
+                    resources = self._db._get_resource_index()
+                    if not resources.isfile(photopath):
                         rootdir = os.path.join(
                             library, "resources", "media", "version", folder_id
                         )
-
-                        for dirname, _, filelist in os.walk(rootdir):
-                            if filename in filelist:
-                                photopath = os.path.join(dirname, filename)
-                                break
+                        found = resources.find(rootdir, filename)
+                        if found is not None:
+                            photopath = found
 
                     # check again to see if we found a valid file
-                    if not os.path.isfile(photopath):
-                        logging.debug(
-                            f"MISSING PATH: edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
-                        )
+                    if not resources.isfile(photopath):
+                        if _debug():
+                            logger.debug(
+                                f"MISSING PATH: edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                            )
                         photopath = None
                 else:
-                    logging.debug(
-                        f"{self.uuid} hasAdjustments but edit_resource_id is None"
-                    )
+                    if _debug():
+                        logger.debug(
+                            f"{self.uuid} hasAdjustments but edit_resource_id is None"
+                        )
                     photopath = None
             else:
                 photopath = None
@@ -222,17 +261,19 @@ class PhotoInfo:
                     filename = f"{self._uuid}_2_0_a.mov"
                 else:
                     # don't know what it is!
-                    logging.debug(f"WARNING: unknown type {self._info['type']}")
+                    if _debug():
+                        logger.debug(f"WARNING: unknown type {self._info['type']}")
                     return None
 
                 photopath = os.path.join(
                     library, "resources", "renders", directory, filename
                 )
 
-                if not os.path.isfile(photopath):
-                    logging.debug(
-                        f"edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
-                    )
+                if not self._isfile(photopath):
+                    if _debug():
+                        logger.debug(
+                            f"edited file for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                        )
                     photopath = None
             else:
                 photopath = None
@@ -241,7 +282,8 @@ class PhotoInfo:
             # if self._info["isMissing"] == 1:
             #     photopath = None  # path would be meaningless until downloaded
 
-            logging.debug(photopath)
+            if _debug():
+                logger.debug(photopath)
 
         return photopath
 
@@ -250,23 +292,23 @@ class PhotoInfo:
         """ long / extended description of picture """
         return self._info["extendedDescription"]
 
-    @property
+    @_memoized_property
     def persons(self):
         """ list of persons in picture """
-        return self._info["persons"]
+        return self._db._dbfaces.decode(self._info["persons"])
 
-    @property
+    @_memoized_property
     def albums(self):
         """ list of albums picture is contained in """
         albums = []
-        for album in self._info["albums"]:
+        for album in self._db._dbalbums.decode(self._info["albums"]):
             albums.append(self._db._dbalbum_details[album]["title"])
         return albums
 
-    @property
+    @_memoized_property
     def keywords(self):
         """ list of keywords for picture """
-        return self._info["keywords"]
+        return self._db._dbkeywords.decode(self._info["keywords"])
 
     @property
     def title(self):
@@ -356,7 +398,7 @@ class PhotoInfo:
         """
         return self._info["incloud"]
 
-    @property
+    @_memoized_property
     def iscloudasset(self):
         """ Returns True if photo is a cloud asset (in an iCloud library),
             otherwise False 
@@ -384,7 +426,7 @@ class PhotoInfo:
         if self._info["burst"]:
             burst_uuid = self._info["burstUUID"]
             burst_photos = [
-                PhotoInfo(db=self._db, uuid=u, info=self._db._dbphotos[u])
+                self._db._photo_info(u)
                 for u in self._db._dbphotos_burst[burst_uuid]
                 if u != self._uuid
             ]
@@ -408,7 +450,8 @@ class PhotoInfo:
             if self.live_photo and not self.ismissing:
                 live_model_id = self._info["live_model_id"]
                 if live_model_id == None:
-                    logging.debug(f"missing live_model_id: {self._uuid}")
+                    if _debug():
+                        logger.debug(f"missing live_model_id: {self._uuid}")
                     photopath = None
                 else:
                     folder_id, file_id = _get_resource_loc(live_model_id)
@@ -422,37 +465,68 @@ class PhotoInfo:
                         "00",
                         f"jpegvideocomplement_{file_id}.mov",
                     )
-                    if not os.path.isfile(photopath):
+                    if not self._isfile(photopath):
                         # In testing, I've seen occasional missing movie for live photo
                         # These appear to be valid -- e.g. live component hasn't been downloaded from iCloud
                         # photos 4 has "isOnDisk" column we could check
                         # or could do the actual check with "isfile"
                         # TODO: should this be a warning or debug?
-                        logging.debug(
-                            f"MISSING PATH: live photo path for UUID {self._uuid} should be at {photopath} but does not appear to exist"
-                        )
+                        if _debug():
+                            logger.debug(
+                                f"MISSING PATH: live photo path for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                            )
                         photopath = None
             else:
                 photopath = None
         else:
             # Photos 5
             if self.live_photo and not self.ismissing:
-                filename = pathlib.Path(self.path)
-                photopath = filename.parent.joinpath(f"{filename.stem}_3.mov")
-                photopath = str(photopath)
-                if not os.path.isfile(photopath):
+                photopath = self._path_live_photo_5()
+                if not self._isfile(photopath):
                     # In testing, I've seen occasional missing movie for live photo
                     # these appear to be valid -- e.g. video component not yet downloaded from iCloud
                     # TODO: should this be a warning or debug?
-                    logging.debug(
-                        f"MISSING PATH: live photo path for UUID {self._uuid} should be at {photopath} but does not appear to exist"
-                    )
+                    if _debug():
+                        logger.debug(
+                            f"MISSING PATH: live photo path for UUID {self._uuid} should be at {photopath} but does not appear to exist"
+                        )
                     photopath = None
             else:
                 photopath = None
 
         return photopath
 
+    def _path_live_photo_5(self):
+        """ path of the live video of a live photo on Photos 5, which is next to the original """
+        filename = pathlib.Path(self.path)
+        return str(filename.parent.joinpath(f"{filename.stem}_3.mov"))
+
+    def _isfile(self, path):
+        """ returns True if path is a file; files in the library's resource directories and
+            files checked by PhotosDB.prefetch_paths are looked up instead of checked on disk """
+        return self._db._get_resource_index().isfile(path)
+
+    def _resource_paths(self):
+        """ returns list of the files path_edited, path_live_photo and export() check for this
+            photo, or for files in the library's resource directories, the directory, for
+            PhotosDB.prefetch_paths """
+        paths = []
+        library = self._db._library_path
+        photos5 = self._db._db_version >= _PHOTOS_5_VERSION
+        if not self.ismissing and self.path is not None:
+            paths.append(self.path)
+        if self._info["hasAdjustments"]:
+            if photos5:
+                paths.append(os.path.join(library, "resources", "renders"))
+            else:
+                paths.append(os.path.join(library, "resources", "media", "version"))
+        if self.live_photo and not self.ismissing:
+            if photos5:
+                paths.append(self._path_live_photo_5())
+            else:
+                paths.append(os.path.join(library, "resources", "media", "master"))
+        return paths
+
     def export(
         self,
         dest,
@@ -464,6 +538,8 @@ class PhotoInfo:
         sidecar_xmp=False,
         use_photos_export=False,
         timeout=120,
+        session=None,
+        use_ditto=False,
     ):
         """ export photo 
             dest: must be valid destination path (or exception raised) 
@@ -479,6 +555,10 @@ class PhotoInfo:
                       sidecar filename will be dest/filename.xmp 
             use_photos_export: (boolean, default=False); if True will attempt to export photo via applescript interaction with Photos
             timeout: (int, default=120) timeout in seconds used with use_photos_export
+            session: (ExportSession, optional); if provided, the names of the files in dest are
+                     looked up in and reserved with session instead of listing dest for each export 
+                     (see ExportSession); all exports to dest must then use the same session
+            use_ditto: (boolean, default=False); if True, copy the file with /usr/bin/ditto instead of in-process
             returns the full path to the exported file """
 
         # TODO: add this docs:
@@ -493,7 +573,7 @@ class PhotoInfo:
             # verify destination is a valid path
             if dest is None:
                 raise ValueError("Destination must not be None")
-            elif not os.path.isdir(dest):
+            elif not (session.isdir(dest) if session is not None else os.path.isdir(dest)):
                 raise FileNotFoundError("Invalid path passed to export")
 
             if filename and len(filename) == 1:
@@ -528,7 +608,9 @@ class PhotoInfo:
         # e.g. exporting sidecar for file1.png and file1.jpeg
         # if file1.png exists and exporting file1.jpeg,
         # dest will be file1 (1).jpeg even though file1.jpeg doesn't exist to prevent sidecar collision
-        if increment and not overwrite:
+        if session is not None:
+            dest = session.reserve(dest, increment=increment, overwrite=overwrite)
+        elif increment and not overwrite:
             count = 1
             glob_str = str(dest.parent / f"{dest.stem}*")
             dest_files = glob.glob(glob_str)
@@ -551,7 +633,7 @@ class PhotoInfo:
             # TODO: how to handle ismissing or not hasadjustments and edited=True cases?
             if edited:
                 if not self.hasadjustments:
-                    logging.warning(
+                    logger.warning(
                         "Attempting to export edited photo but hasadjustments=False"
                     )
 
@@ -563,27 +645,28 @@ class PhotoInfo:
                     )
             else:
                 if self.ismissing:
-                    logging.warning(
+                    logger.warning(
                         f"Attempting to export photo with ismissing=True: path = {self.path}"
                     )
 
                 if self.path is None:
-                    logging.warning(
+                    logger.warning(
                         f"Attempting to export photo but path is None: ismissing = {self.ismissing}"
                     )
                     raise FileNotFoundError("Cannot export photo if path is None")
                 else:
                     src = self.path
 
-            if not os.path.isfile(src):
+            if not self._isfile(src):
                 raise FileNotFoundError(f"{src} does not appear to exist")
 
-            logging.debug(
-                f"exporting {src} to {dest}, overwrite={overwrite}, increment={increment}, dest exists: {dest.exists()}"
-            )
+            if _debug():
+                logger.debug(
+                    f"exporting {src} to {dest}, overwrite={overwrite}, increment={increment}, dest exists: {dest.exists()}"
+                )
 
-            # copy the file, _copy_file uses ditto to preserve Mac extended attributes
-            _copy_file(src, dest)
+            # copy the file, _copy_file preserves Mac extended attributes like ditto
+            _copy_file(src, dest, use_ditto=use_ditto)
         else:
             # use_photo_export
             exported = None
@@ -599,26 +682,28 @@ class PhotoInfo:
                 )
 
             if exported is None:
-                logging.warning(f"Error exporting photo {self.uuid} to {dest}")
+                logger.warning(f"Error exporting photo {self.uuid} to {dest}")
 
         if sidecar_json:
-            logging.debug("writing exiftool_json_sidecar")
+            if _debug():
+                logger.debug("writing exiftool_json_sidecar")
             sidecar_filename = dest.parent / pathlib.Path(f"{dest.stem}.json")
             sidecar_str = self._exiftool_json_sidecar()
             try:
                 self._write_sidecar(sidecar_filename, sidecar_str)
             except Exception as e:
-                logging.warning(f"Error writing json sidecar to {sidecar_filename}")
+                logger.warning(f"Error writing json sidecar to {sidecar_filename}")
                 raise e
 
         if sidecar_xmp:
-            logging.debug("writing xmp_sidecar")
+            if _debug():
+                logger.debug("writing xmp_sidecar")
             sidecar_filename = dest.parent / pathlib.Path(f"{dest.stem}.xmp")
             sidecar_str = self._xmp_sidecar()
             try:
                 self._write_sidecar(sidecar_filename, sidecar_str)
             except Exception as e:
-                logging.warning(f"Error writing xmp sidecar to {sidecar_filename}")
+                logger.warning(f"Error writing xmp sidecar to {sidecar_filename}")
                 raise e
 
         return str(dest)
@@ -702,10 +787,7 @@ class PhotoInfo:
         """ returns string for XMP sidecar """
         # TODO: add additional fields to XMP file?
         
-        xmp_template = Template(
-            filename=os.path.join(_TEMPLATE_DIR, _XMP_TEMPLATE_NAME)
-        )
-        xmp_str = xmp_template.render(photo=self)
+        xmp_str = _get_xmp_template().render(photo=self)
         # remove extra lines that mako inserts from template
         xmp_str = "\n".join([line for line in xmp_str.split("\n") if line.strip() != ""])
         return xmp_str
@@ -817,12 +899,17 @@ class PhotoInfo:
         }
         return json.dumps(pic)
 
-    # compare two PhotoInfo objects for equality
+    # two PhotoInfo objects are equal if they're the same photo in the same library
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return (
+                self._uuid == other._uuid and self._db._dbfile == other._db._dbfile
+            )
 
         return False
 
+    def __hash__(self):
+        return hash((self._db._dbfile, self._uuid))
+
     def __ne__(self, other):
         return not self.__eq__(other)
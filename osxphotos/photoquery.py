@@ -0,0 +1,507 @@
+"""
+PhotoQuery class
+The criteria of a PhotosDB.photos() query, collected once so that the same query can be run
+on any PhotosDB; the query command line tool runs its queries with this class
+Also parses query expressions such as
+    keyword:Kids and (person:Katie or person:Suzy) and not hidden
+into a tree that PhotosDB evaluates with set operations on the sets of uuids of the photos
+matching each term (PhotoQuery's where argument)
+"""
+
+import copy
+import re
+
+from ._constants import _MOVIE_TYPE, _PHOTO_TYPE
+from .textindex import _text_pattern
+
+# relative cost of checking each criterion that's checked for each photo: fields read with
+# the photo cost 0, fields of column groups read separately when lazy=True cost more (see
+# PhotosDB._get_group_steps): descriptions (Photos 5), adjustments and cloud cost 1 and
+# resources, which are matched to photos by fingerprint on Photos 5, cost 2
+_CHECK_COSTS = {
+    "favorite": 0,
+    "hidden": 0,
+    "hasadjustments": 0,
+    "burst": 0,
+    "live_photo": 0,
+    "shared": 0,
+    "no_title": 0,
+    "no_description": 1,
+    "external_edit": 1,
+    "iscloudasset": 1,
+    "incloud": 1,
+    "ismissing": 2,
+}
+
+# criteria that PhotosDB._database_filter checks in the database when lazy=True
+_DATABASE_CRITERIA = [
+    "keywords",
+    "uuid",
+    "persons",
+    "albums",
+    "from_date",
+    "to_date",
+    "modified_since",
+    "modified_before",
+    "uti",
+]
+
+
+# field of a field:value term: PhotosDB lookup used to find the photos with the value
+_TERM_FIELDS = (
+    "keyword",
+    "person",
+    "album",
+    "uuid",
+    "title",
+    "description",
+    "filename",
+)
+_TEXT_TERM_FIELDS = ("title", "description", "filename")
+
+# flag term: PhotoInfo property that must be True; names are those of the command line
+# options, e.g. missing for --missing
+_FLAG_TERMS = {
+    "favorite": "favorite",
+    "hidden": "hidden",
+    "missing": "ismissing",
+    "edited": "hasadjustments",
+    "external_edit": "external_edit",
+    "shared": "shared",
+    "burst": "burst",
+    "live": "live_photo",
+    "cloudasset": "iscloudasset",
+    "incloud": "incloud",
+}
+
+_TOKEN = re.compile(
+    r"""\s*(?:
+        (?P<paren>[()])
+        |(?P<quoted>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+        |(?P<word>[^\s()"':]+)(?P<colon>:)?
+    )""",
+    re.VERBOSE,
+)
+_ESCAPE = re.compile(r"\\(.)")
+_BARE_VALUE = re.compile(r"[^\s()\"':]+")
+_OPERATORS = ("and", "or", "not")
+
+
+class _Term:
+    """ field:value term, e.g. keyword:Kids; match and ignore_case apply to text fields """
+
+    cost = 0
+
+    def __init__(self, field, value, match="substring", ignore_case=False):
+        self.field = field
+        self.value = value
+        self.match = match
+        self.ignore_case = ignore_case
+
+    def evaluate(self, db, candidates):
+        return candidates & db._where_term_set(self)
+
+    def __str__(self):
+        if _BARE_VALUE.fullmatch(self.value) and self.value.lower() not in _OPERATORS:
+            return f"{self.field}:{self.value}"
+        value = self.value.replace("\\", "\\\\").replace('"', '\\"')
+        return f'{self.field}:"{value}"'
+
+
+class _Flag:
+    """ flag term, e.g. favorite: photos for which the PhotoInfo property is True """
+
+    def __init__(self, name):
+        self.name = name
+        self.attribute = _FLAG_TERMS[name]
+        # flags are read from each photo so cost more than field:value terms (cost 0),
+        # which are looked up in the indexes
+        self.cost = 1 + _CHECK_COSTS[self.attribute]
+
+    def evaluate(self, db, candidates):
+        attribute = self.attribute
+        return {uuid for uuid in candidates if getattr(db._photo_info(uuid), attribute)}
+
+    def __str__(self):
+        return self.name
+
+
+class _Not:
+    def __init__(self, operand):
+        self.operand = operand
+        self.cost = operand.cost
+
+    def evaluate(self, db, candidates):
+        return candidates - self.operand.evaluate(db, candidates)
+
+    def __str__(self):
+        if isinstance(self.operand, (_And, _Or)):
+            return f"not ({self.operand})"
+        return f"not {self.operand}"
+
+
+class _And:
+    def __init__(self, operands):
+        # cheapest first so the costly terms are evaluated on as few photos as possible
+        self.operands = sorted(operands, key=lambda operand: operand.cost)
+        self.cost = sum(operand.cost for operand in operands)
+
+    def evaluate(self, db, candidates):
+        for operand in self.operands:
+            if not candidates:
+                break
+            candidates = operand.evaluate(db, candidates)
+        return candidates
+
+    def __str__(self):
+        return " and ".join(
+            f"({operand})" if isinstance(operand, _Or) else str(operand)
+            for operand in self.operands
+        )
+
+
+class _Or:
+    def __init__(self, operands):
+        self.operands = sorted(operands, key=lambda operand: operand.cost)
+        self.cost = sum(operand.cost for operand in operands)
+
+    def evaluate(self, db, candidates):
+        # photos found by an operand don't need to be checked by the others
+        found = set()
+        for operand in self.operands:
+            found |= operand.evaluate(db, candidates - found)
+        return found
+
+    def __str__(self):
+        return " or ".join(str(operand) for operand in self.operands)
+
+
+class _Parser:
+    """ recursive descent parser of a query expression:
+        expression := and_expression ("or" and_expression)*
+        and_expression := not_expression ("and" not_expression)*
+        not_expression := "not" not_expression | "(" expression ")" | term
+        term := field ":" value | flag
+        value := word | "quoted string" | 'quoted string' """
+
+    def __init__(self, expression, match, ignore_case):
+        self.expression = expression
+        self.match = match
+        self.ignore_case = ignore_case
+        self.tokens = []
+        pos = 0
+        end = len(expression.rstrip())
+        while pos < end:
+            token = _TOKEN.match(expression, pos)
+            if token is None or token.end() == pos:
+                self.error("unexpected character", pos)
+            self.tokens.append(token)
+            pos = token.end()
+        self.pos = 0
+
+    def error(self, message, pos=None):
+        if pos is None and self.pos < len(self.tokens):
+            # start of the current token, after any whitespace
+            token = self.tokens[self.pos]
+            pos = token.end() - len(token.group().lstrip())
+        elif pos is None:
+            pos = len(self.expression)
+        raise ValueError(
+            f"invalid query expression {self.expression!r} at position {pos}: {message}"
+        )
+
+    def peek(self):
+        """ returns the next token's (kind, text) or (None, None) at the end """
+        if self.pos == len(self.tokens):
+            return None, None
+        token = self.tokens[self.pos]
+        if token.group("paren"):
+            return "paren", token.group("paren")
+        if token.group("quoted"):
+            return "quoted", token.group("quoted")
+        if token.group("colon"):
+            return "field", token.group("word")
+        word = token.group("word")
+        if word.lower() in _OPERATORS:
+            return "operator", word.lower()
+        return "word", word
+
+    def parse(self):
+        if not self.tokens:
+            self.error("empty expression")
+        node = self.parse_or()
+        if self.pos < len(self.tokens):
+            self.error("expected 'and', 'or' or end of expression")
+        return node
+
+    def parse_or(self):
+        operands = [self.parse_and()]
+        while self.peek() == ("operator", "or"):
+            self.pos += 1
+            operands.append(self.parse_and())
+        return operands[0] if len(operands) == 1 else _Or(operands)
+
+    def parse_and(self):
+        operands = [self.parse_not()]
+        while self.peek() == ("operator", "and"):
+            self.pos += 1
+            operands.append(self.parse_not())
+        return operands[0] if len(operands) == 1 else _And(operands)
+
+    def parse_not(self):
+        kind, text = self.peek()
+        if (kind, text) == ("operator", "not"):
+            self.pos += 1
+            return _Not(self.parse_not())
+        if (kind, text) == ("paren", "("):
+            self.pos += 1
+            node = self.parse_or()
+            if self.peek() != ("paren", ")"):
+                self.error("expected ')'")
+            self.pos += 1
+            return node
+        if kind == "field":
+            return self.parse_term(text)
+        if kind == "word":
+            name = text.lower().replace("-", "_")
+            if name not in _FLAG_TERMS:
+                self.error(
+                    f"unknown flag {text!r} (flags are {', '.join(_FLAG_TERMS)}; "
+                    f"terms are {', '.join(f'{field}:VALUE' for field in _TERM_FIELDS)})"
+                )
+            self.pos += 1
+            return _Flag(name)
+        self.error("expected a term, 'not' or '('")
+
+    def parse_term(self, field):
+        if field.lower() not in _TERM_FIELDS:
+            self.error(
+                f"unknown field {field!r} (fields are {', '.join(_TERM_FIELDS)})"
+            )
+        field = field.lower()
+        self.pos += 1
+        kind, text = self.peek()
+        if kind == "quoted":
+            value = _ESCAPE.sub(r"\1", text[1:-1])
+        elif kind in ("word", "operator"):
+            value = text
+        else:
+            self.error(f"expected a value for {field}")
+        self.pos += 1
+        if field in _TEXT_TERM_FIELDS:
+            try:
+                _text_pattern(value, self.match, self.ignore_case)
+            except ValueError as e:
+                self.pos -= 1
+                self.error(str(e))
+            return _Term(field, value, self.match, self.ignore_case)
+        return _Term(field, value)
+
+
+def _parse_where(expression, match="substring", ignore_case=False):
+    """ returns tree of the query expression, which is evaluated by calling its
+        evaluate(db, candidates) to get the set of uuids in candidates of the photos in
+        PhotosDB db that match
+        match, ignore_case: how title:, description: and filename: terms match (see photos())
+        raises ValueError if expression isn't valid """
+    return _Parser(expression, match, ignore_case).parse()
+
+
+def _text_criteria(title, description, filename, match, ignore_case):
+    """ returns dict of the text criteria of a query or None if no search terms are given
+        raises ValueError if match isn't valid or a term isn't a valid regular expression """
+    text = {"title": title, "description": description, "filename": filename}
+    for term in (term for terms in text.values() for term in terms or []):
+        _text_pattern(term, match, ignore_case)
+    if not any(text.values()):
+        return None
+    return dict(text, match=match, ignore_case=ignore_case)
+
+
+class PhotoQuery:
+    """
+    Criteria for finding photos in a PhotosDB
+    Arguments are the same as PhotosDB.photos() and have the same meaning, plus:
+    no_title: if True, return only photos with no title (default False)
+    no_description: if True, return only photos with no description (default False)
+    photos(photosdb) returns the list of PhotoInfo objects of the photos matching all the criteria
+    and iter_photos(photosdb) yields them as PhotosDB.iter_photos() does
+
+    Criteria are answered with the indexes of the PhotosDB where it has them (keywords, dates,
+    text, etc.); the remaining criteria are checked for each photo in a single pass, cheapest
+    first: the photo's type and UTI, then its flags, ordered by the cost of reading them and
+    checking those that select photos (e.g. favorite=True) before those that exclude them
+    The where expression is parsed when the PhotoQuery is created, so a PhotoQuery can be run
+    many times without parsing it again, and is evaluated on the photos that match the other
+    criteria found with the indexes
+    """
+
+    def __init__(
+        self,
+        keywords=None,
+        uuid=None,
+        persons=None,
+        albums=None,
+        images=True,
+        movies=False,
+        from_date=None,
+        to_date=None,
+        modified_since=None,
+        modified_before=None,
+        month=None,
+        day=None,
+        near=None,
+        bbox=None,
+        title=None,
+        description=None,
+        filename=None,
+        text_match="substring",
+        ignore_case=False,
+        favorite=None,
+        hidden=None,
+        uti=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        where=None,
+        no_title=False,
+        no_description=False,
+    ):
+        self.keywords = keywords
+        self.uuid = uuid
+        self.persons = persons
+        self.albums = albums
+        self.images = images
+        self.movies = movies
+        self.from_date = from_date
+        self.to_date = to_date
+        self.modified_since = modified_since
+        self.modified_before = modified_before
+        self.month = month
+        self.day = day
+        self.near = near
+        self.bbox = bbox
+        self.text = _text_criteria(
+            title, description, filename, text_match, ignore_case
+        )
+        self.uti = uti
+        self.where = _parse_where(where, text_match, ignore_case) if where else None
+        self.no_title = no_title
+        self.no_description = no_description
+
+        # flag: True/False for the flag arguments that are set
+        flags = {
+            "favorite": favorite,
+            "hidden": hidden,
+            "ismissing": ismissing,
+            "hasadjustments": hasadjustments,
+            "external_edit": external_edit,
+            "shared": shared,
+            "burst": burst,
+            "live_photo": live_photo,
+            "iscloudasset": iscloudasset,
+            "incloud": incloud,
+        }
+        self.flags = {flag: value for flag, value in flags.items() if value is not None}
+
+    def photos(self, photosdb):
+        """ returns list of PhotoInfo objects of the photos in PhotosDB photosdb that match """
+        return photosdb._query_photos(self)
+
+    def iter_photos(self, photosdb, batch_size=1000):
+        """ yield the PhotoInfo objects of the photos in PhotosDB photosdb that match one at a time
+            batch_size: number of photos read from the database at a time if photosdb was
+                  created with lazy=True and hasn't loaded the photos (see PhotosDB.iter_photos) """
+        yield from photosdb._iter_query_photos(self, batch_size)
+
+    def estimate_count(self, photosdb):
+        """ returns number of photos in PhotosDB photosdb that match, e.g. for a progress bar,
+            without loading them: if photosdb was created with lazy=True and hasn't loaded the
+            photos, they're counted in the database with the same filter iter_photos uses so
+            the count includes photos rejected once loaded (non-selected burst photos and the
+            criteria that aren't checked in the database, e.g. month or no_title) """
+        return photosdb._estimate_query_count(self)
+
+    def _indexed(self):
+        """ returns dict of the criteria found with the date, location and text indexes """
+        return {
+            "from_date": self.from_date,
+            "to_date": self.to_date,
+            "modified_since": self.modified_since,
+            "modified_before": self.modified_before,
+            "month": self.month,
+            "day": self.day,
+            "near": self.near,
+            "bbox": self.bbox,
+            "text": self.text,
+        }
+
+    def _has_database_criteria(self):
+        """ returns True if the query has criteria that can be checked in the database """
+        return any(getattr(self, name) for name in _DATABASE_CRITERIA) or any(
+            [
+                self.near,
+                self.bbox,
+                self.text,
+                "favorite" in self.flags,
+                "hidden" in self.flags,
+            ]
+        )
+
+    def _after_database(self):
+        """ returns copy of the query with only the criteria that aren't checked in the database
+            by PhotosDB._database_filter, which are checked once the photos are loaded """
+        query = copy.copy(self)
+        for name in _DATABASE_CRITERIA:
+            setattr(query, name, None)
+        query.flags = {
+            flag: value
+            for flag, value in self.flags.items()
+            if flag not in ("favorite", "hidden")
+        }
+        return query
+
+    def _matches_type(self, info):
+        """ returns True if photo info dict info is of a type (image, movie) the query selects """
+        return (self.images and info["type"] == _PHOTO_TYPE) or (
+            self.movies and info["type"] == _MOVIE_TYPE
+        )
+
+    def _photo_check(self, flags=True):
+        """ returns function(photo) that returns True if PhotoInfo photo matches the criteria
+            that are checked for each photo or None if there are none to check
+            flags: if False, the flags are left out (e.g. when selected with an index) """
+        checks = {}
+        if flags:
+            for flag, value in self.flags.items():
+                checks[flag] = (
+                    lambda photo, flag=flag, value=value: bool(getattr(photo, flag))
+                    == value
+                )
+        if self.no_title:
+            checks["no_title"] = lambda photo: not photo.title
+        if self.no_description:
+            checks["no_description"] = lambda photo: not photo.description
+        if not checks:
+            return None
+
+        # cheapest first; of those that cost the same, flags set to True (which usually
+        # select few photos) before the others
+        order = sorted(
+            checks,
+            key=lambda name: (_CHECK_COSTS[name], self.flags.get(name) is not True),
+        )
+        checks = [checks[name] for name in order]
+
+        def check(photo):
+            for check in checks:
+                if not check(photo):
+                    return False
+            return True
+
+        return check
@@ -3,28 +3,46 @@ PhotosDB class
 Processes a Photos.app library database to extract information about photos
 """
 
+import hashlib
 import logging
+import multiprocessing
 import os
 import os.path
 import pathlib
+import pickle
 import platform
 import sqlite3
 import sys
 import tempfile
-from datetime import datetime
+import weakref
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pprint import pformat
 from shutil import copyfile
 
 from ._constants import (
+    _CACHE_DIR,
+    _CACHE_FORMAT_VERSION,
     _MOVIE_TYPE,
     _PHOTO_TYPE,
     _PHOTOS_5_VERSION,
+    _PREFETCH_WORKERS,
+    _SQLITE_MAX_VARIABLES,
     _TESTED_DB_VERSIONS,
     _TESTED_OS_VERSIONS,
     _UNKNOWN_PERSON,
 )
 from ._version import __version__
+from .bitmap import Bitmap
+from .dateindex import DateIndex
+from .geoindex import GeoIndex, _check_bbox, _near_bbox
+from .photocolumns import PhotoColumns, np
+from .photoindex import PhotoIndex
 from .photoinfo import PhotoInfo
+from .photoquery import PhotoQuery
+from .relationship import IdTable, Relationship
+from .resourceindex import ResourceIndex
+from .textindex import TextIndex, _text_pattern
 from .utils import (
     _check_file_exists,
     _get_os_version,
@@ -32,8 +50,12 @@ from .utils import (
     _debug,
     _open_sql_file,
     _db_is_locked,
+    _get_db_signature,
+    _datetime_to_coredata,
 )
 
+logger = logging.getLogger(__name__)
+
 # TODO: Add test for imageTimeZoneOffsetSeconds = None
 # TODO: Fix command line so multiple --keyword, etc. are AND (instead of OR as they are in .photos())
 #       Or fix the help text to match behavior
@@ -41,20 +63,433 @@ from .utils import (
 # TODO: Add special albums and magic albums
 
 
+def _filter_sql(asset_filter, clause="AND"):
+    """ returns tuple of (sql, params) to add asset_filter to a query
+        asset_filter: None or tuple of (sql condition, params) restricting the photos selected
+        clause: "AND" if the query already has a WHERE clause, otherwise "WHERE" """
+    if asset_filter is None:
+        return "", ()
+    sql, params = asset_filter
+    return f" {clause} {sql} ", tuple(params)
+
+
+def _and_filters(*asset_filters):
+    """ returns asset filter that selects photos matching all of asset_filters
+        None in asset_filters matches all photos; returns None if there's nothing to filter on """
+    asset_filters = [f for f in asset_filters if f is not None]
+    if not asset_filters:
+        return None
+    sql = " AND ".join(f"({f[0]})" for f in asset_filters)
+    params = tuple(param for f in asset_filters for param in f[1])
+    return (sql, params)
+
+
+def _fetch_rows(dbfile, sql, params):
+    """ runs query sql with params on its own connection to dbfile and returns list of the rows
+        used to run the loader's queries in parallel; module level so worker processes can call it """
+    (conn, c) = _open_sql_file(dbfile)
+    try:
+        c.execute(sql, params)
+        return c.fetchall()
+    finally:
+        conn.close()
+
+
+class _QueryRecorder:
+    """ stand-in for a sqlite3 cursor that records the queries executed on it and returns no rows
+        used by the parallel loader to find out which queries a load step will run """
+
+    def __init__(self):
+        self.queries = []
+
+    def execute(self, sql, params=()):
+        self.queries.append((sql, tuple(params)))
+        return self
+
+    def __iter__(self):
+        return iter(())
+
+
+class _PrefetchedCursor:
+    """ stand-in for a sqlite3 cursor that returns rows that have already been fetched
+        results: dict of (sql, params): deque of lists of rows, one for each time the query is run
+        queries that weren't prefetched are run on cursor c """
+
+    def __init__(self, c, results):
+        self._c = c
+        self._results = results
+        self._rows = iter(())
+
+    def execute(self, sql, params=()):
+        rows = self._results.get((sql, tuple(params)))
+        if rows:
+            self._rows = iter(rows.popleft())
+        else:
+            self._rows = self._c.execute(sql, params)
+        return self
+
+    def __iter__(self):
+        return self._rows
+
+    def fetchone(self):
+        return next(self._rows, None)
+
+    def fetchall(self):
+        return list(self._rows)
+
+
+# fields stored for each photo, shared by the Photos 4 and Photos 5 loaders
+# fields that only one version of Photos fills in are left unset by the other
+_PHOTO_RECORD_FIELDS = (
+    "_uuid",
+    "modelID",
+    "masterUuid",
+    "masterFingerprint",
+    "filename",
+    "originalFilename",
+    "directory",
+    "imagePath",
+    "volumeId",
+    "name",
+    "extendedDescription",
+    "lastmodifieddate",
+    "imageDate",
+    "imageTimeZoneOffsetSeconds",
+    "mainRating",
+    "hasAdjustments",
+    "adjustmentUuid",
+    "adjustmentFormatID",
+    "edit_resource_id",
+    "isMissing",
+    "localAvailability",
+    "remoteAvailability",
+    "favorite",
+    "hidden",
+    "latitude",
+    "longitude",
+    "type",
+    "UTI",
+    "burstUUID",
+    "burstPickType",
+    "burst",
+    "burst_key",
+    "specialType",
+    "subtype",
+    "customRenderedValue",
+    "masterModelID",
+    "panorama",
+    "slow_mo",
+    "time_lapse",
+    "hdr",
+    "live_photo",
+    "live_model_id",
+    "modeResourceIsOnDisk",
+    "screenshot",
+    "portrait",
+    "selfie",
+    "cloudbatchpublishdate",
+    "shared",
+    "cloudAssetGUID",
+    "cloudLocalState",
+    "cloudLibraryState",
+    "cloudStatus",
+    "cloudAvailable",
+    "incloud",
+    "hasKeywords",
+    "keywords",
+    "hasPersons",
+    "persons",
+    "hasAlbums",
+    "albums",
+    "volume",
+)
+
+
+class _PhotoRecord:
+    """ compact record of info about a photo, used instead of a dict to keep memory down on big libraries
+        fields are stored in __slots__ (see _PHOTO_RECORD_FIELDS) but are read and written like a 
+        dict, e.g. record["filename"], so PhotoInfo doesn't need to know the difference
+        reading a field that hasn't been set raises KeyError, just like a missing dict key """
+
+    __slots__ = _PHOTO_RECORD_FIELDS
+
+    def __getitem__(self, key):
+        try:
+            return self._FIELDS[key].__get__(self)
+        except (KeyError, AttributeError):
+            return self.__missing__(key)
+
+    def __missing__(self, key):
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        try:
+            slot = self._FIELDS[key]
+        except KeyError:
+            raise KeyError(f"{key} is not a photo record field")
+        slot.__set__(self, value)
+
+    def __contains__(self, key):
+        slot = self._FIELDS.get(key)
+        return slot is not None and hasattr(self, key)
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def get(self, key, default=None):
+        """ returns value of field key or default if it hasn't been set """
+        return getattr(self, key, default) if key in self._FIELDS else default
+
+    def keys(self):
+        """ returns list of the fields that have been set """
+        return [key for key in self._FIELDS if hasattr(self, key)]
+
+    def items(self):
+        """ returns list of (field, value) for the fields that have been set """
+        return [(key, getattr(self, key)) for key in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, (_PhotoRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        # same as the equivalent dict so PhotoInfo's repr can still be eval'd
+        return repr(dict(self.items()))
+
+
+# slot descriptor for each field, used to get/set fields by name
+_PhotoRecord._FIELDS = {
+    field: getattr(_PhotoRecord, field) for field in _PHOTO_RECORD_FIELDS
+}
+
+
+class _LazyPhotoRecord(_PhotoRecord):
+    """ photo record used when PhotosDB is created with lazy=True
+        the first time a field that hasn't been loaded is accessed, loads the 
+        column group containing that field for every photo in the library """
+
+    __slots__ = ("_db",)
+
+    def __init__(self, db):
+        self._db = db
+
+    def __missing__(self, key):
+        for group, fields in self._db._get_column_groups().items():
+            if key in fields and group not in self._db._loaded:
+                self._db._require(group)
+                return self[key]
+        raise KeyError(key)
+
+
 class PhotosDB:
     """ Processes a Photos.app library database to extract information about photos """
 
-    def __init__(self, *dbfile_, dbfile=None):
+    # Library data is loaded in groups so that when lazy=True, each group can be loaded
+    # the first time it's needed.  Relationship groups fill in PhotosDB attributes;
+    # column groups fill in fields of each photo's info dict in _dbphotos.
+    # See _get_group_steps for the methods that load each group
+
+    # PhotosDB attributes filled in by each relationship group
+    _RELATIONSHIP_GROUPS = {
+        "persons": ["_dbfaces"],
+        "albums": ["_dbalbums"],
+        "album_details": ["_dbalbum_details"],
+        "keywords": ["_dbkeywords"],
+        "volumes": ["_dbvolumes"],
+        "photos": ["_dbphotos", "_dbphotos_burst"],
+    }
+
+    # relationship groups stored as a Relationship between photos and keywords, persons or albums
+    _ENCODED_GROUPS = ["keywords", "persons", "albums"]
+
+    # relationship groups that are small enough to always be read in full
+    _TABLE_GROUPS = ["album_details", "volumes"]
+
+    # SQL used by photos() to find photos in the database rather than in memory
+    # keywords, persons, albums and uuid select the uuids of photos matching a single value
+    # text has the condition for a case-sensitive substring of each text field of photos()
+    # photos selects the primary keys of all photos (see iter_photos)
+    _QUERY_SQL4 = {
+        "uuid_column": "RKVersion.uuid",
+        "date_column": "RKVersion.imageDate",
+        "modified_column": "RKVersion.lastmodifieddate",
+        "latitude_column": "RKVersion.latitude",
+        "longitude_column": "RKVersion.longitude",
+        "type_column": "RKVersion.type",
+        "types": {_PHOTO_TYPE: 2, _MOVIE_TYPE: 8},
+        "favorite_column": "RKVersion.isFavorite",
+        "hidden_column": "RKVersion.isHidden",
+        "uti": "RKVersion.masterUuid IN (SELECT uuid FROM RKMaster WHERE instr(UTI, ?) > 0)",
+        "text": {
+            "title": "instr(RKVersion.name, ?) > 0",
+            "description": "instr(RKVersion.extendedDescription, ?) > 0",
+            "filename": "(instr(RKVersion.filename, ?) > 0 OR RKVersion.masterUuid IN "
+            "(SELECT uuid FROM RKMaster WHERE instr(originalFileName, ?) > 0))",
+        },
+        "uuid": "SELECT RKVersion.uuid FROM RKVersion, RKMaster "
+        "WHERE RKVersion.isInTrash = 0 AND RKVersion.masterUuid = RKMaster.uuid "
+        "AND RKVersion.filename NOT LIKE '%.pdf' AND RKVersion.uuid = ?",
+        "keywords": "SELECT RKVersion.uuid "
+        "FROM RKKeyword, RKKeywordForVersion, RKVersion, RKMaster "
+        "WHERE RKKeyword.modelId = RKKeywordForVersion.keywordID "
+        "AND RKVersion.modelID = RKKeywordForVersion.versionID "
+        "AND RKMaster.uuid = RKVersion.masterUuid "
+        "AND RKVersion.filename NOT LIKE '%.pdf' AND RKVersion.isInTrash = 0 "
+        "AND RKKeyword.name = ?",
+        "persons": "SELECT RKVersion.uuid FROM RKFace, RKPerson, RKVersion, RKMaster "
+        "WHERE RKFace.personID = RKPerson.modelID AND RKVersion.modelId = RKFace.ImageModelId "
+        "AND RKVersion.masterUuid = RKMaster.uuid "
+        "AND RKVersion.filename NOT LIKE '%.pdf' AND RKVersion.isInTrash = 0 "
+        "AND RKPerson.name = ?",
+        "albums": "SELECT RKVersion.uuid FROM RKAlbum, RKVersion, RKAlbumVersion "
+        "WHERE RKAlbum.modelID = RKAlbumVersion.albumId "
+        "AND RKAlbumVersion.versionID = RKVersion.modelId "
+        "AND RKVersion.filename NOT LIKE '%.pdf' AND RKVersion.isInTrash = 0 "
+        "AND RKAlbum.isInTrash = 0 AND RKAlbum.name = ?",
+        "album_exists": "SELECT uuid FROM RKAlbum WHERE isInTrash = 0 AND name = ?",
+        "photos": "SELECT RKVersion.modelId FROM RKVersion, RKMaster "
+        "WHERE RKVersion.isInTrash = 0 AND RKVersion.masterUuid = RKMaster.uuid "
+        "AND RKVersion.filename NOT LIKE '%.pdf'",
+        "pk_table": "RKVersion",
+        "pk_column": "RKVersion.modelId",
+    }
+    _QUERY_SQL5 = {
+        "uuid_column": "ZGENERICASSET.ZUUID",
+        "date_column": "ZGENERICASSET.ZDATECREATED",
+        "modified_column": "ZGENERICASSET.ZMODIFICATIONDATE",
+        "latitude_column": "ZGENERICASSET.ZLATITUDE",
+        "longitude_column": "ZGENERICASSET.ZLONGITUDE",
+        "type_column": "ZGENERICASSET.ZKIND",
+        "types": {_PHOTO_TYPE: 0, _MOVIE_TYPE: 1},
+        "favorite_column": "ZGENERICASSET.ZFAVORITE",
+        "hidden_column": "ZGENERICASSET.ZHIDDEN",
+        "uti": "instr(ZGENERICASSET.ZUNIFORMTYPEIDENTIFIER, ?) > 0",
+        "text": {
+            "title": "ZGENERICASSET.Z_PK IN (SELECT ZASSET FROM ZADDITIONALASSETATTRIBUTES "
+            "WHERE instr(ZTITLE, ?) > 0)",
+            "description": "ZGENERICASSET.Z_PK IN (SELECT ZADDITIONALASSETATTRIBUTES.ZASSET "
+            "FROM ZADDITIONALASSETATTRIBUTES JOIN ZASSETDESCRIPTION "
+            "ON ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION "
+            "WHERE instr(ZASSETDESCRIPTION.ZLONGDESCRIPTION, ?) > 0)",
+            "filename": "(instr(ZGENERICASSET.ZFILENAME, ?) > 0 OR ZGENERICASSET.Z_PK IN "
+            "(SELECT ZASSET FROM ZADDITIONALASSETATTRIBUTES WHERE instr(ZORIGINALFILENAME, ?) > 0))",
+        },
+        "uuid": "SELECT ZGENERICASSET.ZUUID FROM ZGENERICASSET "
+        "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+        "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 AND ZGENERICASSET.ZUUID = ?",
+        "keywords": "SELECT ZGENERICASSET.ZUUID FROM ZGENERICASSET "
+        "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+        "JOIN Z_1KEYWORDS ON Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK "
+        "JOIN ZKEYWORD ON ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
+        "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 AND ZKEYWORD.ZTITLE = ?",
+        "persons": "SELECT ZGENERICASSET.ZUUID FROM ZPERSON, ZDETECTEDFACE, ZGENERICASSET "
+        "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK AND ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK "
+        "AND ZGENERICASSET.ZTRASHEDSTATE = 0 AND ZPERSON.ZFULLNAME = ?",
+        "albums": "SELECT ZGENERICASSET.ZUUID FROM ZGENERICASSET "
+        "JOIN Z_26ASSETS ON Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK "
+        "JOIN ZGENERICALBUM ON ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS "
+        "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 AND ZGENERICALBUM.ZTITLE = ?",
+        "album_exists": "SELECT ZUUID FROM ZGENERICALBUM WHERE ZTITLE = ?",
+        "photos": "SELECT ZGENERICASSET.Z_PK FROM ZGENERICASSET "
+        "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+        "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0",
+        "pk_table": "ZGENERICASSET",
+        "pk_column": "ZGENERICASSET.Z_PK",
+    }
+
+    # photo info fields filled in by each column group
+    # link_* groups copy relationship data into each photo's info dict
+    _COLUMN_GROUPS4 = {
+        "edits": ["edit_resource_id"],
+        "adjustments": ["adjustmentFormatID"],
+        "live_photos": ["live_model_id", "modeResourceIsOnDisk"],
+        "cloud": ["cloudLibraryState", "cloudStatus", "cloudAvailable", "incloud"],
+        "link_keywords": ["keywords"],
+        "link_persons": ["persons", "hasPersons"],
+        "link_albums": ["albums", "hasAlbums"],
+        "link_volumes": ["volume"],
+    }
+    _COLUMN_GROUPS5 = {
+        "descriptions": ["extendedDescription"],
+        "adjustments": ["adjustmentFormatID"],
+        "resources": ["localAvailability", "remoteAvailability", "isMissing"],
+        "cloud": ["cloudLocalState", "incloud"],
+        "link_keywords": ["keywords", "hasKeywords"],
+        "link_persons": ["persons", "hasPersons"],
+        "link_albums": ["albums", "hasAlbums"],
+    }
+
+    # lookup of relationship group by attribute name
+    _RELATIONSHIP_ATTRIBUTES = {
+        attr: group for group, attrs in _RELATIONSHIP_GROUPS.items() for attr in attrs
+    }
+
+    # attributes holding the parsed library data
+    # these are saved to / restored from the on-disk snapshot when cache=True
+    _CACHED_ATTRIBUTES = [
+        "_dbphotos",
+        "_dbphotos_burst",
+        "_dbuuids",
+        "_dbfaces",
+        "_dbkeywords",
+        "_dbalbums",
+        "_dbalbum_details",
+        "_dbvolumes",
+        "_watermark",
+    ]
+
+    def __init__(
+        self,
+        *dbfile_,
+        dbfile=None,
+        cache=False,
+        cache_dir=None,
+        lazy=False,
+        from_date=None,
+        to_date=None,
+        columnar=False,
+        bitmaps=False,
+        workers=None,
+        processes=None,
+    ):
         """ create a new PhotosDB object 
             path to photos library or database may be specified EITHER as first argument or as named argument dbfile=path 
             specify full path to photos library or photos.db as first argument 
-            specify path to photos library or photos.db using named argument dbfile=path """
+            specify path to photos library or photos.db using named argument dbfile=path 
+            cache: (boolean, default=False); if True, save a snapshot of the parsed library data to disk
+                   and re-use it on subsequent loads as long as the database has not changed 
+            cache_dir: (optional) directory in which to store the snapshot; default is ~/Library/Caches/osxphotos 
+            lazy: (boolean, default=False); if True, don't read the library up front but read each 
+                  part of it (e.g. keywords, albums, photo details) the first time it's needed 
+            from_date, to_date: (optional datetime.datetime) only load photos with creation date 
+                  >= from_date and/or <= to_date; keywords, persons, albums, and photos() will only 
+                  include these photos.  cache is ignored if either is given 
+            columnar: (boolean, default=False); if True, keep a columnar (NumPy) copy of the photo data 
+                  that photos() filters with vectorized operations; requires numpy 
+            bitmaps: (boolean, default=False); if True, keep compressed bitmap indexes of the photos 
+                  by keyword, person, album, type and flag that photos() combines with bitwise 
+                  operations; each index is built the first time a query needs it 
+            workers: (optional int) run the queries that load the library on this many database 
+                  connections in parallel threads 
+            processes: (optional int) split the query that reads the photos table into this many 
+                  ranges of rows, each read by a separate worker process; implies parallel loading 
+                  results are always merged in the same order so the loaded data doesn't depend on 
+                  the number of workers or processes """
+
+        if columnar and np is None:
+            raise ImportError("columnar=True requires numpy")
 
         # Check OS version
         system = platform.system()
         (_, major, _) = _get_os_version()
         if system != "Darwin" or (major not in _TESTED_OS_VERSIONS):
-            logging.warning(
+            logger.warning(
                 f"WARNING: This module has only been tested with MacOS 10."
                 f"[{', '.join(_TESTED_OS_VERSIONS)}]: "
                 f"you have {system}, OS version: {major}"
@@ -75,25 +510,63 @@ class PhotosDB:
         self._dbphotos = {}
         # Dict with information about all burst photos by burst uuid
         self._dbphotos_burst = {}
-        # Dict with information about all persons/photos by uuid
-        self._dbfaces_uuid = {}
-        # Dict with information about all persons/photos by person
-        self._dbfaces_person = {}
-        # Dict with information about all keywords/photos by uuid
-        self._dbkeywords_uuid = {}
-        # Dict with information about all keywords/photos by keyword
-        self._dbkeywords_keyword = {}
-        # Dict with information about all albums/photos by uuid
-        self._dbalbums_uuid = {}
-        # Dict with information about all albums/photos by album
-        self._dbalbums_album = {}
+        # Table of photo uuids shared by the keyword, person and album relationships below
+        self._dbuuids = IdTable()
+        # Relationship between photos and persons (see Relationship)
+        self._dbfaces = Relationship(self._dbuuids)
+        # Relationship between photos and keywords
+        self._dbkeywords = Relationship(self._dbuuids)
+        # Relationship between photos and albums, by album uuid
+        self._dbalbums = Relationship(self._dbuuids)
         # Dict with information about album details
         self._dbalbum_details = {}
         # Dict with information about all the volumes/photos by uuid
         self._dbvolumes = {}
 
+        # asset filter restricting the photos loaded (see _filter_sql), set from from_date, to_date
+        self._scope = None
+
+        # groups of library data that have been loaded (see _get_group_steps)
+        self._lazy = lazy
+        self._loaded = set()
+        if lazy:
+            # relationship data is loaded the first time it's accessed (see __getattr__)
+            for attr in self._RELATIONSHIP_ATTRIBUTES:
+                delattr(self, attr)
+
+        # columnar view of _dbphotos used by photos() if columnar=True (see _get_columns)
+        self._columnar = columnar
+        self._columns = None
+
+        # bitmap indexes used by photos() if bitmaps=True (see _get_index)
+        self._bitmaps = bitmaps
+        self._index = None
+
+        # sorted date indexes used by photos() for date queries, by field (see _get_date_index)
+        self._date_indexes = {}
+
+        # grid index of the photos by location used by photos() for location queries
+        # (see _get_geo_index)
+        self._geo_index = None
+
+        # inverted indexes of the text of the photos used by photos() for text queries, by field
+        # (see _get_text_index)
+        self._text_indexes = {}
+
+        # PhotoInfo objects in use by uuid, so each photo has one (see _photo_info); objects
+        # are dropped once nothing else refers to them
+        self._photo_infos = weakref.WeakValueDictionary()
+
+        # files in the library's resource directories used to find edited and live photo
+        # files (see _get_resource_index)
+        self._resource_index = None
+
+        # parallel loading (see _load_groups)
+        self._workers = workers
+        self._processes = processes
+
         if _debug():
-            logging.debug(f"dbfile = {dbfile}")
+            logger.debug(f"dbfile = {dbfile}")
 
         # get the path to photos library database
         if dbfile_:
@@ -129,7 +602,7 @@ class PhotosDB:
             raise FileNotFoundError(f"dbfile {dbfile} does not exist", dbfile)
 
         if _debug():
-            logging.debug(f"dbfile = {dbfile}")
+            logger.debug(f"dbfile = {dbfile}")
 
         # init database names
         # _tmp_db is the file that will processed by _process_database4/5
@@ -142,31 +615,53 @@ class PhotosDB:
         # or photosanalysisd
         self._dbfile = self._dbfile_actual = self._tmp_db = os.path.abspath(dbfile)
 
-        # if database is exclusively locked, make a copy of it and use the copy
-        # Photos maintains an exclusive lock on the database file while Photos is open
-        # photoanalysisd sometimes maintains this lock even after Photos is closed
-        # In those cases, make a temp copy of the file for sqlite3 to read
-        if _db_is_locked(self._dbfile):
-            self._tmp_db = self._copy_db_file(self._dbfile)
-
-        self._db_version = self._get_db_version()
-
-        # If Photos >= 5, actual data isn't in photos.db but in Photos.sqlite
-        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
-            dbpath = pathlib.Path(self._dbfile).parent
-            dbfile = dbpath / "Photos.sqlite"
-            if not _check_file_exists(dbfile):
-                raise FileNotFoundError(f"dbfile {dbfile} does not exist", dbfile)
-            else:
+        # if requested, look for a snapshot of the parsed library data
+        # this is done before any database copying or processing as a valid snapshot makes those unnecessary
+        self._cache_dir = None
+        snapshot = None
+        if cache and (from_date is not None or to_date is not None):
+            # snapshot is always of the whole library
+            if _debug():
+                logger.debug("Not using cache with from_date or to_date")
+            cache = False
+        if cache:
+            self._cache_dir = cache_dir if cache_dir is not None else _CACHE_DIR
+            # signature is computed before the database is read so that any change
+            # made while the library is being processed invalidates the snapshot
+            signature = self._get_cache_signature()
+            snapshot = self._load_cache(signature)
+
+        if snapshot is not None:
+            self._db_version = snapshot["db_version"]
+            if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+                dbfile = pathlib.Path(self._dbfile).parent / "Photos.sqlite"
                 self._dbfile_actual = self._tmp_db = dbfile
-                # if database is exclusively locked, make a copy of it and use the copy
-                if _db_is_locked(self._dbfile_actual):
-                    self._tmp_db = self._copy_db_file(self._dbfile_actual)
+        else:
+            # if database is exclusively locked, make a copy of it and use the copy
+            # Photos maintains an exclusive lock on the database file while Photos is open
+            # photoanalysisd sometimes maintains this lock even after Photos is closed
+            # In those cases, make a temp copy of the file for sqlite3 to read
+            if _db_is_locked(self._dbfile):
+                self._tmp_db = self._copy_db_file(self._dbfile)
+
+            self._db_version = self._get_db_version()
+
+            # If Photos >= 5, actual data isn't in photos.db but in Photos.sqlite
+            if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+                dbpath = pathlib.Path(self._dbfile).parent
+                dbfile = dbpath / "Photos.sqlite"
+                if not _check_file_exists(dbfile):
+                    raise FileNotFoundError(f"dbfile {dbfile} does not exist", dbfile)
+                else:
+                    self._dbfile_actual = self._tmp_db = dbfile
+                    # if database is exclusively locked, make a copy of it and use the copy
+                    if _db_is_locked(self._dbfile_actual):
+                        self._tmp_db = self._copy_db_file(self._dbfile_actual)
 
-            if _debug():
-                logging.debug(
-                    f"_dbfile = {self._dbfile}, _dbfile_actual = {self._dbfile_actual}"
-                )
+        if _debug():
+            logger.debug(
+                f"_dbfile = {self._dbfile}, _dbfile_actual = {self._dbfile_actual}"
+            )
 
         library_path = os.path.dirname(os.path.abspath(dbfile))
         (library_path, _) = os.path.split(library_path)  # drop /database from path
@@ -179,19 +674,34 @@ class PhotosDB:
             self._masters_path = masters_path
 
         if _debug():
-            logging.debug(f"library = {library_path}, masters = {masters_path}")
+            logger.debug(f"library = {library_path}, masters = {masters_path}")
 
-        if int(self._db_version) < int(_PHOTOS_5_VERSION):
-            self._process_database4()
+        if from_date is not None or to_date is not None:
+            self._scope = self._get_date_filter(from_date, to_date)
+
+        if snapshot is not None:
+            for attr in self._CACHED_ATTRIBUTES:
+                setattr(self, attr, snapshot["data"][attr])
+            self._loaded = set(self._get_group_steps())
+            self._lazy = False
         else:
-            self._process_database5()
+            if int(self._db_version) < int(_PHOTOS_5_VERSION):
+                self._process_database4()
+            else:
+                self._process_database5()
+
+            if cache:
+                self._save_cache(signature)
+
+        if self._columnar and not self._lazy:
+            self._columns = PhotoColumns(self)
 
     @property
     def keywords_as_dict(self):
         """ return keywords as dict of keyword, count in reverse sorted order (descending) """
         keywords = {}
-        for k in self._dbkeywords_keyword.keys():
-            keywords[k] = len(self._dbkeywords_keyword[k])
+        for k in self._dbkeywords:
+            keywords[k] = self._dbkeywords.count(k)
         keywords = dict(sorted(keywords.items(), key=lambda kv: kv[1], reverse=True))
         return keywords
 
@@ -199,8 +709,8 @@ class PhotosDB:
     def persons_as_dict(self):
         """ return persons as dict of person, count in reverse sorted order (descending) """
         persons = {}
-        for k in self._dbfaces_person.keys():
-            persons[k] = len(self._dbfaces_person[k])
+        for k in self._dbfaces:
+            persons[k] = self._dbfaces.count(k)
         persons = dict(sorted(persons.items(), key=lambda kv: kv[1], reverse=True))
         return persons
 
@@ -210,15 +720,15 @@ class PhotosDB:
         albums = {}
         album_keys = [
             k
-            for k in self._dbalbums_album.keys()
+            for k in self._dbalbums
             if self._dbalbum_details[k]["cloudownerhashedpersonid"] is None
         ]
         for k in album_keys:
             title = self._dbalbum_details[k]["title"]
             if title in albums:
-                albums[title] += len(self._dbalbums_album[k])
+                albums[title] += self._dbalbums.count(k)
             else:
-                albums[title] = len(self._dbalbums_album[k])
+                albums[title] = self._dbalbums.count(k)
         albums = dict(sorted(albums.items(), key=lambda kv: kv[1], reverse=True))
         return albums
 
@@ -229,7 +739,7 @@ class PhotosDB:
 
         # if _dbalbum_details[key]["cloudownerhashedpersonid"] is not None, then it's a shared album
         if self._db_version < _PHOTOS_5_VERSION:
-            logging.warning(
+            logger.warning(
                 f"albums_shared not implemented for Photos versions < {_PHOTOS_5_VERSION}"
             )
             return {}
@@ -237,28 +747,28 @@ class PhotosDB:
         albums = {}
         album_keys = [
             k
-            for k in self._dbalbums_album.keys()
+            for k in self._dbalbums
             if self._dbalbum_details[k]["cloudownerhashedpersonid"] is not None
         ]
         for k in album_keys:
             title = self._dbalbum_details[k]["title"]
             if title in albums:
-                albums[title] += len(self._dbalbums_album[k])
+                albums[title] += self._dbalbums.count(k)
             else:
-                albums[title] = len(self._dbalbums_album[k])
+                albums[title] = self._dbalbums.count(k)
         albums = dict(sorted(albums.items(), key=lambda kv: kv[1], reverse=True))
         return albums
 
     @property
     def keywords(self):
         """ return list of keywords found in photos database """
-        keywords = self._dbkeywords_keyword.keys()
+        keywords = self._dbkeywords
         return list(keywords)
 
     @property
     def persons(self):
         """ return list of persons found in photos database """
-        persons = self._dbfaces_person.keys()
+        persons = self._dbfaces
         return list(persons)
 
     @property
@@ -271,7 +781,7 @@ class PhotosDB:
         albums = set()
         album_keys = [
             k
-            for k in self._dbalbums_album.keys()
+            for k in self._dbalbums
             if self._dbalbum_details[k]["cloudownerhashedpersonid"] is None
         ]
         for album in album_keys:
@@ -289,7 +799,7 @@ class PhotosDB:
         # if _dbalbum_details[key]["cloudownerhashedpersonid"] is not None, then it's a shared album
 
         if self._db_version < _PHOTOS_5_VERSION:
-            logging.warning(
+            logger.warning(
                 f"albums_shared not implemented for Photos versions < {_PHOTOS_5_VERSION}"
             )
             return []
@@ -297,7 +807,7 @@ class PhotosDB:
         albums = set()
         album_keys = [
             k
-            for k in self._dbalbums_album.keys()
+            for k in self._dbalbums
             if self._dbalbum_details[k]["cloudownerhashedpersonid"] is not None
         ]
         for album in album_keys:
@@ -339,10 +849,88 @@ class PhotosDB:
             raise Exception
 
         if _debug():
-            logging.debug(self._dest_path)
+            logger.debug(dest_path)
 
         return dest_path
 
+    def _get_cache_signature(self):
+        """ returns signature of the library database files used to validate the snapshot
+            includes both photos.db and Photos.sqlite (Photos 5) and their write-ahead logs """
+        dbpath = pathlib.Path(self._dbfile).parent
+        return _get_db_signature(self._dbfile, dbpath / "Photos.sqlite")
+
+    def _get_cache_path(self):
+        """ returns path to the snapshot file for this library """
+        key = hashlib.sha1(self._dbfile.encode("utf-8")).hexdigest()
+        return os.path.join(self._cache_dir, f"{key}.pickle")
+
+    def _load_cache(self, signature):
+        """ load snapshot of parsed library data from disk
+            returns the snapshot dict if a snapshot exists and was made from a database
+            matching signature with the same version of osxphotos, otherwise returns None """
+        cache_path = self._get_cache_path()
+        try:
+            with open(cache_path, "rb") as fd:
+                snapshot = pickle.load(fd)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            # corrupt or unreadable snapshot, it will be rebuilt
+            logger.warning(f"Could not read cache file {cache_path}: {e}")
+            return None
+
+        if (
+            not isinstance(snapshot, dict)
+            or snapshot.get("format") != _CACHE_FORMAT_VERSION
+            or snapshot.get("version") != __version__
+            or snapshot.get("signature") != signature
+        ):
+            if _debug():
+                logger.debug(f"Ignoring stale cache file {cache_path}")
+            return None
+
+        if _debug():
+            logger.debug(f"Loaded library data from cache file {cache_path}")
+        return snapshot
+
+    def _save_cache(self, signature):
+        """ save snapshot of parsed library data to disk 
+            signature: database signature computed before the database was processed 
+            snapshot is not saved if database changed while it was being processed """
+        if self._lazy:
+            # snapshot must have all the library data
+            if _debug():
+                logger.debug("Library loaded with lazy=True, not saving cache")
+            return
+
+        if self._get_cache_signature() != signature:
+            if _debug():
+                logger.debug("Database changed while loading, not saving cache")
+            return
+
+        snapshot = {
+            "format": _CACHE_FORMAT_VERSION,
+            "version": __version__,
+            "signature": signature,
+            "db_version": self._db_version,
+            "data": {attr: getattr(self, attr) for attr in self._CACHED_ATTRIBUTES},
+        }
+
+        # write to a temporary file then rename so a partially written snapshot is never read
+        cache_path = self._get_cache_path()
+        try:
+            os.makedirs(self._cache_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self._cache_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    pickle.dump(snapshot, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, cache_path)
+            except:
+                os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            logger.warning(f"Could not write cache file {cache_path}: {e}")
+
     # def _open_sql_file(self, fname):
     #     """ opens sqlite file fname in read-only mode
     #         returns tuple of (connection, cursor) """
@@ -381,46 +969,88 @@ class PhotosDB:
         """ process the Photos database to extract info
             works on Photos version <= 4.0 """
 
-        # TODO: Update strings to remove + (not needed)
-        # Epoch is Jan 1, 2001
-        td = (datetime(2001, 1, 1, 0, 0) - datetime(1970, 1, 1, 0, 0)).total_seconds()
-
         (conn, c) = _open_sql_file(self._tmp_db)
 
-        # Look for all combinations of persons and pictures
+        # get the high-water marks used by refresh() to find changed photos
+        # read these first so that anything changed while loading gets picked up by refresh()
+        self._watermark = self._get_watermark4(c)
+
+        if self._lazy:
+            # everything else is loaded when first needed
+            conn.close()
+            return
+
+        self._load_groups(c, list(self._get_group_steps()))
+
+        # done with the database connection
+        conn.close()
+
+        if _debug():
+            logger.debug("Faces:")
+            logger.debug(pformat(self._dbfaces.photos_as_dict()))
+
+            logger.debug("Keywords by uuid:")
+            logger.debug(pformat(self._dbkeywords.photos_as_dict()))
+
+            logger.debug("Keywords by keyword:")
+            logger.debug(pformat(self._dbkeywords.as_dict()))
+
+            logger.debug("Albums by uuid:")
+            logger.debug(pformat(self._dbalbums.photos_as_dict()))
+
+            logger.debug("Albums by album:")
+            logger.debug(pformat(self._dbalbums.as_dict()))
+
+            logger.debug("Album details:")
+            logger.debug(pformat(self._dbalbum_details))
+
+            logger.debug("Volumes:")
+            logger.debug(pformat(self._dbvolumes))
+
+            logger.debug("Photos:")
+            logger.debug(pformat(self._dbphotos))
+
+    def _get_watermark4(self, c):
+        """ returns (max RKVersion.modelId, max RKVersion.lastmodifieddate) 
+            used by refresh() to find photos added or changed since last load """
+        c.execute(
+            "SELECT COALESCE(MAX(modelId), 0), COALESCE(MAX(lastmodifieddate), -1e300) "
+            "FROM RKVersion"
+        )
+        return tuple(c.fetchone())
+
+    def _process_persons4(self, c, asset_filter=None):
+        """ Look for all combinations of persons and pictures """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "select RKPerson.name, RKVersion.uuid from RKFace, RKPerson, RKVersion, RKMaster "
             + "where RKFace.personID = RKperson.modelID and RKVersion.modelId = RKFace.ImageModelId "
             + "and RKVersion.masterUuid = RKMaster.uuid and "
             + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
+            + where,
+            params,
         )
         for person in c:
             if person[0] is None:
                 continue
-            if not person[1] in self._dbfaces_uuid:
-                self._dbfaces_uuid[person[1]] = []
-            if not person[0] in self._dbfaces_person:
-                self._dbfaces_person[person[0]] = []
-            self._dbfaces_uuid[person[1]].append(person[0])
-            self._dbfaces_person[person[0]].append(person[1])
-
-        # Get info on albums
+            self._dbfaces.add(person[0], person[1])
+
+    def _process_albums4(self, c, asset_filter=None):
+        """ Get info on albums """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "select RKAlbum.uuid, RKVersion.uuid from RKAlbum, RKVersion, RKAlbumVersion "
             + "where RKAlbum.modelID = RKAlbumVersion.albumId and "
             + "RKAlbumVersion.versionID = RKVersion.modelId and "
             + "RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
+            + where,
+            params,
         )
         for album in c:
-            # store by uuid in _dbalbums_uuid and by album in _dbalbums_album
-            if not album[1] in self._dbalbums_uuid:
-                self._dbalbums_uuid[album[1]] = []
-            if not album[0] in self._dbalbums_album:
-                self._dbalbums_album[album[0]] = []
-            self._dbalbums_uuid[album[1]].append(album[0])
-            self._dbalbums_album[album[0]].append(album[1])
-
-        # now get additional details about albums
+            self._dbalbums.add(album[0], album[1])
+
+    def _process_album_details4(self, c):
+        """ get additional details about albums """
         c.execute(
             "SELECT "
             "uuid, "  # 0
@@ -442,13 +1072,9 @@ class PhotosDB:
                 "cloudownerhashedpersonid": None,  # Photos 5
             }
 
-        if _debug():
-            logging.debug(f"Finished walking through albums")
-            logging.debug(pformat(self._dbalbums_album))
-            logging.debug(pformat(self._dbalbums_uuid))
-            logging.debug(pformat(self._dbalbum_details))
-
-        # Get info on keywords
+    def _process_keywords4(self, c, asset_filter=None):
+        """ Get info on keywords """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "select RKKeyword.name, RKVersion.uuid, RKMaster.uuid from "
             + "RKKeyword, RKKeywordForVersion, RKVersion, RKMaster "
@@ -456,21 +1082,24 @@ class PhotosDB:
             + "RKVersion.modelID = RKKeywordForVersion.versionID "
             + "and RKMaster.uuid = RKVersion.masterUuid "
             + "and RKVersion.filename not like '%.pdf' and RKVersion.isInTrash = 0"
+            + where,
+            params,
         )
         for keyword in c:
-            if not keyword[1] in self._dbkeywords_uuid:
-                self._dbkeywords_uuid[keyword[1]] = []
-            if not keyword[0] in self._dbkeywords_keyword:
-                self._dbkeywords_keyword[keyword[0]] = []
-            self._dbkeywords_uuid[keyword[1]].append(keyword[0])
-            self._dbkeywords_keyword[keyword[0]].append(keyword[1])
-
-        # Get info on disk volumes
+            self._dbkeywords.add(keyword[0], keyword[1])
+
+    def _process_volumes4(self, c):
+        """ Get info on disk volumes """
         c.execute("select RKVolume.modelId, RKVolume.name from RKVolume")
         for vol in c:
             self._dbvolumes[vol[0]] = vol[1]
 
-        # Get photo details
+    def _process_photos4(self, c, asset_filter=None):
+        """ Get photo details """
+
+        # TODO: Update strings to remove + (not needed)
+
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """ SELECT RKVersion.uuid, RKVersion.modelId, RKVersion.masterUuid, RKVersion.filename, 
                 RKVersion.lastmodifieddate, RKVersion.imageDate, RKVersion.mainRating, 
@@ -483,6 +1112,8 @@ class PhotosDB:
                 RKVersion.specialType, RKMaster.modelID
                 FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND 
                 RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf' """
+            + where,
+            params,
         )
 
         #  TODO:               RKVersion.selfPortrait -- only in Photos 3 and up
@@ -519,26 +1150,27 @@ class PhotosDB:
         # 27    RKVersion.selfPortrait -- 1 if selfie (not yet implemented)
 
         for row in c:
-            uuid = row[0]
+            # use the uuid string stored in _dbuuids so each uuid is only stored once
+            uuid = self._dbuuids.intern(row[0])
             if _debug():
-                logging.debug(f"uuid = '{uuid}, master = '{row[2]}")
-            self._dbphotos[uuid] = {}
+                logger.debug(f"uuid = '{uuid}, master = '{row[2]}")
+            self._dbphotos[uuid] = self._new_photo_info()
             self._dbphotos[uuid]["_uuid"] = uuid  # stored here for easier debugging
             self._dbphotos[uuid]["modelID"] = row[1]
             self._dbphotos[uuid]["masterUuid"] = row[2]
             self._dbphotos[uuid]["filename"] = row[3]
 
+            # dates are stored as Core Data timestamps (seconds since Jan 1, 2001)
+            # and converted to datetime by PhotoInfo when needed
             # There are sometimes negative values for lastmodifieddate in the database
             # I don't know what these mean but they will raise exception in datetime if
             # not accounted for
             if row[4] is not None and row[4] >= 0:
-                self._dbphotos[uuid]["lastmodifieddate"] = datetime.fromtimestamp(
-                    row[4] + td
-                )
+                self._dbphotos[uuid]["lastmodifieddate"] = row[4]
             else:
                 self._dbphotos[uuid]["lastmodifieddate"] = None
 
-            self._dbphotos[uuid]["imageDate"] = datetime.fromtimestamp(row[5] + td)
+            self._dbphotos[uuid]["imageDate"] = row[5]
             self._dbphotos[uuid]["mainRating"] = row[6]
             self._dbphotos[uuid]["hasAdjustments"] = row[7]
             self._dbphotos[uuid]["hasKeywords"] = row[8]
@@ -554,7 +1186,6 @@ class PhotosDB:
             self._dbphotos[uuid]["latitude"] = row[18]
             self._dbphotos[uuid]["longitude"] = row[19]
             self._dbphotos[uuid]["adjustmentUuid"] = row[20]
-            self._dbphotos[uuid]["adjustmentFormatID"] = None
 
             # find type and UTI
             if row[21] == 2:
@@ -566,7 +1197,7 @@ class PhotosDB:
             else:
                 # unknown
                 if _debug():
-                    logging.debug(f"WARNING: {uuid} found unknown type {row[21]}")
+                    logger.debug(f"WARNING: {uuid} found unknown type {row[21]}")
                 self._dbphotos[uuid]["type"] = None
 
             self._dbphotos[uuid]["UTI"] = row[22]
@@ -624,15 +1255,14 @@ class PhotosDB:
             # self._dbphotos[uuid]["selfie"] = True if row[27] == 1 else False
             self._dbphotos[uuid]["selfie"] = None
 
-            # Init cloud details that will be filled in later if cloud asset
+            # edit, live photo and cloud details are filled in by their column groups
+            # (see _load_group)
             self._dbphotos[uuid]["cloudAssetGUID"] = None  # Photos 5
             self._dbphotos[uuid]["cloudLocalState"] = None  # Photos 5
-            self._dbphotos[uuid]["cloudLibraryState"] = None
-            self._dbphotos[uuid]["cloudStatus"] = None
-            self._dbphotos[uuid]["cloudAvailable"] = None
-            self._dbphotos[uuid]["incloud"] = None
 
-        # get details needed to find path of the edited photos
+    def _process_edits4(self, c, asset_filter=None):
+        """ get details needed to find path of the edited photos """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """ SELECT RKVersion.uuid, RKVersion.adjustmentUuid, RKModelResource.modelId,
                 RKModelResource.resourceTag, RKModelResource.UTI, RKVersion.specialType,
@@ -640,6 +1270,8 @@ class PhotosDB:
                 FROM RKVersion
                 JOIN RKModelResource on RKModelResource.attachedModelId = RKVersion.modelId
                 WHERE RKVersion.isInTrash = 0 """
+            + where,
+            params,
         )
 
         # Order of results:
@@ -663,9 +1295,9 @@ class PhotosDB:
                         # and row[4] == "public.jpeg"
                         and row[6] == 2
                     ):
-                        if "edit_resource_id" in self._dbphotos[uuid]:
+                        if self._dbphotos[uuid]["edit_resource_id"] is not None:
                             if _debug():
-                                logging.debug(
+                                logger.debug(
                                     f"WARNING: found more than one edit_resource_id for "
                                     f"UUID {row[0]},adjustmentUUID {row[1]}, modelID {row[2]}"
                                 )
@@ -675,7 +1307,9 @@ class PhotosDB:
                         # For now, return most recent edit
                         self._dbphotos[uuid]["edit_resource_id"] = row[2]
 
-        # get details on external edits
+    def _process_adjustments4(self, c, asset_filter=None):
+        """ get details on external edits """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "SELECT RKVersion.uuid, "
             "RKVersion.adjustmentUuid, "
@@ -683,7 +1317,8 @@ class PhotosDB:
             "RKAdjustmentData.format "
             "FROM RKVersion, RKAdjustmentData "
             "WHERE RKVersion.adjustmentUuid = RKAdjustmentData.uuid "
-            "AND RKVersion.isInTrash = 0"
+            "AND RKVersion.isInTrash = 0" + where,
+            params,
         )
 
         for row in c:
@@ -691,7 +1326,9 @@ class PhotosDB:
             if uuid in self._dbphotos:
                 self._dbphotos[uuid]["adjustmentFormatID"] = row[3]
 
-        # get details to find path of live photos
+    def _process_live_photos4(self, c, asset_filter=None):
+        """ get details to find path of live photos """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """ SELECT 
                 RKVersion.uuid, 
@@ -708,6 +1345,8 @@ class PhotosDB:
 				AND RKMaster.isInTrash = 0
                 AND RKVersion.isInTrash = 0 
               """
+            + where,
+            params,
         )
 
         # Order of results
@@ -728,15 +1367,9 @@ class PhotosDB:
                     True if row[6] == 1 else False
                 )
 
-        # init any uuids that had no edits or live photos
-        for uuid in self._dbphotos:
-            if "edit_resource_id" not in self._dbphotos[uuid]:
-                self._dbphotos[uuid]["edit_resource_id"] = None
-            if "live_model_id" not in self._dbphotos[uuid]:
-                self._dbphotos[uuid]["live_model_id"] = None
-                self._dbphotos[uuid]["modeResourceIsOnDisk"] = None
-
-        # get cloud details
+    def _process_cloud4(self, c, asset_filter=None):
+        """ get cloud details """
+        where, params = _filter_sql(asset_filter, "WHERE")
         c.execute(
             """ SELECT 
                 RKVersion.uuid, 
@@ -746,6 +1379,8 @@ class PhotosDB:
                 FROM RKCloudResource
                 INNER JOIN RKMaster ON RKMaster.fingerprint = RKCloudResource.fingerprint
                 INNER JOIN RKVersion ON RKVersion.masterUuid = RKMaster.uuid """
+            + where,
+            params,
         )
 
         # Order of results
@@ -762,115 +1397,99 @@ class PhotosDB:
                 self._dbphotos[uuid]["cloudStatus"] = row[3]
                 self._dbphotos[uuid]["incloud"] = True if row[2] == 1 else False
 
-        # done with the database connection
-        conn.close()
+    def _process_database5(self):
+        """ process the Photos database to extract info """
+        """ works on Photos version >= 5.0 """
 
-        # add faces and keywords to photo data
-        for uuid in self._dbphotos:
-            # keywords
-            if self._dbphotos[uuid]["hasKeywords"] == 1:
-                self._dbphotos[uuid]["keywords"] = self._dbkeywords_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["keywords"] = []
+        if _debug():
+            logger.debug(f"_process_database5")
 
-            if uuid in self._dbfaces_uuid:
-                self._dbphotos[uuid]["hasPersons"] = 1
-                self._dbphotos[uuid]["persons"] = self._dbfaces_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["hasPersons"] = 0
-                self._dbphotos[uuid]["persons"] = []
+        (conn, c) = _open_sql_file(self._tmp_db)
 
-            if uuid in self._dbalbums_uuid:
-                self._dbphotos[uuid]["albums"] = self._dbalbums_uuid[uuid]
-                self._dbphotos[uuid]["hasAlbums"] = 1
-            else:
-                self._dbphotos[uuid]["albums"] = []
-                self._dbphotos[uuid]["hasAlbums"] = 0
+        # get the high-water marks used by refresh() to find changed photos
+        # read these first so that anything changed while loading gets picked up by refresh()
+        self._watermark = self._get_watermark5(c)
 
-            if self._dbphotos[uuid]["volumeId"] is not None:
-                self._dbphotos[uuid]["volume"] = self._dbvolumes[
-                    self._dbphotos[uuid]["volumeId"]
-                ]
-            else:
-                self._dbphotos[uuid]["volume"] = None
+        if self._lazy:
+            # everything else is loaded when first needed
+            conn.close()
+            return
 
-        if _debug():
-            logging.debug("Faces:")
-            logging.debug(pformat(self._dbfaces_uuid))
+        self._load_groups(c, list(self._get_group_steps()))
 
-            logging.debug("Keywords by uuid:")
-            logging.debug(pformat(self._dbkeywords_uuid))
+        # close connection and remove temporary files
+        conn.close()
 
-            logging.debug("Keywords by keyword:")
-            logging.debug(pformat(self._dbkeywords_keyword))
+        # done processing, dump debug data if requested
+        if _debug():
+            logger.debug("Faces:")
+            logger.debug(pformat(self._dbfaces.photos_as_dict()))
 
-            logging.debug("Albums by uuid:")
-            logging.debug(pformat(self._dbalbums_uuid))
+            logger.debug("Keywords by uuid:")
+            logger.debug(pformat(self._dbkeywords.photos_as_dict()))
 
-            logging.debug("Albums by album:")
-            logging.debug(pformat(self._dbalbums_album))
+            logger.debug("Keywords by keyword:")
+            logger.debug(pformat(self._dbkeywords.as_dict()))
 
-            logging.debug("Volumes:")
-            logging.debug(pformat(self._dbvolumes))
+            logger.debug("Albums by uuid:")
+            logger.debug(pformat(self._dbalbums.photos_as_dict()))
 
-            logging.debug("Photos:")
-            logging.debug(pformat(self._dbphotos))
+            logger.debug("Albums by album:")
+            logger.debug(pformat(self._dbalbums.as_dict()))
 
-    def _process_database5(self):
-        """ process the Photos database to extract info """
-        """ works on Photos version >= 5.0 """
+            logger.debug("Album details:")
+            logger.debug(pformat(self._dbalbum_details))
 
-        if _debug():
-            logging.debug(f"_process_database5")
+            logger.debug("Volumes:")
+            logger.debug(pformat(self._dbvolumes))
 
-        # Epoch is Jan 1, 2001
-        td = (datetime(2001, 1, 1, 0, 0) - datetime(1970, 1, 1, 0, 0)).total_seconds()
+            logger.debug("Photos:")
+            logger.debug(pformat(self._dbphotos))
 
-        (conn, c) = _open_sql_file(self._tmp_db)
+            logger.debug("Burst Photos:")
+            logger.debug(pformat(self._dbphotos_burst))
 
-        # Look for all combinations of persons and pictures
-        if _debug():
-            logging.debug(f"Getting information about persons")
+    def _get_watermark5(self, c):
+        """ returns (max ZGENERICASSET.Z_PK, max ZGENERICASSET.ZMODIFICATIONDATE) 
+            used by refresh() to find photos added or changed since last load """
+        c.execute(
+            "SELECT COALESCE(MAX(Z_PK), 0), COALESCE(MAX(ZMODIFICATIONDATE), -1e300) "
+            "FROM ZGENERICASSET"
+        )
+        return tuple(c.fetchone())
 
+    def _process_persons5(self, c, asset_filter=None):
+        """ Look for all combinations of persons and pictures """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "SELECT ZPERSON.ZFULLNAME, ZGENERICASSET.ZUUID "
             "FROM ZPERSON, ZDETECTEDFACE, ZGENERICASSET "
             "WHERE ZDETECTEDFACE.ZPERSON = ZPERSON.Z_PK AND ZDETECTEDFACE.ZASSET = ZGENERICASSET.Z_PK "
-            "AND ZGENERICASSET.ZTRASHEDSTATE = 0"
+            "AND ZGENERICASSET.ZTRASHEDSTATE = 0" + where,
+            params,
         )
         for person in c:
             if person[0] is None:
                 continue
             person_name = person[0] if person[0] != "" else _UNKNOWN_PERSON
-            if not person[1] in self._dbfaces_uuid:
-                self._dbfaces_uuid[person[1]] = []
-            if not person_name in self._dbfaces_person:
-                self._dbfaces_person[person_name] = []
-            self._dbfaces_uuid[person[1]].append(person_name)
-            self._dbfaces_person[person_name].append(person[1])
-
-        if _debug():
-            logging.debug(f"Finished walking through persons")
-            logging.debug(pformat(self._dbfaces_person))
-            logging.debug(self._dbfaces_uuid)
+            self._dbfaces.add(person_name, person[1])
 
+    def _process_albums5(self, c, asset_filter=None):
+        """ Get info on albums """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "SELECT ZGENERICALBUM.ZUUID, ZGENERICASSET.ZUUID "
             "FROM ZGENERICASSET "
             "JOIN Z_26ASSETS ON Z_26ASSETS.Z_34ASSETS = ZGENERICASSET.Z_PK "
             "JOIN ZGENERICALBUM ON ZGENERICALBUM.Z_PK = Z_26ASSETS.Z_26ALBUMS "
-            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 "
+            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 " + where,
+            params,
         )
         for album in c:
-            # store by uuid in _dbalbums_uuid and by album in _dbalbums_album
-            if not album[1] in self._dbalbums_uuid:
-                self._dbalbums_uuid[album[1]] = []
-            if not album[0] in self._dbalbums_album:
-                self._dbalbums_album[album[0]] = []
-            self._dbalbums_uuid[album[1]].append(album[0])
-            self._dbalbums_album[album[0]].append(album[1])
-
-        # now get additional details about albums
+            self._dbalbums.add(album[0], album[1])
+
+    def _process_album_details5(self, c):
+        """ get additional details about albums """
         c.execute(
             "SELECT "
             "ZUUID, "  # 0
@@ -892,45 +1511,31 @@ class PhotosDB:
                 "cloudidentifier": None,  # Photos4
             }
 
-        if _debug():
-            logging.debug(f"Finished walking through albums")
-            logging.debug(pformat(self._dbalbums_album))
-            logging.debug(pformat(self._dbalbums_uuid))
-            logging.debug(pformat(self._dbalbum_details))
-
-        # get details on keywords
+    def _process_keywords5(self, c, asset_filter=None):
+        """ get details on keywords """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "SELECT ZKEYWORD.ZTITLE, ZGENERICASSET.ZUUID "
             "FROM ZGENERICASSET "
             "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
             "JOIN Z_1KEYWORDS ON Z_1KEYWORDS.Z_1ASSETATTRIBUTES = ZADDITIONALASSETATTRIBUTES.Z_PK "
             "JOIN ZKEYWORD ON ZKEYWORD.Z_PK = Z_1KEYWORDS.Z_37KEYWORDS "
-            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 "
+            "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0 " + where,
+            params,
         )
         for keyword in c:
-            if not keyword[1] in self._dbkeywords_uuid:
-                self._dbkeywords_uuid[keyword[1]] = []
-            if not keyword[0] in self._dbkeywords_keyword:
-                self._dbkeywords_keyword[keyword[0]] = []
-            self._dbkeywords_uuid[keyword[1]].append(keyword[0])
-            self._dbkeywords_keyword[keyword[0]].append(keyword[1])
+            self._dbkeywords.add(keyword[0], keyword[1])
 
-        if _debug():
-            logging.debug(f"Finished walking through keywords")
-            logging.debug(pformat(self._dbkeywords_keyword))
-            logging.debug(pformat(self._dbkeywords_uuid))
-
-        # get details on disk volumes
+    def _process_volumes5(self, c):
+        """ get details on disk volumes """
         c.execute("SELECT ZUUID, ZNAME from ZFILESYSTEMVOLUME")
         for vol in c:
             self._dbvolumes[vol[0]] = vol[1]
 
-        if _debug():
-            logging.debug(f"Finished walking through volumes")
-            logging.debug(self._dbvolumes)
+    def _process_photos5(self, c, asset_filter=None):
+        """ get details about photos """
 
-        # get details about photos
-        logging.debug(f"Getting information about photos")
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """SELECT ZGENERICASSET.ZUUID, 
                 ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT, 
@@ -959,8 +1564,10 @@ class PhotosDB:
                 ZGENERICASSET.ZCLOUDASSETGUID 
                 FROM ZGENERICASSET 
                 JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
-                WHERE ZGENERICASSET.ZTRASHEDSTATE = 0  
-                ORDER BY ZGENERICASSET.ZUUID  """
+                WHERE ZGENERICASSET.ZTRASHEDSTATE = 0  """
+            + where
+            + " ORDER BY ZGENERICASSET.ZUUID ",
+            params,
         )
         # Order of results
         # 0    SELECT ZGENERICASSET.ZUUID,
@@ -991,23 +1598,26 @@ class PhotosDB:
         #       (e.g. user has "iCloud Photos" checked in Photos preferences)
 
         for row in c:
-            uuid = row[0]
-            info = {}
+            # use the uuid string stored in _dbuuids so each uuid is only stored once
+            uuid = self._dbuuids.intern(row[0])
+            info = self._new_photo_info()
             info["_uuid"] = uuid  # stored here for easier debugging
             info["modelID"] = None
             info["masterUuid"] = None
             info["masterFingerprint"] = row[1]
             info["name"] = row[2]
 
+            # dates are stored as Core Data timestamps (seconds since Jan 1, 2001)
+            # and converted to datetime by PhotoInfo when needed
             # There are sometimes negative values for lastmodifieddate in the database
             # I don't know what these mean but they will raise exception in datetime if
             # not accounted for
             if row[4] is not None and row[4] >= 0:
-                info["lastmodifieddate"] = datetime.fromtimestamp(row[4] + td)
+                info["lastmodifieddate"] = row[4]
             else:
                 info["lastmodifieddate"] = None
 
-            info["imageDate"] = datetime.fromtimestamp(row[5] + td)
+            info["imageDate"] = row[5]
             info["imageTimeZoneOffsetSeconds"] = row[6]
             info["hidden"] = row[9]
             info["favorite"] = row[10]
@@ -1029,14 +1639,9 @@ class PhotosDB:
             info["cloudbatchpublishdate"] = row[16]
             info["shared"] = True if row[16] is not None else False
 
-            # these will get filled in later
-            # init to avoid key errors
-            info["extendedDescription"] = None  # fill this in later
-            info["localAvailability"] = None
-            info["remoteAvailability"] = None
-            info["isMissing"] = None
+            # description, availability and adjustment format are filled in
+            # by their column groups (see _load_group)
             info["adjustmentUuid"] = None
-            info["adjustmentFormatID"] = None
 
             # find type
             if row[17] == 0:
@@ -1045,7 +1650,7 @@ class PhotosDB:
                 info["type"] = _MOVIE_TYPE
             else:
                 if _debug():
-                    logging.debug(f"WARNING: {uuid} found unknown type {row[17]}")
+                    logger.debug(f"WARNING: {uuid} found unknown type {row[17]}")
                 info["type"] = None
 
             info["UTI"] = row[18]
@@ -1106,10 +1711,8 @@ class PhotosDB:
             info["selfie"] = True if row[23] == 1 else False
 
             # Determine if photo is part of cloud library (ZGENERICASSET.ZCLOUDASSETGUID not NULL)
-            # Initialize cloud fields that will filled in later
+            # cloud sync state is filled in by the cloud column group
             info["cloudAssetGUID"] = row[24]
-            info["cloudLocalState"] = None
-            info["incloud"] = None
             info["cloudLibraryState"] = None  # Photos 4
             info["cloudStatus"] = None  # Photos 4
             info["cloudAvailable"] = None  # Photos 4
@@ -1128,14 +1731,18 @@ class PhotosDB:
             # else:
             #     info["burst"] = False
 
-        # Get extended description
+    def _process_descriptions5(self, c, asset_filter=None):
+        """ Get extended description """
+        where, params = _filter_sql(asset_filter, "WHERE")
         c.execute(
             "SELECT ZGENERICASSET.ZUUID, "
             "ZASSETDESCRIPTION.ZLONGDESCRIPTION "
             "FROM ZGENERICASSET "
             "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
             "JOIN ZASSETDESCRIPTION ON ZASSETDESCRIPTION.Z_PK = ZADDITIONALASSETATTRIBUTES.ZASSETDESCRIPTION "
-            "ORDER BY ZGENERICASSET.ZUUID "
+            + where
+            + "ORDER BY ZGENERICASSET.ZUUID ",
+            params,
         )
         for row in c:
             uuid = row[0]
@@ -1143,11 +1750,13 @@ class PhotosDB:
                 self._dbphotos[uuid]["extendedDescription"] = row[1]
             else:
                 if _debug():
-                    logging.debug(
+                    logger.debug(
                         f"WARNING: found description {row[1]} but no photo for {uuid}"
                     )
 
-        # get information about adjusted/edited photos
+    def _process_adjustments5(self, c, asset_filter=None):
+        """ get information about adjusted/edited photos """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             "SELECT ZGENERICASSET.ZUUID, "
             "ZGENERICASSET.ZHASADJUSTMENTS, "
@@ -1155,7 +1764,8 @@ class PhotosDB:
             "FROM ZGENERICASSET, ZUNMANAGEDADJUSTMENT "
             "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
             "WHERE ZADDITIONALASSETATTRIBUTES.ZUNMANAGEDADJUSTMENT = ZUNMANAGEDADJUSTMENT.Z_PK "
-            "AND ZGENERICASSET.ZTRASHEDSTATE = 0 "
+            "AND ZGENERICASSET.ZTRASHEDSTATE = 0 " + where,
+            params,
         )
         for row in c:
             uuid = row[0]
@@ -1163,11 +1773,12 @@ class PhotosDB:
                 self._dbphotos[uuid]["adjustmentFormatID"] = row[2]
             else:
                 if _debug():
-                    logging.debug(
+                    logger.debug(
                         f"WARNING: found adjustmentformatidentifier {row[2]} but no photo for uuid {row[0]}"
                     )
 
-        # Find missing photos
+    def _process_resources5(self, c, asset_filter=None):
+        """ Find missing photos """
         # TODO: this code is very kludgy and I had to make lots of assumptions
         # it's probably wrong and needs to be re-worked once I figure out how to reliably
         # determine if a photo is missing in Photos 5
@@ -1175,6 +1786,7 @@ class PhotosDB:
         # Get info on remote/local availability for photos in shared albums
         # Shared photos have a null fingerprint (and some other photos do too)
         # TODO: There may be a bug here, perhaps ZDATASTORESUBTYPE should be 1 --> it's the longest ZDATALENGTH (is this the original)
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """ SELECT 
                 ZGENERICASSET.ZUUID, 
@@ -1183,10 +1795,12 @@ class PhotosDB:
                 FROM ZGENERICASSET
                 JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK 
                 JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZASSET = ZADDITIONALASSETATTRIBUTES.ZASSET 
-                WHERE  ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3 """
+                WHERE  (ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3) """
             # WHERE  ZDATASTORESUBTYPE = 1 OR ZDATASTORESUBTYPE = 3 """
             # WHERE  ZDATASTORESUBTYPE = 0 OR ZDATASTORESUBTYPE = 3 """
             # WHERE ZINTERNALRESOURCE.ZFINGERPRINT IS NULL AND ZINTERNALRESOURCE.ZDATASTORESUBTYPE = 3 """
+            + where,
+            params,
         )
 
         for row in c:
@@ -1204,21 +1818,58 @@ class PhotosDB:
                     self._dbphotos[uuid]["isMissing"] = 0
 
                 # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
-                #     logging.warning(
+                #     logger.warning(
                 #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
                 #     )
 
         # get information on local/remote availability
-        c.execute(
-            """ SELECT ZGENERICASSET.ZUUID,
-                ZINTERNALRESOURCE.ZLOCALAVAILABILITY,
-                ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
-                FROM ZGENERICASSET
-                JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK
-                JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZFINGERPRINT = ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
-        )
+        if asset_filter is None:
+            c.execute(
+                """ SELECT ZGENERICASSET.ZUUID,
+                    ZINTERNALRESOURCE.ZLOCALAVAILABILITY,
+                    ZINTERNALRESOURCE.ZREMOTEAVAILABILITY
+                    FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK
+                    JOIN ZINTERNALRESOURCE ON ZINTERNALRESOURCE.ZFINGERPRINT = ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
+            )
+            rows = list(c)
+        else:
+            # resources are matched to photos by fingerprint, which isn't indexed: joining
+            # them in SQL can make SQLite scan ZINTERNALRESOURCE once per photo when the
+            # query is filtered (e.g. by iter_photos()) so the resources of the photos are
+            # read in one pass and matched to the photos here
+            where, params = _filter_sql(asset_filter, "WHERE")
+            assets_sql = (
+                """ FROM ZGENERICASSET
+                    JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK """
+                + where
+            )
+            c.execute(
+                "SELECT ZGENERICASSET.ZUUID, ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT"
+                + assets_sql,
+                params,
+            )
+            fingerprint_uuids = {}
+            for uuid, fingerprint in c:
+                if fingerprint is not None:
+                    fingerprint_uuids.setdefault(fingerprint, []).append(uuid)
+
+            c.execute(
+                """ SELECT ZFINGERPRINT, ZLOCALAVAILABILITY, ZREMOTEAVAILABILITY
+                    FROM ZINTERNALRESOURCE
+                    WHERE ZFINGERPRINT IN 
+                    (SELECT ZADDITIONALASSETATTRIBUTES.ZMASTERFINGERPRINT """
+                + assets_sql
+                + ")",
+                params,
+            )
+            rows = [
+                (uuid,) + row[1:]
+                for row in c
+                for uuid in fingerprint_uuids.get(row[0], [])
+            ]
 
-        for row in c:
+        for row in rows:
             uuid = row[0]
             if uuid in self._dbphotos:
                 self._dbphotos[uuid]["localAvailability"] = row[1]
@@ -1232,17 +1883,21 @@ class PhotosDB:
                     self._dbphotos[uuid]["isMissing"] = 0
 
                 # if old is not None and old != self._dbphotos[uuid]["isMissing"]:
-                #     logging.warning(
+                #     logger.warning(
                 #         f"{uuid} isMissing changed: {old} {self._dbphotos[uuid]['isMissing']}"
                 #     )
 
-        # get information about cloud sync state
+    def _process_cloud5(self, c, asset_filter=None):
+        """ get information about cloud sync state """
+        where, params = _filter_sql(asset_filter)
         c.execute(
             """ SELECT
                 ZGENERICASSET.ZUUID,
                 ZCLOUDMASTER.ZCLOUDLOCALSTATE
                 FROM ZCLOUDMASTER, ZGENERICASSET
                 WHERE ZGENERICASSET.ZMASTER = ZCLOUDMASTER.Z_PK """
+            + where,
+            params,
         )
         for row in c:
             uuid = row[0]
@@ -1250,61 +1905,799 @@ class PhotosDB:
                 self._dbphotos[uuid]["cloudLocalState"] = row[1]
                 self._dbphotos[uuid]["incloud"] = True if row[1] == 3 else False
 
-        # add faces and keywords to photo data
-        for uuid in self._dbphotos:
-            # keywords
-            if uuid in self._dbkeywords_uuid:
-                self._dbphotos[uuid]["hasKeywords"] = 1
-                self._dbphotos[uuid]["keywords"] = self._dbkeywords_uuid[uuid]
-            else:
-                self._dbphotos[uuid]["hasKeywords"] = 0
-                self._dbphotos[uuid]["keywords"] = []
+    def _get_group_steps(self):
+        """ returns dict of group name: list of methods that load the group's data 
+            groups are listed in the order they're loaded when loading the whole library
+            relationship and column group steps take a cursor and optional asset filter (see _filter_sql)
+            table group steps (_TABLE_GROUPS) take a cursor and always read the whole table
+            link group steps take a list of uuids """
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            return {
+                "persons": [self._process_persons5],
+                "albums": [self._process_albums5],
+                "album_details": [self._process_album_details5],
+                "keywords": [self._process_keywords5],
+                "volumes": [self._process_volumes5],
+                "photos": [self._process_photos5],
+                "descriptions": [self._process_descriptions5],
+                "adjustments": [self._process_adjustments5],
+                "resources": [self._process_resources5],
+                "cloud": [self._process_cloud5],
+                "link_keywords": [self._link_keywords],
+                "link_persons": [self._link_persons],
+                "link_albums": [self._link_albums],
+            }
+        else:
+            return {
+                "persons": [self._process_persons4],
+                "albums": [self._process_albums4],
+                "album_details": [self._process_album_details4],
+                "keywords": [self._process_keywords4],
+                "volumes": [self._process_volumes4],
+                "photos": [self._process_photos4],
+                "edits": [self._process_edits4],
+                "adjustments": [self._process_adjustments4],
+                "live_photos": [self._process_live_photos4],
+                "cloud": [self._process_cloud4],
+                "link_keywords": [self._link_keywords],
+                "link_persons": [self._link_persons],
+                "link_albums": [self._link_albums],
+                "link_volumes": [self._link_volumes],
+            }
 
-            if uuid in self._dbfaces_uuid:
-                self._dbphotos[uuid]["hasPersons"] = 1
-                self._dbphotos[uuid]["persons"] = self._dbfaces_uuid[uuid]
+    def _get_column_groups(self):
+        """ returns dict of column group name: fields of the photo info dict it fills in """
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            return self._COLUMN_GROUPS5
+        else:
+            return self._COLUMN_GROUPS4
+
+    def _load_groups(self, c, groups):
+        """ load groups of library data from the database, in parallel if workers or processes
+            was passed to __init__, otherwise one after the other on cursor c 
+            In parallel mode, the queries each group runs are found by running its steps on a 
+            _QueryRecorder, then run on separate connections in a thread pool; the photos table 
+            query is split into ranges of rows read in a process pool if processes was passed.
+            The groups are then loaded in order from the fetched rows (see _PrefetchedCursor) 
+            so the result is the same as loading serially. """
+        if not self._workers and not self._processes:
+            for group in groups:
+                self._load_group(c, group)
+            return
+
+        filters = {group: None for group in groups}
+        if self._processes:
+            filters["photos"] = [
+                _and_filters(self._scope, asset_filter)
+                for asset_filter in self._pk_filters(c, self._processes)
+            ]
+
+        # find the queries each group runs
+        group_steps = self._get_group_steps()
+        queries = {}
+        for group in groups:
+            if group.startswith("link_"):
+                # link groups only use data that's already loaded
+                continue
+            recorder = _QueryRecorder()
+            for step in group_steps[group]:
+                if group in self._TABLE_GROUPS:
+                    step(recorder)
+                else:
+                    for asset_filter in filters[group] or [self._scope]:
+                        step(recorder, asset_filter)
+            queries[group] = recorder.queries
+
+        # fetch the rows for each query
+        workers = self._workers or self._processes
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            if self._processes and "photos" in queries:
+                # multiprocessing.Pool rather than ProcessPoolExecutor, which only takes a
+                # start method (mp_context) from Python 3.7
+                pool = multiprocessing.get_context("spawn").Pool(self._processes)
+                try:
+                    futures = self._submit_queries(threads, queries, pool)
+                    pool.close()
+                    pool.join()
+                finally:
+                    pool.terminate()
+            else:
+                futures = self._submit_queries(threads, queries)
+            results = {}
+            for query, future in futures:
+                results.setdefault(query, deque()).append(future.result())
+
+        cursor = _PrefetchedCursor(c, results)
+        for group in groups:
+            self._load_group(cursor, group, asset_filters=filters[group])
+
+    def _submit_queries(self, threads, queries, processes=None):
+        """ submit the queries in dict of group: list of (sql, params) to run in thread pool threads
+            if processes (multiprocessing.Pool) is not None, the photos group's queries are run
+            in its processes
+            returns list of ((sql, params), future) in the same order as queries """
+        futures = []
+        for group, group_queries in queries.items():
+            for sql, params in group_queries:
+                args = (str(self._tmp_db), sql, params)
+                if group == "photos" and processes is not None:
+                    future = Future()
+                    processes.apply_async(
+                        _fetch_rows,
+                        args,
+                        callback=future.set_result,
+                        error_callback=future.set_exception,
+                    )
+                else:
+                    future = threads.submit(_fetch_rows, *args)
+                futures.append(((sql, params), future))
+        return futures
+
+    def _pk_filters(self, c, count):
+        """ returns list of up to count asset filters that split the photos table into ranges 
+            of primary key with about the same number of rows; the ranges are in key order """
+        sql = self._get_query_sql()
+        pk_table, pk_column = sql["pk_table"], sql["pk_column"]
+        c.execute(f"SELECT COUNT(*) FROM {pk_table}")
+        total = c.fetchone()[0]
+        bounds = []
+        for i in range(1, count):
+            c.execute(
+                f"SELECT {pk_column} FROM {pk_table} ORDER BY {pk_column} LIMIT 1 OFFSET ?",
+                (total * i // count,),
+            )
+            row = c.fetchone()
+            if row is not None and (not bounds or row[0] > bounds[-1]):
+                bounds.append(row[0])
+
+        filters = []
+        low = None
+        for high in bounds + [None]:
+            if low is None and high is None:
+                filters.append(None)
+            elif low is None:
+                filters.append((f"{pk_column} < ?", (high,)))
+            elif high is None:
+                filters.append((f"{pk_column} >= ?", (low,)))
+            else:
+                filters.append((f"{pk_column} >= ? AND {pk_column} < ?", (low, high)))
+            low = high
+        return filters
+
+    def _load_group(self, c, group, uuids=None, asset_filters=None):
+        """ load a group of library data from the database
+            c: cursor to the Photos database
+            group: name of group (see _get_group_steps)
+            uuids: if not None, only (re)load data for these photos, used by refresh() 
+            asset_filters: if not None, list of asset filters to run the group's steps with 
+                  instead of the scope, used to split the load into parts (see _load_groups) """
+        steps = self._get_group_steps()[group]
+
+        if asset_filters is not None:
+            filters = asset_filters
+        elif uuids is None:
+            filters = [self._scope]
+        else:
+            filters = [
+                _and_filters(self._scope, asset_filter)
+                for asset_filter in self._uuid_filters(uuids)
+            ]
+
+        if group in self._RELATIONSHIP_GROUPS:
+            if uuids is None or group in self._TABLE_GROUPS:
+                for attr in self._RELATIONSHIP_GROUPS[group]:
+                    if group in self._ENCODED_GROUPS:
+                        setattr(self, attr, Relationship(self._dbuuids))
+                    else:
+                        setattr(self, attr, {})
+            if group in self._TABLE_GROUPS:
+                for step in steps:
+                    step(c)
             else:
-                self._dbphotos[uuid]["hasPersons"] = 0
-                self._dbphotos[uuid]["persons"] = []
+                for asset_filter in filters:
+                    for step in steps:
+                        step(c, asset_filter)
+        else:
+            # column group: initialize the group's fields then fill them in from the database
+            photos = self._dbphotos
+            if uuids is None:
+                uuids = list(photos)
+            else:
+                uuids = [uuid for uuid in uuids if uuid in photos]
+            fields = self._get_column_groups()[group]
+            for uuid in uuids:
+                info = photos[uuid]
+                for field in fields:
+                    info[field] = None
+
+            if group.startswith("link_"):
+                for step in steps:
+                    step(uuids)
+            else:
+                for asset_filter in filters:
+                    for step in steps:
+                        step(c, asset_filter)
+
+        if group == "photos":
+            # rows have changed so the columnar view and bitmap indexes need to be rebuilt
+            self._columns = None
+            self._index = None
+            self._date_indexes = {}
+            self._geo_index = None
+            self._text_indexes = {}
+            self._photo_infos = weakref.WeakValueDictionary()
 
-            if uuid in self._dbalbums_uuid:
-                self._dbphotos[uuid]["albums"] = self._dbalbums_uuid[uuid]
-                self._dbphotos[uuid]["hasAlbums"] = 1
+        self._loaded.add(group)
+
+        if _debug():
+            logger.debug(f"Loaded {group}")
+
+    def _require(self, group):
+        """ load group of library data if it hasn't been loaded yet (only needed when lazy=True) """
+        if group in self._loaded:
+            return
+
+        (conn, c) = _open_sql_file(self._tmp_db)
+        try:
+            self._load_group(c, group)
+        finally:
+            conn.close()
+
+    def _require_all(self):
+        """ load all the library data that hasn't been loaded yet (only needed when lazy=True)
+            data is loaded on demand in whichever thread first needs it, which isn't thread-safe,
+            so this must be called before the PhotosDB (or its PhotoInfo objects) is used by
+            several threads at once """
+        groups = [
+            group for group in self._get_group_steps() if group not in self._loaded
+        ]
+        if not groups:
+            return
+
+        (conn, c) = _open_sql_file(self._tmp_db)
+        try:
+            for group in groups:
+                # loading a group may load the groups it depends on
+                if group not in self._loaded:
+                    self._load_group(c, group)
+        finally:
+            conn.close()
+
+    def _new_photo_info(self):
+        """ returns new record to store info about a photo (see _PhotoRecord)
+            when lazy=True, the record loads column groups the first time one of their fields is accessed """
+        return _LazyPhotoRecord(self) if self._lazy else _PhotoRecord()
+
+    def __getattr__(self, name):
+        """ load relationship data (e.g. _dbkeywords) the first time it's accessed when lazy=True """
+        # only called if attribute not found the normal way
+        group = self._RELATIONSHIP_ATTRIBUTES.get(name)
+        if group is None or "_loaded" not in self.__dict__ or group in self._loaded:
+            raise AttributeError(
+                f"'{self.__class__.__name__}' object has no attribute '{name}'"
+            )
+        self._require(group)
+        return self.__dict__[name]
+
+    def _link_keywords(self, uuids):
+        """ add keywords to photo data for each uuid in uuids """
+        photos5 = int(self._db_version) >= int(_PHOTOS_5_VERSION)
+        for uuid in uuids:
+            info = self._dbphotos[uuid]
+            if photos5:
+                info["hasKeywords"] = int(self._dbkeywords.has_photo(uuid))
+            if info["hasKeywords"] == 1:
+                info["keywords"] = self._dbkeywords.value_ids(uuid)
+            else:
+                info["keywords"] = ()
+
+    def _link_persons(self, uuids):
+        """ add faces to photo data for each uuid in uuids """
+        for uuid in uuids:
+            info = self._dbphotos[uuid]
+            info["persons"] = self._dbfaces.value_ids(uuid)
+            info["hasPersons"] = int(bool(info["persons"]))
+
+    def _link_albums(self, uuids):
+        """ add albums to photo data for each uuid in uuids """
+        for uuid in uuids:
+            info = self._dbphotos[uuid]
+            info["albums"] = self._dbalbums.value_ids(uuid)
+            info["hasAlbums"] = int(bool(info["albums"]))
+
+    def _link_volumes(self, uuids):
+        """ add volume name to photo data for each uuid in uuids (Photos <= 4) """
+        for uuid in uuids:
+            info = self._dbphotos[uuid]
+            if info["volumeId"] is not None:
+                info["volume"] = self._dbvolumes[info["volumeId"]]
             else:
-                self._dbphotos[uuid]["albums"] = []
-                self._dbphotos[uuid]["hasAlbums"] = 0
+                info["volume"] = None
+
+    def refresh(self):
+        """ reload photos that were added, changed, or trashed in the Photos library since
+            this PhotosDB object was created or last refreshed and update the keyword, person,
+            album, and burst indexes in place
+            Changed photos are found using the modification date and primary key of each
+            photo so only those photos are re-read from the database; the cost of refresh is
+            proportional to the number of changes rather than the size of the library.
+            Changes that do not modify any photo (e.g. renaming a person) may not be detected;
+            create a new PhotosDB object to pick those up.
+            PhotoInfo objects obtained before the refresh are not updated.
+            returns dict with keys "added", "updated", "removed", each a sorted list of uuids """
+
+        if self._cache_dir is not None:
+            signature = self._get_cache_signature()
+
+        # database may have been locked (e.g. Photos opened) since it was last read
+        self._tmp_db = self._dbfile_actual
+        if _db_is_locked(self._dbfile_actual):
+            self._tmp_db = self._copy_db_file(self._dbfile_actual)
+
+        photos5 = int(self._db_version) >= int(_PHOTOS_5_VERSION)
+
+        (conn, c) = _open_sql_file(self._tmp_db)
+
+        # find photos added or modified since the last load, including photos moved to trash
+        watermark = self._watermark
+        if photos5:
+            self._watermark = self._get_watermark5(c)
+            c.execute(
+                "SELECT ZUUID FROM ZGENERICASSET "
+                "WHERE Z_PK > ? OR ZMODIFICATIONDATE > ?",
+                watermark,
+            )
+        else:
+            self._watermark = self._get_watermark4(c)
+            c.execute(
+                "SELECT uuid FROM RKVersion WHERE modelId > ? OR lastmodifieddate > ?",
+                watermark,
+            )
+        changed = {row[0] for row in c}
+
+        if _debug():
+            logger.debug(f"refresh: {len(changed)} changed photos since {watermark}")
+
+        # photo details are needed to report what changed
+        if "photos" not in self._loaded:
+            self._load_group(c, "photos")
+
+        previous = {uuid for uuid in changed if uuid in self._dbphotos}
+        for uuid in changed:
+            self._remove_photo(uuid)
+
+        self._load_photos(c, changed)
+
+        # photos that were deleted outright (rather than moved to trash) can't be found by
+        # watermark so verify the photo count and if it's off, compare the full list of uuids
+        # this is also a safety net for anything else the watermarks missed
+        if self._get_photo_count(c) != len(self._dbphotos):
+            current = self._get_photo_uuids(c)
+            deleted = set(self._dbphotos) - current
+            for uuid in deleted:
+                self._remove_photo(uuid)
+            unseen = current - set(self._dbphotos)
+            self._load_photos(c, unseen)
+            previous |= deleted
+            changed |= deleted | unseen
 
-        # close connection and remove temporary files
         conn.close()
 
-        # done processing, dump debug data if requested
+        if self._cache_dir is not None:
+            self._save_cache(signature)
+
+        # changed photos may have new edited or live photo files
+        self.refresh_resource_index()
+
+        report = {
+            "added": sorted(
+                uuid for uuid in changed - previous if uuid in self._dbphotos
+            ),
+            "updated": sorted(uuid for uuid in previous if uuid in self._dbphotos),
+            "removed": sorted(uuid for uuid in previous if uuid not in self._dbphotos),
+        }
         if _debug():
-            logging.debug("Faces:")
-            logging.debug(pformat(self._dbfaces_uuid))
+            logger.debug(f"refresh: {report}")
+        return report
+
+    def refresh_resource_index(self):
+        """ read the library's resource directories again the next time an edited or live photo
+            file is looked up (see PhotoInfo.path_edited and path_live_photo), for example after
+            Photos has created edited versions or downloaded files from iCloud """
+        if self._resource_index is not None:
+            self._resource_index.refresh()
+
+    def prefetch_paths(self, photos, workers=_PREFETCH_WORKERS):
+        """ check the files of PhotoInfo objects photos that path, path_edited, path_live_photo 
+            and export() look for ahead of time, on workers threads at once, so they don't wait
+            for the disk one file at a time (e.g. for a library on a network volume)
+            the resource directories with edited and live photo files are read if they haven't
+            been and the other files are checked on disk; the results for the other files are
+            kept until the next call """
+        paths = []
+        for photo in photos:
+            paths.extend(photo._resource_paths())
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            self._get_resource_index().prefetch(paths, executor)
+
+    def _get_resource_index(self):
+        """ returns index of the files in the library's resource directories (see ResourceIndex),
+            creating it if needed; each directory tree is read the first time it's used """
+        if self._resource_index is None:
+            resources = os.path.join(self._library_path, "resources")
+            self._resource_index = ResourceIndex(
+                [
+                    os.path.join(resources, "media", "version"),
+                    os.path.join(resources, "media", "master"),
+                    os.path.join(resources, "renders"),
+                ]
+            )
+        return self._resource_index
+
+    def _load_photos(self, c, uuids):
+        """ read photo details and keywords, persons and albums for each photo in uuids 
+            and add them to the in-memory indexes; only groups already loaded are read
+            albums and volumes are small tables so they are always re-read in full
+            c: cursor to the Photos database """
+        for group in self._get_group_steps():
+            if group not in self._loaded:
+                continue
+            if group in self._TABLE_GROUPS:
+                self._load_group(c, group)
+            elif uuids:
+                self._load_group(c, group, uuids)
+
+    def _remove_photo(self, uuid):
+        """ remove photo uuid and all references to it from the in-memory indexes """
+        self._columns = None
+        self._index = None
+        self._date_indexes = {}
+        self._geo_index = None
+        self._text_indexes = {}
+        self._photo_infos.pop(uuid, None)
+        info = self._dbphotos.pop(uuid, None)
+        if info is not None and info["burst"]:
+            burst_set = self._dbphotos_burst.get(info["burstUUID"])
+            if burst_set is not None:
+                burst_set.discard(uuid)
+                if not burst_set:
+                    del self._dbphotos_burst[info["burstUUID"]]
+
+        for group in self._ENCODED_GROUPS:
+            if group not in self._loaded:
+                continue
+            for attr in self._RELATIONSHIP_GROUPS[group]:
+                getattr(self, attr).remove_photo(uuid)
 
-            logging.debug("Keywords by uuid:")
-            logging.debug(pformat(self._dbkeywords_uuid))
+    def _uuid_filters(self, uuids):
+        """ returns list of asset filters that together select the photos in uuids
+            uuids are split into chunks to stay below sqlite's limit on query parameters """
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            column = "ZGENERICASSET.ZUUID"
+        else:
+            column = "RKVersion.uuid"
+
+        uuids = list(uuids)
+        filters = []
+        for i in range(0, len(uuids), _SQLITE_MAX_VARIABLES):
+            chunk = tuple(uuids[i : i + _SQLITE_MAX_VARIABLES])
+            placeholders = ", ".join(["?"] * len(chunk))
+            filters.append((f"{column} IN ({placeholders})", chunk))
+        return filters
+
+    def _library_uuids(self, uuids):
+        """ returns set of the uuids in iterable uuids that are photos in the library (not in
+            the trash), including burst photos that aren't selected, which photos() skips """
+        uuids = set(uuids)
+        if not self._lazy or "photos" in self._loaded:
+            return uuids & self._dbphotos.keys()
+
+        found = set()
+        for uuid_filter in self._uuid_filters(uuids):
+            scoped = self._scoped(uuid_filter)
+            scoped._require("photos")
+            found.update(scoped._dbphotos)
+        return found
+
+    def _get_photo_count(self, c):
+        """ returns number of photos in the database, using same criteria as _process_photos4/5 """
+        where, params = _filter_sql(self._scope)
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            c.execute(
+                "SELECT COUNT(*) FROM ZGENERICASSET "
+                "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+                "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0" + where,
+                params,
+            )
+        else:
+            c.execute(
+                "SELECT COUNT(*) FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND "
+                "RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf'"
+                + where,
+                params,
+            )
+        return c.fetchone()[0]
 
-            logging.debug("Keywords by keyword:")
-            logging.debug(pformat(self._dbkeywords_keyword))
+    def _get_photo_uuids(self, c):
+        """ returns set of uuids of photos in the database, using same criteria as _process_photos4/5 """
+        where, params = _filter_sql(self._scope)
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            c.execute(
+                "SELECT ZGENERICASSET.ZUUID FROM ZGENERICASSET "
+                "JOIN ZADDITIONALASSETATTRIBUTES ON ZADDITIONALASSETATTRIBUTES.ZASSET = ZGENERICASSET.Z_PK "
+                "WHERE ZGENERICASSET.ZTRASHEDSTATE = 0" + where,
+                params,
+            )
+        else:
+            c.execute(
+                "SELECT RKVersion.uuid FROM RKVersion, RKMaster WHERE RKVersion.isInTrash = 0 AND "
+                "RKVersion.masterUuid = RKMaster.uuid AND RKVersion.filename NOT LIKE '%.pdf'"
+                + where,
+                params,
+            )
+        return {row[0] for row in c}
 
-            logging.debug("Albums by uuid:")
-            logging.debug(pformat(self._dbalbums_uuid))
+    def _get_query_sql(self):
+        """ returns dict of SQL used to find photos in the database for this version of Photos """
+        if int(self._db_version) >= int(_PHOTOS_5_VERSION):
+            return self._QUERY_SQL5
+        else:
+            return self._QUERY_SQL4
+
+    def _get_date_filter(self, from_date=None, to_date=None):
+        """ returns asset filter selecting photos with creation date >= from_date and <= to_date
+            from_date, to_date: datetime.datetime or None """
+        # dates in the database are Core Data timestamps, seconds since Jan 1, 2001
+        date_column = self._get_query_sql()["date_column"]
+        asset_filter = None
+        if from_date is not None:
+            asset_filter = _and_filters(
+                asset_filter,
+                (f"{date_column} >= ?", (_datetime_to_coredata(from_date),)),
+            )
+        if to_date is not None:
+            asset_filter = _and_filters(
+                asset_filter, (f"{date_column} <= ?", (_datetime_to_coredata(to_date),))
+            )
+        return asset_filter
+
+    def _get_modified_filter(self, modified_since=None, modified_before=None):
+        """ returns asset filter selecting photos with modification date >= modified_since 
+            and < modified_before; photos with no modification date aren't selected
+            modified_since, modified_before: datetime.datetime or None """
+        # negative modification dates are treated as no date (see _process_database4)
+        modified_column = self._get_query_sql()["modified_column"]
+        asset_filter = (f"{modified_column} >= 0", ())
+        if modified_since is not None:
+            since = _datetime_to_coredata(modified_since)
+            asset_filter = _and_filters(
+                asset_filter, (f"{modified_column} >= ?", (since,))
+            )
+        if modified_before is not None:
+            before = _datetime_to_coredata(modified_before)
+            asset_filter = _and_filters(
+                asset_filter, (f"{modified_column} < ?", (before,))
+            )
+        return asset_filter
+
+    def _get_location_filter(self, near=None, bbox=None):
+        """ returns asset filter selecting photos in bounding box bbox and in the bounding box
+            of the circle near (see photos()); photos near a point are found by checking the
+            distance of each once loaded """
+        sql = self._get_query_sql()
+        lat_column = sql["latitude_column"]
+        lon_column = sql["longitude_column"]
+        boxes = []
+        if near:
+            boxes.append(_near_bbox(*near))
+        if bbox:
+            _check_bbox(*bbox)
+            boxes.append(tuple(bbox))
+
+        # missing locations are NULL (Photos 4) or -180.0 (Photos 5) so aren't selected
+        asset_filter = None
+        for min_lat, min_lon, max_lat, max_lon in boxes:
+            # box crosses the 180th meridian if min_lon > max_lon
+            op = "AND" if min_lon <= max_lon else "OR"
+            asset_filter = _and_filters(
+                asset_filter,
+                (
+                    f"{lat_column} BETWEEN ? AND ? "
+                    f"AND ({lon_column} >= ? {op} {lon_column} <= ?)",
+                    (min_lat, max_lat, min_lon, max_lon),
+                ),
+            )
+        return asset_filter
+
+    def _get_text_filter(self, text):
+        """ returns asset filter selecting photos whose text contains each search term of the
+            text criteria text (see PhotoQuery) or None if the terms can't be checked with
+            SQL; photos are found by checking the text of each once loaded
+            SQL only compares text case-sensitively so the filter is only for substring, word
+            and prefix searches that don't ignore case, which all match a substring of the text """
+        if text["ignore_case"] or text["match"] == "regex":
+            return None
+        sql = self._get_query_sql()["text"]
+        asset_filter = None
+        for field, condition in sql.items():
+            for term in text[field] or []:
+                params = (term,) * condition.count("?")
+                asset_filter = _and_filters(asset_filter, (condition, params))
+        return asset_filter
+
+    def _database_filter(self, query):
+        """ returns asset filter selecting the photos in the database that match the criteria of 
+            PhotoQuery query that can be checked with SQL or None if no photos can match
+            (see PhotoQuery._after_database for the criteria that are left to check) """
+        sql = self._get_query_sql()
+        favorite = query.flags.get("favorite")
+        hidden = query.flags.get("hidden")
+        scope_where, scope_params = _filter_sql(self._scope)
 
-            logging.debug("Albums by album:")
-            logging.debug(pformat(self._dbalbums_album))
+        (conn, c) = _open_sql_file(self._tmp_db)
 
-            logging.debug("Album details:")
-            logging.debug(pformat(self._dbalbum_details))
+        conditions = []
+        found = False  # mirrors photos(): criteria that aren't found in the library are ignored
+        for kind, values in [
+            ("albums", query.albums),
+            ("uuid", query.uuid),
+            ("keywords", query.keywords),
+            ("persons", query.persons),
+        ]:
+            for value in values or []:
+                if (
+                    kind == "persons"
+                    and value == _UNKNOWN_PERSON
+                    and int(self._db_version) >= int(_PHOTOS_5_VERSION)
+                ):
+                    # Photos 5 stores unknown persons with empty name
+                    value = ""
+                if kind == "albums":
+                    c.execute(f"SELECT EXISTS ({sql['album_exists']})", (value,))
+                else:
+                    c.execute(
+                        f"SELECT EXISTS ({sql[kind]}{scope_where})",
+                        (value,) + scope_params,
+                    )
+                if c.fetchone()[0]:
+                    conditions.append(
+                        (f"{sql['uuid_column']} IN ({sql[kind]})", (value,))
+                    )
+                    found = True
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find {kind} '{value}' in database")
 
-            logging.debug("Volumes:")
-            logging.debug(pformat(self._dbvolumes))
+        conn.close()
 
-            logging.debug("Photos:")
-            logging.debug(pformat(self._dbphotos))
+        if query.from_date or query.to_date:
+            conditions.append(self._get_date_filter(query.from_date, query.to_date))
+            found = True
 
-            logging.debug("Burst Photos:")
-            logging.debug(pformat(self._dbphotos_burst))
+        if query.modified_since or query.modified_before:
+            conditions.append(
+                self._get_modified_filter(query.modified_since, query.modified_before)
+            )
+            found = True
+
+        if query.near or query.bbox:
+            conditions.append(self._get_location_filter(query.near, query.bbox))
+            found = True
+
+        if query.text:
+            conditions.append(self._get_text_filter(query.text))
+            found = True
+
+        if not found and any([query.keywords, query.uuid, query.persons, query.albums]):
+            if not (query.month or query.day):
+                return None
+
+        types = []
+        if query.images:
+            types.append(sql["types"][_PHOTO_TYPE])
+        if query.movies:
+            types.append(sql["types"][_MOVIE_TYPE])
+        if not types:
+            return None
+        placeholders = ", ".join(["?"] * len(types))
+        conditions.append((f"{sql['type_column']} IN ({placeholders})", tuple(types)))
+
+        if favorite is not None:
+            op = "=" if favorite else "!="
+            conditions.append((f"COALESCE({sql['favorite_column']}, 0) {op} 1", ()))
+
+        if hidden is not None:
+            op = "=" if hidden else "!="
+            conditions.append((f"COALESCE({sql['hidden_column']}, 0) {op} 1", ()))
+
+        if query.uti:
+            conditions.append((sql["uti"], (query.uti,)))
+
+        return _and_filters(*conditions)
+
+    def _photos_from_database(self, query):
+        """ answer PhotoQuery query with a single SQL query instead of loading all photos 
+            (used when lazy=True); the matching photos are loaded into a new PhotosDB object 
+            scoped to just those photos and the rest of the query is run on it
+            returns list of PhotoInfo objects as photos() does """
+        asset_filter = self._database_filter(query)
+        if asset_filter is None:
+            return []
+
+        # month and day depend on each photo's time zone, the distance of photos near a
+        # point is computed for each photo and text is matched as photos() does, so these
+        # are checked once loaded
+        scoped = self._scoped(asset_filter)
+        return list(scoped._iter_photos(query._after_database()))
+
+    def _iter_photos_from_database(self, query, batch_size):
+        """ yield the photos matching PhotoQuery query (used by iter_photos() when lazy=True)
+            the matching rows are read from a cursor batch_size at a time and each batch is 
+            loaded into a new PhotosDB object scoped to the batch's range of primary keys so 
+            only one batch of photos is held in memory """
+        asset_filter = self._database_filter(query)
+        if asset_filter is None:
+            return
+
+        # month, day, location and text are checked once loaded as in _photos_from_database
+        remaining = query._after_database()
+
+        sql = self._get_query_sql()
+        pk_column = sql["pk_column"]
+        where, params = _filter_sql(_and_filters(self._scope, asset_filter))
+        (conn, c) = _open_sql_file(self._tmp_db)
+        try:
+            c.execute(f"{sql['photos']}{where} ORDER BY {pk_column}", params)
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                batch_filter = (
+                    f"{pk_column} >= ? AND {pk_column} <= ?",
+                    (rows[0][0], rows[-1][0]),
+                )
+                scoped = self._scoped(_and_filters(asset_filter, batch_filter))
+                yield from scoped._iter_photos(remaining)
+        finally:
+            conn.close()
+
+    def _estimate_query_count(self, query):
+        """ returns number of photos matching PhotoQuery query (see PhotoQuery.estimate_count) """
+        if not (self._lazy and "photos" not in self._loaded):
+            return sum(1 for _ in self._iter_photos(query))
+
+        asset_filter = self._database_filter(query)
+        if asset_filter is None:
+            return 0
+        sql = self._get_query_sql()
+        where, params = _filter_sql(_and_filters(self._scope, asset_filter))
+        (conn, c) = _open_sql_file(self._tmp_db)
+        try:
+            c.execute(f"SELECT COUNT(*) FROM ({sql['photos']}{where})", params)
+            return c.fetchone()[0]
+        finally:
+            conn.close()
+
+    def _scoped(self, asset_filter):
+        """ returns new PhotosDB for the same library that loads only the photos in this object's
+            scope that also match asset_filter; data is loaded lazily """
+        scoped = self.__class__.__new__(self.__class__)
+        for attr, value in self.__dict__.items():
+            if attr not in self._RELATIONSHIP_ATTRIBUTES:
+                scoped.__dict__[attr] = value
+        scoped._lazy = True
+        scoped._loaded = set()
+        scoped._cache_dir = None
+        scoped._columns = None
+        scoped._index = None
+        scoped._date_indexes = {}
+        scoped._geo_index = None
+        scoped._text_indexes = {}
+        scoped._photo_infos = weakref.WeakValueDictionary()
+        # share the index so the resource directories are read once for the library
+        scoped._resource_index = self._get_resource_index()
+        scoped._scope = _and_filters(self._scope, asset_filter)
+        return scoped
 
     def photos(
         self,
@@ -1316,6 +2709,29 @@ class PhotosDB:
         movies=False,
         from_date=None,
         to_date=None,
+        modified_since=None,
+        modified_before=None,
+        month=None,
+        day=None,
+        near=None,
+        bbox=None,
+        title=None,
+        description=None,
+        filename=None,
+        text_match="substring",
+        ignore_case=False,
+        favorite=None,
+        hidden=None,
+        uti=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        where=None,
     ):
         """ 
         Return a list of PhotoInfo objects
@@ -1326,91 +2742,618 @@ class PhotosDB:
         movies: if True, returns movie files, if False, does not return movies; default is False
         from_date: return photos with creation date >= from_date (datetime.datetime object, default None)
         to_date: return photos with creation date <= to_date (datetime.datetime object, default None)
+        modified_since: return photos with modification date >= modified_since 
+                (datetime.datetime object, default None)
+        modified_before: return photos with modification date < modified_before 
+                (datetime.datetime object, default None)
+                photos that have never been modified are not returned if either is set
+        month: return photos created in month (1-12) of any year (int, default None)
+        day: return photos created on day (1-31) of any month (int, default None)
+                month and day are matched against PhotoInfo.date, the date in the photo's time zone
+        near: (latitude, longitude, radius_km): return photos taken within radius_km km of
+                latitude, longitude in degrees (default None)
+        bbox: (min_latitude, min_longitude, max_latitude, max_longitude): return photos taken in
+                the bounding box with south-west corner min_latitude, min_longitude and north-east
+                corner max_latitude, max_longitude in degrees; the box crosses the 180th meridian
+                if min_longitude > max_longitude (default None)
+                photos with no location are not returned if either is set
+        title: list of search terms; return photos whose title matches all of them (default None)
+        description: list of search terms; return photos whose description matches all of them
+                (default None)
+        filename: list of search terms; return photos whose current or original filename
+                matches all of them (default None)
+        text_match: how the terms of title, description and filename match the text:
+                "substring": text contains the term (default)
+                "word": the term is in the text as whole words, e.g. "cat" matches "my cat"
+                        but not "catalog"
+                "prefix": the term is at the start of a word of the text, e.g. "cat" matches
+                        "my cat" and "catalog" but not "bobcat"
+                "regex": the term is a regular expression found in the text (re.search)
+        ignore_case: if True, title, description and filename are matched case-insensitively
+                (default False)
+        favorite: if True, return only favorites, if False, return only non-favorites; default is None (both)
+        hidden: if True, return only hidden photos, if False, return only photos that aren't hidden; 
+                default is None (both)
+        uti: return only photos whose uniform type identifier (UTI) contains uti (str, default None)
+        ismissing, hasadjustments, external_edit, shared, burst, live_photo, iscloudasset, incloud:
+                like favorite, True or False to return only photos for which the PhotoInfo property 
+                of the same name is True or False; default is None (both)
+        where: query expression combining terms with and, or, not and parentheses (default None)
+                terms are field:value (keyword, person, album, uuid, title, description and
+                filename, e.g. person:Katie or album:"Summer 2019"; title, description and 
+                filename match as set by text_match and ignore_case) or a flag: favorite, 
+                hidden, missing, edited, external_edit, shared, burst, live, cloudasset, incloud
+                e.g. 'keyword:Kids and (person:Katie or person:Suzy) and not hidden'
+                raises ValueError if the expression isn't valid
+        If lazy=True and the photos haven't been loaded yet, the query is run in the database
+        so only the matching photos are read
+        If columnar=True, the photos are filtered with vectorized operations on the columnar view
+        If bitmaps=True, the photos are found by combining the bitmap indexes
+        Dates, locations and text are found with indexes built the first time they're needed
+        """
+        query = PhotoQuery(
+            keywords=keywords,
+            uuid=uuid,
+            persons=persons,
+            albums=albums,
+            images=images,
+            movies=movies,
+            from_date=from_date,
+            to_date=to_date,
+            modified_since=modified_since,
+            modified_before=modified_before,
+            month=month,
+            day=day,
+            near=near,
+            bbox=bbox,
+            title=title,
+            description=description,
+            filename=filename,
+            text_match=text_match,
+            ignore_case=ignore_case,
+            favorite=favorite,
+            hidden=hidden,
+            uti=uti,
+            ismissing=ismissing,
+            hasadjustments=hasadjustments,
+            external_edit=external_edit,
+            shared=shared,
+            burst=burst,
+            live_photo=live_photo,
+            iscloudasset=iscloudasset,
+            incloud=incloud,
+            where=where,
+        )
+        photoinfo = self._query_photos(query)
+        if _debug():
+            logger.debug(f"photoinfo: {pformat(photoinfo)}")
+        return photoinfo
+
+    def iter_photos(
+        self,
+        keywords=None,
+        uuid=None,
+        persons=None,
+        albums=None,
+        images=True,
+        movies=False,
+        from_date=None,
+        to_date=None,
+        modified_since=None,
+        modified_before=None,
+        month=None,
+        day=None,
+        near=None,
+        bbox=None,
+        title=None,
+        description=None,
+        filename=None,
+        text_match="substring",
+        ignore_case=False,
+        favorite=None,
+        hidden=None,
+        uti=None,
+        ismissing=None,
+        hasadjustments=None,
+        external_edit=None,
+        shared=None,
+        burst=None,
+        live_photo=None,
+        iscloudasset=None,
+        incloud=None,
+        where=None,
+        batch_size=1000,
+    ):
+        """ 
+        Yield the PhotoInfo objects that photos() returns for the same arguments one at a time
+        instead of returning a list of all of them
+        If lazy=True and the photos haven't been loaded yet, the matching photos are read from
+        the database with a cursor, batch_size photos at a time, and only the current batch is 
+        held in memory; the photos aren't loaded into this PhotosDB object
+        Otherwise the query is run on the loaded photos as photos() does
         """
-        photos_sets = []  # list of photo sets to perform intersection of
-        if not any([keywords, uuid, persons, albums, from_date, to_date]):
+        query = PhotoQuery(
+            keywords=keywords,
+            uuid=uuid,
+            persons=persons,
+            albums=albums,
+            images=images,
+            movies=movies,
+            from_date=from_date,
+            to_date=to_date,
+            modified_since=modified_since,
+            modified_before=modified_before,
+            month=month,
+            day=day,
+            near=near,
+            bbox=bbox,
+            title=title,
+            description=description,
+            filename=filename,
+            text_match=text_match,
+            ignore_case=ignore_case,
+            favorite=favorite,
+            hidden=hidden,
+            uti=uti,
+            ismissing=ismissing,
+            hasadjustments=hasadjustments,
+            external_edit=external_edit,
+            shared=shared,
+            burst=burst,
+            live_photo=live_photo,
+            iscloudasset=iscloudasset,
+            incloud=incloud,
+            where=where,
+        )
+        yield from self._iter_query_photos(query, batch_size)
+
+    def _query_photos(self, query):
+        """ returns list of the photos matching PhotoQuery query (see photos()) """
+        if (
+            self._lazy
+            and "photos" not in self._loaded
+            and query._has_database_criteria()
+        ):
+            return self._photos_from_database(query)
+        return list(self._iter_photos(query))
+
+    def _iter_query_photos(self, query, batch_size):
+        """ yield the photos matching PhotoQuery query (see iter_photos()) """
+        if self._lazy and "photos" not in self._loaded:
+            yield from self._iter_photos_from_database(query, batch_size)
+        else:
+            yield from self._iter_photos(query)
+
+    def _iter_photos(self, query):
+        """ yield the photos matching PhotoQuery query from the loaded photos """
+        if self._bitmaps:
+            yield from self._iter_photos_from_index(query)
+            return
+
+        photos_sets = self._photos_sets(
+            query.keywords, query.uuid, query.persons, query.albums
+        )
+        indexed = query._indexed()
+
+        if self._columnar:
+            if any([query.keywords, query.uuid, query.persons, query.albums]):
+                if not photos_sets and not any(indexed.values()):
+                    return
+            # creation date range is checked in the columnar view, others with the indexes
+            photos_sets += self._indexed_sets(
+                dict(indexed, from_date=None, to_date=None)
+            )
+            yield from self._iter_photos_from_columns(photos_sets or None, query)
+            return
+
+        # list of photo sets to perform intersection of
+        if not any(
+            [query.keywords, query.uuid, query.persons, query.albums, *indexed.values()]
+        ):
             # return all the photos, filtering for images and movies
             # append keys of all photos as a single set to photos_sets
             photos_sets.append(set(self._dbphotos.keys()))
         else:
-            if albums:
-                album_titles = {}
-                for album_id in self._dbalbum_details:
-                    title = self._dbalbum_details[album_id]["title"]
-                    if title in album_titles:
-                        album_titles[title].append(album_id)
-                    else:
-                        album_titles[title] = [album_id]
-                for album in albums:
-                    # TODO: can have >1 album with same name. This globs them together.
-                    # Need a way to select with album?
-                    if album in album_titles:
-                        album_set = set()
-                        for album_id in album_titles[album]:
-                            album_set.update(self._dbalbums_album[album_id])
-                        photos_sets.append(album_set)
-                    else:
-                        logging.debug(f"Could not find album '{album}' in database")
+            photos_sets += self._indexed_sets(indexed)
 
-            if uuid:
-                for u in uuid:
-                    if u in self._dbphotos:
-                        photos_sets.append(set([u]))
-                    else:
-                        logging.debug(f"Could not find uuid '{u}' in database")
-
-            if keywords:
-                for keyword in keywords:
-                    if keyword in self._dbkeywords_keyword:
-                        photos_sets.append(set(self._dbkeywords_keyword[keyword]))
-                    else:
-                        logging.debug(f"Could not find keyword '{keyword}' in database")
-
-            if persons:
-                for person in persons:
-                    if person in self._dbfaces_person:
-                        photos_sets.append(set(self._dbfaces_person[person]))
-                    else:
-                        logging.debug(f"Could not find person '{person}' in database")
-            if from_date or to_date:
-                dsel = self._dbphotos
-                if from_date:
-                    dsel = {
-                        k: v for k, v in dsel.items() if v["imageDate"] >= from_date
-                    }
-                    logging.debug(
-                        f"Found %i items with from_date {from_date}" % len(dsel)
-                    )
-                if to_date:
-                    dsel = {k: v for k, v in dsel.items() if v["imageDate"] <= to_date}
-                    logging.debug(f"Found %i items with to_date {to_date}" % len(dsel))
-                photos_sets.append(set(dsel.keys()))
+        if photos_sets and query.where is not None:
+            # where expression is evaluated on the photos found by the other criteria
+            photos_sets = [self._where_set(query.where, set.intersection(*photos_sets))]
 
-        photoinfo = []
         if photos_sets:  # found some photos
             # get the intersection of each argument/search criteria
-            logging.debug(f"Got photo_sets: {photos_sets}")
+            if _debug():
+                logger.debug(f"Got photo_sets: {photos_sets}")
+            # the remaining criteria are checked for each photo in one pass, cheapest first
+            photos = self._dbphotos
+            uti = query.uti
+            check = query._photo_check()
             for p in set.intersection(*photos_sets):
+                info = photos[p]
                 # filter for non-selected burst photos
-                if self._dbphotos[p]["burst"] and not self._dbphotos[p]["burst_key"]:
+                if info["burst"] and not info["burst_key"]:
                     # not a key/selected burst photo, don't include in returned results
                     continue
 
                 # filter for images and/or movies
-                if (images and self._dbphotos[p]["type"] == _PHOTO_TYPE) or (
-                    movies and self._dbphotos[p]["type"] == _MOVIE_TYPE
-                ):
-                    info = PhotoInfo(db=self, uuid=p, info=self._dbphotos[p])
-                    photoinfo.append(info)
-        logging.debug(f"photoinfo: {pformat(photoinfo)}")
-        return photoinfo
+                if not query._matches_type(info):
+                    continue
+
+                if uti and not (info["UTI"] and uti in info["UTI"]):
+                    continue
+
+                photo = self._photo_info(p)
+                if check is None or check(photo):
+                    yield photo
+
+    def _photos_sets(self, keywords, uuid, persons, albums):
+        """ returns list of sets of uuids found for the keywords, uuid, persons and albums
+            in the library; photos() returns photos in all of the sets
+            keywords, persons and albums are matched using photo ids (see Relationship) and 
+            the intersection of their sets is returned as a single set of uuids """
+        # arrays or sets of photo ids
+        id_sets = []
+        if albums:
+            album_titles = self._album_titles()
+            for album in albums:
+                # TODO: can have >1 album with same name. This globs them together.
+                # Need a way to select with album?
+                if album in album_titles:
+                    album_set = set()
+                    for album_id in album_titles[album]:
+                        album_set.update(self._dbalbums.photo_ids(album_id))
+                    id_sets.append(album_set)
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find album '{album}' in database")
+
+        if keywords:
+            for keyword in keywords:
+                if keyword in self._dbkeywords:
+                    id_sets.append(self._dbkeywords.photo_ids(keyword))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find keyword '{keyword}' in database")
+
+        if persons:
+            for person in persons:
+                if person in self._dbfaces:
+                    id_sets.append(self._dbfaces.photo_ids(person))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find person '{person}' in database")
+
+        photos_sets = []
+        if id_sets:
+            # start from the smallest and keep the photo ids found in each of the others
+            id_sets.sort(key=len)
+            ids = set(id_sets[0])
+            for photo_ids in id_sets[1:]:
+                ids.intersection_update(photo_ids)
+            uuids = self._dbuuids
+            photos_sets.append({uuids[id_] for id_ in ids})
+
+        if uuid:
+            for u in uuid:
+                if u in self._dbphotos:
+                    photos_sets.append(set([u]))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find uuid '{u}' in database")
+
+        return photos_sets
+
+    def _where_set(self, where, candidates):
+        """ returns set of the uuids in candidates of the photos matching query expression where
+            (see PhotoQuery) """
+        found = where.evaluate(self, candidates)
+        if _debug():
+            logger.debug(f"Found {len(found)} of {len(candidates)} photos for {where}")
+        return found
+
+    def _where_term_set(self, term):
+        """ returns set of uuids of the photos matching field:value term of a query expression;
+            keywords, persons and albums are found as photos() finds them but a value that
+            isn't in the library matches no photos """
+        field = term.field
+        value = term.value
+        if field in ("title", "description", "filename"):
+            return self._get_text_index(field).search(
+                value, term.match, term.ignore_case
+            )
+        if field == "uuid":
+            return {value} if value in self._dbphotos else set()
+
+        ids = set()
+        if field == "album":
+            for album_id in self._album_titles().get(value, []):
+                ids.update(self._dbalbums.photo_ids(album_id))
+        elif field == "keyword":
+            if value in self._dbkeywords:
+                ids.update(self._dbkeywords.photo_ids(value))
+        elif value in self._dbfaces:
+            ids.update(self._dbfaces.photo_ids(value))
+        uuids = self._dbuuids
+        return {uuids[id_] for id_ in ids}
+
+    def _get_date_index(self, field):
+        """ returns sorted index of the photos by date field (see DateIndex), building it if needed 
+            field: "imageDate" (creation date) or "lastmodifieddate" (modification date) """
+        date_index = self._date_indexes.get(field)
+        if date_index is None:
+            date_index = self._date_indexes[field] = DateIndex(self, field)
+            if _debug():
+                logger.debug(f"Built date index for {field}")
+        return date_index
+
+    def _date_sets(
+        self,
+        from_date=None,
+        to_date=None,
+        modified_since=None,
+        modified_before=None,
+        month=None,
+        day=None,
+    ):
+        """ returns list of sets of uuids of the photos matching the date criteria of photos() 
+            that are set, found using the date indexes """
+
+        def timestamp(dt):
+            return _datetime_to_coredata(dt) if dt else None
+
+        photos_sets = []
+        if from_date or to_date:
+            date_index = self._get_date_index("imageDate")
+            photos_sets.append(
+                set(date_index.range(timestamp(from_date), timestamp(to_date)))
+            )
+            if _debug():
+                logger.debug(
+                    f"Found {len(photos_sets[-1])} items from {from_date} to {to_date}"
+                )
+
+        if modified_since or modified_before:
+            # photos with no modification date aren't in the index so aren't found
+            date_index = self._get_date_index("lastmodifieddate")
+            photos_sets.append(
+                set(
+                    date_index.range(
+                        timestamp(modified_since),
+                        timestamp(modified_before),
+                        include_end=False,
+                    )
+                )
+            )
+            if _debug():
+                logger.debug(
+                    f"Found {len(photos_sets[-1])} items modified since {modified_since} "
+                    f"before {modified_before}"
+                )
+
+        if month or day:
+            photos_sets.append(
+                set(self._get_date_index("imageDate").calendar(month, day))
+            )
+            if _debug():
+                logger.debug(
+                    f"Found {len(photos_sets[-1])} items in month {month} day {day}"
+                )
+
+        return photos_sets
+
+    def _get_geo_index(self):
+        """ returns grid index of the photos by location (see GeoIndex), building it if needed """
+        if self._geo_index is None:
+            self._geo_index = GeoIndex(self)
+            if _debug():
+                logger.debug("Built location index")
+        return self._geo_index
+
+    def _location_sets(self, near=None, bbox=None):
+        """ returns list of sets of uuids of the photos matching the location criteria of
+            photos() that are set, found using the location index """
+        photos_sets = []
+        if near:
+            photos_sets.append(set(self._get_geo_index().near(*near)))
+            if _debug():
+                logger.debug(f"Found {len(photos_sets[-1])} items near {near}")
+
+        if bbox:
+            photos_sets.append(set(self._get_geo_index().bbox(*bbox)))
+            if _debug():
+                logger.debug(f"Found {len(photos_sets[-1])} items in {bbox}")
+
+        return photos_sets
+
+    def _get_text_index(self, field):
+        """ returns inverted index of the text of the photos (see TextIndex), building it if
+            needed; field: "title", "description" or "filename" """
+        text_index = self._text_indexes.get(field)
+        if text_index is None:
+            text_index = self._text_indexes[field] = TextIndex(self, field)
+            if _debug():
+                logger.debug(f"Built text index for {field}")
+        return text_index
+
+    def _text_sets(self, text=None):
+        """ returns list of sets of uuids of the photos matching each search term of the text
+            criteria text (see PhotoQuery), found using the text indexes """
+        photos_sets = []
+        if not text:
+            return photos_sets
+        for field in ("title", "description", "filename"):
+            for term in text[field] or []:
+                photos_sets.append(
+                    self._get_text_index(field).search(
+                        term, text["match"], text["ignore_case"]
+                    )
+                )
+                if _debug():
+                    logger.debug(
+                        f"Found {len(photos_sets[-1])} items with {field} {term}"
+                    )
+        return photos_sets
+
+    def _indexed_sets(self, indexed):
+        """ returns list of sets of uuids of the photos matching the date, location and text
+            criteria of photos() in dict indexed (see _iter_photos) that are set """
+        indexed = dict(indexed)
+        near = indexed.pop("near", None)
+        bbox = indexed.pop("bbox", None)
+        text = indexed.pop("text", None)
+        return (
+            self._date_sets(**indexed)
+            + self._location_sets(near, bbox)
+            + self._text_sets(text)
+        )
+
+    def _album_titles(self):
+        """ returns dict of album title: list of album uuids with that title """
+        album_titles = {}
+        for album_id in self._dbalbum_details:
+            title = self._dbalbum_details[album_id]["title"]
+            if title in album_titles:
+                album_titles[title].append(album_id)
+            else:
+                album_titles[title] = [album_id]
+        return album_titles
+
+    def _photo_info(self, uuid):
+        """ returns the PhotoInfo object for photo uuid; the same object is returned for as
+            long as it's in use so its memoized properties are computed once """
+        photo = self._photo_infos.get(uuid)
+        if photo is None:
+            photo = self._photo_infos[uuid] = PhotoInfo(
+                db=self, uuid=uuid, info=self._dbphotos[uuid]
+            )
+        return photo
+
+    def _get_index(self):
+        """ returns bitmap indexes of the photo data (see PhotoIndex), building them if needed """
+        if self._index is None:
+            self._index = PhotoIndex(self)
+        return self._index
+
+    def _iter_photos_from_index(self, query):
+        """ yield the photos matching PhotoQuery query using the bitmap indexes (used when bitmaps=True) """
+        index = self._get_index()
+        keywords = query.keywords
+        uuid = query.uuid
+        persons = query.persons
+        albums = query.albums
+        indexed = query._indexed()
+
+        # bitmaps of the photos matching each keyword, uuid, person and album
+        bitmaps = []
+        if albums:
+            album_titles = self._album_titles()
+            for album in albums:
+                # albums with the same title are globbed together as in _photos_sets
+                if album in album_titles:
+                    bitmap = Bitmap()
+                    for album_id in album_titles[album]:
+                        bitmap |= index.related("_dbalbums", album_id)
+                    bitmaps.append(bitmap)
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find album '{album}' in database")
+
+        if uuid:
+            for u in uuid:
+                if u in self._dbphotos:
+                    bitmaps.append(index.uuid(u))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find uuid '{u}' in database")
+
+        if keywords:
+            for keyword in keywords:
+                if keyword in self._dbkeywords:
+                    bitmaps.append(index.related("_dbkeywords", keyword))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find keyword '{keyword}' in database")
+
+        if persons:
+            for person in persons:
+                if person in self._dbfaces:
+                    bitmaps.append(index.related("_dbfaces", person))
+                else:
+                    if _debug():
+                        logger.debug(f"Could not find person '{person}' in database")
+
+        if any([keywords, uuid, persons, albums]) and not bitmaps:
+            if not any(indexed.values()):
+                return
+
+        # photos found by the date and location indexes
+        uuids = self._dbuuids
+        for indexed_set in self._indexed_sets(indexed):
+            bitmaps.append(Bitmap(uuids.get(u) for u in indexed_set))
+
+        bitmap = index.select(query.images, query.movies, **query.flags)
+        for other in bitmaps:
+            bitmap &= other
+
+        if query.where is not None:
+            # where expression is evaluated on the photos found by the other criteria
+            bitmap = Bitmap(
+                uuids.get(u)
+                for u in self._where_set(query.where, {uuids[id_] for id_ in bitmap})
+            )
+
+        # uti, title and description aren't indexed so are checked for each photo found
+        photos = self._dbphotos
+        uti = query.uti
+        check = query._photo_check(flags=False)
+        for id_ in bitmap:
+            u = uuids[id_]
+            info = photos[u]
+            if uti and not (info["UTI"] and uti in info["UTI"]):
+                continue
+            photo = self._photo_info(u)
+            if check is None or check(photo):
+                yield photo
+
+    def _get_columns(self):
+        """ returns columnar view of the photo data (see PhotoColumns), building it if needed """
+        if self._columns is None:
+            self._columns = PhotoColumns(self)
+        return self._columns
+
+    def _iter_photos_from_columns(self, photos_sets, query):
+        """ yield the photos matching PhotoQuery query using the columnar view (used when columnar=True)
+            photos_sets: list of sets of uuids found with the other indexes or None to select all photos """
+        columns = self._get_columns()
+        mask = columns.mask(
+            query.images,
+            query.movies,
+            query.from_date,
+            query.to_date,
+            query.uti,
+            **query.flags,
+        )
+        if photos_sets:
+            mask &= columns.select(set.intersection(*photos_sets))
+        found = columns.uuid[mask]
+        if query.where is not None:
+            # where expression is evaluated on the photos found by the other criteria
+            selected = self._where_set(query.where, set(found))
+            found = [uuid for uuid in found if uuid in selected]
+        # title and description aren't in the columnar view so are checked for each photo
+        check = query._photo_check(flags=False)
+        for uuid in found:
+            photo = self._photo_info(uuid)
+            if check is None or check(photo):
+                yield photo
 
     def __repr__(self):
         return f"osxphotos.{self.__class__.__name__}(dbfile='{self.db_path}')"
 
-    # compare two PhotosDB objects for equality
+    # compare two PhotosDB objects for equality: objects for the same library are equal
+    # (comparing all the data loaded would cost the size of the library)
     def __eq__(self, other):
         if isinstance(other, self.__class__):
-            return self.__dict__ == other.__dict__
+            return self._dbfile == other._dbfile
 
         return False
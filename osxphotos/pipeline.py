@@ -0,0 +1,241 @@
+"""
+Pipeline and PipelineStage classes
+Runs items through a sequence of stages, each with its own threads, connected by bounded queues
+so a slow stage holds back the stages before it instead of letting work pile up in memory
+Used by the export command to overlap copying files with rendering sidecars etc.
+"""
+
+import queue
+import threading
+import time
+
+# how often (seconds) threads waiting on a queue check whether the pipeline was stopped
+_POLL_INTERVAL = 0.1
+
+# put on a stage's queue by the previous stage (or the source) when it's done
+_DONE = object()
+
+
+class PipelineStage:
+    """ a stage of a Pipeline: func(item) is called for each item in workers threads and
+        returns the item passed to the next stage
+        if ordered=True, func is called for the items in the order they entered the pipeline
+        (only possible with 1 worker), e.g. to hand out names in a predictable order
+        queue_size: number of items that can wait for the stage, default 2 * workers """
+
+    def __init__(self, name, func, workers=1, ordered=False, queue_size=None):
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1: {workers}")
+        if ordered and workers != 1:
+            raise ValueError(f"ordered stage {name} must have 1 worker: {workers}")
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.ordered = ordered
+        self.queue_size = queue_size or 2 * workers
+
+
+class _StageState:
+    """ queue and counters of a stage while the pipeline runs """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.queue = queue.Queue(stage.queue_size)
+        self.lock = threading.Lock()
+        self.running = stage.workers
+        self.processed = 0
+        self.busy = 0.0
+        self.max_depth = 0
+        self.depth_total = 0
+        self.depth_count = 0
+
+
+class _Entry:
+    """ item going through the pipeline, with its position and exception raised by a stage """
+
+    __slots__ = ("seq", "item", "error")
+
+    def __init__(self, seq, item):
+        self.seq = seq
+        self.item = item
+        self.error = None
+
+
+class Pipeline:
+    """
+    Runs items through stages (list of PipelineStage)
+    run(items) yields the items, as returned by the last stage, in the order of items
+    If a stage raises an exception for an item, the item skips the remaining stages and run()
+    raises the exception when it gets to the item
+    stats() returns the number of items each stage processed, how busy it was and how deep
+    its queue got, to find the stage holding back the others
+    """
+
+    def __init__(self, stages):
+        if not stages:
+            raise ValueError("pipeline needs at least one stage")
+        self.stages = stages
+        self._states = []
+        self._output = None
+        self._stop = threading.Event()
+        self._start = None
+        self._end = None
+
+    def _put(self, state, entry):
+        """ put entry on state's queue, waiting while it's full; returns False if stopped """
+        while not self._stop.is_set():
+            try:
+                state.queue.put(entry, timeout=_POLL_INTERVAL)
+            except queue.Full:
+                continue
+            if entry is not _DONE:
+                depth = state.queue.qsize()
+                with state.lock:
+                    state.max_depth = max(state.max_depth, depth)
+                    state.depth_total += depth
+                    state.depth_count += 1
+            return True
+        return False
+
+    def _get(self, q):
+        """ returns next entry from queue q, waiting for it; returns None if stopped """
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=_POLL_INTERVAL)
+            except queue.Empty:
+                continue
+        return None
+
+    def _feed(self, items):
+        """ put items on the first stage's queue """
+        first = self._states[0]
+        seq = 0
+        try:
+            for item in items:
+                if not self._put(first, _Entry(seq, item)):
+                    return
+                seq += 1
+        except BaseException as e:
+            # error getting the items: goes through the stages (which skip it) so it's
+            # raised by run() after the items before it
+            entry = _Entry(seq, None)
+            entry.error = e
+            self._put(first, entry)
+        for _ in range(first.stage.workers):
+            self._put(first, _DONE)
+
+    def _entries(self, state):
+        """ yield the entries on state's queue until the previous stage is done, in the order
+            they entered the pipeline if the stage is ordered """
+        if not state.stage.ordered:
+            while True:
+                entry = self._get(state.queue)
+                if entry is None or entry is _DONE:
+                    return
+                yield entry
+
+        waiting = {}
+        next_seq = 0
+        while True:
+            entry = self._get(state.queue)
+            if entry is None or entry is _DONE:
+                return
+            waiting[entry.seq] = entry
+            while next_seq in waiting:
+                yield waiting.pop(next_seq)
+                next_seq += 1
+
+    def _work(self, index):
+        """ run stage index on the entries on its queue and pass them to the next stage """
+        state = self._states[index]
+        output = self._states[index + 1] if index + 1 < len(self._states) else None
+        func = state.stage.func
+        for entry in self._entries(state):
+            if entry.error is None:
+                start = time.perf_counter()
+                try:
+                    entry.item = func(entry.item)
+                except BaseException as e:
+                    entry.error = e
+                elapsed = time.perf_counter() - start
+                with state.lock:
+                    state.processed += 1
+                    state.busy += elapsed
+            if not self._put(output or self._output, entry):
+                return
+
+        with state.lock:
+            state.running -= 1
+            last = state.running == 0
+        if last:
+            # the last worker of the stage to finish tells the next stage it's done
+            for _ in range(output.stage.workers if output else 1):
+                self._put(output or self._output, _DONE)
+
+    def run(self, items):
+        """ run items (iterable) through the stages; yields the items in the order of items
+            when it's done or stopped (an exception or the generator is closed), the threads
+            finish the items they're processing and stop """
+        self._stop.clear()
+        self._states = [_StageState(stage) for stage in self.stages]
+        # queue of the items done, read by run() in order
+        self._output = _StageState(
+            PipelineStage(
+                "output", None, ordered=True, queue_size=2 * self.stages[-1].workers
+            )
+        )
+        self._start = time.perf_counter()
+        self._end = None
+
+        threads = [threading.Thread(target=self._feed, args=(items,), daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(
+                threading.Thread(target=self._work, args=(index,), daemon=True)
+                for _ in range(stage.workers)
+            )
+        for thread in threads:
+            thread.start()
+
+        try:
+            for entry in self._entries(self._output):
+                if entry.error is not None:
+                    raise entry.error
+                yield entry.item
+        finally:
+            self._end = time.perf_counter()
+            self._stop.set()
+            # wait for the items being processed so nothing is still running when run() returns
+            # or raises
+            for thread in threads:
+                thread.join()
+
+    def stats(self):
+        """ returns list with a dict for each stage (while or after running) with:
+            name, workers, processed: number of items the stage processed, busy: seconds spent
+            processing them (all workers), utilization: share of the time since the pipeline
+            started the workers were busy (near 1.0 is the bottleneck), throughput: items
+            processed per second, queue_depth: items waiting now, max_queue_depth and
+            mean_queue_depth: items waiting when an item was queued """
+        if self._start is None:
+            return []
+        elapsed = max((self._end or time.perf_counter()) - self._start, 1e-9)
+        stats = []
+        for state in self._states:
+            stage = state.stage
+            with state.lock:
+                stats.append(
+                    {
+                        "name": stage.name,
+                        "workers": stage.workers,
+                        "processed": state.processed,
+                        "busy": state.busy,
+                        "utilization": state.busy / (stage.workers * elapsed),
+                        "throughput": state.processed / elapsed,
+                        "queue_depth": state.queue.qsize(),
+                        "max_queue_depth": state.max_depth,
+                        "mean_queue_depth": state.depth_total / state.depth_count
+                        if state.depth_count
+                        else 0.0,
+                    }
+                )
+        return stats
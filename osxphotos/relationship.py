@@ -0,0 +1,207 @@
+"""
+IdTable and Relationship classes
+Dictionary-encoded storage for the many-to-many relationships between the photos in a PhotosDB
+and their keywords, persons and albums
+Each photo uuid and each keyword, person or album is stored once in an IdTable that gives it
+a small integer id; a Relationship stores the links between them as arrays of these ids
+"""
+
+from array import array
+
+# array type code used to store ids: unsigned 32-bit on all supported platforms
+_ID_TYPECODE = "I"
+
+
+class IdTable:
+    """ Assigns consecutive integer ids to values (e.g. photo uuids) so each value is stored once
+        Ids are never reused or reassigned so they stay valid as the table grows """
+
+    def __init__(self):
+        self._values = []
+        self._ids = {}
+
+    def encode(self, value):
+        """ returns id of value, adding value to the table if it's not already in it """
+        id_ = self._ids.get(value)
+        if id_ is None:
+            id_ = self._ids[value] = len(self._values)
+            self._values.append(value)
+        return id_
+
+    def intern(self, value):
+        """ returns the copy of value stored in the table, adding value if it's not already in it """
+        return self._values[self.encode(value)]
+
+    def get(self, value):
+        """ returns id of value or None if value is not in the table """
+        return self._ids.get(value)
+
+    def __getitem__(self, id_):
+        """ returns value with id id_ """
+        return self._values[id_]
+
+    def __len__(self):
+        return len(self._values)
+
+    def __eq__(self, other):
+        if isinstance(other, self.__class__):
+            return self._values == other._values
+        return False
+
+    __hash__ = None
+
+    def __getstate__(self):
+        # the id lookup is rebuilt from the values when unpickled
+        return self._values
+
+    def __setstate__(self, values):
+        self._values = values
+        self._ids = {value: id_ for id_, value in enumerate(values)}
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self._values})"
+
+
+class Relationship:
+    """ Many-to-many relationship between photos and values (keywords, persons or album uuids)
+        uuids: IdTable of photo uuids, shared by all the relationships of a PhotosDB so the
+               photo ids found in different relationships can be compared directly
+        The values of each photo are stored as a tuple of value ids in the order they were added;
+        the photos with each value are stored as an array of photo ids
+        Removing a photo only records which of its links to drop from the arrays of its values;
+        an array is compacted once half of it is to be dropped or when its photo ids are needed,
+        so removing a photo doesn't cost the size of every album, keyword or person it's in
+        Iterating over a Relationship gives the values that have at least one photo """
+
+    def __init__(self, uuids):
+        self.uuids = uuids
+        self.values = IdTable()
+        # photo id: tuple of value ids
+        self._by_photo = {}
+        # value id: array of photo ids
+        self._by_value = {}
+        # value id: dict of photo id: number of links of the photo removed but still in the
+        # value's array, and value id: total number of these links
+        self._removed = {}
+        self._removed_count = {}
+
+    def add(self, value, uuid):
+        """ add link between photo uuid and value """
+        photo_id = self.uuids.encode(uuid)
+        value_id = self.values.encode(value)
+        self._by_photo[photo_id] = self._by_photo.get(photo_id, ()) + (value_id,)
+        removed = self._removed.get(value_id)
+        if removed is not None and photo_id in removed:
+            # photo is added back (e.g. by PhotosDB.refresh): keep a link that's still there
+            self._unremove(value_id, photo_id)
+            return
+        photo_ids = self._by_value.get(value_id)
+        if photo_ids is None:
+            photo_ids = self._by_value[value_id] = array(_ID_TYPECODE)
+        photo_ids.append(photo_id)
+
+    def remove_photo(self, uuid):
+        """ remove all links to photo uuid """
+        photo_id = self.uuids.get(uuid)
+        for value_id in self._by_photo.pop(photo_id, ()):
+            removed = self._removed.setdefault(value_id, {})
+            removed[photo_id] = removed.get(photo_id, 0) + 1
+            count = self._removed_count[value_id] = (
+                self._removed_count.get(value_id, 0) + 1
+            )
+            if 2 * count >= len(self._by_value[value_id]):
+                self._compact(value_id)
+
+    def _unremove(self, value_id, photo_id):
+        """ keep one of the removed links of photo_id still in the array of value_id """
+        removed = self._removed[value_id]
+        removed[photo_id] -= 1
+        if not removed[photo_id]:
+            del removed[photo_id]
+        self._removed_count[value_id] -= 1
+        if not removed:
+            del self._removed[value_id]
+            del self._removed_count[value_id]
+
+    def _compact(self, value_id):
+        """ drop the removed links from the array of value_id, deleting it if it's empty """
+        removed = self._removed.pop(value_id)
+        del self._removed_count[value_id]
+        photo_ids = array(_ID_TYPECODE)
+        for id_ in self._by_value[value_id]:
+            if removed.get(id_):
+                removed[id_] -= 1
+            else:
+                photo_ids.append(id_)
+        if photo_ids:
+            self._by_value[value_id] = photo_ids
+        else:
+            del self._by_value[value_id]
+
+    def has_photo(self, uuid):
+        """ returns True if photo uuid has at least one value """
+        return self.uuids.get(uuid) in self._by_photo
+
+    def value_ids(self, uuid):
+        """ returns tuple of ids of the values of photo uuid; decode with decode() """
+        return self._by_photo.get(self.uuids.get(uuid), ())
+
+    def decode(self, value_ids):
+        """ returns list of the values with ids in value_ids """
+        values = self.values
+        return [values[id_] for id_ in value_ids]
+
+    def photo_ids(self, value):
+        """ returns array of ids of the photos with value (ids in uuids) """
+        value_id = self.values.get(value)
+        if value_id in self._removed:
+            self._compact(value_id)
+        return self._by_value.get(value_id, ())
+
+    def count(self, value):
+        """ returns number of links to value """
+        value_id = self.values.get(value)
+        return len(self._by_value.get(value_id, ())) - self._removed_count.get(
+            value_id, 0
+        )
+
+    def __iter__(self):
+        values = self.values
+        return (values[id_] for id_ in self._by_value)
+
+    def __len__(self):
+        return len(self._by_value)
+
+    def __contains__(self, value):
+        return self.values.get(value) in self._by_value
+
+    def as_dict(self):
+        """ returns dict of value: list of uuids of the photos with value """
+        for value_id in list(self._removed):
+            self._compact(value_id)
+        uuids = self.uuids
+        return {
+            self.values[value_id]: [uuids[id_] for id_ in photo_ids]
+            for value_id, photo_ids in self._by_value.items()
+        }
+
+    def photos_as_dict(self):
+        """ returns dict of uuid: list of values of the photo """
+        return {
+            self.uuids[photo_id]: self.decode(value_ids)
+            for photo_id, value_ids in self._by_photo.items()
+        }
+
+    def __eq__(self, other):
+        # compare what's stored rather than the ids, which depend on the order things were added
+        if isinstance(other, self.__class__):
+            return (
+                self.as_dict() == other.as_dict()
+                and self.photos_as_dict() == other.photos_as_dict()
+            )
+        return False
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.as_dict()})"
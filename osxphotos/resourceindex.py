@@ -0,0 +1,148 @@
+"""
+ResourceIndex class
+Names of the files in the resource directories of a Photos library (edited versions, live photo
+movies, renders) read with one os.scandir pass per directory tree so that PhotoInfo.path_edited
+and path_live_photo look up whether a file exists instead of checking the disk for every photo
+Other files (e.g. originals) can be checked ahead of time, many at once, with prefetch()
+"""
+
+import os
+import os.path
+
+
+def _list_dir(directory):
+    """ returns (set of names of the files, list of paths of the subdirectories) of directory
+        or None if it can't be read; symbolic links to directories aren't followed """
+    files = set()
+    subdirs = []
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        files.add(entry.name)
+                except OSError:
+                    continue
+    except OSError:
+        # doesn't exist or can't be read
+        return None
+    return files, subdirs
+
+
+class ResourceIndex:
+    """
+    Files in directory trees roots, each read the first time a path in it is looked up
+    Paths outside the roots are checked on disk unless they were checked by prefetch()
+    The index isn't updated when files are added or removed: call refresh() to read the
+    directories again
+    """
+
+    def __init__(self, roots):
+        self.roots = [os.path.normpath(root) for root in roots]
+        # root: {directory: set of names of the files in it}
+        self._dirs = {}
+        # root: {file name: list of directories with the file, in os.walk (top-down) order}
+        self._names = {}
+        # path: True if it's a file, for the paths outside the roots checked by prefetch()
+        self._stats = {}
+
+    def _root(self, path):
+        """ returns the root that contains path or None """
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def _scan(self, root, executor=None):
+        """ read the directories in root, one scandir per directory, a level of the tree at a
+            time; the directories of each level are read concurrently with executor
+            (concurrent.futures.Executor) if given """
+        listings = {}
+        level = [root]
+        while level:
+            results = (
+                executor.map(_list_dir, level) if executor else map(_list_dir, level)
+            )
+            next_level = []
+            for directory, listing in zip(level, results):
+                if listing is not None:
+                    listings[directory] = listing
+                    next_level.extend(listing[1])
+            level = next_level
+
+        # record the directories in the order os.walk would visit them
+        dirs = {}
+        names = {}
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            if directory not in listings:
+                continue
+            files, subdirs = listings[directory]
+            dirs[directory] = files
+            for name in files:
+                names.setdefault(name, []).append(directory)
+            stack.extend(reversed(subdirs))
+        # _dirs marks root as read so it's set last for threads looking up paths at the same time
+        self._names[root] = names
+        self._dirs[root] = dirs
+
+    def _get_dirs(self, root):
+        if root not in self._dirs:
+            self._scan(root)
+        return self._dirs[root]
+
+    def isfile(self, path):
+        """ returns True if path is a file, like os.path.isfile """
+        path = os.path.normpath(path)
+        root = self._root(path)
+        if root is None:
+            isfile = self._stats.get(path)
+            return os.path.isfile(path) if isfile is None else isfile
+        directory, name = os.path.split(path)
+        return name in self._get_dirs(root).get(directory, ())
+
+    def find(self, directory, name):
+        """ returns path of the file name in directory or its subdirectories or None if there
+            isn't one; if there's more than one, the first found by os.walk(directory) """
+        directory = os.path.normpath(directory)
+        root = self._root(directory)
+        if root is None:
+            for dirname, _, filelist in os.walk(directory):
+                if name in filelist:
+                    return os.path.join(dirname, name)
+            return None
+
+        self._get_dirs(root)
+        for dirname in self._names[root].get(name, []):
+            if dirname == directory or dirname.startswith(directory + os.sep):
+                return os.path.join(dirname, name)
+        return None
+
+    def prefetch(self, paths, executor):
+        """ check paths ahead of isfile() using executor (concurrent.futures.Executor) to run
+            the checks concurrently: the roots that contain any of paths that haven't been read
+            are read and the other paths are checked on disk
+            only the paths outside the roots checked by the last call are kept so memory use
+            doesn't grow with the number of paths checked over time """
+        roots = set()
+        others = []
+        for path in paths:
+            path = os.path.normpath(path)
+            root = self._root(path)
+            if root is None:
+                others.append(path)
+            elif root not in self._dirs:
+                roots.add(root)
+
+        for root in roots:
+            self._scan(root, executor)
+        self._stats = dict(zip(others, executor.map(os.path.isfile, others)))
+
+    def refresh(self):
+        """ forget the files read so the directories are read again when next needed """
+        self._dirs = {}
+        self._names = {}
+        self._stats = {}
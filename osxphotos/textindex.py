@@ -0,0 +1,240 @@
+"""
+TextIndex class
+Inverted indexes of the title, description or filename of the photos of a PhotosDB so that
+PhotosDB.photos() finds the photos whose text matches a search term by checking only the photos
+that contain the term's trigrams or words instead of every photo
+"""
+
+import re
+from array import array
+from bisect import bisect_left
+
+# info fields of the photo searched by each text field of photos()
+_TEXT_FIELDS = {
+    "title": ("name",),
+    "description": ("extendedDescription",),
+    "filename": ("filename", "originalFilename"),
+}
+
+# ways a search term can match the text (see TextIndex.search)
+_TEXT_MATCHES = ("substring", "word", "prefix", "regex")
+
+_WORD = re.compile(r"\w+")
+
+# regular expressions whose literal text can't be found by scanning the pattern:
+# verbose mode (whitespace is ignored) or escapes that aren't a single character
+_VERBOSE = re.compile(r"\(\?[aiLmsux]*x")
+_NUMERIC_ESCAPES = "xuUN0123456789"
+_REPEAT = re.compile(r"\{(\d*)(?:,\d*)?\}")
+
+
+def _text_pattern(term, match, ignore_case):
+    """ returns compiled regular expression that finds term in a text for match "word", "prefix"
+        or "regex", or None for "substring"; if ignore_case, the pattern of "word" and "prefix"
+        is for case-folded text
+        raises ValueError if match isn't valid or term isn't a valid regular expression """
+    if match not in _TEXT_MATCHES:
+        raise ValueError(f"match must be one of {', '.join(_TEXT_MATCHES)}: {match}")
+    if match == "substring":
+        return None
+    if match == "regex":
+        try:
+            return re.compile(term, re.IGNORECASE if ignore_case else 0)
+        except re.error as e:
+            raise ValueError(f"invalid regular expression {term!r}: {e}")
+    if ignore_case:
+        term = term.casefold()
+    pattern = r"(?<!\w)" + re.escape(term)
+    if match == "word":
+        pattern += r"(?!\w)"
+    return re.compile(pattern)
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _regex_literals(pattern):
+    """ returns list of strings that every match of regular expression pattern contains, found
+        by scanning the pattern for runs of literal characters outside groups; an empty list
+        if the pattern has alternatives at the top level or can't be scanned """
+    if _VERBOSE.search(pattern):
+        return []
+
+    literals = []
+    run = ""
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        i += 1
+        literal = None
+        optional = False
+        if char == "\\":
+            escaped = pattern[i : i + 1]
+            i += 1
+            if escaped and escaped in _NUMERIC_ESCAPES:
+                return []
+            if escaped and not escaped.isalnum():
+                literal = escaped
+        elif char == "[":
+            # skip character set; a ] first in the set is part of it
+            if pattern[i : i + 1] == "^":
+                i += 1
+            if pattern[i : i + 1] == "]":
+                i += 1
+            while i < len(pattern) and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+            i += 1
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|":
+            if depth == 0:
+                return []
+        elif char in "*?":
+            optional = True
+        elif char == "{":
+            repeat = _REPEAT.match(pattern, i - 1)
+            if repeat:
+                optional = not repeat.group(1).strip("0")
+                i = repeat.end()
+            else:
+                literal = char
+        elif char not in ".^$+":
+            literal = char
+
+        if literal is not None and depth == 0:
+            run += literal
+            continue
+        if optional:
+            # the character before the repeat, if it's the last of the run, is optional
+            run = run[:-1]
+        if run:
+            literals.append(run)
+        run = ""
+    if run:
+        literals.append(run)
+    return literals
+
+
+class TextIndex:
+    """
+    Text of a field of the photos of a PhotosDB with inverted indexes of its trigrams and words
+    field: "title", "description" or "filename" (current and original filename)
+    uuids: uuid of the photo of each text; texts: the texts
+    The indexes are of the case-folded text; photos with no text (None or "") aren't in the index
+    """
+
+    def __init__(self, db, field):
+        self.field = field
+        self.uuids = []
+        self.texts = []
+        self._folded = []
+
+        trigrams = {}
+        words = {}
+        for uuid, info in db._dbphotos.items():
+            for key in _TEXT_FIELDS[field]:
+                text = info[key]
+                if not text:
+                    continue
+                i = len(self.texts)
+                folded = text.casefold()
+                self.uuids.append(uuid)
+                self.texts.append(text)
+                self._folded.append(folded)
+                for trigram in _trigrams(folded):
+                    trigrams.setdefault(trigram, []).append(i)
+                for word in set(_WORD.findall(folded)):
+                    words.setdefault(word, []).append(i)
+
+        # trigram or word: array of the positions in texts of the texts that contain it
+        self._trigrams = {key: array("L", ids) for key, ids in trigrams.items()}
+        self._words = {key: array("L", ids) for key, ids in words.items()}
+        self._vocabulary = sorted(words)
+
+    def __len__(self):
+        return len(self.texts)
+
+    def _intersect(self, postings):
+        """ returns set of the positions in all of postings or None if postings is empty """
+        if not postings:
+            return None
+        postings = sorted(postings, key=len)
+        found = set(postings[0])
+        for ids in postings[1:]:
+            if not found:
+                break
+            found.intersection_update(ids)
+        return found
+
+    def _substring_candidates(self, folded):
+        """ returns set of positions of the texts that contain every trigram of folded
+            or None if folded is too short to have any """
+        empty = array("L")
+        return self._intersect(
+            [self._trigrams.get(trigram, empty) for trigram in _trigrams(folded)]
+        )
+
+    def _word_candidates(self, folded, prefix):
+        """ returns set of positions of the texts that contain every word of folded, the last
+            of which may be the start of a longer word if prefix, or None if folded has no words """
+        words = _WORD.findall(folded)
+        # last word of a prefix search can be the start of a longer word unless the term
+        # ends with a character that isn't part of a word
+        extends = prefix and words and folded.endswith(words[-1])
+        empty = array("L")
+        postings = [
+            self._words.get(word, empty) for word in (words[:-1] if extends else words)
+        ]
+        if extends:
+            # last word of a prefix search: texts with any word that starts with it
+            last = words[-1]
+            ids = set()
+            vocabulary = self._vocabulary
+            i = bisect_left(vocabulary, last)
+            while i < len(vocabulary) and vocabulary[i].startswith(last):
+                ids.update(self._words[vocabulary[i]])
+                i += 1
+            postings.append(ids)
+        return self._intersect(postings)
+
+    def search(self, term, match="substring", ignore_case=False):
+        """ returns set of uuids of the photos whose text matches term
+            match: "substring": text contains term
+                   "word": term is found in the text as whole words
+                   "prefix": term is found at the start of a word of the text
+                   "regex": regular expression term matches the text (re.search)
+            ignore_case: if True, text and term are compared case-folded
+            raises ValueError if match isn't valid or term isn't a valid regular expression """
+        pattern = _text_pattern(term, match, ignore_case)
+        folded = term.casefold()
+
+        # texts that can match are found with the indexes then each is checked
+        if match == "substring":
+            candidates = self._substring_candidates(folded)
+        elif match == "regex":
+            candidates = self._intersect(
+                [
+                    self._substring_candidates(literal.casefold())
+                    for literal in _regex_literals(term)
+                    if len(literal.casefold()) >= 3
+                ]
+            )
+        else:
+            candidates = self._word_candidates(folded, prefix=match == "prefix")
+        if candidates is None:
+            candidates = range(len(self))
+
+        if ignore_case and match != "regex":
+            texts = self._folded
+            term = folded
+        else:
+            texts = self.texts
+        if pattern is None:
+            found = {i for i in candidates if term in texts[i]}
+        else:
+            found = {i for i in candidates if pattern.search(texts[i])}
+        return {self.uuids[i] for i in found}
@@ -7,6 +7,7 @@ import subprocess
 import tempfile
 import urllib.parse
 import pathlib
+from datetime import datetime, timedelta, timezone
 from plistlib import load as plistload
 
 import CoreFoundation
@@ -14,17 +15,53 @@ import objc
 from Foundation import *
 
 from osxphotos._applescript import AppleScript
+from osxphotos._constants import _COREDATA_EPOCH_OFFSET
+from osxphotos.filecopy import copy_file
 
 _DEBUG = False
 
+# osxphotos logs to the "osxphotos" logger (each module to a child logger, e.g.
+# "osxphotos.photosdb"), not to the root logger, so importing osxphotos doesn't change
+# the logging configuration of the application using it
+# debug messages are only logged (and formatted) if debugging is turned on with _set_debug
+_LOGGER = logging.getLogger("osxphotos")
+_LOG_FORMAT = "%(asctime)s - %(levelname)s - %(filename)s - %(lineno)d - %(message)s"
 
-logging.basicConfig(
-    level=logging.DEBUG,
-    format="%(asctime)s - %(levelname)s - %(filename)s - %(lineno)d - %(message)s",
-)
+# handler _set_debug adds if the application hasn't configured logging
+_debug_handler = None
 
-if not _DEBUG:
-    logging.disable(logging.DEBUG)
+# level of _LOGGER before _set_debug turned debugging on, restored when it's turned off
+_saved_level = None
+
+logger = logging.getLogger(__name__)
+
+
+# timezone objects by offset from UTC in seconds, shared by all photos with the same offset
+_TIMEZONES = {}
+
+
+def _get_timezone(seconds):
+    """ returns datetime.timezone for offset of seconds from UTC
+        timezones are cached so each offset is only created once """
+    try:
+        return _TIMEZONES[seconds]
+    except KeyError:
+        tz = _TIMEZONES[seconds] = timezone(timedelta(seconds=seconds))
+        return tz
+
+
+def _coredata_to_datetime(timestamp, tzoffset=None):
+    """ returns timezone aware datetime for Core Data timestamp (seconds since Jan 1, 2001 UTC)
+        in the timezone tzoffset seconds from UTC (None for UTC) """
+    return datetime.fromtimestamp(
+        timestamp + _COREDATA_EPOCH_OFFSET, _get_timezone(tzoffset or 0)
+    )
+
+
+def _datetime_to_coredata(dt):
+    """ returns Core Data timestamp (seconds since Jan 1, 2001 UTC) for datetime dt
+        naive datetimes are treated as local time """
+    return dt.timestamp() - _COREDATA_EPOCH_OFFSET
 
 
 def _get_logger():
@@ -33,17 +70,30 @@ def _get_logger():
     Returns:
         logging.Logger object -- logging.Logger object for osxphotos
     """
-    return logging.Logger(__name__)
+    return _LOGGER
 
 
 def _set_debug(debug):
-    """ Enable or disable debug logging """
-    global _DEBUG
+    """ Enable or disable debug logging
+        if the application hasn't configured logging, debug messages are written to stderr
+        disabling restores the level the "osxphotos" logger had before debug was enabled """
+    global _DEBUG, _debug_handler, _saved_level
     _DEBUG = debug
     if debug:
-        logging.disable(logging.NOTSET)
+        if _saved_level is None:
+            _saved_level = _LOGGER.level
+        _LOGGER.setLevel(logging.DEBUG)
+        if _debug_handler is None and not _LOGGER.hasHandlers():
+            _debug_handler = logging.StreamHandler()
+            _debug_handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+            _LOGGER.addHandler(_debug_handler)
     else:
-        logging.disable(logging.DEBUG)
+        if _saved_level is not None:
+            _LOGGER.setLevel(_saved_level)
+            _saved_level = None
+        if _debug_handler is not None:
+            _LOGGER.removeHandler(_debug_handler)
+            _debug_handler = None
 
 
 def _debug():
@@ -113,11 +163,13 @@ def _dd_to_dms(dd):
     return int(deg_), int(min_), sec_
 
 
-def _copy_file(src, dest):
+def _copy_file(src, dest, use_ditto=False):
     """ Copies a file from src path to dest path 
         src: source path as string 
         dest: destination path as string
-        Uses ditto to perform copy; will silently overwrite dest if it exists
+        use_ditto: if True, use ditto to perform copy instead of copying in-process (see filecopy.py)
+        Preserves extended attributes, permissions and dates like ditto; will silently overwrite 
+        dest if it exists
         Raises exception if copy fails or either path is None """
 
     if src is None or dest is None:
@@ -126,15 +178,10 @@ def _copy_file(src, dest):
     if not os.path.isfile(src):
         raise ValueError("src file does not appear to exist", src)
 
-    # if error on copy, subprocess will raise CalledProcessError
     try:
-        subprocess.run(
-            ["/usr/bin/ditto", src, dest], check=True, stderr=subprocess.PIPE
-        )
-    except subprocess.CalledProcessError as e:
-        logging.critical(
-            f"ditto returned error: {e.returncode} {e.stderr.decode(sys.getfilesystemencoding()).rstrip()}"
-        )
+        copy_file(src, dest, use_ditto=use_ditto)
+    except OSError as e:
+        logger.critical(f"error copying {src} to {dest}: {e}")
         raise e
 
 
@@ -173,9 +220,10 @@ def get_system_library_path():
     """ on earlier versions, returns None """
     _, major, _ = _get_os_version()
     if int(major) < 15:
-        logging.debug(
-            f"get_system_library_path not implemented for MacOS < 10.15: you have {major}"
-        )
+        if _debug():
+            logger.debug(
+                f"get_system_library_path not implemented for MacOS < 10.15: you have {major}"
+            )
         return None
 
     plist_file = pathlib.Path(
@@ -186,7 +234,7 @@ def get_system_library_path():
         with open(plist_file, "rb") as fp:
             pl = plistload(fp)
     else:
-        logging.warning(f"could not find plist file: {str(plist_file)}")
+        logger.warning(f"could not find plist file: {str(plist_file)}")
         return None
 
     photospath = pl["SystemLibraryPath"]
@@ -194,7 +242,7 @@ def get_system_library_path():
     if photospath is not None:
         return photospath
     else:
-        logging.warning("Could not get path to Photos database")
+        logger.warning("Could not get path to Photos database")
         return None
 
 
@@ -209,7 +257,8 @@ def get_last_library_path():
         with open(plist_file, "rb") as fp:
             pl = plistload(fp)
     else:
-        logging.debug(f"could not find plist file: {str(plist_file)}")
+        if _debug():
+            logger.debug(f"could not find plist file: {str(plist_file)}")
         return None
 
     # get the IPXDefaultLibraryURLBookmark from com.apple.Photos.plist
@@ -236,14 +285,15 @@ def get_last_library_path():
                 urllib.parse.unquote(urllib.parse.urlparse(photosurlstr).path)
             )
         else:
-            logging.warning(
+            logger.warning(
                 "Could not extract photos URL String from IPXDefaultLibraryURLBookmark"
             )
             return None
 
         return photospath
     else:
-        logging.debug("Could not get path to Photos database")
+        if _debug():
+            logger.debug("Could not get path to Photos database")
         return None
 
 
@@ -361,7 +411,7 @@ def _export_photo_uuid_applescript(
             "export_by_uuid", uuid, tmpdir.name, original, edited, timeout
         )
     except Exception as e:
-        logging.warning("Error exporting uuid %s: %s" % (uuid, str(e)))
+        logger.warning("Error exporting uuid %s: %s" % (uuid, str(e)))
         return None
 
     if filename is not None:
@@ -391,6 +441,39 @@ def _open_sql_file(dbname):
     return (conn, c)
 
 
+def _get_db_signature(*dbnames):
+    """ returns a cheap signature of one or more sqlite database files
+        for each database, signature includes (path, size, mtime, ctime, inode)
+        and for its write-ahead log (-wal) file (path, size, mtime, wal header)
+        any write to the database or its write-ahead log will change the signature
+        files that do not exist are represented by (path, None) """
+    signature = []
+    for dbname in dbnames:
+        dbname = str(dbname)
+        try:
+            st = os.stat(dbname)
+        except FileNotFoundError:
+            signature.append((dbname, None))
+            continue
+        signature.append(
+            (dbname, st.st_size, st.st_mtime_ns, st.st_ctime_ns, st.st_ino)
+        )
+
+        # sqlite touches the ctime of the -wal file even on read-only access
+        # so use the wal header instead: it holds the checkpoint sequence number and
+        # salts which change every time the wal is reset; appended frames change the size
+        walname = f"{dbname}-wal"
+        try:
+            with open(walname, "rb") as fd:
+                st = os.fstat(fd.fileno())
+                header = fd.read(32)
+        except FileNotFoundError:
+            signature.append((walname, None))
+            continue
+        signature.append((walname, st.st_size, st.st_mtime_ns, header))
+    return tuple(signature)
+
+
 def _db_is_locked(dbname):
     """ check to see if a sqlite3 db is locked
         returns True if database is locked, otherwise False
@@ -399,7 +482,8 @@ def _db_is_locked(dbname):
     # first, check to see if lock file exists, if so, assume the file is locked
     lock_name = f"{dbname}.lock"
     if os.path.exists(lock_name):
-        logging.debug(f"{dbname} is locked")
+        if _debug():
+            logger.debug(f"{dbname} is locked")
         return True
 
     # no lock file so try to read from the database to see if it's locked
@@ -408,10 +492,12 @@ def _db_is_locked(dbname):
         (conn, c) = _open_sql_file(dbname)
         c.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name;")
         conn.close()
-        logging.debug(f"{dbname} is not locked")
+        if _debug():
+            logger.debug(f"{dbname} is not locked")
         locked = False
     except Exception as e:
-        logging.debug(f"{dbname} is locked")
+        if _debug():
+            logger.debug(f"{dbname} is locked")
         locked = True
 
     return locked
@@ -771,6 +771,19 @@ def test_photosdb_repr():
     }
 
 
+def test_photosdb_eq():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photosdb2 = osxphotos.PhotosDB(dbfile=PHOTOS_DB, lazy=True)
+    # PhotoInfo objects in use don't affect the comparison
+    photosdb.photos()
+    assert photosdb == photosdb2
+    assert photosdb != osxphotos.PhotosDB(
+        dbfile="./tests/Test-10.14.6.photoslibrary/database/photos.db"
+    )
+
+
 def test_photosinfo_repr():
     import osxphotos
     import datetime
@@ -804,3 +817,873 @@ def test_from_to_date():
     photos = photosdb.photos(from_date=dt.datetime(2018, 9, 28),
                              to_date=dt.datetime(2018, 9, 29))
     assert len(photos) == 4
+
+
+def test_cache():
+    import os
+    import tempfile
+    import osxphotos
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        photosdb = osxphotos.PhotosDB(PHOTOS_DB, cache=True, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 1
+
+        photosdb2 = osxphotos.PhotosDB(PHOTOS_DB, cache=True, cache_dir=cache_dir)
+        assert photosdb2.db_version == photosdb.db_version
+        assert photosdb2.keywords_as_dict == photosdb.keywords_as_dict
+        assert photosdb2.persons_as_dict == photosdb.persons_as_dict
+        assert photosdb2.albums_as_dict == photosdb.albums_as_dict
+        assert sorted(p.uuid for p in photosdb2.photos()) == sorted(
+            p.uuid for p in photosdb.photos()
+        )
+
+
+def test_cache_invalidated():
+    import os
+    import shutil
+    import tempfile
+    import osxphotos
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        cache_dir = os.path.join(tempdir, "cache")
+        dbdir = os.path.join(tempdir, "database")
+        shutil.copytree(os.path.dirname(PHOTOS_DB), dbdir)
+        dbfile = os.path.join(dbdir, "photos.db")
+
+        photosdb = osxphotos.PhotosDB(dbfile, cache=True, cache_dir=cache_dir)
+        signature = photosdb._get_cache_signature()
+        assert photosdb._load_cache(signature) is not None
+
+        # touch the database so the signature changes
+        sqlite_file = os.path.join(dbdir, "Photos.sqlite")
+        st = os.stat(sqlite_file)
+        os.utime(sqlite_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        assert photosdb._get_cache_signature() != signature
+        assert photosdb._load_cache(photosdb._get_cache_signature()) is None
+
+        # stale cache is replaced on next load
+        photosdb2 = osxphotos.PhotosDB(dbfile, cache=True, cache_dir=cache_dir)
+        assert photosdb2._load_cache(photosdb2._get_cache_signature()) is not None
+        assert len(photosdb2.photos()) == len(photosdb.photos())
+
+
+def test_refresh():
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        dbdir = os.path.join(tempdir, "database")
+        shutil.copytree(os.path.dirname(PHOTOS_DB), dbdir)
+        photosdb = osxphotos.PhotosDB(os.path.join(dbdir, "photos.db"))
+        count = len(photosdb.photos())
+        kids = photosdb.keywords_as_dict["Kids"]
+
+        # nothing changed
+        assert photosdb.refresh() == {"added": [], "updated": [], "removed": []}
+
+        conn = sqlite3.connect(os.path.join(dbdir, "Photos.sqlite"))
+        # Photos defines this function for its triggers; stub it out so we can update the table
+        conn.create_function("NSCoreDataTriggerUpdateAffectedObjectValue", -1, lambda *args: None)
+        (moddate,) = conn.execute(
+            "SELECT MAX(ZMODIFICATIONDATE) FROM ZGENERICASSET"
+        ).fetchone()
+        conn.execute(
+            "UPDATE ZGENERICASSET SET ZFAVORITE = 1, ZMODIFICATIONDATE = ? WHERE ZUUID = ?",
+            (moddate + 1, "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4"),
+        )
+        conn.execute(
+            "UPDATE ZGENERICASSET SET ZTRASHEDSTATE = 1, ZMODIFICATIONDATE = ? WHERE ZUUID = ?",
+            (moddate + 1, "D79B8D77-BFFC-460B-9312-034F2877D35B"),
+        )
+        conn.commit()
+        conn.close()
+
+        changes = photosdb.refresh()
+        assert changes == {
+            "added": [],
+            "updated": ["6191423D-8DB8-4D4C-92BE-9BBBA308AAC4"],
+            "removed": ["D79B8D77-BFFC-460B-9312-034F2877D35B"],
+        }
+        assert len(photosdb.photos()) == count - 1
+        assert photosdb.photos(uuid=["6191423D-8DB8-4D4C-92BE-9BBBA308AAC4"])[0].favorite
+        assert photosdb.keywords_as_dict["Kids"] == kids - 1
+
+        # refreshed data matches a fresh load
+        photosdb2 = osxphotos.PhotosDB(os.path.join(dbdir, "photos.db"))
+        assert photosdb2.keywords_as_dict == photosdb.keywords_as_dict
+        assert photosdb2.persons_as_dict == photosdb.persons_as_dict
+        assert photosdb2.albums_as_dict == photosdb.albums_as_dict
+        assert sorted(p.uuid for p in photosdb2.photos()) == sorted(
+            p.uuid for p in photosdb.photos()
+        )
+
+
+def test_lazy():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    # only the data that's accessed is loaded
+    assert photosdb_lazy.keywords_as_dict == photosdb.keywords_as_dict
+    assert photosdb_lazy._loaded == {"keywords"}
+    assert photosdb_lazy.albums_as_dict == photosdb.albums_as_dict
+    assert photosdb_lazy._loaded == {"keywords", "albums", "album_details"}
+
+    photos = sorted(photosdb.photos(movies=True), key=lambda p: p.uuid)
+    photos_lazy = sorted(photosdb_lazy.photos(movies=True), key=lambda p: p.uuid)
+    assert "photos" in photosdb_lazy._loaded
+    assert "cloud" not in photosdb_lazy._loaded
+    assert [p.json() for p in photos_lazy] == [p.json() for p in photos]
+    assert photosdb_lazy.persons_as_dict == photosdb.persons_as_dict
+
+
+def test_lazy_query():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    queries = [
+        {"keywords": ["Kids"]},
+        {"keywords": ["Kids", "not a keyword"]},
+        {"persons": ["Katie"]},
+        {"albums": ["Pumpkin Farm"]},
+        {"uuid": [photosdb.photos()[0].uuid]},
+        {"favorite": True},
+        {"hidden": False, "movies": True},
+        {"uti": "jpeg"},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        # query is run in the database without loading all the photos
+        photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+        photos_lazy = photosdb_lazy.photos(**query)
+        assert "photos" not in photosdb_lazy._loaded
+        assert sorted(p.uuid for p in photos_lazy) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_from_date_to_date():
+    import datetime
+    import osxphotos
+
+    from_date = datetime.datetime(2018, 9, 28)
+    to_date = datetime.datetime(2018, 9, 28, 23, 0, 0)
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_scoped = osxphotos.PhotosDB(
+        PHOTOS_DB, from_date=from_date, to_date=to_date
+    )
+
+    photos = photosdb.photos(from_date=from_date, to_date=to_date)
+    assert len(photos) == 4
+    assert sorted(p.uuid for p in photosdb_scoped.photos()) == sorted(
+        p.uuid for p in photos
+    )
+    assert photosdb_scoped.keywords_as_dict == {"Kids": 4}
+
+
+def test_photo_record():
+    import datetime
+    import pytest
+    import osxphotos
+    from osxphotos.photosdb import _PhotoRecord
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+    record = photo._info
+
+    # records are used like the dicts they replace
+    assert isinstance(record, _PhotoRecord)
+    assert record["_uuid"] == UUID_DICT["favorite"]
+    assert record == dict(record.items())
+    assert eval(repr(record)) == record
+    assert "filename" in record
+    assert record.get("not_a_field") is None
+
+    # Photos 4 only field isn't set by Photos 5
+    assert "mainRating" not in record
+    with pytest.raises(KeyError):
+        record["mainRating"]
+    with pytest.raises(KeyError):
+        record["not_a_field"] = 1
+
+
+def test_photos_flags():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    for flag in ["ismissing", "hasadjustments", "burst", "iscloudasset"]:
+        for value in [True, False]:
+            assert sorted(
+                p.uuid for p in photosdb.photos(movies=True, **{flag: value})
+            ) == sorted(p.uuid for p in photos if getattr(p, flag) == value)
+
+
+def test_columnar():
+    import datetime
+    import pytest
+    import osxphotos
+
+    pytest.importorskip("numpy")
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_columnar = osxphotos.PhotosDB(PHOTOS_DB, columnar=True)
+    assert len(photosdb_columnar._columns) == len(photosdb._dbphotos)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"persons": ["Katie"], "favorite": False},
+        {"uti": "jpeg"},
+        {"favorite": True, "hidden": False, "ismissing": False},
+        {"hasadjustments": True, "movies": True},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        assert sorted(p.uuid for p in photosdb_columnar.photos(**query)) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_parallel_load():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    ignore_keys = ["_tmp_db", "_tempdir", "_tempdir_name", "_workers", "_processes"]
+    for kwargs in [{"workers": 4}, {"workers": 2, "processes": 2}]:
+        photosdb_parallel = osxphotos.PhotosDB(PHOTOS_DB, **kwargs)
+        assert {
+            k: v for k, v in photosdb.__dict__.items() if k not in ignore_keys
+        } == {
+            k: v for k, v in photosdb_parallel.__dict__.items() if k not in ignore_keys
+        }
+
+
+def test_date_decoded_on_access():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+
+    # dates are stored as Core Data timestamps and only decoded when asked for
+    for photo in photos:
+        assert isinstance(photo._info["imageDate"], (int, float))
+        assert isinstance(photo.date, datetime.datetime)
+        assert photo.date.utcoffset() == datetime.timedelta(
+            seconds=photo._info["imageTimeZoneOffsetSeconds"]
+        )
+
+    # photos with the same time zone offset share the tzinfo object
+    tzinfos = {}
+    for photo in photos:
+        tzinfo = tzinfos.setdefault(photo.date.utcoffset(), photo.date.tzinfo)
+        assert photo.date.tzinfo is tzinfo
+
+
+def test_relationship():
+    import pickle
+    import osxphotos
+    from osxphotos.relationship import IdTable, Relationship
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+
+    # keywords, persons and albums are stored as ids and decoded when accessed
+    assert all(isinstance(id_, int) for id_ in photo._info["keywords"])
+    assert photo.keywords == photosdb._dbkeywords.decode(photo._info["keywords"])
+    assert photo.keywords == ["wedding"]
+    assert photosdb._dbkeywords.count("Kids") == photosdb.keywords_as_dict["Kids"]
+
+    # photo uuids are shared by all the relationships and with _dbphotos
+    uuid = photosdb._dbuuids[photosdb._dbuuids.get(photo.uuid)]
+    assert uuid is next(u for u in photosdb._dbphotos if u == photo.uuid)
+
+    uuids = IdTable()
+    relationship = Relationship(uuids)
+    relationship.add("Kids", "A")
+    relationship.add("Kids", "B")
+    relationship.add("wedding", "A")
+    assert list(relationship) == ["Kids", "wedding"]
+    assert relationship.decode(relationship.value_ids("A")) == ["Kids", "wedding"]
+    assert sorted(uuids[id_] for id_ in relationship.photo_ids("Kids")) == ["A", "B"]
+    assert pickle.loads(pickle.dumps(relationship)) == relationship
+
+    relationship.remove_photo("A")
+    assert relationship.as_dict() == {"Kids": ["B"]}
+    assert not relationship.has_photo("A")
+    assert "wedding" not in relationship
+
+    # removed links are dropped from the arrays lazily; adding the photo back reuses them
+    for uuid in "CDE":
+        relationship.add("Kids", uuid)
+    relationship.remove_photo("C")
+    assert relationship.count("Kids") == 3
+    relationship.add("Kids", "C")
+    relationship.remove_photo("D")
+    assert relationship.count("Kids") == 3
+    assert sorted(uuids[id_] for id_ in relationship.photo_ids("Kids")) == [
+        "B",
+        "C",
+        "E",
+    ]
+    assert relationship.as_dict() == {"Kids": ["B", "C", "E"]}
+
+
+def test_bitmaps():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"keywords": ["Kids"], "persons": ["Katie"], "hidden": False},
+        {"persons": ["Katie"], "favorite": False},
+        {"albums": ["Pumpkin Farm"]},
+        {"uuid": [UUID_DICT["favorite"]]},
+        {"uti": "jpeg"},
+        {"favorite": True, "hidden": False, "ismissing": False},
+        {"hasadjustments": True, "movies": True},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        assert sorted(p.uuid for p in photosdb_bitmaps.photos(**query)) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_bitmap():
+    from osxphotos.bitmap import Bitmap
+
+    # ids in two chunks, one stored as an array and one as a bitset
+    a = Bitmap(list(range(0, 20000, 2)) + [70000, 70001])
+    b = Bitmap(list(range(0, 20000, 3)) + [70001, 70002])
+    assert len(a) == 10002
+    assert list(a & b) == list(range(0, 20000, 6)) + [70001]
+    assert list(a - b)[-2:] == [19996, 70000]
+    assert len(a | b) == len(set(a) | set(b))
+    assert 70000 in a and 70002 not in a
+    assert not Bitmap() and Bitmap([1])
+
+
+def test_modified_date():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photos = photosdb.photos(movies=True)
+
+    since = datetime.datetime(2019, 11, 1, tzinfo=datetime.timezone.utc)
+    before = datetime.datetime(2019, 11, 30, tzinfo=datetime.timezone.utc)
+    for query, expected in [
+        ({"modified_since": since}, lambda p: p.date_modified >= since),
+        ({"modified_before": since}, lambda p: p.date_modified < since),
+        (
+            {"modified_since": since, "modified_before": before},
+            lambda p: since <= p.date_modified < before,
+        ),
+    ]:
+        uuids = sorted(p.uuid for p in photos if expected(p))
+        assert uuids
+        for db in (photosdb, photosdb_lazy):
+            assert sorted(p.uuid for p in db.photos(movies=True, **query)) == uuids
+
+
+def test_calendar():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos()
+
+    for month, day in [(9, None), (None, 28), (9, 28), (2, 30)]:
+        uuids = sorted(
+            p.uuid
+            for p in photos
+            if month in (None, p.date.month) and day in (None, p.date.day)
+        )
+        assert sorted(p.uuid for p in photosdb.photos(month=month, day=day)) == uuids
+
+    date_index = photosdb._get_date_index("imageDate")
+    assert list(date_index.timestamps) == sorted(date_index.timestamps)
+    assert len(date_index) == len(photosdb._dbphotos)
+
+
+def test_iter_photos():
+    import datetime
+    import types
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"persons": ["Katie"], "favorite": False},
+        {"albums": ["Pumpkin Farm"], "hasadjustments": False},
+        {"uti": "jpeg", "month": 9},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        expected = sorted(p.uuid for p in photosdb.photos(**query))
+        photos = photosdb_lazy.iter_photos(batch_size=2, **query)
+        assert isinstance(photos, types.GeneratorType)
+        assert sorted(p.uuid for p in photos) == expected
+        assert sorted(p.uuid for p in photosdb.iter_photos(**query)) == expected
+
+    # photos are read in batches and not loaded into the PhotosDB object
+    assert "photos" not in photosdb_lazy._loaded
+
+
+def test_photo_info_cached():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos()
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+
+    # same PhotoInfo object for a photo while it's in use
+    assert any(p is photo for p in photos)
+    assert all(p is q for p, q in zip(photos, photosdb.photos()))
+
+    # PhotoInfo objects can be used in sets and dicts
+    assert len(set(photos + photosdb.photos())) == len(photos)
+    assert {p: p.uuid for p in photos}[photo] == UUID_DICT["favorite"]
+
+    # equal to the same photo from another PhotosDB for the library
+    photo2 = osxphotos.PhotosDB(PHOTOS_DB).photos(uuid=[UUID_DICT["favorite"]])[0]
+    assert photo2 is not photo
+    assert photo2 == photo
+    assert hash(photo2) == hash(photo)
+
+    # derived properties are computed once; lists are copies
+    assert photo.path == photo.path
+    albums = photo.albums
+    albums.append("not an album")
+    assert photo.albums == photo2.albums
+
+
+def test_location_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    # St James's Park, London
+    for query, expected in [
+        ({"near": (51.5, -0.13, 1)}, [UUID_DICT["location"]]),
+        ({"near": (51.5, -0.13, 0.1)}, []),
+        ({"near": (48.86, 2.35, 400)}, [UUID_DICT["location"]]),
+        ({"bbox": (51.4, -0.3, 51.6, 0.0)}, [UUID_DICT["location"]]),
+        ({"bbox": (51.4, 0.0, 51.6, -0.2)}, []),
+        ({"bbox": (51.4, 179.0, 51.6, -0.1)}, [UUID_DICT["location"]]),
+        ({"bbox": (-90, -180, 90, 180), "keywords": ["Kids"]}, []),
+    ]:
+        for db in (photosdb, photosdb_lazy, photosdb_bitmaps):
+            assert [p.uuid for p in db.photos(movies=True, **query)] == expected
+
+    # photos with no location aren't found
+    photos = photosdb.photos(movies=True, bbox=(-90, -180, 90, 180))
+    assert UUID_DICT["no_location"] not in [p.uuid for p in photos]
+    assert len(photosdb._get_geo_index()) == 1
+
+    with pytest.raises(ValueError):
+        photosdb.photos(near=(91, 0, 1))
+    with pytest.raises(ValueError):
+        photosdb.photos(bbox=(52, 0, 51, 1))
+
+
+def test_geo_index():
+    from osxphotos.geoindex import GeoIndex
+
+    class DB:
+        # points either side of the 180th meridian, near a pole and with no location
+        _dbphotos = {
+            "fiji": {"latitude": -17.7, "longitude": 178.0},
+            "samoa": {"latitude": -13.8, "longitude": -172.1},
+            "pole": {"latitude": 89.99, "longitude": 45.0},
+            "none": {"latitude": None, "longitude": None},
+        }
+
+    geo_index = GeoIndex(DB())
+    assert len(geo_index) == 3
+    assert sorted(geo_index.near(-15.0, 180.0, 1000)) == ["fiji", "samoa"]
+    assert geo_index.near(-15.0, 180.0, 500) == ["fiji"]
+    assert geo_index.near(-15.0, 180.0, 300) == []
+    assert sorted(geo_index.bbox(-20, 170, -10, -170)) == ["fiji", "samoa"]
+    assert geo_index.bbox(-20, -170, -10, 170) == []
+    assert geo_index.near(89.9, -135.0, 20) == ["pole"]
+
+
+def test_text_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    for query, expected in [
+        ({"title": ["found"]}, ["D79B8D77-BFFC-460B-9312-034F2877D35B"]),
+        ({"title": ["pumpkin"]}, []),
+        ({"title": ["pumpkin"], "ignore_case": True}, [UUID_DICT["missing"]]),
+        (
+            {"description": ["pumpkin"]},
+            [
+                "1EB2B765-0765-43BA-A90C-0D0580E6172C",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+                "F12384F6-CD17-4151-ACBA-AE0E3688539E",
+            ],
+        ),
+        (
+            {"description": ["pumpkin"], "text_match": "word"},
+            [
+                "1EB2B765-0765-43BA-A90C-0D0580E6172C",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+            ],
+        ),
+        (
+            {"description": ["girl", "pumpkin"], "ignore_case": True},
+            [
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+                "F12384F6-CD17-4151-ACBA-AE0E3688539E",
+            ],
+        ),
+        ({"description": ["wed"], "text_match": "prefix"}, []),
+        (
+            {"description": ["wed"], "text_match": "prefix", "ignore_case": True},
+            ["6191423D-8DB8-4D4C-92BE-9BBBA308AAC4", UUID_DICT["favorite"]],
+        ),
+        ({"title": [r"^St\. James's"], "text_match": "regex"}, [UUID_DICT["location"]]),
+        ({"filename": ["St James"]}, [UUID_DICT["location"]]),
+        ({"filename": ["Pumpkins4"], "keywords": ["wedding"]}, []),
+    ]:
+        for db in (photosdb, photosdb_lazy, photosdb_bitmaps):
+            photos = db.photos(movies=True, **query)
+            assert sorted(p.uuid for p in photos) == expected
+
+    assert len(photosdb._get_text_index("title")) == 5
+
+    with pytest.raises(ValueError):
+        photosdb.photos(title=["one"], text_match="exact")
+    with pytest.raises(ValueError):
+        photosdb.photos(title=["("], text_match="regex")
+
+
+def test_text_index():
+    from osxphotos.textindex import TextIndex, _regex_literals
+
+    class DB:
+        _dbphotos = {
+            "cat": {
+                "name": "My Cat",
+                "filename": "IMG_1.jpg",
+                "originalFilename": "cat.jpg",
+            },
+            "catalog": {
+                "name": "Catalog",
+                "filename": "IMG_2.jpg",
+                "originalFilename": None,
+            },
+            "bobcat": {
+                "name": "bobcat",
+                "filename": "IMG_3.jpg",
+                "originalFilename": None,
+            },
+            "none": {"name": None, "filename": "IMG_4.jpg", "originalFilename": None},
+        }
+
+    text_index = TextIndex(DB(), "title")
+    assert len(text_index) == 3
+    assert text_index.search("cat") == {"bobcat"}
+    assert text_index.search("cat", ignore_case=True) == {"cat", "catalog", "bobcat"}
+    assert text_index.search("cat", "word", ignore_case=True) == {"cat"}
+    assert text_index.search("cat", "prefix", ignore_case=True) == {"cat", "catalog"}
+    assert text_index.search("Cat$", "regex") == {"cat"}
+    assert text_index.search("^cat", "regex", ignore_case=True) == {"catalog"}
+
+    filename_index = TextIndex(DB(), "filename")
+    assert filename_index.search("cat") == {"cat"}
+    assert filename_index.search("IMG_") == {"cat", "catalog", "bobcat", "none"}
+
+    # literal text of a regular expression is used to find the candidates
+    assert _regex_literals(r"St\. James'?s Park") == ["St. James", "s Park"]
+    assert _regex_literals("cat|dog") == []
+
+
+def test_photo_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    for query, expected in [
+        (
+            {"no_title": True},
+            [
+                "1EB2B765-0765-43BA-A90C-0D0580E6172C",
+                "E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51",
+            ],
+        ),
+        (
+            {"keywords": ["Kids"], "no_title": True},
+            ["1EB2B765-0765-43BA-A90C-0D0580E6172C"],
+        ),
+        ({"favorite": True, "no_title": True}, [UUID_DICT["favorite"]]),
+        ({"favorite": True, "no_description": True}, []),
+        (
+            {"no_description": True},
+            [
+                "A1DD1F98-2ECD-431F-9AC9-5AFEFE2D3A5C",
+                "DC99FBDD-7A52-4100-A5BB-344131646C30",
+            ],
+        ),
+        (
+            {"favorite": False, "hasadjustments": True},
+            ["DC99FBDD-7A52-4100-A5BB-344131646C30"],
+        ),
+    ]:
+        photo_query = osxphotos.PhotoQuery(movies=True, **query)
+        for db in (photosdb, photosdb_lazy, photosdb_bitmaps):
+            photos = photo_query.photos(db)
+            assert sorted(p.uuid for p in photos) == expected
+            photos = photo_query.iter_photos(db, batch_size=2)
+            assert sorted(p.uuid for p in photos) == expected
+            # counted in the database when lazy, before the checks done once loaded
+            count = photo_query.estimate_count(db)
+            if db is photosdb_lazy:
+                assert count >= len(expected)
+            else:
+                assert count == len(expected)
+
+
+def test_photo_query_check_order():
+    import osxphotos
+
+    class Photo:
+        def __init__(self):
+            self.checked = []
+
+        def __getattr__(self, name):
+            self.checked.append(name)
+            return None
+
+    photo_query = osxphotos.PhotoQuery(
+        ismissing=False, incloud=False, favorite=False, live_photo=True, no_title=True
+    )
+    check = photo_query._photo_check()
+    photo = Photo()
+    assert not check(photo)
+    # live_photo=True is checked first and fails
+    assert photo.checked == ["live_photo"]
+
+    check = osxphotos.PhotoQuery(
+        ismissing=False, incloud=False, favorite=False, no_title=True
+    )._photo_check()
+    photo = Photo()
+    assert check(photo)
+    assert photo.checked == ["favorite", "title", "incloud", "ismissing"]
+
+    assert osxphotos.PhotoQuery(keywords=["Kids"])._photo_check() is None
+    with pytest.raises(ValueError):
+        osxphotos.PhotoQuery(title=["found"], text_match="glob")
+
+
+def test_where_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    for query, expected in [
+        (
+            {"where": "keyword:Kids and (person:Katie or person:Suzy) and not hidden"},
+            [
+                "1EB2B765-0765-43BA-A90C-0D0580E6172C",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+                "F12384F6-CD17-4151-ACBA-AE0E3688539E",
+            ],
+        ),
+        (
+            {"where": "favorite or hidden"},
+            [
+                "A1DD1F98-2ECD-431F-9AC9-5AFEFE2D3A5C",
+                "E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51",
+            ],
+        ),
+        (
+            {"where": "not keyword:Kids"},
+            [
+                "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4",
+                "DC99FBDD-7A52-4100-A5BB-344131646C30",
+                "E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51",
+            ],
+        ),
+        (
+            {"where": "keyword:wedding or title:found"},
+            [
+                "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+                "E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51",
+            ],
+        ),
+        (
+            {"where": 'album:"Pumpkin Farm" or keyword:wedding', "favorite": False},
+            [
+                "1EB2B765-0765-43BA-A90C-0D0580E6172C",
+                "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+                "F12384F6-CD17-4151-ACBA-AE0E3688539E",
+            ],
+        ),
+        (
+            {"where": "title:^I or description:^Wed", "text_match": "regex"},
+            [
+                "6191423D-8DB8-4D4C-92BE-9BBBA308AAC4",
+                "D79B8D77-BFFC-460B-9312-034F2877D35B",
+            ],
+        ),
+        ({"where": "keyword:Kids and not person:Katie", "keywords": ["wedding"]}, []),
+        ({"where": "keyword:Nope or uuid:Nope"}, []),
+    ]:
+        photo_query = osxphotos.PhotoQuery(movies=True, **query)
+        for db in (photosdb, photosdb_lazy, photosdb_bitmaps):
+            photos = db.photos(movies=True, **query)
+            assert sorted(p.uuid for p in photos) == expected
+            photos = photo_query.iter_photos(db, batch_size=2)
+            assert sorted(p.uuid for p in photos) == expected
+
+
+def test_where_parse():
+    import osxphotos
+    from osxphotos.photoquery import _parse_where
+
+    where = _parse_where(
+        "NOT hidden AND (person:Katie or person:Suzy) and keyword:Kids"
+    )
+    # terms are evaluated cheapest first: flags after the terms found with the indexes
+    assert str(where) == "(person:Katie or person:Suzy) and keyword:Kids and not hidden"
+    where = _parse_where('album:\'Pumpkin Farm\' or keyword:"a \\" b" or keyword:or')
+    assert str(where) == 'album:"Pumpkin Farm" or keyword:"a \\" b" or keyword:"or"'
+    assert str(_parse_where("missing or live and Favorite")) == (
+        "live and favorite or missing"
+    )
+
+    for where in [
+        "",
+        "keyword:Kids and",
+        "(favorite",
+        "favorite hidden",
+        "color:red",
+        "pumpkin",
+        "keyword:",
+        "keyword:Kids)",
+    ]:
+        with pytest.raises(ValueError):
+            osxphotos.PhotoQuery(where=where or " ")
+    with pytest.raises(ValueError):
+        _parse_where("title:[", match="regex")
+
+
+def test_resource_index():
+    import os
+    import tempfile
+    import osxphotos
+    from osxphotos.resourceindex import ResourceIndex
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        root = os.path.join(tempdir, "version")
+        for folder, name in [("00", "a.jpeg"), ("01", "b.jpeg"), ("01/02", "c.jpeg")]:
+            os.makedirs(os.path.join(root, "1", folder), exist_ok=True)
+            with open(os.path.join(root, "1", folder, name), "w") as f:
+                f.write(name)
+        outside = os.path.join(tempdir, "outside.jpeg")
+        with open(outside, "w") as f:
+            f.write("outside")
+
+        index = ResourceIndex([root])
+        assert index.isfile(os.path.join(root, "1", "00", "a.jpeg"))
+        assert not index.isfile(os.path.join(root, "1", "00", "b.jpeg"))
+        assert not index.isfile(os.path.join(root, "1", "01", "02"))
+        assert index.isfile(outside)
+        assert index.find(os.path.join(root, "1"), "c.jpeg") == os.path.join(
+            root, "1", "01", "02", "c.jpeg"
+        )
+        assert index.find(os.path.join(root, "1", "00"), "c.jpeg") is None
+        assert index.find(os.path.join(root, "2"), "a.jpeg") is None
+
+        # new files aren't seen until the index is refreshed
+        with open(os.path.join(root, "1", "00", "d.jpeg"), "w") as f:
+            f.write("d")
+        assert not index.isfile(os.path.join(root, "1", "00", "d.jpeg"))
+        index.refresh()
+        assert index.isfile(os.path.join(root, "1", "00", "d.jpeg"))
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photo = photosdb.photos(uuid=["E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51"])[0]
+    assert photo.path_edited.endswith(
+        "resources/renders/E/E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51_1_201_a.jpeg"
+    )
+    index = photosdb._get_resource_index()
+    assert index.isfile(photo.path_edited)
+    photosdb.refresh_resource_index()
+    assert photo.path_edited is not None
+
+
+def test_prefetch_paths(monkeypatch):
+    import os.path
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    expected = [(p.path_edited, p.path_live_photo) for p in photos]
+    assert any(edited for edited, _ in expected)
+
+    photosdb.refresh_resource_index()
+    photosdb.prefetch_paths(photos, workers=4)
+
+    # files were all checked by prefetch_paths so the disk isn't checked again
+    checked = []
+    isfile = os.path.isfile
+
+    def check(path):
+        checked.append(path)
+        return isfile(path)
+
+    monkeypatch.setattr(os.path, "isfile", check)
+    assert [(p.path_edited, p.path_live_photo) for p in photos] == expected
+    for p in photos:
+        if not p.ismissing:
+            assert p._isfile(p.path) == isfile(p.path)
+    assert checked == []
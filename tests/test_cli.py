@@ -155,3 +155,362 @@ def test_export_sidecar():
         )
         files = glob.glob("*")
         assert files.sort() == CLI_EXPORT_SIDECAR_FILENAMES.sort()
+
+
+def test_query_modified_date():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    result = runner.invoke(
+        query,
+        [
+            "--json",
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--modified-since=2019-11-01",
+        ],
+    )
+    assert result.exit_code == 0
+
+    json_got = json.loads(result.output)
+    assert len(json_got) == 4
+
+
+def test_query_location():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    for args, count in [
+        (["--near", "51.5", "-0.13", "1"], 1),
+        (["--bbox", "51.4", "-0.3", "51.6", "0.0"], 1),
+        (["--near", "48.86", "2.35", "10"], 0),
+    ]:
+        result = runner.invoke(
+            query, ["--json", "--db", "./tests/Test-10.15.1.photoslibrary", *args]
+        )
+        assert result.exit_code == 0
+        assert len(json.loads(result.output)) == count
+
+    result = runner.invoke(
+        query, ["--db", "./tests/Test-10.15.1.photoslibrary", "--near", "91", "0", "1"]
+    )
+    assert result.exit_code != 0
+    assert "latitude must be between -90 and 90" in result.output
+
+
+def test_query_text():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    for args, count in [
+        (["--description", "pumpkin"], 3),
+        (["--description", "pumpkin", "--text-match", "word"], 2),
+        (["--title", "pum", "--text-match", "prefix", "-i"], 1),
+        (["--title", "^I found", "--text-match", "regex"], 1),
+        (["--filename", "Pumpkins4"], 1),
+        (["--filename", "Pumpkins4", "--no-description"], 1),
+    ]:
+        result = runner.invoke(
+            query, ["--json", "--db", "./tests/Test-10.15.1.photoslibrary", *args]
+        )
+        assert result.exit_code == 0
+        assert len(json.loads(result.output)) == count
+
+    result = runner.invoke(
+        query,
+        [
+            "--db",
+            "./tests/Test-10.15.1.photoslibrary",
+            "--title",
+            "(",
+            "--text-match",
+            "regex",
+        ],
+    )
+    assert result.exit_code != 0
+    assert "invalid regular expression" in result.output
+
+
+def test_query_where():
+    import json
+    import osxphotos
+    from osxphotos.__main__ import query
+
+    runner = CliRunner()
+    for args, count in [
+        (
+            [
+                "--where",
+                "keyword:Kids and (person:Katie or person:Suzy) and not hidden",
+            ],
+            3,
+        ),
+        (["--where", "favorite or hidden"], 2),
+        (["--where", "not keyword:Kids", "--not-favorite"], 2),
+        (["--where", 'album:"Pumpkin Farm" or title:found'], 3),
+        (["--where", "title:PUMPKIN or description:bride", "-i"], 2),
+    ]:
+        result = runner.invoke(
+            query, ["--json", "--db", "./tests/Test-10.15.1.photoslibrary", *args]
+        )
+        assert result.exit_code == 0
+        assert len(json.loads(result.output)) == count
+
+    result = runner.invoke(
+        query,
+        ["--db", "./tests/Test-10.15.1.photoslibrary", "--where", "keyword:Kids and"],
+    )
+    assert result.exit_code != 0
+    assert "invalid query expression" in result.output
+
+
+def test_export_workers():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    results = []
+    for workers in ["1", "4"]:
+        with runner.isolated_filesystem():
+            os.makedirs("export")
+            outputs = []
+            # export twice so the second export has to add (1) to every name
+            for _ in range(2):
+                result = runner.invoke(
+                    export,
+                    [
+                        os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+                        "export",
+                        "--original-name",
+                        "--export-edited",
+                        "--sidecar",
+                        "json",
+                        "--workers",
+                        workers,
+                        "-V",
+                    ],
+                )
+                assert result.exit_code == 0
+                outputs.append(result.output)
+            results.append((outputs, sorted(os.listdir("export"))))
+
+    assert results[0] == results[1]
+    files = results[1][1]
+    assert "Pumkins1.jpg" in files
+    assert "Pumkins1 (1).jpg" in files
+    assert "Pumkins1 (1).json" in files
+    assert "wedding_edited (1).jpg" in files
+
+
+def test_export_stage_workers():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    with runner.isolated_filesystem():
+        os.makedirs("export")
+        result = runner.invoke(
+            export,
+            [
+                os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+                "export",
+                "--sidecar",
+                "xmp",
+                "--stage-workers",
+                "copy=3",
+                "--stage-workers",
+                "sidecar=2",
+                "--pipeline-stats",
+                "-V",
+            ],
+        )
+        assert result.exit_code == 0
+        files = os.listdir("export")
+        assert "F12384F6-CD17-4151-ACBA-AE0E3688539E.jpeg" in files
+        assert "F12384F6-CD17-4151-ACBA-AE0E3688539E.xmp" in files
+        assert "WARNING" not in result.output
+        lines = result.output.splitlines()
+        assert "Exported 6 photos" in lines
+        stats = lines[lines.index("Skipped 1 missing photo") + 2 :]
+        assert [line.split()[:3] for line in stats] == [
+            ["resolve", "1", "7"],
+            ["plan", "1", "7"],
+            ["copy", "3", "7"],
+            ["sidecar", "2", "7"],
+            ["verify", "1", "7"],
+        ]
+
+        result = runner.invoke(
+            export,
+            [
+                os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+                "export",
+                "--stage-workers",
+                "plan=2",
+            ],
+        )
+        assert result.exit_code != 0
+        assert "invalid stage 'plan'" in result.output
+
+
+def test_export_update():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    with runner.isolated_filesystem():
+        os.makedirs("export")
+        args = [
+            os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+            "export",
+            "--update",
+            "--export-edited",
+            "--sidecar",
+            "json",
+            "-V",
+        ]
+        result = runner.invoke(export, args)
+        assert result.exit_code == 0
+        assert "Exported 6 photos (6 new, 0 updated)" in result.output
+        files = sorted(os.listdir("export"))
+        assert ".osxphotos_export.db" in files
+
+        # nothing changed so nothing is exported again
+        result = runner.invoke(export, args)
+        assert result.exit_code == 0
+        assert "Exported 0 photos (0 new, 0 updated)" in result.output
+        assert "Skipped 6 unchanged photos" in result.output
+        assert sorted(os.listdir("export")) == files
+
+        # deleted files are exported again with the same names
+        os.remove("export/E9BC5C36-7CD1-40A1-A72B-8B8FAC227D51_edited.jpeg")
+        os.remove("export/D79B8D77-BFFC-460B-9312-034F2877D35B.json")
+        result = runner.invoke(export, args + ["--workers", "2"])
+        assert result.exit_code == 0
+        assert "Exported 2 photos (0 new, 2 updated)" in result.output
+        assert "Skipped 4 unchanged photos" in result.output
+        assert sorted(os.listdir("export")) == files
+
+
+def test_export_update_dest_path():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    with runner.isolated_filesystem():
+        os.makedirs("export")
+        library = os.path.join(cwd, "tests/Test-10.15.1.photoslibrary")
+        args = ["--update", "--sidecar", "json", "-V"]
+        result = runner.invoke(export, [library, "./export"] + args)
+        assert result.exit_code == 0
+        assert "Exported 6 photos (6 new, 0 updated)" in result.output
+        files = sorted(os.listdir("export"))
+
+        # the files are found however dest is written
+        for dest in ["./export", "export/", os.path.abspath("export")]:
+            result = runner.invoke(export, [library, dest] + args)
+            assert result.exit_code == 0
+            assert "Exported 0 photos (0 new, 0 updated)" in result.output
+            assert "Skipped 6 unchanged photos" in result.output
+            assert sorted(os.listdir("export")) == files
+
+
+def test_export_update_existing_export():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    with runner.isolated_filesystem():
+        os.makedirs("export")
+        # file that's not from the library, so the photo is exported as "name (1).jpeg"
+        with open("export/D79B8D77-BFFC-460B-9312-034F2877D35B.jpeg", "wb") as f:
+            f.write(b"not a photo")
+        args = [
+            os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+            "export",
+            "--export-edited",
+            "--sidecar",
+            "json",
+        ]
+        result = runner.invoke(export, args)
+        assert result.exit_code == 0
+        files = sorted(os.listdir("export"))
+        assert "D79B8D77-BFFC-460B-9312-034F2877D35B (1).jpeg" in files
+
+        # the files exported without --update are adopted instead of exported again
+        result = runner.invoke(export, args + ["--update", "-V"])
+        assert result.exit_code == 0
+        assert "Exported 0 photos (0 new, 0 updated)" in result.output
+        assert "Skipped 6 already exported photos" in result.output
+        assert sorted(os.listdir("export")) == sorted(files + [".osxphotos_export.db"])
+
+        result = runner.invoke(export, args + ["--update"])
+        assert result.exit_code == 0
+        assert "Skipped 6 unchanged photos" in result.output
+
+
+def test_export_update_cleanup():
+    import os
+    import os.path
+    import osxphotos
+    from osxphotos.__main__ import export
+    from osxphotos.exportdb import ExportDB, ExportedFile, ExportRecord
+
+    runner = CliRunner()
+    cwd = os.getcwd()
+    with runner.isolated_filesystem():
+        os.makedirs("export")
+        args = [
+            os.path.join(cwd, "tests/Test-10.15.1.photoslibrary"),
+            "export",
+            "--update",
+        ]
+        result = runner.invoke(export, args)
+        assert result.exit_code == 0
+
+        # a photo exported before that's no longer in the library
+        with open("export/IMG_9999.jpg", "w") as f:
+            f.write("photo")
+        export_db = ExportDB("export")
+        export_db.record(
+            ExportRecord(
+                "NOT-IN-LIBRARY",
+                None,
+                {"original": ExportedFile(os.path.abspath("export/IMG_9999.jpg"))},
+            )
+        )
+        export_db.close()
+
+        result = runner.invoke(export, args + ["--cleanup"])
+        assert result.exit_code == 0
+        assert "Deleted 1 files exported for 1 photos" in result.output
+        assert "IMG_9999.jpg" not in os.listdir("export")
+        assert "F12384F6-CD17-4151-ACBA-AE0E3688539E.jpeg" in os.listdir("export")
+        export_db = ExportDB("export")
+        assert "NOT-IN-LIBRARY" not in export_db.uuids()
+        assert len(export_db.uuids()) == 6
+        export_db.close()
+
+        result = runner.invoke(export, args[:2] + ["--cleanup"])
+        assert result.exit_code != 0
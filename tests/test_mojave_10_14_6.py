@@ -354,3 +354,454 @@ def test_photosinfo_repr():
     assert {k: str(v).encode("utf-8") for k, v in photo.__dict__.items()} == {
         k: str(v).encode("utf-8") for k, v in photo2.__dict__.items()
     }
+
+
+def test_cache():
+    import os
+    import tempfile
+    import osxphotos
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        photosdb = osxphotos.PhotosDB(PHOTOS_DB, cache=True, cache_dir=cache_dir)
+        assert len(os.listdir(cache_dir)) == 1
+
+        photosdb2 = osxphotos.PhotosDB(PHOTOS_DB, cache=True, cache_dir=cache_dir)
+        assert photosdb2.keywords_as_dict == photosdb.keywords_as_dict
+        assert photosdb2.persons_as_dict == photosdb.persons_as_dict
+        assert photosdb2.albums_as_dict == photosdb.albums_as_dict
+        assert sorted(p.uuid for p in photosdb2.photos()) == sorted(
+            p.uuid for p in photosdb.photos()
+        )
+
+
+def test_refresh():
+    import os
+    import shutil
+    import sqlite3
+    import tempfile
+    import osxphotos
+
+    with tempfile.TemporaryDirectory() as tempdir:
+        dbdir = os.path.join(tempdir, "database")
+        shutil.copytree(os.path.dirname(PHOTOS_DB), dbdir)
+        photosdb = osxphotos.PhotosDB(os.path.join(dbdir, "photos.db"))
+        count = len(photosdb.photos())
+
+        # nothing changed
+        assert photosdb.refresh() == {"added": [], "updated": [], "removed": []}
+
+        conn = sqlite3.connect(os.path.join(dbdir, "photos.db"))
+        # Photos defines this function for its triggers; stub it out so we can update the table
+        conn.create_function("RKVersion_notifyRidIndexUpdate", -1, lambda *args: None)
+        (moddate,) = conn.execute("SELECT MAX(lastmodifieddate) FROM RKVersion").fetchone()
+        conn.execute(
+            "UPDATE RKVersion SET isFavorite = 1, lastmodifieddate = ? WHERE uuid = ?",
+            (moddate + 1, "HrK3ZQdlQ7qpDA0FgOYXLA"),
+        )
+        conn.execute(
+            "UPDATE RKVersion SET isInTrash = 1, lastmodifieddate = ? WHERE uuid = ?",
+            (moddate + 1, "15uNd7%8RguTEgNPKHfTWw"),
+        )
+        conn.commit()
+        conn.close()
+
+        changes = photosdb.refresh()
+        assert changes == {
+            "added": [],
+            "updated": ["HrK3ZQdlQ7qpDA0FgOYXLA"],
+            "removed": ["15uNd7%8RguTEgNPKHfTWw"],
+        }
+        assert len(photosdb.photos()) == count - 1
+        assert photosdb.photos(uuid=["HrK3ZQdlQ7qpDA0FgOYXLA"])[0].favorite
+
+        # refreshed data matches a fresh load
+        photosdb2 = osxphotos.PhotosDB(os.path.join(dbdir, "photos.db"))
+        assert photosdb2.keywords_as_dict == photosdb.keywords_as_dict
+        assert photosdb2.persons_as_dict == photosdb.persons_as_dict
+        assert photosdb2.albums_as_dict == photosdb.albums_as_dict
+        assert sorted(p.uuid for p in photosdb2.photos()) == sorted(
+            p.uuid for p in photosdb.photos()
+        )
+
+
+def test_lazy():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    # only the data that's accessed is loaded
+    assert photosdb_lazy.keywords_as_dict == photosdb.keywords_as_dict
+    assert photosdb_lazy._loaded == {"keywords"}
+    assert photosdb_lazy.albums_as_dict == photosdb.albums_as_dict
+    assert photosdb_lazy._loaded == {"keywords", "albums", "album_details"}
+
+    photos = sorted(photosdb.photos(movies=True), key=lambda p: p.uuid)
+    photos_lazy = sorted(photosdb_lazy.photos(movies=True), key=lambda p: p.uuid)
+    assert "photos" in photosdb_lazy._loaded
+    assert "cloud" not in photosdb_lazy._loaded
+    assert [p.json() for p in photos_lazy] == [p.json() for p in photos]
+    assert photosdb_lazy.persons_as_dict == photosdb.persons_as_dict
+
+
+def test_lazy_query():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    queries = [
+        {"keywords": ["Kids"]},
+        {"keywords": ["Kids", "not a keyword"]},
+        {"persons": ["Katie"]},
+        {"albums": ["Pumpkin Farm"]},
+        {"uuid": [photosdb.photos()[0].uuid]},
+        {"favorite": True},
+        {"hidden": False, "movies": True},
+        {"uti": "jpeg"},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        # query is run in the database without loading all the photos
+        photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+        photos_lazy = photosdb_lazy.photos(**query)
+        assert "photos" not in photosdb_lazy._loaded
+        assert sorted(p.uuid for p in photos_lazy) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_from_date_to_date():
+    import datetime
+    import osxphotos
+
+    from_date = datetime.datetime(2018, 9, 28)
+    to_date = datetime.datetime(2018, 9, 28, 23, 0, 0)
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_scoped = osxphotos.PhotosDB(
+        PHOTOS_DB, from_date=from_date, to_date=to_date
+    )
+
+    photos = photosdb.photos(from_date=from_date, to_date=to_date)
+    assert len(photos) == 4
+    assert sorted(p.uuid for p in photosdb_scoped.photos()) == sorted(
+        p.uuid for p in photos
+    )
+    assert photosdb_scoped.keywords_as_dict == {"Kids": 4}
+
+
+def test_photos_flags():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    for flag in ["ismissing", "hasadjustments", "burst", "iscloudasset"]:
+        for value in [True, False]:
+            assert sorted(
+                p.uuid for p in photosdb.photos(movies=True, **{flag: value})
+            ) == sorted(p.uuid for p in photos if getattr(p, flag) == value)
+
+
+def test_columnar():
+    import datetime
+    import pytest
+    import osxphotos
+
+    pytest.importorskip("numpy")
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_columnar = osxphotos.PhotosDB(PHOTOS_DB, columnar=True)
+    assert len(photosdb_columnar._columns) == len(photosdb._dbphotos)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"persons": ["Katie"], "favorite": False},
+        {"uti": "jpeg"},
+        {"favorite": True, "hidden": False, "ismissing": False},
+        {"hasadjustments": True, "movies": True},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        assert sorted(p.uuid for p in photosdb_columnar.photos(**query)) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_parallel_load():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    ignore_keys = ["_tmp_db", "_tempdir", "_tempdir_name", "_workers", "_processes"]
+    for kwargs in [{"workers": 4}, {"workers": 2, "processes": 2}]:
+        photosdb_parallel = osxphotos.PhotosDB(PHOTOS_DB, **kwargs)
+        assert {
+            k: v for k, v in photosdb.__dict__.items() if k not in ignore_keys
+        } == {
+            k: v for k, v in photosdb_parallel.__dict__.items() if k not in ignore_keys
+        }
+
+
+def test_bitmaps():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_bitmaps = osxphotos.PhotosDB(PHOTOS_DB, bitmaps=True)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"images": False, "movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"keywords": ["Kids"], "persons": ["Katie"], "hidden": False},
+        {"persons": ["Katie"], "favorite": False},
+        {"albums": ["Pumpkin Farm"]},
+        {"uuid": [UUID_DICT["favorite"]]},
+        {"uti": "jpeg"},
+        {"favorite": True, "hidden": False, "ismissing": False},
+        {"hasadjustments": True, "movies": True},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        assert sorted(p.uuid for p in photosdb_bitmaps.photos(**query)) == sorted(
+            p.uuid for p in photosdb.photos(**query)
+        )
+
+
+def test_modified_date():
+    import datetime
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+    photos = photosdb.photos(movies=True)
+
+    since = datetime.datetime(2019, 11, 1, tzinfo=datetime.timezone.utc)
+    before = datetime.datetime(2019, 11, 30, tzinfo=datetime.timezone.utc)
+    for query, expected in [
+        ({"modified_since": since}, lambda p: p.date_modified >= since),
+        ({"modified_before": since}, lambda p: p.date_modified < since),
+        (
+            {"modified_since": since, "modified_before": before},
+            lambda p: since <= p.date_modified < before,
+        ),
+    ]:
+        uuids = sorted(p.uuid for p in photos if expected(p))
+        assert uuids
+        for db in (photosdb, photosdb_lazy):
+            assert sorted(p.uuid for p in db.photos(movies=True, **query)) == uuids
+
+
+def test_calendar():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos()
+
+    for month, day in [(9, None), (None, 28), (9, 28), (2, 30)]:
+        uuids = sorted(
+            p.uuid
+            for p in photos
+            if month in (None, p.date.month) and day in (None, p.date.day)
+        )
+        assert sorted(p.uuid for p in photosdb.photos(month=month, day=day)) == uuids
+
+    date_index = photosdb._get_date_index("imageDate")
+    assert list(date_index.timestamps) == sorted(date_index.timestamps)
+    assert len(date_index) == len(photosdb._dbphotos)
+
+
+def test_iter_photos():
+    import datetime
+    import types
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    queries = [
+        {},
+        {"movies": True},
+        {"keywords": ["Kids"]},
+        {"keywords": ["not a keyword"]},
+        {"persons": ["Katie"], "favorite": False},
+        {"albums": ["Pumpkin Farm"], "hasadjustments": False},
+        {"uti": "jpeg", "month": 9},
+        {
+            "from_date": datetime.datetime(2018, 9, 28),
+            "to_date": datetime.datetime(2018, 9, 28, 23, 0, 0),
+        },
+    ]
+    for query in queries:
+        expected = sorted(p.uuid for p in photosdb.photos(**query))
+        photos = photosdb_lazy.iter_photos(batch_size=2, **query)
+        assert isinstance(photos, types.GeneratorType)
+        assert sorted(p.uuid for p in photos) == expected
+        assert sorted(p.uuid for p in photosdb.iter_photos(**query)) == expected
+
+    # photos are read in batches and not loaded into the PhotosDB object
+    assert "photos" not in photosdb_lazy._loaded
+
+
+def test_photo_info_cached():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photos = photosdb.photos()
+    photo = photosdb.photos(uuid=[UUID_DICT["favorite"]])[0]
+
+    # same PhotoInfo object for a photo while it's in use
+    assert any(p is photo for p in photos)
+    assert all(p is q for p, q in zip(photos, photosdb.photos()))
+
+    # PhotoInfo objects can be used in sets and dicts
+    assert len(set(photos + photosdb.photos())) == len(photos)
+    assert {p: p.uuid for p in photos}[photo] == UUID_DICT["favorite"]
+
+    # equal to the same photo from another PhotosDB for the library
+    photo2 = osxphotos.PhotosDB(PHOTOS_DB).photos(uuid=[UUID_DICT["favorite"]])[0]
+    assert photo2 is not photo
+    assert photo2 == photo
+    assert hash(photo2) == hash(photo)
+
+    # derived properties are computed once; lists are copies
+    assert photo.path == photo.path
+    albums = photo.albums
+    albums.append("not an album")
+    assert photo.albums == photo2.albums
+
+
+def test_location_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    # St James's Park, London
+    for query, expected in [
+        ({"near": (51.5, -0.13, 1)}, ["3Jn73XpSQQCluzRBMWRsMA"]),
+        ({"near": (51.5, -0.13, 0.1)}, []),
+        ({"bbox": (51.4, -0.3, 51.6, 0.0)}, ["3Jn73XpSQQCluzRBMWRsMA"]),
+        ({"bbox": (51.4, 0.0, 51.6, -0.2)}, []),
+    ]:
+        for db in (photosdb, photosdb_lazy):
+            assert [p.uuid for p in db.photos(movies=True, **query)] == expected
+
+
+def test_text_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    for query, expected in [
+        ({"title": ["found"]}, ["15uNd7%8RguTEgNPKHfTWw"]),
+        ({"title": ["pumpkin"], "ignore_case": True}, ["od0fmC7NQx+ayVr+%i06XA"]),
+        (
+            {"description": ["pumpkin"], "text_match": "word"},
+            ["15uNd7%8RguTEgNPKHfTWw", "HrK3ZQdlQ7qpDA0FgOYXLA"],
+        ),
+        ({"filename": ["St James"]}, ["3Jn73XpSQQCluzRBMWRsMA"]),
+        ({"description": ["^Wed"], "text_match": "regex"}, ["YZFCPY24TUySvpu7owiqxA"]),
+    ]:
+        for db in (photosdb, photosdb_lazy):
+            photos = db.photos(movies=True, **query)
+            assert sorted(p.uuid for p in photos) == expected
+
+
+def test_photo_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    for query, expected in [
+        ({"no_title": True}, ["6bxcNnzRQKGnK4uPrCJ9UQ", "HrK3ZQdlQ7qpDA0FgOYXLA"]),
+        ({"keywords": ["Kids"], "no_title": True}, ["HrK3ZQdlQ7qpDA0FgOYXLA"]),
+        ({"favorite": True, "no_title": True}, ["6bxcNnzRQKGnK4uPrCJ9UQ"]),
+        (
+            {"no_description": True},
+            ["3Jn73XpSQQCluzRBMWRsMA", "od0fmC7NQx+ayVr+%i06XA"],
+        ),
+    ]:
+        photo_query = osxphotos.PhotoQuery(movies=True, **query)
+        for db in (photosdb, photosdb_lazy):
+            photos = photo_query.photos(db)
+            assert sorted(p.uuid for p in photos) == expected
+            photos = photo_query.iter_photos(db)
+            assert sorted(p.uuid for p in photos) == expected
+
+
+def test_where_query():
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(PHOTOS_DB)
+    photosdb_lazy = osxphotos.PhotosDB(PHOTOS_DB, lazy=True)
+
+    for where, expected in [
+        (
+            "keyword:Kids and (person:Katie or person:Suzy) and not hidden",
+            [
+                "15uNd7%8RguTEgNPKHfTWw",
+                "8SOE9s0XQVGsuq4ONohTng",
+                "HrK3ZQdlQ7qpDA0FgOYXLA",
+            ],
+        ),
+        ("favorite or hidden", ["6bxcNnzRQKGnK4uPrCJ9UQ", "od0fmC7NQx+ayVr+%i06XA"]),
+        (
+            "keyword:wedding or title:found",
+            [
+                "15uNd7%8RguTEgNPKHfTWw",
+                "6bxcNnzRQKGnK4uPrCJ9UQ",
+                "YZFCPY24TUySvpu7owiqxA",
+            ],
+        ),
+        ("person:Maria and not (favorite or missing)", []),
+    ]:
+        photo_query = osxphotos.PhotoQuery(movies=True, where=where)
+        for db in (photosdb, photosdb_lazy):
+            photos = photo_query.photos(db)
+            assert sorted(p.uuid for p in photos) == expected
+            photos = db.iter_photos(movies=True, where=where)
+            assert sorted(p.uuid for p in photos) == expected
+
+
+def test_prefetch_paths(monkeypatch):
+    import os.path
+    import osxphotos
+
+    photosdb = osxphotos.PhotosDB(dbfile=PHOTOS_DB)
+    photos = photosdb.photos(movies=True)
+    expected = [(p.path_edited, p.path_live_photo) for p in photos]
+    assert any(edited for edited, _ in expected)
+
+    photosdb.refresh_resource_index()
+    photosdb.prefetch_paths(photos, workers=4)
+
+    # files were all checked by prefetch_paths so the disk isn't checked again
+    checked = []
+    isfile = os.path.isfile
+
+    def check(path):
+        checked.append(path)
+        return isfile(path)
+
+    monkeypatch.setattr(os.path, "isfile", check)
+    assert [(p.path_edited, p.path_live_photo) for p in photos] == expected
+    for p in photos:
+        if not p.ismissing:
+            assert p._isfile(p.path) == isfile(p.path)
+    assert checked == []
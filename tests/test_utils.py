@@ -23,6 +23,55 @@ def test_debug_disable():
     assert not logger.isEnabledFor(logging.DEBUG)
 
 
+def test_debug_logging(caplog):
+    import logging
+    import osxphotos
+    from osxphotos.photoinfo import PhotoInfo
+
+    def repr_called(self):
+        raise AssertionError("PhotoInfo formatted for a debug message")
+
+    photosdb = osxphotos.PhotosDB(DB_UNLOCKED_10_15)
+    osxphotos._set_debug(False)
+    caplog.set_level(logging.DEBUG)
+    repr_ = PhotoInfo.__repr__
+    PhotoInfo.__repr__ = repr_called
+    try:
+        # debug messages aren't formatted or logged when debugging is off
+        assert photosdb.photos(keywords=["Kids"])
+        assert not [r for r in caplog.records if r.levelno == logging.DEBUG]
+    finally:
+        PhotoInfo.__repr__ = repr_
+
+    # osxphotos logs to the "osxphotos" logger
+    osxphotos._set_debug(True)
+    try:
+        photosdb.photos(keywords=["Kids"])
+        assert caplog.records
+        assert all(r.name.startswith("osxphotos.") for r in caplog.records)
+    finally:
+        osxphotos._set_debug(False)
+
+
+def test_debug_restores_level():
+    import logging
+    import osxphotos
+
+    # turning debug off doesn't override the level the application set
+    logger = osxphotos._get_logger()
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        osxphotos._set_debug(True)
+        assert logger.isEnabledFor(logging.DEBUG)
+        osxphotos._set_debug(False)
+        assert logger.level == logging.WARNING
+        osxphotos._set_debug(False)
+        assert logger.level == logging.WARNING
+    finally:
+        logger.setLevel(level)
+
+
 def test_dd_to_dms():
     # expands coverage for edge case in _dd_to_dms
     from osxphotos.utils import _dd_to_dms
@@ -51,3 +100,308 @@ def test_db_is_locked_unlocked():
     import osxphotos
 
     assert not osxphotos.utils._db_is_locked(DB_UNLOCKED_10_15)
+
+
+def test_export_session_reserve():
+    import pathlib
+    import tempfile
+
+    from osxphotos import ExportSession
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    dest = pathlib.Path(tempdir.name)
+    (dest / "file1.png").touch()
+    (dest / "file2.json").touch()
+
+    session = ExportSession()
+    # stem used by another file or sidecar so name is incremented
+    assert session.reserve(dest / "file1.jpeg") == dest / "file1 (1).jpeg"
+    assert session.reserve(dest / "file1.jpeg") == dest / "file1 (2).jpeg"
+    assert session.reserve(dest / "file2.jpeg") == dest / "file2 (1).jpeg"
+    assert session.reserve(dest / "file3.jpeg") == dest / "file3.jpeg"
+    assert session.reserve(dest / "file3.jpeg") == dest / "file3 (1).jpeg"
+    assert session.reserve(dest / "file1.jpeg", overwrite=True) == dest / "file1.jpeg"
+    assert session.reserve(dest / "file4.jpeg", increment=False) == dest / "file4.jpeg"
+    assert session.reserve(dest / "file4.jpeg") == dest / "file4 (1).jpeg"
+
+
+def test_export_session_reserve_threads():
+    import tempfile
+    import threading
+
+    from osxphotos import ExportSession
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    session = ExportSession()
+    names = []
+
+    def reserve():
+        for _ in range(50):
+            names.append(session.reserve(f"{tempdir.name}/IMG_0001.JPG").name)
+
+    threads = [threading.Thread(target=reserve) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(names) == 400
+    assert len(set(names)) == 400
+    assert "IMG_0001.JPG" in names
+    assert "IMG_0001 (399).JPG" in names
+
+
+def test_export_session_create_path_by_date():
+    import datetime
+    import os.path
+    import tempfile
+
+    import pytest
+
+    from osxphotos import ExportSession
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    session = ExportSession()
+    dt = datetime.datetime(2019, 7, 4).timetuple()
+    path = session.create_path_by_date(tempdir.name, dt)
+    assert path == os.path.join(tempdir.name, "2019", "07", "04")
+    assert os.path.isdir(path)
+    assert session.create_path_by_date(tempdir.name, dt) == path
+
+    with pytest.raises(FileNotFoundError):
+        session.create_path_by_date(os.path.join(tempdir.name, "missing"), dt)
+
+
+def test_copy_file():
+    import os
+    import tempfile
+
+    from osxphotos.utils import _copy_file
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    src = os.path.join(tempdir.name, "src.jpeg")
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    with open(src, "wb") as f:
+        f.write(data)
+    os.chmod(src, 0o640)
+    os.utime(src, ns=(1_500_000_000_123_456_789, 1_500_000_000_123_456_789))
+    xattr = hasattr(os, "setxattr")
+    if xattr:
+        try:
+            os.setxattr(src, "user.osxphotos", b"test")
+        except OSError:
+            xattr = False
+
+    dest = os.path.join(tempdir.name, "dest.jpeg")
+    with open(dest, "wb") as f:
+        f.write(b"overwritten")
+    _copy_file(src, dest)
+
+    with open(dest, "rb") as f:
+        assert f.read() == data
+    stat = os.stat(dest)
+    assert stat.st_mtime_ns == 1_500_000_000_123_456_789
+    assert stat.st_mode & 0o777 == 0o640
+    if xattr:
+        assert os.getxattr(dest, "user.osxphotos") == b"test"
+    # no temporary files left
+    assert sorted(os.listdir(tempdir.name)) == ["dest.jpeg", "src.jpeg"]
+
+    # copy into a directory, creating the folder dest is in
+    _copy_file(src, os.path.join(tempdir.name, "sub"))
+    assert os.path.isfile(os.path.join(tempdir.name, "sub"))
+    _copy_file(src, os.path.join(tempdir.name, "new", "dest.jpeg"))
+    assert os.path.isfile(os.path.join(tempdir.name, "new", "dest.jpeg"))
+    os.makedirs(os.path.join(tempdir.name, "folder"))
+    _copy_file(src, os.path.join(tempdir.name, "folder"))
+    assert os.listdir(os.path.join(tempdir.name, "folder")) == ["src.jpeg"]
+
+
+def test_copy_file_methods():
+    import os
+    import tempfile
+
+    from osxphotos.filecopy import _COPY_METHODS, _copy_data
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    src = os.path.join(tempdir.name, "src")
+    data = os.urandom(2 * 1024 * 1024 + 5)
+    with open(src, "wb") as f:
+        f.write(data)
+
+    for method in _COPY_METHODS:
+        dest = os.path.join(tempdir.name, method[0])
+        with open(src, "rb") as src_file, open(dest, "wb") as dest_file:
+            # falls back to reading and writing buffers if method isn't supported here
+            used = _copy_data(
+                src_file.fileno(),
+                dest_file.fileno(),
+                len(data),
+                [method, _COPY_METHODS[-1]],
+            )
+        assert used in (method[0], "buffered")
+        with open(dest, "rb") as f:
+            assert f.read() == data
+
+
+def test_copy_file_error():
+    import os
+    import tempfile
+
+    import pytest
+
+    from osxphotos.filecopy import copy_file
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    dest = os.path.join(tempdir.name, "dest.jpeg")
+    with open(dest, "wb") as f:
+        f.write(b"original")
+
+    with pytest.raises(FileNotFoundError):
+        copy_file(os.path.join(tempdir.name, "missing.jpeg"), dest)
+
+    # dest untouched and no temporary file left
+    assert os.listdir(tempdir.name) == ["dest.jpeg"]
+    with open(dest, "rb") as f:
+        assert f.read() == b"original"
+
+
+def test_copy_file_range_copies_nothing(monkeypatch):
+    import os
+    import tempfile
+
+    import pytest
+
+    import osxphotos.filecopy
+    from osxphotos.filecopy import copy_file
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    src = os.path.join(tempdir.name, "src.jpeg")
+    data = os.urandom(1024 * 1024 + 3)
+    with open(src, "wb") as f:
+        f.write(data)
+    monkeypatch.setattr(
+        osxphotos.filecopy,
+        "_COPY_METHODS",
+        [m for m in osxphotos.filecopy._COPY_METHODS if m[0] != "clone"],
+    )
+
+    # some filesystems return 0 from copy_file_range without copying: falls back
+    monkeypatch.setattr(os, "copy_file_range", lambda *args: 0, raising=False)
+    dest = os.path.join(tempdir.name, "dest.jpeg")
+    copy_file(src, dest)
+    with open(dest, "rb") as f:
+        assert f.read() == data
+
+    # copy that ends early raises instead of leaving a truncated file
+    calls = []
+
+    def short_copy(src_fd, dest_fd, count):
+        calls.append(count)
+        return 10 if len(calls) == 1 else 0
+
+    monkeypatch.setattr(os, "copy_file_range", short_copy, raising=False)
+    with pytest.raises(OSError):
+        copy_file(src, dest)
+    with open(dest, "rb") as f:
+        assert f.read() == data
+    assert sorted(os.listdir(tempdir.name)) == ["dest.jpeg", "src.jpeg"]
+
+
+def test_pipeline():
+    import time
+
+    import pytest
+
+    from osxphotos.pipeline import Pipeline, PipelineStage
+
+    order = []
+
+    def slow_square(x):
+        # later items finish first
+        time.sleep(0.001 * (20 - x % 20))
+        return x * x
+
+    def record(x):
+        order.append(x)
+        return x
+
+    pipeline = Pipeline(
+        [
+            PipelineStage("square", slow_square, workers=4),
+            PipelineStage("record", record, ordered=True),
+            PipelineStage("negate", lambda x: -x, workers=2, queue_size=1),
+        ]
+    )
+    assert list(pipeline.run(range(100))) == [-x * x for x in range(100)]
+    assert order == [x * x for x in range(100)]
+
+    stats = pipeline.stats()
+    assert [s["name"] for s in stats] == ["square", "record", "negate"]
+    assert [s["workers"] for s in stats] == [4, 1, 2]
+    assert all(s["processed"] == 100 for s in stats)
+    assert stats[0]["busy"] > 0
+    assert all(s["max_queue_depth"] <= 2 * s["workers"] for s in stats)
+    assert stats[2]["max_queue_depth"] <= 1
+
+    def fail(x):
+        if x == 50:
+            raise ValueError(x)
+        return x
+
+    results = []
+    with pytest.raises(ValueError):
+        for x in Pipeline([PipelineStage("fail", fail, workers=3)]).run(range(100)):
+            results.append(x)
+    assert results == list(range(50))
+
+    with pytest.raises(ValueError):
+        PipelineStage("ordered", record, workers=2, ordered=True)
+
+
+def test_export_db():
+    import os.path
+    import tempfile
+
+    from osxphotos.exportdb import ExportDB, ExportedFile, ExportRecord
+
+    tempdir = tempfile.TemporaryDirectory(prefix="osxphotos_")
+    src = os.path.join(tempdir.name, "src.jpg")
+    dest = os.path.join(tempdir.name, "IMG_0001.jpg")
+    for path in (src, dest):
+        with open(path, "w") as f:
+            f.write("photo")
+
+    export_db = ExportDB(tempdir.name)
+    assert export_db.get("UUID1") is None
+    export_db.record(
+        ExportRecord(
+            "UUID1",
+            "hash",
+            {
+                "original": ExportedFile.copied(dest, src),
+                "json": ExportedFile(os.path.join(tempdir.name, "IMG_0001.json")),
+            },
+        )
+    )
+    export_db.record(ExportRecord("UUID2", None, {}))
+    export_db.remove("UUID2")
+    export_db.close()
+
+    # records are read back when the database is opened again
+    export_db = ExportDB(tempdir.name)
+    assert export_db.uuids() == {"UUID1"}
+    record = export_db.get("UUID1")
+    assert record.metadata == "hash"
+    assert sorted(record.files) == ["json", "original"]
+    original = record.files["original"]
+    assert original.path == dest
+    assert original.src == src
+    assert original.unchanged(dest, src)
+    assert record.files["json"].src is None
+
+    # changed source
+    with open(src, "w") as f:
+        f.write("edited photo")
+    assert not original.unchanged(dest, src)
+    export_db.close()